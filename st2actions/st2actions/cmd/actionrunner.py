@@ -21,7 +21,7 @@ eventlet.monkey_patch(
 
 def _setup():
     common_setup(service='actionrunner', config=config, setup_db=True, register_mq_exchanges=True,
-                 register_signal_handlers=True)
+                 register_signal_handlers=True, use_resource_cache=True)
 
 
 def _run_worker():
@@ -45,7 +45,22 @@ def _register_action_runner_opts():
         cfg.StrOpt('logging', default='conf/logging.conf',
                    help='location of the logging.conf file'),
         cfg.StrOpt('python_binary', default=sys.executable,
-                   help='Python binary which will be used by Python actions.')
+                   help='Python binary which will be used by Python actions.'),
+        cfg.BoolOpt('python_runner_worker_pool', default=False,
+                    help='True to run Python actions in a pool of long-lived worker processes '
+                         'instead of starting a new process for each execution.'),
+        cfg.IntOpt('python_runner_worker_pool_size', default=4,
+                   help='Maximum number of Python action worker processes per pack.'),
+        cfg.IntOpt('python_runner_worker_max_executions', default=100,
+                   help='Number of executions after which a Python action worker process is '
+                        'replaced with a new one.'),
+        cfg.BoolOpt('action_chain_status_notifications', default=True,
+                    help='True to let action chains wait for the tasks to complete using the '
+                         'live action status notifications instead of polling the database '
+                         'every second.'),
+        cfg.IntOpt('action_chain_status_poll_interval', default=5,
+                   help='How often (in seconds) action chains check the status of a task if no '
+                        'status notification has been received.')
     ]
     CONF.register_opts(logging_opts, group='actionrunner')
 
@@ -50,7 +50,10 @@ def _register_notifier_opts():
         cfg.IntOpt('delayed_execution_recovery', default=600,
                    help='The time in seconds to wait before recovering delayed action executions.'),
         cfg.IntOpt('rescheduling_interval', default=300,
-                   help='The frequency for rescheduling action executions.')
+                   help='The frequency for rescheduling action executions.'),
+        cfg.IntOpt('concurrency_reconciliation_interval', default=300,
+                   help='How often (in seconds) to reconcile concurrency policy slots with the '
+                        'action executions. 0 to disable.')
     ]
     CONF.register_opts(scheduler_opts, group='scheduler')
 
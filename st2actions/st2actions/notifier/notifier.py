@@ -23,8 +23,6 @@ from st2common.constants.action import LIVEACTION_STATUS_SUCCEEDED, LIVEACTION_S
 from st2common.constants.triggers import INTERNAL_TRIGGER_TYPES
 from st2common.models.api.trace import TraceContext
 from st2common.models.db.liveaction import LiveActionDB
-from st2common.persistence.action import Action
-from st2common.persistence.policy import Policy
 from st2common import policies
 from st2common.models.system.common import ResourceReference
 from st2common.persistence.execution import ActionExecution
@@ -32,6 +30,7 @@ from st2common.services import trace as trace_service
 from st2common.transport import consumers, liveaction, publishers
 from st2common.transport import utils as transport_utils
 from st2common.transport.reactor import TriggerDispatcher
+from st2common.util import action_db as action_utils
 
 __all__ = [
     'Notifier',
@@ -51,6 +50,7 @@ NOTIFY_TRIGGER_TYPE = INTERNAL_TRIGGER_TYPES['action'][1]
 
 class Notifier(consumers.MessageHandler):
     message_type = LiveActionDB
+    service_name = 'notifier'
 
     def __init__(self, connection, queues, trigger_dispatcher=None):
         super(Notifier, self).__init__(connection, queues)
@@ -193,7 +193,7 @@ class Notifier(consumers.MessageHandler):
 
     def _apply_post_run_policies(self, liveaction=None, execution_id=None):
         # Apply policies defined for the action.
-        for policy_db in Policy.query(resource_ref=liveaction.action):
+        for policy_db in action_utils.get_policies_by_resource_ref(liveaction.action):
             driver = policies.get_driver(policy_db.ref,
                                          policy_db.policy_type,
                                          **policy_db.parameters)
@@ -209,7 +209,7 @@ class Notifier(consumers.MessageHandler):
 
         :rtype: ``str``
         """
-        action = Action.get_by_ref(action_ref)
+        action = action_utils.get_action_by_ref(action_ref)
         return action['runner_type']['name']
 
 
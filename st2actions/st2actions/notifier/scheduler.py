@@ -22,6 +22,7 @@ import apscheduler.util as aps_utils
 
 from st2common import log as logging
 from st2common.constants import action as action_constants
+from st2common.services import concurrency as concurrency_service
 from st2common.services import coordination
 from st2common.util import date as date_utils
 from st2common.services import action as action_service
@@ -29,7 +30,8 @@ from st2common.persistence.liveaction import LiveAction
 
 __all__ = [
     'get_rescheduler',
-    'recover_delayed_executions'
+    'recover_delayed_executions',
+    'reconcile_concurrency_slots'
 ]
 
 LOG = logging.getLogger(__name__)
@@ -50,6 +52,18 @@ def get_rescheduler():
                   next_run_time=date_utils.get_datetime_utc_now(),
                   replace_existing=True)
 
+    if cfg.CONF.scheduler.concurrency_reconciliation_interval > 0:
+        time_spec = {
+            'seconds': cfg.CONF.scheduler.concurrency_reconciliation_interval,
+            'timezone': aps_utils.astimezone('UTC')
+        }
+
+        timer.add_job(reconcile_concurrency_slots,
+                      trigger=IntervalTrigger(**time_spec),
+                      max_instances=1,
+                      misfire_grace_time=60,
+                      replace_existing=True)
+
     return timer
 
 
@@ -82,3 +96,8 @@ def recover_delayed_executions():
                 LOG.exception('Unable to reschedule liveaction. <LiveAction.id=%s>', instance.id)
 
         LOG.info('Rescheduled %d out of %d delayed liveactions.', len(liveactions), rescheduled)
+
+
+def reconcile_concurrency_slots():
+    count = concurrency_service.reconcile_slots()
+    LOG.debug('Reconciled %d concurrency slots.', count)
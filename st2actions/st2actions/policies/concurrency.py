@@ -13,13 +13,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import json
-
 from st2common.constants import action as action_constants
 from st2common import log as logging
+from st2common.exceptions.db import StackStormDBObjectNotFoundError
 from st2common.persistence import action as action_access
 from st2common.policies import base
 from st2common.services import action as action_service
+from st2common.services import concurrency as concurrency_service
 from st2common.services import coordination
 
 
@@ -27,36 +27,45 @@ LOG = logging.getLogger(__name__)
 
 
 class ConcurrencyApplicator(base.ResourcePolicyApplicator):
+    """
+    Delays executions of the action once the number of its scheduled and running executions
+    reaches the threshold.
+
+    Slots are tracked by the concurrency service so the scheduling decision doesn't query the
+    live actions. Delayed executions are queued and scheduled in the order they were delayed.
+    """
 
     def __init__(self, policy_ref, policy_type, *args, **kwargs):
         super(ConcurrencyApplicator, self).__init__(policy_ref, policy_type, *args, **kwargs)
         self.coordinator = coordination.get_coordinator()
         self.threshold = kwargs.get('threshold', 0)
 
-    def _get_lock_uid(self, target):
-        return json.dumps({'policy_type': self._policy_type, 'action': target.action})
-
-    def _apply_before(self, target):
-        # Get the count of scheduled instances of the action.
-        scheduled = action_access.LiveAction.count(
-            action=target.action, status=action_constants.LIVEACTION_STATUS_SCHEDULED)
+    def _get_slot_attributes(self, target):
+        return None
 
-        # Get the count of running instances of the action.
-        running = action_access.LiveAction.count(
-            action=target.action, status=action_constants.LIVEACTION_STATUS_RUNNING)
+    def _get_slot_key(self, target):
+        return concurrency_service.get_slot_key(policy_ref=self._policy_ref,
+                                                action_ref=target.action,
+                                                attributes=self._get_slot_attributes(target))
 
-        count = scheduled + running
+    def _get_lock_uid(self, target):
+        return concurrency_service.get_lock_uid(self._get_slot_key(target))
 
-        # Mark the execution as scheduled if threshold is not reached or delayed otherwise.
-        if count < self.threshold:
-            LOG.debug('There are %s instances of %s in scheduled or running status. '
-                      'Threshold of %s is not reached. Action execution will be scheduled.',
-                      count, target.action, self._policy_ref)
+    def _apply_before(self, target):
+        slot_key = self._get_slot_key(target)
+        concurrency_service.ensure_slots(slot_key=slot_key, policy_ref=self._policy_ref,
+                                         action_ref=target.action,
+                                         attributes=self._get_slot_attributes(target))
+
+        # Mark the execution as scheduled if a slot is available or delayed otherwise.
+        if concurrency_service.acquire_slot(slot_key, str(target.id), self.threshold):
+            LOG.debug('Threshold of %s is not reached. Action execution of %s will be scheduled.',
+                      self._policy_ref, target.action)
             status = action_constants.LIVEACTION_STATUS_SCHEDULED
         else:
-            LOG.debug('There are %s instances of %s in scheduled or running status. '
-                      'Threshold of %s is reached. Action execution will be delayed.',
-                      count, target.action, self._policy_ref)
+            LOG.debug('Threshold of %s is reached. Action execution of %s will be delayed.',
+                      self._policy_ref, target.action)
+            concurrency_service.delay(slot_key, str(target.id))
             status = action_constants.LIVEACTION_STATUS_DELAYED
 
         # Update the status in the database but do not publish.
@@ -75,7 +84,7 @@ class ConcurrencyApplicator(base.ResourcePolicyApplicator):
         if not coordination.configured():
             LOG.warn('Coordination service is not configured. Policy enforcement is best effort.')
 
-        # Acquire a distributed lock before querying the database to make sure that only one
+        # Acquire a distributed lock before updating the slots to make sure that only one
         # scheduler is scheduling execution for this action. Even if the coordination service
         # is not configured, the fake driver using zake or the file driver can still acquire
         # a lock for the local process or server respectively.
@@ -87,21 +96,37 @@ class ConcurrencyApplicator(base.ResourcePolicyApplicator):
         return target
 
     def _apply_after(self, target):
-        # Schedule the oldest delayed executions.
-        requests = action_access.LiveAction.query(action=target.action,
-                                                  status=action_constants.LIVEACTION_STATUS_DELAYED,
-                                                  order_by=['start_timestamp'], limit=1)
+        slot_key = self._get_slot_key(target)
+        concurrency_service.release_slot(slot_key, str(target.id))
+
+        # Hand the slot over to the oldest delayed execution. Executions which are not delayed
+        # anymore (e.g. they have been canceled) are skipped.
+        while True:
+            liveaction_id = concurrency_service.acquire_slot_for_delayed(slot_key, self.threshold)
+
+            if not liveaction_id:
+                break
+
+            try:
+                liveaction_db = action_access.LiveAction.get_by_id(liveaction_id)
+            except StackStormDBObjectNotFoundError:
+                liveaction_db = None
+
+            if (not liveaction_db or
+                    liveaction_db.status != action_constants.LIVEACTION_STATUS_DELAYED):
+                concurrency_service.release_slot(slot_key, liveaction_id)
+                continue
 
-        if requests:
             action_service.update_status(
-                requests[0], action_constants.LIVEACTION_STATUS_REQUESTED, publish=True)
+                liveaction_db, action_constants.LIVEACTION_STATUS_REQUESTED, publish=True)
+            break
 
     def apply_after(self, target):
         # Warn users that the coordination service is not configured.
         if not coordination.configured():
             LOG.warn('Coordination service is not configured. Policy enforcement is best effort.')
 
-        # Acquire a distributed lock before querying the database to make sure that only one
+        # Acquire a distributed lock before updating the slots to make sure that only one
         # scheduler is scheduling execution for this action. Even if the coordination service
         # is not configured, the fake driver using zake or the file driver can still acquire
         # a lock for the local process or server respectively.
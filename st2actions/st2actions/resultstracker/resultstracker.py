@@ -36,6 +36,7 @@ ACTIONSTATE_WORK_Q = actionexecutionstate.get_queue('st2.resultstracker.work',
 
 class ResultsTracker(consumers.MessageHandler):
     message_type = ActionExecutionStateDB
+    service_name = 'resultstracker'
 
     def __init__(self, connection, queues):
         super(ResultsTracker, self).__init__(connection, queues)
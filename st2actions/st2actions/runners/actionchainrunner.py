@@ -14,6 +14,9 @@
 # limitations under the License.
 
 import eventlet
+from eventlet.semaphore import Semaphore
+import six
+from oslo_config import cfg
 import traceback
 import uuid
 import datetime
@@ -35,6 +38,7 @@ from st2common.models.utils import action_param_utils
 from st2common.persistence.execution import ActionExecution
 from st2common.services import action as action_service
 from st2common.services.keyvalues import KeyValueLookup
+from st2common.services.liveaction_watcher import get_liveaction_status_watcher
 from st2common.util import action_db as action_db_util
 from st2common.util import isotime
 from st2common.util import date as date_utils
@@ -44,6 +48,62 @@ from st2common.util import jinja as jinja_utils
 LOG = logging.getLogger(__name__)
 RESULTS_KEY = '__results'
 
+# Maximum number of tasks executed at the same time by parallel branches (unless specified in the
+# chain definition)
+DEFAULT_CONCURRENCY = 10
+
+
+def _get_kv_lookup(mapping):
+    kv_lookup = KeyValueLookup()
+
+    # Retrieve all the datastore values referenced by the mapping at once
+    kv_lookup.prefetch(six.itervalues(mapping or {}))
+
+    return kv_lookup
+
+
+class ChainState(object):
+    """
+    Results and variables of a chain (or of a parallel branch of a chain).
+
+    Each parallel branch works on its own copy of the state so the branches can't see each
+    other's results and variables. Once all the branches complete, results and variables
+    published by the branches are merged into the parent state in the order in which the branches
+    are defined so the outcome doesn't depend on the order in which the branches complete.
+    """
+
+    def __init__(self, context_result=None, chain_vars=None):
+        self.tasks = []  # holds formatted results of the executed tasks
+        self.context_result = context_result if context_result is not None else {}
+        self.vars = chain_vars if chain_vars is not None else {}
+        self.top_level_error = None
+
+        # Results and variables which have been added since the state has been forked
+        self._new_results = {}
+        self._new_vars = {}
+
+    def set_result(self, task_name, result):
+        self.context_result[task_name] = result
+        self._new_results[task_name] = result
+
+    def publish_vars(self, published_vars):
+        self.vars.update(published_vars)
+        self._new_vars.update(published_vars)
+
+    def fork(self):
+        return ChainState(context_result=dict(self.context_result), chain_vars=dict(self.vars))
+
+    def join(self, branch_state):
+        self.tasks.extend(branch_state.tasks)
+
+        for task_name, result in six.iteritems(branch_state._new_results):
+            self.set_result(task_name, result)
+
+        self.publish_vars(branch_state._new_vars)
+
+        if branch_state.top_level_error and not self.top_level_error:
+            self.top_level_error = branch_state.top_level_error
+
 
 class ChainHolder(object):
 
@@ -56,6 +116,7 @@ class ChainHolder(object):
         LOG.debug('Using %s as default for %s.', self.actionchain.default, self.chainname)
         if not self.actionchain.default:
             raise Exception('Failed to find default node in %s.' % (self.chainname))
+        self._validate_nodes()
         self.vars = {}
 
     def init_vars(self, action_parameters):
@@ -80,7 +141,9 @@ class ChainHolder(object):
         node_names = set(all_nodes)
         on_success_nodes = set([node.on_success for node in _actionchain.chain])
         on_failure_nodes = set([node.on_failure for node in _actionchain.chain])
-        referenced_nodes = on_success_nodes | on_failure_nodes
+        parallel_nodes = set([name for node in _actionchain.chain for name in
+                              (node.parallel or [])])
+        referenced_nodes = on_success_nodes | on_failure_nodes | parallel_nodes
         possible_default_nodes = node_names - referenced_nodes
         if possible_default_nodes:
             # This is to preserve order. set([..]) does not preserve the order so iterate
@@ -91,11 +154,31 @@ class ChainHolder(object):
         # If no node is found assume the first node in the chain list to be default.
         return _actionchain.chain[0].name
 
+    def _validate_nodes(self):
+        node_names = set([node.name for node in self.actionchain.chain])
+
+        for node in self.actionchain.chain:
+            if node.parallel is None:
+                if not node.ref:
+                    raise Exception('Node "%s" in %s needs to specify either "ref" or '
+                                    '"parallel".' % (node.name, self.chainname))
+                continue
+
+            if node.ref:
+                raise Exception('Parallel node "%s" in %s can\'t specify "ref".' %
+                                (node.name, self.chainname))
+
+            for branch_node_name in node.parallel:
+                if branch_node_name not in node_names:
+                    raise Exception('Unable to find node with name "%s" referenced by parallel '
+                                    'node "%s" in %s.' % (branch_node_name, node.name,
+                                                         self.chainname))
+
     @staticmethod
     def _get_rendered_vars(vars, action_parameters):
         if not vars:
             return {}
-        context = {SYSTEM_KV_PREFIX: KeyValueLookup()}
+        context = {SYSTEM_KV_PREFIX: _get_kv_lookup(mapping=vars)}
         context.update(action_parameters)
         return jinja_utils.render_values(mapping=vars, context=context)
 
@@ -130,6 +213,7 @@ class ActionChainRunner(ActionRunner):
         self._stopped = False
         self._skip_notify_tasks = []
         self._chain_notify = None
+        self._task_semaphore = None
 
     def pre_run(self):
         chainspec_file = self.entry_point
@@ -161,7 +245,6 @@ class ActionChainRunner(ActionRunner):
 
     def run(self, action_parameters):
         result = {'tasks': []}  # holds final result we store
-        context_result = {}  # holds result which is used for the template context purposes
         top_level_error = None  # stores a reference to a top level error
         fail = True
         action_node = None
@@ -188,122 +271,237 @@ class ActionChainRunner(ActionRunner):
         if getattr(self.liveaction, 'context', None):
             parent_context.update(self.liveaction.context)
 
+        concurrency = self.chain_holder.actionchain.concurrency or DEFAULT_CONCURRENCY
+        self._task_semaphore = Semaphore(concurrency)
+
+        # Variables published by the tasks are stored directly in the chain holder vars
+        state = ChainState(chain_vars=self.chain_holder.vars)
+        state.top_level_error = top_level_error
+
+        if action_node:
+            status = self._run_nodes(action_node=action_node, action_parameters=action_parameters,
+                                     parent_context=parent_context, state=state)
+
+            if status == LIVEACTION_STATUS_CANCELED:
+                result['tasks'] = state.tasks
+                return (status, result, None)
+
+            fail = (status == LIVEACTION_STATUS_FAILED)
+
+        result['tasks'] = state.tasks
+
+        if fail:
+            status = LIVEACTION_STATUS_FAILED
+        else:
+            status = LIVEACTION_STATUS_SUCCEEDED
+
+        if state.top_level_error:
+            # Include top level error information
+            result['error'] = state.top_level_error['error']
+            result['traceback'] = state.top_level_error['traceback']
+
+        return (status, result, None)
+
+    def _run_nodes(self, action_node, action_parameters, parent_context, state,
+                   join_node_name=None):
+        """
+        Execute the provided node and the nodes which follow it until there is no next node.
+
+        :param join_node_name: Name of the node at which the execution stops (used by the
+                               parallel branches).
+        :type join_node_name: ``str``
+
+        :return: Status of the last executed node (succeeded, failed) or canceled if the chain
+                 has been canceled.
+        :rtype: ``str``
+        """
+        fail = True
+
         while action_node:
             fail = False
             error = None
             liveaction = None
 
-            created_at = date_utils.get_datetime_utc_now()
+            if action_node.parallel is not None:
+                status = self._run_parallel_node(action_node=action_node,
+                                                 action_parameters=action_parameters,
+                                                 parent_context=parent_context, state=state)
 
-            try:
-                liveaction = self._get_next_action(
-                    action_node=action_node, parent_context=parent_context,
-                    action_params=action_parameters, context_result=context_result)
-            except InvalidActionReferencedException as e:
-                error = ('Failed to run task "%s". Action with reference "%s" doesn\'t exist.' %
-                         (action_node.name, action_node.ref))
-                LOG.exception(error)
+                if status == LIVEACTION_STATUS_CANCELED:
+                    return status
 
-                fail = True
-                top_level_error = {
-                    'error': error,
-                    'traceback': traceback.format_exc(10)
-                }
-                break
-            except ParameterRenderingFailedException as e:
-                # Rendering parameters failed before we even got to running this action, abort and
-                # fail the whole action chain
-                LOG.exception('Failed to run action "%s".', action_node.name)
+                if state.top_level_error:
+                    # One of the branches has been aborted, abort the whole chain
+                    fail = True
+                    break
+
+                fail = (status == LIVEACTION_STATUS_FAILED)
+            else:
+                created_at = date_utils.get_datetime_utc_now()
+
+                try:
+                    liveaction = self._get_next_action(
+                        action_node=action_node, parent_context=parent_context,
+                        action_params=action_parameters, context_result=state.context_result,
+                        chain_vars=state.vars)
+                except InvalidActionReferencedException as e:
+                    error = ('Failed to run task "%s". Action with reference "%s" doesn\'t '
+                             'exist.' % (action_node.name, action_node.ref))
+                    LOG.exception(error)
+
+                    fail = True
+                    state.top_level_error = {
+                        'error': error,
+                        'traceback': traceback.format_exc(10)
+                    }
+                    break
+                except ParameterRenderingFailedException as e:
+                    # Rendering parameters failed before we even got to running this action,
+                    # abort and fail the whole action chain
+                    LOG.exception('Failed to run action "%s".', action_node.name)
+
+                    fail = True
+                    error = ('Failed to run task "%s". Parameter rendering failed: %s' %
+                             (action_node.name, str(e)))
+                    trace = traceback.format_exc(10)
+                    state.top_level_error = {
+                        'error': error,
+                        'traceback': trace
+                    }
+                    break
+
+                try:
+                    # Slot is held until the task completes so at most "concurrency" tasks are
+                    # executed at the same time
+                    with self._task_semaphore:
+                        liveaction = self._run_action(liveaction)
+                except Exception as e:
+                    # Save the traceback and error message
+                    LOG.exception('Failure in running action "%s".', action_node.name)
+
+                    error = {
+                        'error': 'Task "%s" failed: %s' % (action_node.name, str(e)),
+                        'traceback': traceback.format_exc(10)
+                    }
+                    state.set_result(action_node.name, error)
+                else:
+                    # Update context result
+                    state.set_result(action_node.name, liveaction.result)
+
+                    # Render and publish variables
+                    rendered_publish_vars = ActionChainRunner._render_publish_vars(
+                        action_node=action_node, action_parameters=action_parameters,
+                        execution_result=liveaction.result,
+                        previous_execution_results=state.context_result,
+                        chain_vars=state.vars)
+
+                    if rendered_publish_vars:
+                        state.publish_vars(rendered_publish_vars)
+                finally:
+                    # Record result
+                    updated_at = date_utils.get_datetime_utc_now()
+
+                    format_kwargs = {'action_node': action_node, 'liveaction_db': liveaction,
+                                     'created_at': created_at, 'updated_at': updated_at}
+
+                    if error:
+                        format_kwargs['error'] = error
+
+                    task_result = self._format_action_exec_result(**format_kwargs)
+                    state.tasks.append(task_result)
+
+                fail = (not liveaction or liveaction.status == LIVEACTION_STATUS_FAILED)
+
+            # Resolve a next node based on the task success or failure
+            if self.liveaction_id:
+                self._stopped = action_service.is_action_canceled_or_canceling(
+                    self.liveaction_id)
+
+            if self._stopped:
+                LOG.info('Chain execution (%s) canceled by user.', self.liveaction_id)
+                return LIVEACTION_STATUS_CANCELED
+
+            try:
+                if fail:
+                    action_node = self.chain_holder.get_next_node(action_node.name,
+                                                                  condition='on-failure')
+                elif liveaction is None or liveaction.status == LIVEACTION_STATUS_SUCCEEDED:
+                    action_node = self.chain_holder.get_next_node(action_node.name,
+                                                                  condition='on-success')
+            except Exception as e:
+                LOG.exception('Failed to get next node "%s".', action_node.name)
 
                 fail = True
-                error = ('Failed to run task "%s". Parameter rendering failed: %s' %
+                error = ('Failed to get next node "%s". Lookup failed: %s' %
                          (action_node.name, str(e)))
                 trace = traceback.format_exc(10)
-                top_level_error = {
+                state.top_level_error = {
                     'error': error,
                     'traceback': trace
                 }
                 break
 
-            try:
-                liveaction = self._run_action(liveaction)
-            except Exception as e:
-                # Save the traceback and error message
-                LOG.exception('Failure in running action "%s".', action_node.name)
-
-                error = {
-                    'error': 'Task "%s" failed: %s' % (action_node.name, str(e)),
-                    'traceback': traceback.format_exc(10)
-                }
-                context_result[action_node.name] = error
-            else:
-                # Update context result
-                context_result[action_node.name] = liveaction.result
-
-                # Render and publish variables
-                rendered_publish_vars = ActionChainRunner._render_publish_vars(
-                    action_node=action_node, action_parameters=action_parameters,
-                    execution_result=liveaction.result, previous_execution_results=context_result,
-                    chain_vars=self.chain_holder.vars)
-
-                if rendered_publish_vars:
-                    self.chain_holder.vars.update(rendered_publish_vars)
-            finally:
-                # Record result and resolve a next node based on the task success or failure
-                updated_at = date_utils.get_datetime_utc_now()
-
-                format_kwargs = {'action_node': action_node, 'liveaction_db': liveaction,
-                                 'created_at': created_at, 'updated_at': updated_at}
-
-                if error:
-                    format_kwargs['error'] = error
-
-                task_result = self._format_action_exec_result(**format_kwargs)
-                result['tasks'].append(task_result)
-
-                if self.liveaction_id:
-                    self._stopped = action_service.is_action_canceled_or_canceling(
-                        self.liveaction_id)
-
-                if not self._stopped:
-                    try:
-                        if not liveaction or liveaction.status == LIVEACTION_STATUS_FAILED:
-                            fail = True
-                            action_node = self.chain_holder.get_next_node(action_node.name,
-                                                                          condition='on-failure')
-                        elif liveaction.status == LIVEACTION_STATUS_SUCCEEDED:
-                            action_node = self.chain_holder.get_next_node(action_node.name,
-                                                                          condition='on-success')
-                    except Exception as e:
-                        LOG.exception('Failed to get next node "%s".', action_node.name)
-
-                        fail = True
-                        error = ('Failed to get next node "%s". Lookup failed: %s' %
-                                 (action_node.name, str(e)))
-                        trace = traceback.format_exc(10)
-                        top_level_error = {
-                            'error': error,
-                            'traceback': trace
-                        }
-                        # reset action_node here so that chain breaks on failure.
-                        action_node = None
-                        break
-                else:
-                    LOG.info('Chain execution (%s) canceled by user.', self.liveaction_id)
-                    status = LIVEACTION_STATUS_CANCELED
-                    return (status, result, None)
+            if action_node and join_node_name and action_node.name == join_node_name:
+                # Branch is complete, parent continues with the join node
+                break
 
         if fail:
-            status = LIVEACTION_STATUS_FAILED
-        else:
-            status = LIVEACTION_STATUS_SUCCEEDED
+            return LIVEACTION_STATUS_FAILED
 
-        if top_level_error:
-            # Include top level error information
-            result['error'] = top_level_error['error']
-            result['traceback'] = top_level_error['traceback']
+        return LIVEACTION_STATUS_SUCCEEDED
 
-        return (status, result, None)
+    def _run_parallel_node(self, action_node, action_parameters, parent_context, state):
+        """
+        Execute the branches of the provided parallel node and wait for all of them to complete.
+
+        :return: Failed if any of the branches failed, succeeded otherwise (or canceled if the
+                 chain has been canceled).
+        :rtype: ``str``
+        """
+        LOG.debug('Running %s parallel branches of node "%s".', len(action_node.parallel),
+                  action_node.name)
+
+        branches = []
+
+        for branch_node_name in action_node.parallel:
+            branch_node = self.chain_holder.get_node(branch_node_name, raise_on_failure=True)
+            branch_state = state.fork()
+            thread = eventlet.spawn(self._run_branch, action_node=branch_node,
+                                    action_parameters=action_parameters,
+                                    parent_context=parent_context, state=branch_state,
+                                    join_node_name=action_node.on_success)
+            branches.append((branch_state, thread))
+
+        statuses = []
+
+        # Branches are joined in the order in which they are defined so the merged results and
+        # variables are the same regardless of the order in which the branches complete
+        for branch_state, thread in branches:
+            statuses.append(thread.wait())
+            state.join(branch_state)
+
+        if LIVEACTION_STATUS_CANCELED in statuses:
+            return LIVEACTION_STATUS_CANCELED
+
+        if LIVEACTION_STATUS_FAILED in statuses:
+            return LIVEACTION_STATUS_FAILED
+
+        return LIVEACTION_STATUS_SUCCEEDED
+
+    def _run_branch(self, action_node, action_parameters, parent_context, state,
+                    join_node_name):
+        try:
+            return self._run_nodes(action_node=action_node, action_parameters=action_parameters,
+                                   parent_context=parent_context, state=state,
+                                   join_node_name=join_node_name)
+        except Exception as e:
+            LOG.exception('Failed to run branch "%s".', action_node.name)
+
+            state.top_level_error = {
+                'error': 'Failed to run branch "%s": %s' % (action_node.name, str(e)),
+                'traceback': traceback.format_exc(10)
+            }
+            return LIVEACTION_STATUS_FAILED
 
     @staticmethod
     def _render_publish_vars(action_node, action_parameters, execution_result,
@@ -324,7 +522,7 @@ class ActionChainRunner(ActionRunner):
         context.update(previous_execution_results)
         context.update(chain_vars)
         context.update({RESULTS_KEY: previous_execution_results})
-        context.update({SYSTEM_KV_PREFIX: KeyValueLookup()})
+        context.update({SYSTEM_KV_PREFIX: _get_kv_lookup(mapping=action_node.publish)})
         rendered_result = jinja_utils.render_values(mapping=action_node.publish, context=context)
         return rendered_result
 
@@ -336,7 +534,7 @@ class ActionChainRunner(ActionRunner):
         context.update(results)
         context.update(chain_vars)
         context.update({RESULTS_KEY: results})
-        context.update({SYSTEM_KV_PREFIX: KeyValueLookup()})
+        context.update({SYSTEM_KV_PREFIX: _get_kv_lookup(mapping=action_node.params)})
         context.update({ACTION_KV_PREFIX: chain_context})
         try:
             rendered_params = jinja_utils.render_values(mapping=action_node.params,
@@ -347,7 +545,8 @@ class ActionChainRunner(ActionRunner):
         LOG.debug('Rendered params: %s: Type: %s', rendered_params, type(rendered_params))
         return rendered_params
 
-    def _get_next_action(self, action_node, parent_context, action_params, context_result):
+    def _get_next_action(self, action_node, parent_context, action_params, context_result,
+                         chain_vars=None):
         # Verify that the referenced action exists
         # TODO: We do another lookup in cast_param, refactor to reduce number of lookups
         task_name = action_node.name
@@ -360,7 +559,8 @@ class ActionChainRunner(ActionRunner):
 
         resolved_params = ActionChainRunner._resolve_params(
             action_node=action_node, original_parameters=action_params,
-            results=context_result, chain_vars=self.chain_holder.vars,
+            results=context_result,
+            chain_vars=chain_vars if chain_vars is not None else self.chain_holder.vars,
             chain_context={'parent': parent_context})
 
         liveaction = self._build_liveaction_object(
@@ -378,9 +578,27 @@ class ActionChainRunner(ActionRunner):
             LOG.exception('Failed to schedule liveaction.')
             raise e
 
-        while (wait_for_completion and
-               liveaction.status != LIVEACTION_STATUS_SUCCEEDED and
-               liveaction.status != LIVEACTION_STATUS_FAILED):
+        if wait_for_completion:
+            liveaction = self._wait_for_completion(liveaction)
+
+        return liveaction
+
+    def _wait_for_completion(self, liveaction):
+        statuses = [LIVEACTION_STATUS_SUCCEEDED, LIVEACTION_STATUS_FAILED]
+
+        if liveaction.status in statuses:
+            return liveaction
+
+        watcher = get_liveaction_status_watcher()
+
+        if watcher.running:
+            # Status notifications are used if the watcher has been started by the service,
+            # database is only polled in case a notification is lost
+            return watcher.wait_for_status(
+                liveaction_id=liveaction.id, statuses=statuses,
+                poll_interval=cfg.CONF.actionrunner.action_chain_status_poll_interval)
+
+        while liveaction.status not in statuses:
             eventlet.sleep(1)
             liveaction = action_db_util.get_liveaction_by_id(liveaction.id)
 
@@ -28,6 +28,7 @@ from st2common.models.system.action import ShellScriptAction
 from st2common.constants.action import LIVEACTION_STATUS_SUCCEEDED
 from st2common.constants.action import LIVEACTION_STATUS_FAILED
 from st2common.constants.runners import LOCAL_RUNNER_DEFAULT_ACTION_TIMEOUT
+from st2common.services import executions as execution_service
 from st2common.util.misc import strip_last_newline_char
 from st2common.util.green.shell import run_command
 from st2common.util.shell import kill_process
@@ -138,15 +139,26 @@ class LocalShellRunner(ActionRunner, ShellRunnerMixin):
         # Ideally os.killpg should have done the trick but for some reason that failed.
         # Note: pkill will set the returncode to 143 so we don't need to explicitly set
         # it to some non-zero value.
-        exit_code, stdout, stderr, timed_out = run_command(cmd=args, stdin=None,
-                                                           stdout=subprocess.PIPE,
-                                                           stderr=subprocess.PIPE,
-                                                           shell=True,
-                                                           cwd=self._cwd,
-                                                           env=env,
-                                                           timeout=self._timeout,
-                                                           preexec_func=os.setsid,
-                                                           kill_func=kill_process)
+        stdout_capture = execution_service.get_execution_output_capture(
+            execution_id=self.execution_id, output_type='stdout')
+        stderr_capture = execution_service.get_execution_output_capture(
+            execution_id=self.execution_id, output_type='stderr')
+
+        try:
+            exit_code, stdout, stderr, timed_out = run_command(cmd=args, stdin=None,
+                                                               stdout=subprocess.PIPE,
+                                                               stderr=subprocess.PIPE,
+                                                               shell=True,
+                                                               cwd=self._cwd,
+                                                               env=env,
+                                                               timeout=self._timeout,
+                                                               preexec_func=os.setsid,
+                                                               kill_func=kill_process,
+                                                               stdout_capture=stdout_capture,
+                                                               stderr_capture=stderr_capture)
+        finally:
+            stdout_capture.close()
+            stderr_capture.close()
 
         error = None
 
@@ -167,5 +179,8 @@ class LocalShellRunner(ActionRunner, ShellRunnerMixin):
         if error:
             result['error'] = error
 
+        result.update(execution_service.get_truncated_output_info(
+            execution_id=self.execution_id, captures=[stdout_capture, stderr_capture]))
+
         status = LIVEACTION_STATUS_SUCCEEDED if exit_code == 0 else LIVEACTION_STATUS_FAILED
         return (status, jsonify.json_loads(result, LocalShellRunner.KEYS_TO_TRANSFORM), None)
@@ -0,0 +1,169 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Long-lived Python action worker process.
+
+Worker reads execution requests (one JSON object per line) from stdin and writes a response
+(one JSON object per line) for each request to stdout. Action stdout and stderr are written to the
+files provided in the request (and not sent over the pipe) so the parent can capture them with
+bounded memory. Config is parsed and st2 libraries are imported only once when the worker starts
+and action classes are cached between executions.
+"""
+
+import os
+import sys
+import json
+import argparse
+import traceback
+
+from st2common import log as logging
+from st2actions import config
+from st2actions.runners.python_action_wrapper import PythonActionWrapper
+
+__all__ = [
+    'PythonActionWorker'
+]
+
+LOG = logging.getLogger(__name__)
+
+
+class PythonActionWorker(object):
+    def __init__(self, parent_args=None):
+        """
+        :param parent_args: Command line arguments passed to the parent process.
+        :type parse_args: ``list``
+        """
+        self._parent_args = parent_args or []
+
+        # Maps action file path -> (file modification time, action class)
+        self._action_classes = {}
+
+        try:
+            config.parse_args(args=self._parent_args)
+        except Exception:
+            pass
+
+        self._input = None
+        self._output = None
+        self._stderr_fd = None
+        self._devnull_fd = None
+
+    def run(self):
+        # Protocol uses the original stdin and stdout. Actions (and the processes they spawn) get
+        # /dev/null as stdin and a capture file as stdout and stderr so they can't corrupt the
+        # protocol stream.
+        self._input = os.fdopen(os.dup(0), 'r')
+        self._output = os.fdopen(os.dup(1), 'w')
+        self._stderr_fd = os.dup(2)
+        self._devnull_fd = os.open(os.devnull, os.O_RDWR)
+        os.dup2(self._devnull_fd, 0)
+        os.dup2(self._devnull_fd, 1)
+
+        self._write_response({'status': 'ready'})
+
+        while True:
+            line = self._input.readline()
+
+            if not line:
+                # Parent closed the pipe, worker is being stopped
+                break
+
+            request = json.loads(line)
+            self._write_response(self._run_action(request=request))
+
+    def _run_action(self, request):
+        stdout_file = open(request['stdout_path'], 'wb')
+        stderr_file = open(request['stderr_path'], 'wb')
+        environ = os.environ.copy()
+
+        os.environ.update(request.get('env', None) or {})
+        self._redirect_output(stdout_fd=stdout_file.fileno(), stderr_fd=stderr_file.fileno())
+
+        exit_code = 0
+        result = None
+        action = None
+
+        try:
+            action = self._get_action_instance(pack=request['pack'],
+                                               file_path=request['file_path'])
+            result = action.run(**(request.get('parameters', None) or {}))
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                exit_code = e.code or 0
+            else:
+                sys.stderr.write('%s\n' % (e.code))
+                exit_code = 1
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            self._redirect_output(stdout_fd=self._devnull_fd, stderr_fd=self._stderr_fd)
+            stdout_file.close()
+            stderr_file.close()
+            os.environ.clear()
+            os.environ.update(environ)
+
+            if action:
+                # New handler is added to the (shared) action logger for each instance
+                for handler in action.logger.handlers[:]:
+                    action.logger.removeHandler(handler)
+
+        try:
+            json.dumps(result)
+        except Exception:
+            result = str(result)
+
+        response = {
+            'exit_code': exit_code,
+            'result': result
+        }
+        return response
+
+    def _get_action_instance(self, pack, file_path):
+        wrapper = PythonActionWrapper(pack=pack, file_path=file_path, parent_args=None,
+                                      parse_config=False)
+        mtime = os.path.getmtime(file_path) if os.path.isfile(file_path) else None
+        cached_mtime, action_cls = self._action_classes.get(file_path, (None, None))
+
+        if not action_cls or cached_mtime != mtime:
+            action_cls = wrapper.get_action_class()
+            self._action_classes[file_path] = (mtime, action_cls)
+
+        return wrapper.get_action_instance(action_cls=action_cls)
+
+    def _write_response(self, response):
+        self._output.write(json.dumps(response) + '\n')
+        self._output.flush()
+
+    @staticmethod
+    def _redirect_output(stdout_fd, stderr_fd):
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Python action runner worker process')
+    parser.add_argument('--parent-args', required=False,
+                        help='Command line arguments passed to the parent process')
+    args = parser.parse_args()
+
+    parent_args = json.loads(args.parent_args) if args.parent_args else []
+    assert isinstance(parent_args, list)
+
+    worker = PythonActionWorker(parent_args=parent_args)
+    worker.run()
@@ -32,7 +32,7 @@ LOG = logging.getLogger(__name__)
 
 
 class PythonActionWrapper(object):
-    def __init__(self, pack, file_path, parameters=None, parent_args=None):
+    def __init__(self, pack, file_path, parameters=None, parent_args=None, parse_config=True):
         """
         :param pack: Name of the pack this action belongs to.
         :type pack: ``str``
@@ -45,32 +45,47 @@ class PythonActionWrapper(object):
 
         :param parent_args: Command line arguments passed to the parent process.
         :type parse_args: ``list``
+
+        :param parse_config: False if the st2 config has already been parsed.
+        :type parse_config: ``bool``
         """
         self._pack = pack
         self._file_path = file_path
         self._parameters = parameters or {}
         self._parent_args = parent_args or []
 
-        try:
-            config.parse_args(args=self._parent_args)
-        except Exception:
-            pass
+        if parse_config:
+            try:
+                config.parse_args(args=self._parent_args)
+            except Exception:
+                pass
 
-    def run(self):
-        action = self._get_action_instance()
+    def run(self, result_file_path=None):
+        """
+        :param result_file_path: Path to the file the result is written to. If not provided,
+                                 result is printed to stdout between the result delimiters.
+        :type result_file_path: ``str``
+        """
+        action = self.get_action_instance(action_cls=self.get_action_class())
         output = action.run(**self._parameters)
 
-        # Print output to stdout so the parent can capture it
-        sys.stdout.write(ACTION_OUTPUT_RESULT_DELIMITER)
         print_output = None
         try:
             print_output = json.dumps(output)
         except:
             print_output = str(output)
+
+        if result_file_path:
+            with open(result_file_path, 'w') as fp:
+                fp.write(print_output)
+            return
+
+        # Print output to stdout so the parent can capture it
+        sys.stdout.write(ACTION_OUTPUT_RESULT_DELIMITER)
         sys.stdout.write(print_output + '\n')
         sys.stdout.write(ACTION_OUTPUT_RESULT_DELIMITER)
 
-    def _get_action_instance(self):
+    def get_action_class(self):
         actions_cls = action_loader.register_plugin(Action, self._file_path)
         action_cls = actions_cls[0] if actions_cls and len(actions_cls) > 0 else None
 
@@ -78,6 +93,9 @@ class PythonActionWrapper(object):
             raise Exception('File "%s" has no action or the file doesn\'t exist.' %
                             (self._file_path))
 
+        return action_cls
+
+    def get_action_instance(self, action_cls):
         config_parser = ContentPackConfigParser(pack_name=self._pack)
         config = config_parser.get_action_config(action_file_path=self._file_path)
 
@@ -101,6 +119,8 @@ if __name__ == '__main__':
                         help='Serialized action parameters')
     parser.add_argument('--parent-args', required=False,
                         help='Command line arguments passed to the parent process')
+    parser.add_argument('--result-file', required=False,
+                        help='Path to the file the action result is written to')
     args = parser.parse_args()
 
     parameters = args.parameters
@@ -113,4 +133,4 @@ if __name__ == '__main__':
                               parameters=parameters,
                               parent_args=parent_args)
 
-    obj.run()
+    obj.run(result_file_path=args.result_file)
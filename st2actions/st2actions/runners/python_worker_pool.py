@@ -0,0 +1,325 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Pool of long-lived Python action worker processes (see python_action_worker.py).
+
+Worker processes are started with the same interpreter and environment as the processes which
+are started for each execution in the default mode. A worker which crashes, times out or has
+executed the maximum number of actions is killed and replaced with a new one.
+"""
+
+import os
+import json
+import signal
+import tempfile
+
+import eventlet
+from eventlet.green import subprocess
+from eventlet.semaphore import Semaphore
+
+from st2common import log as logging
+from st2common.util.green.shell import READ_CHUNK_SIZE
+from st2common.util.green.shell import TIMEOUT_EXIT_CODE
+from st2common.util.output_capture import OutputCapture
+
+__all__ = [
+    'PythonActionWorkerProcess',
+    'PythonActionWorkerPool',
+
+    'get_worker_pool',
+    'shutdown_worker_pools'
+]
+
+LOG = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKER_SCRIPT_NAME = 'python_action_worker.py'
+WORKER_SCRIPT_PATH = os.path.join(BASE_DIR, WORKER_SCRIPT_NAME)
+
+# Maps (pack, python binary path) -> PythonActionWorkerPool
+_WORKER_POOLS = {}
+
+
+class WorkerProcessExitedError(Exception):
+    pass
+
+
+class PythonActionWorkerProcess(object):
+    """
+    Single long-lived worker process.
+    """
+
+    def __init__(self, python_path, env, parent_args=None):
+        """
+        :param python_path: Python binary used by the worker.
+        :type python_path: ``str``
+
+        :param env: Worker process environment.
+        :type env: ``dict``
+
+        :param parent_args: Command line arguments passed to the parent process.
+        :type parent_args: ``list``
+        """
+        args = [
+            python_path,
+            WORKER_SCRIPT_PATH,
+            '--parent-args=%s' % (json.dumps(parent_args or []))
+        ]
+
+        # Note: Worker runs in a new session so the whole process group (worker and the processes
+        # started by the action) can be killed
+        self.process = subprocess.Popen(args=args, stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, env=env, close_fds=True,
+                                        preexec_fn=os.setsid)
+        self.executed_count = 0
+        self._ready = False
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def execute(self, request):
+        """
+        Send execution request to the worker and wait for the response.
+
+        :rtype: ``dict``
+        """
+        if not self._ready:
+            # Wait until the worker has imported the libraries and parsed the config
+            self._read_response()
+            self._ready = True
+
+        self.executed_count += 1
+        self.process.stdin.write(json.dumps(request) + '\n')
+        self.process.stdin.flush()
+
+        return self._read_response()
+
+    def kill(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except OSError:
+            # Already dead
+            pass
+
+        self.process.wait()
+
+    def stop(self):
+        """
+        Stop the worker after it has finished the current execution.
+        """
+        try:
+            self.process.stdin.close()
+            self.process.wait()
+        except Exception:
+            LOG.exception('Failed to stop Python action worker (pid=%s).', self.pid)
+            self.kill()
+
+    def _read_response(self):
+        line = self.process.stdout.readline()
+
+        if not line:
+            self.process.wait()
+            raise WorkerProcessExitedError('Python action worker (pid=%s) exited unexpectedly '
+                                           'with exit code %s.' %
+                                           (self.pid, self.process.returncode))
+
+        return json.loads(line)
+
+
+class PythonActionWorkerPool(object):
+    """
+    Bounded pool of worker processes which share the same interpreter and environment.
+    """
+
+    def __init__(self, python_path, env, size, max_executions, parent_args=None):
+        """
+        :param size: Maximum number of worker processes (and concurrent executions).
+        :type size: ``int``
+
+        :param max_executions: Number of executions after which a worker is replaced with a new
+                               process.
+        :type max_executions: ``int``
+        """
+        self._python_path = python_path
+        self._env = env
+        self._parent_args = parent_args
+        self._max_executions = max_executions
+
+        self._semaphore = Semaphore(size)
+        self._idle_workers = []
+        self._busy_workers = set()
+        self._shutdown = False
+
+    def execute(self, request, timeout, stdout_capture=None, stderr_capture=None):
+        """
+        Execute an action in one of the pool workers.
+
+        :param request: Execution request (pack, file_path, parameters and env).
+        :type request: ``dict``
+
+        :param timeout: Execution timeout in seconds.
+        :type timeout: ``int``
+
+        :param stdout_capture: Optional capture which action stdout is copied into.
+        :type stdout_capture: :class:`st2common.util.output_capture.OutputCapture`
+
+        :param stderr_capture: Optional capture which action stderr is copied into.
+        :type stderr_capture: :class:`st2common.util.output_capture.OutputCapture`
+
+        :rtype: ``tuple`` (exit_code, stdout, stderr, timed_out, result)
+        """
+        stdout_capture = stdout_capture or OutputCapture(output_type='stdout')
+        stderr_capture = stderr_capture or OutputCapture(output_type='stderr')
+
+        # Worker writes the action output to files so it's not held in memory
+        request = dict(request)
+        output_paths = []
+
+        try:
+            for output_type in ['stdout', 'stderr']:
+                fd, path = tempfile.mkstemp(prefix='st2-python-action-%s-' % (output_type))
+                os.close(fd)
+                output_paths.append(path)
+                request['%s_path' % (output_type)] = path
+
+            exit_code, timed_out, result, error = self._execute(request=request,
+                                                                timeout=timeout)
+
+            _copy_output(path=request['stdout_path'], capture=stdout_capture)
+            _copy_output(path=request['stderr_path'], capture=stderr_capture)
+        finally:
+            for path in output_paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+        if error:
+            stderr_capture.write(error)
+
+        return (exit_code, stdout_capture.getvalue(), stderr_capture.getvalue(), timed_out,
+                result)
+
+    def _execute(self, request, timeout):
+        """
+        :rtype: ``tuple`` (exit_code, timed_out, result, error)
+        """
+        with self._semaphore:
+            worker = self._idle_workers.pop() if self._idle_workers else self._create_worker()
+            self._busy_workers.add(worker)
+
+            try:
+                with eventlet.Timeout(timeout):
+                    response = worker.execute(request=request)
+            except eventlet.Timeout:
+                LOG.info('Killing Python action worker (pid=%s) which timed out.', worker.pid)
+                worker.kill()
+                return (TIMEOUT_EXIT_CODE, True, None, None)
+            except WorkerProcessExitedError as e:
+                return (worker.process.returncode, False, None, str(e))
+            except:
+                worker.kill()
+                raise
+            finally:
+                self._busy_workers.discard(worker)
+
+            self._release_worker(worker=worker)
+
+        return (response['exit_code'], False, response['result'], None)
+
+    def shutdown(self):
+        """
+        Stop the idle workers and kill the workers which are executing an action (those run in
+        their own session so they would otherwise outlive the parent process).
+        """
+        self._shutdown = True
+
+        while self._idle_workers:
+            self._idle_workers.pop().stop()
+
+        for worker in list(self._busy_workers):
+            LOG.info('Killing Python action worker (pid=%s) on shutdown.', worker.pid)
+            worker.kill()
+
+    def _create_worker(self):
+        worker = PythonActionWorkerProcess(python_path=self._python_path, env=self._env,
+                                           parent_args=self._parent_args)
+        LOG.debug('Started Python action worker (pid=%s).', worker.pid)
+        return worker
+
+    def _release_worker(self, worker):
+        if not worker.is_alive():
+            return
+
+        if self._shutdown:
+            worker.stop()
+            return
+
+        if worker.executed_count < self._max_executions:
+            self._idle_workers.append(worker)
+            return
+
+        LOG.debug('Recycling Python action worker (pid=%s) after %s executions.', worker.pid,
+                  worker.executed_count)
+        worker.stop()
+
+        # Replacement starts warming up right away so the next execution doesn't wait for it
+        self._idle_workers.append(self._create_worker())
+
+
+def get_worker_pool(pack, python_path, env, size, max_executions, parent_args=None):
+    """
+    Return worker pool for the provided pack virtualenv. Pool is created on first use.
+
+    :rtype: :class:`PythonActionWorkerPool`
+    """
+    key = (pack, python_path)
+    pool = _WORKER_POOLS.get(key, None)
+
+    if not pool:
+        pool = PythonActionWorkerPool(python_path=python_path, env=env, size=size,
+                                      max_executions=max_executions, parent_args=parent_args)
+        _WORKER_POOLS[key] = pool
+
+    return pool
+
+
+def _copy_output(path, capture):
+    with open(path, 'rb') as fp:
+        while True:
+            data = fp.read(READ_CHUNK_SIZE)
+
+            if not data:
+                break
+
+            capture.write(data)
+
+
+def shutdown_worker_pools():
+    """
+    Shut down all the worker pools which have been created in this process.
+    """
+    while _WORKER_POOLS:
+        _, pool = _WORKER_POOLS.popitem()
+
+        try:
+            pool.shutdown()
+        except Exception:
+            LOG.exception('Failed to shut down Python action worker pool.')
@@ -18,17 +18,20 @@ import sys
 import abc
 import json
 import uuid
+import tempfile
 import logging as stdlib_logging
 
 import six
 from eventlet.green import subprocess
+from oslo_config import cfg
 
 from st2actions.runners import ActionRunner
+from st2actions.runners.python_worker_pool import get_worker_pool
 from st2common.util.green.shell import run_command
 from st2common import log as logging
-from st2common.constants.action import ACTION_OUTPUT_RESULT_DELIMITER
 from st2common.constants.action import LIVEACTION_STATUS_SUCCEEDED, LIVEACTION_STATUS_FAILED
 from st2common.constants.error_messages import PACK_VIRTUALENV_DOESNT_EXIST
+from st2common.services import executions as execution_service
 from st2common.util.sandboxing import get_sandbox_path
 from st2common.util.sandboxing import get_sandbox_python_path
 from st2common.util.sandboxing import get_sandbox_python_binary_path
@@ -106,6 +109,9 @@ class PythonRunner(ActionRunner):
         super(PythonRunner, self).__init__(runner_id=runner_id)
         self._timeout = timeout
 
+        # Output truncation info of the last execution (see _run_in_new_process)
+        self._output_info = {}
+
     def pre_run(self):
         # TODO :This is awful, but the way "runner_parameters" and other variables get
         # assigned on the runner instance is even worse. Those arguments should
@@ -126,15 +132,6 @@ class PythonRunner(ActionRunner):
         if not self.entry_point:
             raise Exception('Action "%s" is missing entry_point attribute' % (self.action.name))
 
-        args = [
-            python_path,
-            WRAPPER_SCRIPT_PATH,
-            '--pack=%s' % (pack),
-            '--file-path=%s' % (self.entry_point),
-            '--parameters=%s' % (serialized_parameters),
-            '--parent-args=%s' % (json.dumps(sys.argv[1:]))
-        ]
-
         # We need to ensure all the st2 dependencies are also available to the
         # subprocess
         env = os.environ.copy()
@@ -144,34 +141,42 @@ class PythonRunner(ActionRunner):
 
         # Include user provided environment variables (if any)
         user_env_vars = self._get_env_vars()
-        env.update(user_env_vars)
 
         # Include common st2 environment variables
         st2_env_vars = self._get_common_action_env_variables()
-        env.update(st2_env_vars)
 
-        exit_code, stdout, stderr, timed_out = run_command(cmd=args, stdout=subprocess.PIPE,
-                                                           stderr=subprocess.PIPE, shell=False,
-                                                           env=env, timeout=self._timeout)
+        if cfg.CONF.actionrunner.python_runner_worker_pool:
+            # Execution specific environment variables are set by the worker for the duration
+            # of the execution
+            execution_env = {}
+            execution_env.update(user_env_vars)
+            execution_env.update(st2_env_vars)
+
+            pool = get_worker_pool(
+                pack=pack, python_path=python_path, env=env,
+                size=cfg.CONF.actionrunner.python_runner_worker_pool_size,
+                max_executions=cfg.CONF.actionrunner.python_runner_worker_max_executions,
+                parent_args=sys.argv[1:])
+            request = {
+                'pack': pack,
+                'file_path': self.entry_point,
+                'parameters': action_parameters or {},
+                'env': execution_env
+            }
+            exit_code, stdout, stderr, timed_out, result = self._run_in_worker_pool(
+                pool=pool, request=request)
+        else:
+            env.update(user_env_vars)
+            env.update(st2_env_vars)
+            exit_code, stdout, stderr, timed_out, result = self._run_in_new_process(
+                pack=pack, python_path=python_path, env=env,
+                serialized_parameters=serialized_parameters)
 
         if timed_out:
             error = 'Action failed to complete in %s seconds' % (self._timeout)
         else:
             error = None
 
-        if ACTION_OUTPUT_RESULT_DELIMITER in stdout:
-            split = stdout.split(ACTION_OUTPUT_RESULT_DELIMITER)
-            assert len(split) == 3
-            result = split[1].strip()
-            stdout = split[0] + split[2]
-        else:
-            result = None
-
-        try:
-            result = json.loads(result)
-        except:
-            pass
-
         output = {
             'stdout': stdout,
             'stderr': stderr,
@@ -182,9 +187,102 @@ class PythonRunner(ActionRunner):
         if error:
             output['error'] = error
 
+        output.update(self._output_info)
+
         status = LIVEACTION_STATUS_SUCCEEDED if exit_code == 0 else LIVEACTION_STATUS_FAILED
         return (status, output, None)
 
+    def _run_in_worker_pool(self, pool, request):
+        """
+        Run the action in one of the worker pool processes.
+
+        :rtype: ``tuple`` (exit_code, stdout, stderr, timed_out, result)
+        """
+        stdout_capture = execution_service.get_execution_output_capture(
+            execution_id=self.execution_id, output_type='stdout')
+        stderr_capture = execution_service.get_execution_output_capture(
+            execution_id=self.execution_id, output_type='stderr')
+
+        try:
+            exit_code, stdout, stderr, timed_out, result = pool.execute(
+                request=request, timeout=self._timeout, stdout_capture=stdout_capture,
+                stderr_capture=stderr_capture)
+        finally:
+            stdout_capture.close()
+            stderr_capture.close()
+
+        self._output_info = execution_service.get_truncated_output_info(
+            execution_id=self.execution_id, captures=[stdout_capture, stderr_capture])
+
+        return (exit_code, stdout, stderr, timed_out, result)
+
+    def _run_in_new_process(self, pack, python_path, env, serialized_parameters):
+        """
+        Run the action in a new Python process.
+
+        :rtype: ``tuple`` (exit_code, stdout, stderr, timed_out, result)
+        """
+        # Result is written to a separate file (and not to stdout) so it's not affected by the
+        # output truncation
+        result_fd, result_file_path = tempfile.mkstemp(prefix='st2-python-action-result-')
+        os.close(result_fd)
+
+        args = [
+            python_path,
+            WRAPPER_SCRIPT_PATH,
+            '--pack=%s' % (pack),
+            '--file-path=%s' % (self.entry_point),
+            '--parameters=%s' % (serialized_parameters),
+            '--parent-args=%s' % (json.dumps(sys.argv[1:])),
+            '--result-file=%s' % (result_file_path)
+        ]
+
+        stdout_capture = execution_service.get_execution_output_capture(
+            execution_id=self.execution_id, output_type='stdout')
+        stderr_capture = execution_service.get_execution_output_capture(
+            execution_id=self.execution_id, output_type='stderr')
+
+        try:
+            exit_code, stdout, stderr, timed_out = run_command(cmd=args, stdout=subprocess.PIPE,
+                                                               stderr=subprocess.PIPE,
+                                                               shell=False, env=env,
+                                                               timeout=self._timeout,
+                                                               stdout_capture=stdout_capture,
+                                                               stderr_capture=stderr_capture)
+            result = self._read_result(result_file_path=result_file_path)
+        finally:
+            stdout_capture.close()
+            stderr_capture.close()
+
+            try:
+                os.remove(result_file_path)
+            except OSError:
+                pass
+
+        self._output_info = execution_service.get_truncated_output_info(
+            execution_id=self.execution_id, captures=[stdout_capture, stderr_capture])
+
+        return (exit_code, stdout, stderr, timed_out, result)
+
+    @staticmethod
+    def _read_result(result_file_path):
+        """
+        Read the result written by the action wrapper. Result which is not valid JSON is returned
+        as a string.
+
+        :return: Result or None if the action hasn't returned (e.g. it has failed).
+        """
+        with open(result_file_path, 'r') as fp:
+            result = fp.read().strip()
+
+        if not result:
+            return None
+
+        try:
+            return json.loads(result)
+        except ValueError:
+            return result
+
     def _get_env_vars(self):
         """
         Return sanitized environment variables which will be used when launching
@@ -159,7 +159,8 @@ class ParamikoRemoteScriptRunner(BaseParallelSSHRunner):
         command = remote_action.get_full_command_string()
         LOG.info('Command to run: %s', command)
         results = self._parallel_ssh_client.run(command, timeout=remote_action.get_timeout(),
-                                                cwd=remote_action.get_cwd())
+                                                cwd=remote_action.get_cwd(),
+                                                execution_id=self.execution_id)
         LOG.debug('Results from script: %s', results)
         return results
 
@@ -23,6 +23,7 @@ import eventlet
 from st2actions.runners.ssh.paramiko_ssh import ParamikoSSHClient
 from st2common import log as logging
 from st2common.exceptions.ssh import NoHostsConnectedToException
+from st2common.services import executions as execution_service
 import st2common.util.jsonify as jsonify
 from st2common.util import ip_utils
 
@@ -86,7 +87,7 @@ class ParallelSSHClient(object):
 
         return results
 
-    def run(self, cmd, timeout=None, cwd=None):
+    def run(self, cmd, timeout=None, cwd=None, execution_id=None):
         """
         Run a command on remote hosts. Returns a dict containing results
         of execution from all hosts.
@@ -100,6 +101,9 @@ class ParallelSSHClient(object):
         :param cwd: Optional Current working directory. Must be shlex quoted.
         :type cwd: ``str``
 
+        :param execution_id: Optional Id of the action execution the output is stored for.
+        :type execution_id: ``str``
+
         :rtype: ``dict`` of ``str`` to ``dict``
         """
         # Note that doing a chdir using sftp client in ssh_client doesn't really
@@ -109,7 +113,8 @@ class ParallelSSHClient(object):
 
         options = {
             'cmd': cmd,
-            'timeout': timeout
+            'timeout': timeout,
+            'execution_id': execution_id
         }
         results = self._execute_in_pool(self._run_command, **options)
         return jsonify.json_loads(results, ParallelSSHClient.KEYS_TO_TRANSFORM)
@@ -252,14 +257,22 @@ class ParallelSSHClient(object):
             self._hosts_client[hostname] = client
             results[hostname] = {'message': 'Connected to host.'}
 
-    def _run_command(self, host, cmd, results, timeout=None):
+    def _run_command(self, host, cmd, results, timeout=None, execution_id=None):
         try:
             LOG.debug('Running command: %s on host: %s.', cmd, host)
             client = self._hosts_client[host]
-            (stdout, stderr, exit_code) = client.run(cmd, timeout=timeout)
+            stdout_capture = execution_service.get_execution_output_capture(
+                execution_id=execution_id, output_type='stdout')
+            stderr_capture = execution_service.get_execution_output_capture(
+                execution_id=execution_id, output_type='stderr')
+            (stdout, stderr, exit_code) = client.run(cmd, timeout=timeout,
+                                                     stdout_capture=stdout_capture,
+                                                     stderr_capture=stderr_capture)
             is_succeeded = (exit_code == 0)
             results[host] = {'stdout': stdout, 'stderr': stderr, 'return_code': exit_code,
                              'succeeded': is_succeeded, 'failed': not is_succeeded}
+            results[host].update(execution_service.get_truncated_output_info(
+                execution_id=execution_id, captures=[stdout_capture, stderr_capture]))
         except:
             error = 'Failed executing command %s on host %s' % (cmd, host)
             LOG.exception(error)
@@ -28,6 +28,7 @@ import paramiko
 # Ref: https://bugs.launchpad.net/paramiko/+bug/392973
 
 from st2common.log import logging
+from st2common.services import executions as execution_service
 from st2common.util.misc import strip_last_newline_char
 from st2common.util.shell import quote_unix
 
@@ -326,7 +327,7 @@ class ParamikoSSHClient(object):
         self.logger.debug('Deleting dir', extra=extra)
         return self.sftp.rmdir(path)
 
-    def run(self, cmd, timeout=None, quote=False):
+    def run(self, cmd, timeout=None, quote=False, stdout_capture=None, stderr_capture=None):
         """
         Note: This function is based on paramiko's exec_command()
         method.
@@ -334,6 +335,14 @@ class ParamikoSSHClient(object):
         :param timeout: How long to wait (in seconds) for the command to
                         finish (optional).
         :type timeout: ``float``
+
+        :param stdout_capture: Optional capture which command stdout is streamed into as it's
+                               produced. Capture is closed once the command finishes.
+        :type stdout_capture: :class:`st2common.util.output_capture.OutputCapture`
+
+        :param stderr_capture: Optional capture which command stderr is streamed into as it's
+                               produced. Capture is closed once the command finishes.
+        :type stderr_capture: :class:`st2common.util.output_capture.OutputCapture`
         """
 
         if quote:
@@ -351,8 +360,14 @@ class ParamikoSSHClient(object):
         start_time = time.time()
         chan.exec_command(cmd)
 
-        stdout = StringIO()
-        stderr = StringIO()
+        # Output is kept in memory only up to the configured size
+        if not stdout_capture:
+            stdout_capture = execution_service.get_execution_output_capture(
+                execution_id=None, output_type='stdout')
+
+        if not stderr_capture:
+            stderr_capture = execution_service.get_execution_output_capture(
+                execution_id=None, output_type='stderr')
 
         # Create a stdin file and immediately close it to prevent any
         # interactive script from hanging the process.
@@ -370,8 +385,8 @@ class ParamikoSSHClient(object):
         exit_status_ready = chan.exit_status_ready()
 
         if exit_status_ready:
-            stdout.write(self._consume_stdout(chan).getvalue())
-            stderr.write(self._consume_stderr(chan).getvalue())
+            stdout_capture.write(self._consume_stdout(chan).getvalue())
+            stderr_capture.write(self._consume_stderr(chan).getvalue())
 
         while not exit_status_ready:
             current_time = time.time()
@@ -380,11 +395,13 @@ class ParamikoSSHClient(object):
             if timeout and (elapsed_time > timeout):
                 # TODO: Is this the right way to clean up?
                 chan.close()
+                stdout_capture.close()
+                stderr_capture.close()
 
                 raise SSHCommandTimeoutError(cmd=cmd, timeout=timeout)
 
-            stdout.write(self._consume_stdout(chan).getvalue())
-            stderr.write(self._consume_stderr(chan).getvalue())
+            stdout_capture.write(self._consume_stdout(chan).getvalue())
+            stderr_capture.write(self._consume_stderr(chan).getvalue())
 
             # We need to check the exist status here, because the command could
             # print some output and exit during this sleep bellow.
@@ -400,8 +417,10 @@ class ParamikoSSHClient(object):
         # Receive the exit status code of the command we ran.
         status = chan.recv_exit_status()
 
-        stdout = strip_last_newline_char(stdout.getvalue())
-        stderr = strip_last_newline_char(stderr.getvalue())
+        stdout = strip_last_newline_char(stdout_capture.getvalue())
+        stderr = strip_last_newline_char(stderr_capture.getvalue())
+        stdout_capture.close()
+        stderr_capture.close()
 
         extra = {'_status': status, '_stdout': stdout, '_stderr': stderr}
         self.logger.debug('Command finished', extra=extra)
@@ -18,13 +18,13 @@ import json
 
 import six
 
-from jinja2 import Template, Environment, StrictUndefined, meta, exceptions
 from st2common import log as logging
 from st2common.constants.action import ACTION_KV_PREFIX
 from st2common.constants.system import SYSTEM_KV_PREFIX
 from st2common.exceptions import actionrunner
 from st2common.services.keyvalues import KeyValueLookup
 from st2common.util.casts import get_cast
+from st2common.util import jinja as jinja_utils
 from st2common.util.compat import to_unicode
 
 
@@ -36,6 +36,10 @@ __all__ = [
     'get_finalized_params',
 ]
 
+# Strings which contain none of these can't be templates (Jinja also normalizes newlines and
+# strips a single trailing newline which changes the rendered value)
+TEMPLATE_MARKERS = ['{', '\r']
+
 
 def _split_params(runner_parameters, action_parameters, mixed_params):
     def pf(params, skips):
@@ -119,11 +123,20 @@ def get_resolved_params(runnertype_parameter_info, action_parameter_info, action
 
 
 def _is_template(template_str):
+    if not any(marker in template_str for marker in TEMPLATE_MARKERS) and \
+       not template_str.endswith('\n'):
+        return False
+
     template_str = to_unicode(template_str)
-    template = Template(template_str)
+    compiled = jinja_utils.get_compiled_template(template_str)
+
+    if compiled.variables:
+        return True
+
+    # Source is a template only if the rendered value differs from it
     try:
-        return template_str != template.render({})
-    except exceptions.UndefinedError:
+        return template_str != compiled.template.render({})
+    except Exception:
         return True
 
 
@@ -170,23 +183,10 @@ def _check_availability(param, param_dependencies, renderable_params, context):
     return True
 
 
-def _check_cyclic(dep_chain, dependencies):
-    last_idx = len(dep_chain) - 1
-    last_value = dep_chain[last_idx]
-    for dependency in dependencies.get(last_value, []):
-        if dependency in dep_chain:
-            dep_chain.append(dependency)
-            return False
-        dep_chain.append(dependency)
-        if not _check_cyclic(dep_chain, dependencies):
-            return False
-        dep_chain.pop()
-    return True
-
-
-def _validate_dependencies(renderable_params, context):
+def _get_render_order(dependencies, renderable_params, context):
     '''
-    Validates dependencies between the parameters.
+    Validates dependencies between the parameters and returns the order in which the parameters
+    need to be rendered (dependencies first).
     e.g.
     {
         'a': '{{b}}',
@@ -195,76 +195,66 @@ def _validate_dependencies(renderable_params, context):
     In this example 'a' requires 'b' for template rendering and vice-versa. There is no way for
     these templates to be rendered and will be flagged with an ActionRunnerException.
     '''
-    env = Environment(undefined=StrictUndefined)
-    dependencies = {}
-    for k, v in six.iteritems(renderable_params):
-        template_ast = env.parse(v)
-        dependencies[k] = meta.find_undeclared_variables(template_ast)
-
     for k, v in six.iteritems(dependencies):
         if not _check_availability(k, v, renderable_params, context):
             msg = 'Dependecy unsatisfied - %s: %s.' % (k, v)
             raise actionrunner.ActionRunnerException(msg)
-        dep_chain = []
-        dep_chain.append(k)
-        if not _check_cyclic(dep_chain, dependencies):
+
+    render_order = []
+
+    # Maps parameter -> False while the dependencies of the parameter are being visited and
+    # True once the parameter has been added to the render order
+    visited = {}
+
+    def visit(dep_chain):
+        k = dep_chain[-1]
+
+        if visited.get(k, None) is False:
             msg = 'Cyclic dependecy found - %s.' % dep_chain
             raise actionrunner.ActionRunnerException(msg)
 
+        if k in visited:
+            return
+
+        visited[k] = False
+        for dependency in sorted(dependencies[k]):
+            # Only other templates need to be rendered first
+            if dependency in dependencies:
+                dep_chain.append(dependency)
+                visit(dep_chain)
+                dep_chain.pop()
+
+        visited[k] = True
+        render_order.append(k)
+
+    for k in sorted(dependencies):
+        visit([k])
+
+    return render_order
+
 
 def _do_render_params(renderable_params, context):
     '''
-    Will render the params per the context and will return best attempt to render. Render attempts
-    with missing params will leave blanks.
+    Will render the params per the context. Each template is parsed once (compiled templates are
+    cached by st2common.util.jinja) and the params are rendered in a single pass in the dependency
+    order.
     '''
     if not renderable_params:
         return renderable_params
-    _validate_dependencies(renderable_params, context)
-    env = Environment(undefined=StrictUndefined)
+
+    templates = {k: jinja_utils.get_compiled_template(to_unicode(v))
+                 for k, v in six.iteritems(renderable_params)}
+    dependencies = {k: template.variables for k, template in six.iteritems(templates)}
+    render_order = _get_render_order(dependencies, renderable_params, context)
+
     rendered_params = {}
     rendered_params.update(context)
 
-    # Maps parameter key to render exception
-    # We save the exception so we can throw a more meaningful exception at the end if rendering of
-    # some parameter fails
-    parameter_render_exceptions = {}
-
-    num_parameters = len(renderable_params) + len(context)
-    # After how many attempts at failing to render parameter we should bail out
-    max_rendered_parameters_unchanged_count = num_parameters
-    rendered_params_unchanged_count = 0
-
-    while len(renderable_params) != 0:
-        renderable_params_pre_loop = renderable_params.copy()
-        for k, v in six.iteritems(renderable_params):
-            template = env.from_string(v)
-
-            try:
-                rendered = template.render(rendered_params)
-                rendered_params[k] = rendered
-
-                if k in parameter_render_exceptions:
-                    del parameter_render_exceptions[k]
-            except Exception as e:
-                # Note: This sucks, but because we support multi level and out of order
-                # rendering, we can't throw an exception here yet since the parameter could get
-                # rendered in future iteration
-                LOG.debug('Failed to render %s: %s', k, v, exc_info=True)
-                parameter_render_exceptions[k] = e
-
-        for k in rendered_params:
-            if k in renderable_params:
-                del renderable_params[k]
-
-        if renderable_params_pre_loop == renderable_params:
-            rendered_params_unchanged_count += 1
-
-        # Make sure we terminate and don't end up in an infinite loop if we
-        # tried to render all the parameters but rendering of some parameters
-        # still fails
-        if rendered_params_unchanged_count >= max_rendered_parameters_unchanged_count:
-            k = parameter_render_exceptions.keys()[0]
-            e = parameter_render_exceptions[k]
+    for k in render_order:
+        try:
+            rendered_params[k] = templates[k].template.render(rendered_params)
+        except Exception as e:
+            LOG.debug('Failed to render %s: %s', k, renderable_params[k], exc_info=True)
             msg = 'Failed to render parameter "%s": %s' % (k, str(e))
             raise actionrunner.ActionRunnerException(msg)
 
@@ -304,11 +294,15 @@ def get_rendered_params(runner_parameters, action_parameters, action_context,
     # parameter category references are also rendered correctly. Particularly in the cases where
     # a runner parameter is overridden in an action it is likely that a runner parameter could
     # depend on an action parameter.
-    render_context = {SYSTEM_KV_PREFIX: KeyValueLookup()}
+    kv_lookup = KeyValueLookup()
+    render_context = {SYSTEM_KV_PREFIX: kv_lookup}
     render_context[ACTION_KV_PREFIX] = action_context
     renderable_params, context = _renderable_context_param_split(action_parameters,
                                                                  runner_parameters,
                                                                  render_context)
+
+    # Retrieve all the datastore values referenced by the templates at once
+    kv_lookup.prefetch(six.itervalues(renderable_params))
     rendered_params = _do_render_params(renderable_params, context)
     template_free_params = {}
     template_free_params.update(rendered_params)
@@ -17,8 +17,10 @@ import sys
 import traceback
 
 from kombu import Connection
+from oslo_config import cfg
 
 from st2actions.container.base import RunnerContainer
+from st2actions.runners.python_worker_pool import shutdown_worker_pools
 from st2common import log as logging
 from st2common.constants import action as action_constants
 from st2common.exceptions.actionrunner import ActionRunnerException
@@ -26,6 +28,8 @@ from st2common.exceptions.db import StackStormDBObjectNotFoundError
 from st2common.models.db.liveaction import LiveActionDB
 from st2common.persistence.execution import ActionExecution
 from st2common.services import executions
+from st2common.services.keyvalues import get_key_value_cache_watcher
+from st2common.services.liveaction_watcher import get_liveaction_status_watcher
 from st2common.transport import consumers, liveaction
 from st2common.transport import utils as transport_utils
 from st2common.util import action_db as action_utils
@@ -43,10 +47,37 @@ ACTIONRUNNER_CANCEL_Q = liveaction.get_status_management_queue(
 
 class ActionExecutionDispatcher(consumers.MessageHandler):
     message_type = LiveActionDB
+    service_name = 'actionrunner'
 
     def __init__(self, connection, queues):
         super(ActionExecutionDispatcher, self).__init__(connection, queues)
         self.container = RunnerContainer()
+        self._kv_cache_watcher = get_key_value_cache_watcher()
+        self._liveaction_status_watcher = None
+
+        if cfg.CONF.actionrunner.action_chain_status_notifications:
+            self._liveaction_status_watcher = get_liveaction_status_watcher()
+
+    def start(self, wait=False):
+        if self._kv_cache_watcher:
+            self._kv_cache_watcher.start()
+
+        if self._liveaction_status_watcher:
+            self._liveaction_status_watcher.start()
+
+        super(ActionExecutionDispatcher, self).start(wait=wait)
+
+    def shutdown(self):
+        super(ActionExecutionDispatcher, self).shutdown()
+
+        # Python action workers run in their own session and would outlive the action runner
+        shutdown_worker_pools()
+
+        if self._kv_cache_watcher:
+            self._kv_cache_watcher.stop()
+
+        if self._liveaction_status_watcher:
+            self._liveaction_status_watcher.stop()
 
     def process(self, liveaction):
         """Dispatches the LiveAction to appropriate action runner.
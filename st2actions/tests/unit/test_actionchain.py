@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import eventlet
 import mock
 
 from st2actions.runners import actionchainrunner as acr
@@ -88,6 +89,8 @@ CHAIN_WITH_PUBLISH = FixturesLoader().get_fixture_file_path_abs(
     FIXTURES_PACK, 'actionchains', 'chain_with_publish.yaml')
 CHAIN_WITH_INVALID_ACTION = FixturesLoader().get_fixture_file_path_abs(
     FIXTURES_PACK, 'actionchains', 'chain_with_invalid_action.yaml')
+CHAIN_WITH_PARALLEL = FixturesLoader().get_fixture_file_path_abs(
+    FIXTURES_PACK, 'actionchains', 'chain_with_parallel.yaml')
 
 CHAIN_NOTIFY_API = {'notify': {'on-complete': {'message': 'foo happened.'}}}
 CHAIN_NOTIFY_DB = NotificationsHelper.to_model(CHAIN_NOTIFY_API)
@@ -188,6 +191,30 @@ class TestActionChainRunner(DbTestCase):
         # based on the chain the callcount is known to be 3. Not great but works.
         self.assertEqual(request.call_count, 3)
 
+    @mock.patch.object(acr, 'get_liveaction_status_watcher')
+    @mock.patch.object(action_db_util, 'get_liveaction_by_id')
+    @mock.patch.object(action_db_util, 'get_action_by_ref',
+                       mock.MagicMock(return_value=ACTION_1))
+    @mock.patch.object(action_service, 'request',
+                       return_value=(DummyActionExecution(status=LIVEACTION_STATUS_RUNNING), None))
+    def test_chain_runner_success_path_with_status_watcher(self, request, get_liveaction_by_id,
+                                                           get_liveaction_status_watcher):
+        watcher = get_liveaction_status_watcher.return_value
+        watcher.running = True
+        watcher.wait_for_status.return_value = DummyActionExecution()
+
+        chain_runner = acr.get_runner()
+        chain_runner.entry_point = CHAIN_1_PATH
+        chain_runner.action = ACTION_1
+        chain_runner.container_service = RunnerContainerService()
+        chain_runner.pre_run()
+        chain_runner.run({})
+        self.assertEqual(request.call_count, 3)
+
+        # Tasks wait for the status notifications instead of polling the database
+        self.assertEqual(watcher.wait_for_status.call_count, 3)
+        self.assertEqual(get_liveaction_by_id.call_count, 0)
+
     @mock.patch.object(action_db_util, 'get_action_by_ref',
                        mock.MagicMock(return_value=ACTION_1))
     @mock.patch.object(action_service, 'request',
@@ -543,6 +570,95 @@ class TestActionChainRunner(DbTestCase):
         self.assertTrue(expected_error in output['error'])
         self.assertTrue('Traceback' in output['traceback'], output['traceback'])
 
+    @mock.patch.object(action_db_util, 'get_action_by_ref',
+                       mock.MagicMock(return_value=ACTION_2))
+    @mock.patch.object(action_service, 'request',
+                       return_value=(DummyActionExecution(result={'raw_out': 'published'}), None))
+    def test_chain_runner_parallel(self, request):
+        chain_runner = acr.get_runner()
+        chain_runner.entry_point = CHAIN_WITH_PARALLEL
+        chain_runner.action = ACTION_2
+        chain_runner.container_service = RunnerContainerService()
+        chain_runner.pre_run()
+        status, output, _ = chain_runner.run({})
+
+        self.assertEqual(status, LIVEACTION_STATUS_SUCCEEDED)
+        self.assertEqual(request.call_count, 6)
+
+        # Results are recorded in the order in which the branches are defined
+        self.assertEqual([task['name'] for task in output['tasks']],
+                         ['c1', 'b1', 'b1_2', 'b2', 'b3', 'join'])
+
+        parameters = dict([(call[0][0].context['chain']['name'], call[0][0].parameters)
+                           for call in request.call_args_list])
+
+        # Branches don't see the variables published by the other branches
+        self.assertEqual(parameters['b1_2'], {'strtype': 'published'})
+        self.assertEqual(parameters['b2'], {'strtype': 'c1'})
+
+        # Variables published by the later branches take precedence
+        self.assertEqual(parameters['join'], {'strtype': 'b2-b3'})
+
+    @mock.patch.object(action_db_util, 'get_action_by_ref',
+                       mock.MagicMock(return_value=ACTION_2))
+    @mock.patch.object(action_service, 'request')
+    def test_chain_runner_parallel_branch_failure(self, request):
+        def mock_request(liveaction):
+            if liveaction.context['chain']['name'] == 'b3':
+                return (DummyActionExecution(status=LIVEACTION_STATUS_FAILED), None)
+
+            return (DummyActionExecution(result={'raw_out': 'published'}), None)
+
+        request.side_effect = mock_request
+
+        chain_runner = acr.get_runner()
+        chain_runner.entry_point = CHAIN_WITH_PARALLEL
+        chain_runner.action = ACTION_2
+        chain_runner.container_service = RunnerContainerService()
+        chain_runner.pre_run()
+        status, output, _ = chain_runner.run({})
+
+        # Other branches complete before the chain continues with the on-failure node
+        self.assertEqual([task['name'] for task in output['tasks']],
+                         ['c1', 'b1', 'b1_2', 'b2', 'b3', 'cleanup'])
+        self.assertEqual(status, LIVEACTION_STATUS_SUCCEEDED)
+
+    @mock.patch.object(action_db_util, 'get_action_by_ref',
+                       mock.MagicMock(return_value=ACTION_2))
+    @mock.patch.object(action_service, 'request')
+    def test_chain_runner_parallel_concurrency(self, request):
+        running = {'current': 0, 'max': 0}
+
+        def mock_request(liveaction):
+            running['current'] += 1
+            running['max'] = max(running['max'], running['current'])
+            eventlet.sleep(0.01)
+            running['current'] -= 1
+            return (DummyActionExecution(result={'raw_out': 'published'}), None)
+
+        request.side_effect = mock_request
+
+        chain_runner = acr.get_runner()
+        chain_runner.entry_point = CHAIN_WITH_PARALLEL
+        chain_runner.action = ACTION_2
+        chain_runner.container_service = RunnerContainerService()
+        chain_runner.pre_run()
+        status, _, _ = chain_runner.run({})
+
+        self.assertEqual(status, LIVEACTION_STATUS_SUCCEEDED)
+        self.assertEqual(request.call_count, 6)
+
+        # Chain limits the concurrency to 2 tasks
+        self.assertEqual(running['max'], 2)
+
+    def test_chain_holder_invalid_parallel_node(self):
+        chainspec = {'chain': [{'name': 'fork', 'parallel': ['missing']}]}
+        self.assertRaises(Exception, acr.ChainHolder, chainspec, 'test')
+
+        chainspec = {'chain': [{'name': 'fork', 'parallel': ['c1'], 'ref': 'wolfpack.a2'},
+                               {'name': 'c1', 'ref': 'wolfpack.a2'}]}
+        self.assertRaises(Exception, acr.ChainHolder, chainspec, 'test')
+
     @classmethod
     def tearDownClass(cls):
         FixturesLoader().delete_models_from_db(MODELS)
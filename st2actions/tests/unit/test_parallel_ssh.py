@@ -16,10 +16,12 @@
 import os
 
 from mock import (patch, Mock, MagicMock)
+from oslo_config import cfg
 import unittest2
 
 from st2actions.runners.ssh.parallel_ssh import ParallelSSHClient
 from st2actions.runners.ssh.paramiko_ssh import ParamikoSSHClient
+from st2common.services import executions as execution_service
 import st2tests.config as tests_config
 tests_config.parse_args()
 
@@ -96,12 +98,40 @@ class ParallelSSHTests(unittest2.TestCase):
                                    pkey_file='~/.ssh/id_rsa',
                                    connect=True)
         client.run('pwd', timeout=60)
-        expected_kwargs = {
-            'timeout': 60
-        }
         for host in hosts:
             hostname, _ = client._get_host_port_info(host)
-            client._hosts_client[hostname].run.assert_called_with('pwd', **expected_kwargs)
+            args, kwargs = client._hosts_client[hostname].run.call_args
+            self.assertEqual(args, ('pwd',))
+            self.assertEqual(kwargs['timeout'], 60)
+            self.assertEqual(kwargs['stdout_capture'].output_type, 'stdout')
+            self.assertEqual(kwargs['stderr_capture'].output_type, 'stderr')
+
+    @patch('paramiko.SSHClient', Mock)
+    @patch.object(execution_service, 'store_execution_output_data')
+    def test_run_command_output_is_stored_and_truncated(self, mock_store):
+        cfg.CONF.set_override(name='max_result_size', override=5, group='action_output')
+        cfg.CONF.set_override(name='stream', override=True, group='action_output')
+        self.addCleanup(cfg.CONF.clear_override, name='max_result_size', group='action_output')
+        self.addCleanup(cfg.CONF.clear_override, name='stream', group='action_output')
+
+        def mock_run(cmd, timeout=None, stdout_capture=None, stderr_capture=None):
+            stdout_capture.write('1234567890')
+            stdout = stdout_capture.getvalue()
+            stdout_capture.close()
+            stderr_capture.close()
+            return (stdout, '', 0)
+
+        client = ParallelSSHClient(hosts=['localhost'], user='ubuntu',
+                                   pkey_file='~/.ssh/id_rsa', connect=True)
+        client._hosts_client['localhost'].run = mock_run
+
+        results = client.run('pwd', timeout=60, execution_id='execution1')
+
+        self.assertEqual(results['localhost']['stdout'], '67890')
+        self.assertEqual(results['localhost']['output_truncated'], ['stdout'])
+        self.assertEqual(results['localhost']['output_ref'], '/v1/executions/execution1/output')
+        mock_store.assert_called_once_with(execution_id='execution1', output_type='stdout',
+                                           data='1234567890')
 
     @patch('paramiko.SSHClient', Mock)
     @patch.object(ParamikoSSHClient, 'put', MagicMock(return_value={}))
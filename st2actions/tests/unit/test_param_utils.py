@@ -24,6 +24,7 @@ from st2common.models.db.keyvalue import KeyValuePairDB
 from st2common.persistence.keyvalue import KeyValuePair
 from st2common.transport.publishers import PoolPublisher
 from st2common.util import date as date_utils
+from st2common.util import jinja as jinja_utils
 from st2common.models.utils import action_param_utils
 from st2tests import DbTestCase
 from st2tests.fixturesloader import FixturesLoader
@@ -335,6 +336,39 @@ class ParamsUtilsTest(DbTestCase):
                                 runnertype_parameter_info={},
                                 action_parameter_info={})
 
+    def test_get_rendered_params_dependency_chain(self):
+        # Params are declared in the reverse order of the dependencies
+        action_params = {'p%s' % (index): '{{p%s}}-%s' % (index + 1, index)
+                         for index in range(50)}
+        action_params['p50'] = 'start'
+
+        action_param_info = {k: {} for k in action_params}
+
+        _, rendered = param_utils.get_rendered_params(runner_parameters={},
+                                                      action_parameters=action_params,
+                                                      action_context={},
+                                                      runnertype_parameter_info={},
+                                                      action_parameter_info=action_param_info)
+        self.assertEqual(rendered['p0'], 'start-' + '-'.join(str(index) for index
+                                                             in reversed(range(50))))
+
+    def test_get_rendered_params_templates_are_compiled_once(self):
+        jinja_utils._TEMPLATE_CACHE.clear()
+        action_params = {'cmd': 'echo {{a1}} {{a2}}', 'a1': '{{a2}}', 'a2': 'plain value'}
+        action_param_info = {'cmd': {}, 'a1': {}, 'a2': {}}
+
+        env = jinja_utils.get_shared_jinja_environment()
+        with mock.patch.object(env, 'parse', wraps=env.parse) as mock_parse:
+            for _ in range(3):
+                _, rendered = param_utils.get_rendered_params(
+                    runner_parameters={}, action_parameters=action_params, action_context={},
+                    runnertype_parameter_info={}, action_parameter_info=action_param_info)
+                self.assertEqual(rendered['cmd'], 'echo plain value plain value')
+
+        # Plain strings are not templates and never hit the cache
+        self.assertEqual(mock_parse.call_count, 2)
+        self.assertEqual(jinja_utils.get_template_cache_stats()['size'], 2)
+
     def test_cast_param_referenced_action_doesnt_exist(self):
         # Make sure the function throws if the action doesnt exist
         expected_msg = 'Action with ref "foo.doesntexist" doesn\'t exist'
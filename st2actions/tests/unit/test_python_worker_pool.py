@@ -0,0 +1,150 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+
+import eventlet
+import mock
+import unittest2
+
+import st2tests.config as tests_config
+tests_config.parse_args()
+
+from st2actions.runners import python_worker_pool
+from st2actions.runners.python_worker_pool import PythonActionWorkerPool
+from st2common.util.green.shell import TIMEOUT_EXIT_CODE
+from st2common.util.output_capture import OutputCapture
+import st2tests.base as tests_base
+
+WORKER_MODES_ACTION_PATH = os.path.join(tests_base.get_resources_path(), 'packs',
+                                        'pythonactions/actions/worker_modes.py')
+
+
+def get_request(**parameters):
+    return {
+        'pack': 'pythonactions',
+        'file_path': WORKER_MODES_ACTION_PATH,
+        'parameters': parameters,
+        'env': {'WORKER_TEST_VAR': 'value1'}
+    }
+
+
+class PythonActionWorkerPoolTestCase(unittest2.TestCase):
+
+    def setUp(self):
+        super(PythonActionWorkerPoolTestCase, self).setUp()
+        self.pool = PythonActionWorkerPool(python_path=sys.executable, env=os.environ.copy(),
+                                           size=1, max_executions=3)
+
+    def tearDown(self):
+        super(PythonActionWorkerPoolTestCase, self).tearDown()
+        self.pool.shutdown()
+
+    def test_worker_is_reused_and_recycled(self):
+        results = [self.pool.execute(request=get_request(value=index), timeout=30)
+                   for index in range(4)]
+
+        for index, (exit_code, _, _, timed_out, result) in enumerate(results):
+            self.assertEqual(exit_code, 0)
+            self.assertFalse(timed_out)
+            self.assertEqual(result['value'], index)
+            self.assertEqual(result['env'], 'value1')
+
+        pids = [result[4]['pid'] for result in results]
+        self.assertEqual(len(set(pids[:3])), 1)
+        self.assertNotEqual(pids[3], pids[0])
+
+        # Execution environment is only set for the duration of the execution
+        self.assertNotIn('WORKER_TEST_VAR', os.environ)
+
+    def test_output_is_captured(self):
+        exit_code, stdout, stderr, _, _ = self.pool.execute(request=get_request(mode='output'),
+                                                            timeout=30)
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(stdout, 'to stdout\nfrom subprocess\n')
+        self.assertIn('to logger', stderr)
+
+        # Logger handlers don't pile up in the worker
+        _, _, stderr, _, _ = self.pool.execute(request=get_request(mode='output'), timeout=30)
+        self.assertEqual(stderr.count('to logger'), 1)
+
+    def test_output_is_copied_into_captures(self):
+        chunk_handler = mock.Mock()
+        stdout_capture = OutputCapture(max_result_size=1000, chunk_handler=chunk_handler)
+        stderr_capture = OutputCapture(output_type='stderr')
+
+        exit_code, stdout, _, _, result = self.pool.execute(
+            request=get_request(mode='large_output', value=5000), timeout=30,
+            stdout_capture=stdout_capture, stderr_capture=stderr_capture)
+        stdout_capture.close()
+
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(stdout, 'x' * 1000)
+        self.assertTrue(stdout_capture.truncated)
+        self.assertFalse(stderr_capture.truncated)
+
+        data = ''.join([call[0][1] for call in chunk_handler.call_args_list])
+        self.assertEqual(data, 'x' * 5000)
+
+    def test_failures_dont_kill_the_worker(self):
+        exit_code, _, stderr, _, result = self.pool.execute(request=get_request(mode='raise'),
+                                                            timeout=30)
+        self.assertEqual(exit_code, 1)
+        self.assertIn('ValueError: action failed', stderr)
+        self.assertIsNone(result)
+
+        exit_code, _, _, _, _ = self.pool.execute(request=get_request(mode='exit', value=2),
+                                                  timeout=30)
+        self.assertEqual(exit_code, 2)
+
+        exit_code, _, _, _, result = self.pool.execute(request=get_request(), timeout=30)
+        self.assertEqual(exit_code, 0)
+
+    def test_crash_and_timeout_replace_the_worker(self):
+        exit_code, _, stderr, timed_out, _ = self.pool.execute(
+            request=get_request(mode='crash'), timeout=30)
+        self.assertEqual(exit_code, 3)
+        self.assertFalse(timed_out)
+        self.assertIn('exited unexpectedly', stderr)
+
+        exit_code, _, _, timed_out, _ = self.pool.execute(
+            request=get_request(mode='sleep', value=10), timeout=2)
+        self.assertEqual(exit_code, TIMEOUT_EXIT_CODE)
+        self.assertTrue(timed_out)
+
+        exit_code, _, _, _, result = self.pool.execute(request=get_request(value=1), timeout=30)
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(result['value'], 1)
+
+    def test_shutdown_kills_busy_workers(self):
+        pool = python_worker_pool.get_worker_pool(
+            pack='pythonactions', python_path=sys.executable, env=os.environ.copy(), size=1,
+            max_executions=3)
+        thread = eventlet.spawn(pool.execute, request=get_request(mode='sleep', value=60),
+                                timeout=120)
+
+        # Wait for the worker to start executing the action
+        while not pool._busy_workers:
+            eventlet.sleep(0.1)
+
+        worker = list(pool._busy_workers)[0]
+        python_worker_pool.shutdown_worker_pools()
+
+        exit_code, _, stderr, timed_out, _ = thread.wait()
+        self.assertNotEqual(exit_code, 0)
+        self.assertFalse(timed_out)
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(python_worker_pool._WORKER_POOLS, {})
@@ -14,12 +14,13 @@
 # limitations under the License.
 
 import os
+from StringIO import StringIO
 
 import mock
+from oslo_config import cfg
 
 from st2actions.runners import pythonrunner
 from st2actions.container import service
-from st2common.constants.action import ACTION_OUTPUT_RESULT_DELIMITER
 from st2common.constants.action import LIVEACTION_STATUS_SUCCEEDED, LIVEACTION_STATUS_FAILED
 from st2common.constants.pack import SYSTEM_PACK_NAME
 from base import RunnerTestCase
@@ -29,6 +30,8 @@ import st2tests.config as tests_config
 
 PACAL_ROW_ACTION_PATH = os.path.join(tests_base.get_resources_path(), 'packs',
                                      'pythonactions/actions/pascal_row.py')
+WORKER_MODES_ACTION_PATH = os.path.join(tests_base.get_resources_path(), 'packs',
+                                        'pythonactions/actions/worker_modes.py')
 
 # Note: runner inherits parent args which doesn't work with tests since test pass additional
 # unrecognized args
@@ -60,6 +63,26 @@ class PythonRunnerTestCase(RunnerTestCase):
         self.assertTrue(result is not None)
         self.assertEqual(result['result'], [1, 4, 6, 4, 1])
 
+    def test_simple_action_worker_pool(self):
+        cfg.CONF.set_override(name='python_runner_worker_pool', override=True,
+                              group='actionrunner')
+
+        try:
+            for row_index in [4, 5]:
+                runner = pythonrunner.get_runner()
+                runner.action = self._get_mock_action_obj()
+                runner.runner_parameters = {}
+                runner.entry_point = PACAL_ROW_ACTION_PATH
+                runner.container_service = service.RunnerContainerService()
+                runner.pre_run()
+                (status, result, _) = runner.run({'row_index': row_index})
+                self.assertEqual(status, LIVEACTION_STATUS_SUCCEEDED)
+                self.assertEqual(result['exit_code'], 0)
+
+            self.assertEqual(result['result'], [1, 5, 10, 10, 5, 1])
+        finally:
+            cfg.CONF.clear_override(name='python_runner_worker_pool', group='actionrunner')
+
     def test_simple_action_fail(self):
         runner = pythonrunner.get_runner()
         runner.action = self._get_mock_action_obj()
@@ -97,7 +120,8 @@ class PythonRunnerTestCase(RunnerTestCase):
         env_vars = {'key1': 'val1', 'key2': 'val2', 'PYTHONPATH': 'foobar'}
 
         mock_process = mock.Mock()
-        mock_process.communicate.return_value = ('', '')
+        mock_process.stdout = StringIO('')
+        mock_process.stderr = StringIO('')
         mock_popen.return_value = mock_process
 
         runner = pythonrunner.get_runner()
@@ -118,17 +142,22 @@ class PythonRunnerTestCase(RunnerTestCase):
             else:
                 self.assertEqual(actual_env[key], value)
 
-    @mock.patch('st2common.util.green.shell.subprocess.Popen')
-    def test_stdout_interception_and_parsing(self, mock_popen):
-        values = {'delimiter': ACTION_OUTPUT_RESULT_DELIMITER}
+    @mock.patch.object(pythonrunner, 'run_command')
+    def test_stdout_interception_and_parsing(self, mock_run_command):
+        def get_run_command(stdout, stderr, result):
+            def run_command(cmd, **kwargs):
+                result_file_path = [arg for arg in cmd if arg.startswith('--result-file=')][0]
+
+                with open(result_file_path.split('=', 1)[1], 'w') as fp:
+                    fp.write(result)
+
+                return 0, stdout, stderr, False
+
+            return run_command
 
         # No output to stdout and no result (implicit None)
-        mock_stdout = '%(delimiter)sNone%(delimiter)s' % values
-        mock_stderr = 'foo stderr'
-        mock_process = mock.Mock()
-        mock_process.communicate.return_value = (mock_stdout, mock_stderr)
-        mock_process.returncode = 0
-        mock_popen.return_value = mock_process
+        mock_run_command.side_effect = get_run_command(stdout='', stderr='foo stderr',
+                                                       result='null')
 
         runner = pythonrunner.get_runner()
         runner.action = self._get_mock_action_obj()
@@ -139,17 +168,14 @@ class PythonRunnerTestCase(RunnerTestCase):
         (_, output, _) = runner.run({'row_index': 4})
 
         self.assertEqual(output['stdout'], '')
-        self.assertEqual(output['stderr'], mock_stderr)
-        self.assertEqual(output['result'], 'None')
+        self.assertEqual(output['stderr'], 'foo stderr')
+        self.assertEqual(output['result'], None)
         self.assertEqual(output['exit_code'], 0)
 
-        # Output to stdout and no result (implicit None)
-        mock_stdout = 'pre result%(delimiter)sNone%(delimiter)spost result' % values
-        mock_stderr = 'foo stderr'
-        mock_process = mock.Mock()
-        mock_process.communicate.return_value = (mock_stdout, mock_stderr)
-        mock_process.returncode = 0
-        mock_popen.return_value = mock_process
+        # Output to stdout and a result which is not serializable as JSON
+        mock_run_command.side_effect = get_run_command(stdout='pre result post result',
+                                                       stderr='foo stderr',
+                                                       result='<object>')
 
         runner = pythonrunner.get_runner()
         runner.action = self._get_mock_action_obj()
@@ -159,15 +185,33 @@ class PythonRunnerTestCase(RunnerTestCase):
         runner.pre_run()
         (_, output, _) = runner.run({'row_index': 4})
 
-        self.assertEqual(output['stdout'], 'pre resultpost result')
-        self.assertEqual(output['stderr'], mock_stderr)
-        self.assertEqual(output['result'], 'None')
+        self.assertEqual(output['stdout'], 'pre result post result')
+        self.assertEqual(output['stderr'], 'foo stderr')
+        self.assertEqual(output['result'], '<object>')
         self.assertEqual(output['exit_code'], 0)
 
+    def test_result_is_not_affected_by_truncated_stdout(self):
+        cfg.CONF.set_override(name='max_result_size', override=1000, group='action_output')
+        self.addCleanup(cfg.CONF.clear_override, name='max_result_size', group='action_output')
+
+        runner = pythonrunner.get_runner()
+        runner.action = self._get_mock_action_obj()
+        runner.runner_parameters = {}
+        runner.entry_point = WORKER_MODES_ACTION_PATH
+        runner.container_service = service.RunnerContainerService()
+        runner.pre_run()
+        (status, output, _) = runner.run({'mode': 'large_output', 'value': 5000})
+
+        self.assertEqual(status, LIVEACTION_STATUS_SUCCEEDED)
+        self.assertEqual(output['result']['value'], 5000)
+        self.assertEqual(output['stdout'], 'x' * 1000)
+        self.assertEqual(output['output_truncated'], ['stdout'])
+
     @mock.patch('st2common.util.green.shell.subprocess.Popen')
     def test_common_st2_env_vars_are_available_to_the_action(self, mock_popen):
         mock_process = mock.Mock()
-        mock_process.communicate.return_value = ('', '')
+        mock_process.stdout = StringIO('')
+        mock_process.stderr = StringIO('')
         mock_popen.return_value = mock_process
 
         runner = pythonrunner.get_runner()
@@ -50,7 +50,7 @@ WSGI_SERVER_REQUEST_SHUTDOWN_TIME = 2
 
 def _setup():
     common_setup(service='api', config=config, setup_db=True, register_mq_exchanges=True,
-                 register_signal_handlers=True)
+                 register_signal_handlers=True, use_token_cache=True, use_permissions_index=True)
 
     register_internal_trigger_types()
 
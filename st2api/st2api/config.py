@@ -53,6 +53,12 @@ def _register_app_opts():
                     help='List of origins allowed'),
         cfg.IntOpt('heartbeat', default=25,
                    help='Send empty message every N seconds to keep connection open'),
+        cfg.IntOpt('stream_buffer_size', default=1000,
+                   help='Maximum number of events buffered for a stream client. Stream of a client '
+                        'which doesn\'t keep up is closed'),
+        cfg.IntOpt('stream_replay_size', default=1000,
+                   help='Number of the most recent events which are replayed to a stream client '
+                        'which reconnects with the Last-Event-ID header'),
         cfg.BoolOpt('mask_secrets', default=True,
                     help='True to mask secrets in API responses')
     ]
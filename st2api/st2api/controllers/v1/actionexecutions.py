@@ -33,11 +33,14 @@ from st2common.exceptions.trace import TraceNotFoundException
 from st2common.models.api.action import LiveActionAPI
 from st2common.models.api.base import jsexpose
 from st2common.models.api.execution import ActionExecutionAPI
+from st2common.models.api.execution import ActionExecutionOutputAPI
 from st2common.models.db.liveaction import LiveActionDB
 from st2common.persistence.liveaction import LiveAction
 from st2common.persistence.execution import ActionExecution
+from st2common.persistence.execution import ActionExecutionOutput
 from st2common.services import action as action_service
 from st2common.services import executions as execution_service
+from st2common.services import snapshots as snapshot_service
 from st2common.rbac.utils import request_user_is_admin
 from st2common.util import jsonify
 from st2common.util import isotime
@@ -216,9 +219,56 @@ class ActionExecutionAttributeController(ActionExecutionsControllerMixin):
         fields = self._validate_exclude_fields(fields)
         action_exec_db = self.access.impl.model.objects.filter(id=id).only(*fields).get()
         result = getattr(action_exec_db, attribute, None)
+
+        if attribute in snapshot_service.SNAPSHOT_ATTRIBUTES:
+            # Attribute could be stored as a reference to a snapshot
+            doc = snapshot_service.hydrate_execution_doc({'id': id, attribute: result})
+            result = doc[attribute]
+
         return result
 
 
+class ActionExecutionOutputController(ActionExecutionsControllerMixin):
+    @request_user_has_permission(permission_type=PermissionType.EXECUTION_VIEW)
+    @jsexpose(arg_types=[str])
+    def get(self, id, output_type=None, after=None, **kwargs):
+        """
+        Retrieve output of the provided action execution in chunks (oldest first) as they have
+        been stored while the execution was running.
+
+        Handles requests:
+
+            GET /executions/<id>/output[?output_type=stdout][&after=<timestamp>]
+
+        :param output_type: Only return the chunks of this output type (stdout, stderr).
+        :type output_type: ``str``
+
+        :param after: Only return the chunks produced after this timestamp (timestamp of the last
+                      retrieved chunk can be used to tail the output of a running execution).
+        :type after: ``str``
+
+        :rtype: ``list``
+        """
+        try:
+            self.access.get_by_id(id)
+        except Exception:
+            abort(http_client.NOT_FOUND, 'Execution with id %s not found.' % (id))
+
+        filters = {'execution_id': id}
+
+        if output_type:
+            filters['output_type'] = output_type
+
+        if after:
+            try:
+                filters['timestamp__gt'] = isotime.parse(after)
+            except ValueError as e:
+                abort(http_client.BAD_REQUEST, str(e))
+
+        output_dbs = ActionExecutionOutput.query(order_by=['timestamp'], **filters)
+        return [ActionExecutionOutputAPI.from_model(output_db) for output_db in output_dbs]
+
+
 class ActionExecutionReRunController(ActionExecutionsControllerMixin, ResourceController):
     supported_filters = {}
     exclude_fields = [
@@ -273,6 +323,7 @@ class ActionExecutionsController(ActionExecutionsControllerMixin, ResourceContro
 
     children = ActionExecutionChildrenController()
     attribute = ActionExecutionAttributeController()
+    output = ActionExecutionOutputController()
     re_run = ActionExecutionReRunController()
 
     # ResourceController attributes
@@ -19,9 +19,9 @@ from pecan.rest import RestController
 
 from st2common import log as logging
 from st2common.models.api.base import jsexpose
-from st2common.util.jsonify import json_encode
 
 from st2api.listener import get_listener
+from st2api.listener import StreamFilter
 
 LOG = logging.getLogger(__name__)
 
@@ -30,22 +30,47 @@ def format(gen):
     # Yield initial state so client would receive the headers the moment it connects to the stream
     yield '\n'
 
-    message = '''event: %s\ndata: %s\n\n'''
-
-    for pack in gen:
-        if not pack:
+    for stream_event in gen:
+        if not stream_event:
             yield '\n'
         else:
-            (event, body) = pack
-            yield message % (event, json_encode(body, indent=None))
+            # Message is serialized once and shared by all the clients
+            yield stream_event.message
 
 
 class StreamController(RestController):
     @jsexpose(content_type='text/event-stream')
-    def get_all(self):
+    def get_all(self, events=None, action_refs=None, execution_ids=None, users=None):
+        """
+        Stream execution and live action events.
+
+        Handles requests:
+            GET /stream[?events=st2.execution__update&action_refs=core.local&users=stanley]
+
+        All the filters are comma delimited strings. Event is sent to the client if it matches all
+        the provided filters. Client which reconnects with the Last-Event-ID header receives the
+        events it has missed (if those are still buffered).
+
+        :param events: Names of the events.
+        :type events: ``str``
+
+        :param action_refs: References of the actions.
+        :type action_refs: ``str``
+
+        :param execution_ids: Ids of the executions (or live actions).
+        :type execution_ids: ``str``
+
+        :param users: Users which have run the actions.
+        :type users: ``str``
+        """
+        stream_filter = StreamFilter(events=_split(events), action_refs=_split(action_refs),
+                                     object_ids=_split(execution_ids), users=_split(users))
+        last_event_id = pecan.request.environ.get('HTTP_LAST_EVENT_ID', None)
+
         def make_response():
-            res = Response(content_type='text/event-stream',
-                           app_iter=format(get_listener().generator()))
+            generator = get_listener().generator(stream_filter=stream_filter,
+                                                 last_event_id=last_event_id)
+            res = Response(content_type='text/event-stream', app_iter=format(generator))
             return res
 
         # Prohibit buffering response by eventlet
@@ -54,3 +79,10 @@ class StreamController(RestController):
         stream = make_response()
 
         return stream
+
+
+def _split(value):
+    if not value:
+        return None
+
+    return [item.strip() for item in value.split(',') if item.strip()]
@@ -13,6 +13,21 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+"""
+Listener which forwards execution and live action events from the message bus to the clients
+connected to the stream API.
+
+Each event is assigned a sequential id and serialized once, the serialized message is shared by
+all the subscriptions. Subscriptions can filter the events by the event name, action, object id
+and user. Each subscription buffers a limited number of events, subscription of a client which
+doesn't keep up is closed (client reconnects and resumes the stream). Most recent events are kept
+in a replay buffer so a client which reconnects with the id of the last event it has received
+(Last-Event-ID) doesn't miss the events published in the meantime.
+"""
+
+import collections
+import uuid
+
 import eventlet
 
 from kombu import Connection, Queue
@@ -22,10 +37,16 @@ from oslo_config import cfg
 from st2common.models.api.action import LiveActionAPI
 from st2common.models.api.execution import ActionExecutionAPI
 from st2common.transport import liveaction, execution, publishers
+from st2common.transport import serialization
 from st2common.transport import utils as transport_utils
+from st2common.util.jsonify import json_encode
 from st2common import log as logging
 
 __all__ = [
+    'StreamEvent',
+    'StreamFilter',
+    'Subscription',
+
     'get_listener',
     'get_listener_if_set'
 ]
@@ -37,28 +58,138 @@ QUEUE = Queue(None,
               routing_key=publishers.ANY_RK,
               exclusive=True)
 
+MESSAGE_FORMAT = 'id: %s\nevent: %s\ndata: %s\n\n'
+
 _listener = None
 
 
+class StreamEvent(object):
+    """
+    Event which is sent to the stream clients.
+    """
+
+    def __init__(self, listener_id, sequence, event, body):
+        self.id = '%s:%s' % (listener_id, sequence)
+        self.sequence = sequence
+        self.event = event
+        self.body = body
+
+        self.object_id = getattr(body, 'id', None)
+        self.action_ref = _get_action_ref(body)
+        self.user = (getattr(body, 'context', None) or {}).get('user', None)
+
+        self._message = None
+
+    @property
+    def message(self):
+        """
+        Serialized event. Body is only serialized once (when the first client needs it).
+
+        :rtype: ``str``
+        """
+        if self._message is None:
+            self._message = MESSAGE_FORMAT % (self.id, self.event,
+                                              json_encode(self.body, indent=None))
+
+        return self._message
+
+
+class StreamFilter(object):
+    """
+    Filter of the events a client is interested in. Empty filter attribute matches all the
+    events.
+    """
+
+    def __init__(self, events=None, action_refs=None, object_ids=None, users=None):
+        """
+        :param events: Names of the events (e.g. st2.execution__update).
+        :type events: ``list``
+
+        :param action_refs: References of the actions.
+        :type action_refs: ``list``
+
+        :param object_ids: Ids of the executions or live actions.
+        :type object_ids: ``list``
+
+        :param users: Users which have run the actions.
+        :type users: ``list``
+        """
+        self._filters = [
+            ('event', frozenset(events or [])),
+            ('action_ref', frozenset(action_refs or [])),
+            ('object_id', frozenset(object_ids or [])),
+            ('user', frozenset(users or []))
+        ]
+        self._filters = [(attribute, values) for attribute, values in self._filters if values]
+
+    def matches(self, event):
+        for attribute, values in self._filters:
+            if getattr(event, attribute) not in values:
+                return False
+
+        return True
+
+
+class Subscription(object):
+    """
+    Events buffered for a single client.
+    """
+
+    def __init__(self, stream_filter, max_size):
+        self.stream_filter = stream_filter
+        self.closed = False
+
+        self._queue = eventlet.Queue(maxsize=max_size)
+
+    def put(self, event):
+        """
+        Add the event to the buffer. Subscription is closed if the buffer is full.
+
+        :return: False if the subscription has been closed.
+        :rtype: ``bool``
+        """
+        try:
+            self._queue.put_nowait(event)
+        except eventlet.queue.Full:
+            self.closed = True
+
+        return not self.closed
+
+    def get(self, timeout):
+        """
+        Return next event or None if there hasn't been any event for timeout seconds.
+        """
+        try:
+            return self._queue.get(timeout=timeout)
+        except eventlet.queue.Empty:
+            return None
+
+
 class Listener(ConsumerMixin):
 
     def __init__(self, connection):
         self.connection = connection
-        self.queues = []
+        self.subscriptions = []
         self._stopped = False
 
+        # Id of the listener is a part of the event ids so ids issued by a different API process
+        # (or before a restart) are not mistaken for the ids issued by this one
+        self._id = uuid.uuid4().hex[:8]
+        self._sequence = 0
+        self._replay_events = collections.deque(maxlen=cfg.CONF.api.stream_replay_size)
+
     def get_consumers(self, consumer, channel):
         return [
             consumer(queues=[execution.get_queue(routing_key=publishers.ANY_RK,
                                                  exclusive=True)],
-                     accept=['pickle'],
+                     accept=serialization.ACCEPT_CONTENT,
                      callbacks=[self.processor(ActionExecutionAPI)]),
 
             consumer(queues=[Queue(None,
                                    liveaction.LIVEACTION_XCHG,
                                    routing_key=publishers.ANY_RK,
                                    exclusive=True)],
-                     accept=['pickle'],
+                     accept=serialization.ACCEPT_CONTENT,
                      callbacks=[self.processor(LiveActionAPI)])
         ]
 
@@ -76,25 +207,72 @@ class Listener(ConsumerMixin):
         return process
 
     def emit(self, event, body):
-        pack = (event, body)
-        for queue in self.queues:
-            queue.put(pack)
+        self._sequence += 1
+        stream_event = StreamEvent(listener_id=self._id, sequence=self._sequence, event=event,
+                                   body=body)
+        self._replay_events.append(stream_event)
+
+        for subscription in list(self.subscriptions):
+            if not subscription.stream_filter.matches(stream_event):
+                continue
+
+            if not subscription.put(stream_event):
+                LOG.warning('Closing stream subscription which has %s pending events.',
+                            cfg.CONF.api.stream_buffer_size)
+                self.subscriptions.remove(subscription)
+
+    def generator(self, stream_filter=None, last_event_id=None):
+        """
+        Yield events which match the provided filter and None every heartbeat interval if there
+        are no events.
+
+        :param last_event_id: Id of the last event received by the client. Events which have
+                              been published after it are replayed first.
+        :type last_event_id: ``str``
+        """
+        stream_filter = stream_filter or StreamFilter()
+        subscription = Subscription(stream_filter=stream_filter,
+                                    max_size=cfg.CONF.api.stream_buffer_size)
+
+        # Nothing yields between collecting the replayed events and subscribing so no event
+        # can be missed or sent twice
+        replay_events = self._get_replay_events(stream_filter=stream_filter,
+                                                last_event_id=last_event_id)
+        self.subscriptions.append(subscription)
 
-    def generator(self):
-        queue = eventlet.Queue()
-        self.queues.append(queue)
         try:
-            while not self._stopped:
-                try:
-                    yield queue.get(timeout=cfg.CONF.api.heartbeat)
-                except eventlet.queue.Empty:
-                    yield
+            for stream_event in replay_events:
+                yield stream_event
+
+            while not self._stopped and not subscription.closed:
+                yield subscription.get(timeout=cfg.CONF.api.heartbeat)
         finally:
-            self.queues.remove(queue)
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
 
     def shutdown(self):
         self._stopped = True
 
+    def _get_replay_events(self, stream_filter, last_event_id):
+        if not last_event_id:
+            return []
+
+        listener_id, _, sequence = last_event_id.partition(':')
+
+        if listener_id != self._id or not sequence.isdigit():
+            LOG.debug('Can\'t resume stream from event "%s" issued by a different listener.',
+                      last_event_id)
+            return []
+
+        sequence = int(sequence)
+
+        if self._replay_events and self._replay_events[0].sequence > sequence + 1:
+            LOG.debug('Events published after event "%s" are not available anymore, replaying '
+                      'all the buffered events.', last_event_id)
+
+        return [stream_event for stream_event in self._replay_events
+                if stream_event.sequence > sequence and stream_filter.matches(stream_event)]
+
 
 def listen(listener):
     try:
@@ -115,3 +293,13 @@ def get_listener():
 def get_listener_if_set():
     global _listener
     return _listener
+
+
+def _get_action_ref(body):
+    # Execution includes the action object, live action only the reference
+    action = getattr(body, 'action', None)
+
+    if isinstance(action, dict):
+        return action.get('ref', None)
+
+    return action
@@ -26,12 +26,15 @@ except ImportError:
     import json
 import st2common.validators.api.action as action_validator
 
+from oslo_config import cfg
 from six.moves import filter
 from st2common.util import isotime
 from st2common.util import date as date_utils
 from st2common.models.db.auth import TokenDB
 from st2common.persistence.auth import Token
 from st2common.persistence.trace import Trace
+from st2common.services import executions as execution_service
+from st2common.services import snapshots as snapshot_service
 from st2common.transport.publishers import PoolPublisher
 from st2tests.fixturesloader import FixturesLoader
 from tests import FunctionalTest, AuthMiddlewareTest
@@ -364,6 +367,50 @@ class TestActionExecutionController(FunctionalTest):
         self.assertEqual(re_run_resp.status_int, 400)
         self.assertIn('1000 is not of type \'string\'', re_run_resp.json['faultstring'])
 
+    def test_get_output(self):
+        post_resp = self._do_post(LIVE_ACTION_1)
+        self.assertEqual(post_resp.status_int, 201)
+        execution_id = self._get_actionexecution_id(post_resp)
+
+        execution_service.store_execution_output_data(execution_id=execution_id,
+                                                      output_type='stdout', data='line 1\n')
+        execution_service.store_execution_output_data(execution_id=execution_id,
+                                                      output_type='stderr', data='error 1\n')
+        execution_service.store_execution_output_data(execution_id=execution_id,
+                                                      output_type='stdout', data='line 2\n')
+
+        resp = self.app.get('/v1/executions/%s/output' % (execution_id))
+        self.assertEqual(resp.status_int, 200)
+        self.assertEqual([chunk['data'] for chunk in resp.json],
+                         ['line 1\n', 'error 1\n', 'line 2\n'])
+
+        resp = self.app.get('/v1/executions/%s/output?output_type=stdout' % (execution_id))
+        self.assertEqual([chunk['data'] for chunk in resp.json], ['line 1\n', 'line 2\n'])
+
+        # Tail the output after the first chunk
+        resp = self.app.get('/v1/executions/%s/output?after=%s' %
+                            (execution_id, resp.json[0]['timestamp']))
+        self.assertEqual([chunk['data'] for chunk in resp.json], ['error 1\n', 'line 2\n'])
+
+    def test_get_attribute_stored_by_reference(self):
+        cfg.CONF.set_override('store_snapshots_by_reference', True, group='execution')
+        self.addCleanup(cfg.CONF.clear_override, 'store_snapshots_by_reference',
+                        group='execution')
+
+        post_resp = self._do_post(LIVE_ACTION_1)
+        self.assertEqual(post_resp.status_int, 201)
+        execution_id = self._get_actionexecution_id(post_resp)
+
+        resp = self.app.get('/v1/executions/%s/attribute/action' % (execution_id))
+        self.assertEqual(resp.status_int, 200)
+        self.assertNotIn(snapshot_service.SNAPSHOT_HASH_KEY, resp.json)
+        self.assertEqual(resp.json['ref'], LIVE_ACTION_1['action'])
+        self.assertEqual(resp.json['id'], self.action1['id'])
+
+    def test_get_output_execution_doesnt_exist(self):
+        resp = self.app.get('/v1/executions/doesntexist/output', expect_errors=True)
+        self.assertEqual(resp.status_int, 404)
+
     @staticmethod
     def _get_actionexecution_id(resp):
         return resp.json['id']
@@ -14,9 +14,13 @@
 # limitations under the License.
 
 import mock
+import unittest2
 
 from st2api import listener
+from st2common.models.api.action import LiveActionAPI
+from st2common.models.api.execution import ActionExecutionAPI
 from st2tests import DbTestCase
+import st2tests.config as tests_config
 
 
 class ListenerTest(DbTestCase):
@@ -45,18 +49,94 @@ class ListenerTest(DbTestCase):
 
     def test_emit(self):
         listen = listener.Listener(mock.Mock())
-        put1 = mock.Mock()
-        put2 = mock.Mock()
-        queue1 = type('queue', (object,), {
-            'put': put1
-        })
-        queue2 = type('queue', (object,), {
-            'put': put2
-        })
+        subscription1 = listener.Subscription(listener.StreamFilter(), max_size=10)
+        subscription2 = listener.Subscription(listener.StreamFilter(), max_size=10)
 
-        listen.queues = [queue1, queue2]
+        listen.subscriptions = [subscription1, subscription2]
 
         listen.emit('event', 'body')
 
-        put1.assert_called_once_with(('event', 'body'))
-        put2.assert_called_once_with(('event', 'body'))
+        event1 = subscription1.get(timeout=0)
+        event2 = subscription2.get(timeout=0)
+
+        # Subscriptions share the same event (and the serialized message)
+        self.assertIs(event1, event2)
+        self.assertEqual(event1.event, 'event')
+        self.assertEqual(event1.body, 'body')
+        self.assertEqual(event1.message, 'id: %s\nevent: event\ndata: "body"\n\n' % (event1.id))
+
+
+class ListenerStreamTest(unittest2.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(ListenerStreamTest, cls).setUpClass()
+        tests_config.parse_args()
+
+    def setUp(self):
+        super(ListenerStreamTest, self).setUp()
+        tests_config.CONF.set_override(name='heartbeat', override=0, group='api')
+        self.addCleanup(tests_config.CONF.clear_override, name='heartbeat', group='api')
+
+    def _get_body(self, id, action_ref, user):
+        return ActionExecutionAPI(id=id, action={'ref': action_ref}, context={'user': user})
+
+    def test_filter(self):
+        listen = listener.Listener(mock.Mock())
+        stream_filter = listener.StreamFilter(events=['st2.execution__update'],
+                                              action_refs=['core.local'], users=['stanley'])
+        generator = listen.generator(stream_filter=stream_filter)
+
+        # Subscription is registered once the generator is started
+        self.assertEqual(next(generator), None)
+
+        listen.emit('st2.execution__create', self._get_body('1', 'core.local', 'stanley'))
+        listen.emit('st2.execution__update', self._get_body('2', 'core.remote', 'stanley'))
+        listen.emit('st2.execution__update', self._get_body('3', 'core.local', 'joe'))
+        listen.emit('st2.execution__update', self._get_body('4', 'core.local', 'stanley'))
+
+        # Live action only includes the action reference
+        body = LiveActionAPI(id='5', action='core.local', context={'user': 'stanley'})
+        listen.emit('st2.execution__update', body)
+
+        self.assertEqual(next(generator).body.id, '4')
+        self.assertEqual(next(generator).body.id, '5')
+
+    def test_slow_subscription_is_closed(self):
+        tests_config.CONF.set_override(name='stream_buffer_size', override=2, group='api')
+        self.addCleanup(tests_config.CONF.clear_override, name='stream_buffer_size', group='api')
+
+        listen = listener.Listener(mock.Mock())
+        generator = listen.generator()
+        next(generator)
+        self.assertEqual(len(listen.subscriptions), 1)
+
+        for index in range(3):
+            listen.emit('event', self._get_body(str(index), 'core.local', 'stanley'))
+
+        self.assertEqual(listen.subscriptions, [])
+        self.assertRaises(StopIteration, next, generator)
+
+        # Client which reconnects receives the events it has missed
+        generator = listen.generator(last_event_id=listen._replay_events[0].id)
+        self.assertEqual([next(generator).body.id for _ in range(2)], ['1', '2'])
+
+    def test_replay(self):
+        tests_config.CONF.set_override(name='stream_replay_size', override=3, group='api')
+        self.addCleanup(tests_config.CONF.clear_override, name='stream_replay_size', group='api')
+
+        listen = listener.Listener(mock.Mock())
+
+        for index in range(5):
+            listen.emit('event', self._get_body(str(index), 'core.local', 'stanley'))
+
+        event_id = listen._replay_events[0].id
+        generator = listen.generator(last_event_id=event_id)
+        self.assertEqual([next(generator).body.id for _ in range(2)], ['3', '4'])
+
+        listen.emit('event', self._get_body('5', 'core.local', 'stanley'))
+        self.assertEqual(next(generator).body.id, '5')
+
+        # Events issued by a different listener are not replayed
+        generator = listen.generator(last_event_id='abcd:1')
+        self.assertEqual(next(generator), None)
@@ -32,3 +32,10 @@ class TestStreamController(FunctionalTest):
         self.assertIsInstance(resp._app_iter, mock.Mock)
         self.assertEqual(resp._status, '200 OK')
         self.assertIn(('Content-Type', 'text/event-stream; charset=UTF-8'), resp._headerlist)
+
+    def test_format(self):
+        stream_event = listener.StreamEvent(listener_id='abcd', sequence=1, event='event',
+                                            body={'id': '1'})
+        messages = list(stream.format(iter([stream_event, None])))
+
+        self.assertEqual(messages, ['\n', 'id: abcd:1\nevent: event\ndata: {"id": "1"}\n\n', '\n'])
@@ -0,0 +1,277 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Functions for purging old executions, live actions, trigger instances and traces.
+
+Objects are deleted in bounded batches, oldest first. Each batch is selected using an indexed
+range query on the object timestamp (only the ids are retrieved) and deleted with a single
+server-side delete. Because the oldest objects are always deleted first, an interrupted purge
+simply continues where it stopped when it's started again.
+"""
+
+import time
+
+import eventlet
+import pymongo
+from bson.objectid import ObjectId
+
+from st2common import log as logging
+from st2common.constants.action import COMPLETED_STATES
+from st2common.models.db.execution import ActionExecutionDB
+from st2common.models.db.execution import ActionExecutionOutputDB
+from st2common.models.db.liveaction import LiveActionDB
+from st2common.models.db.trace import TraceDB
+from st2common.models.db.trigger import TriggerInstanceDB
+
+__all__ = [
+    'RateLimiter',
+
+    'purge_executions',
+    'purge_trigger_instances',
+    'purge_traces',
+
+    'ensure_trigger_instances_ttl_index'
+]
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+TRIGGER_INSTANCE_TIMESTAMP_INDEX_NAME = 'occurrence_time_1'
+
+
+class RateLimiter(object):
+    """
+    Limits the number of deleted objects per second.
+    """
+
+    def __init__(self, max_per_second):
+        """
+        :param max_per_second: Maximum number of objects deleted per second. 0 means no limit.
+        :type max_per_second: ``int``
+        """
+        self._max_per_second = max_per_second
+        self._start_timestamp = time.time()
+        self._count = 0
+
+    def wait(self, count):
+        """
+        Record that count objects have been deleted and sleep if the rate limit is exceeded.
+        """
+        if not self._max_per_second:
+            return
+
+        self._count += count
+        expected_duration = float(self._count) / self._max_per_second
+        duration = time.time() - self._start_timestamp
+
+        if expected_duration > duration:
+            eventlet.sleep(expected_duration - duration)
+
+
+def purge_executions(timestamp, action_ref=None, exclude_action_refs=None,
+                     purge_incomplete=False, batch_size=DEFAULT_BATCH_SIZE, rate_limiter=None):
+    """
+    Purge executions (and the corresponding live actions and output) which have been started
+    before the provided timestamp.
+
+    :param timestamp: Executions started before this timestamp are deleted.
+    :type timestamp: ``datetime.datetime``
+
+    :param action_ref: Only delete the executions of this action.
+    :type action_ref: ``str``
+
+    :param exclude_action_refs: Don't delete the executions of these actions.
+    :type exclude_action_refs: ``list``
+
+    :param purge_incomplete: True to also delete the executions which haven't completed.
+    :type purge_incomplete: ``bool``
+
+    :return: Number of deleted executions.
+    :rtype: ``int``
+    """
+    filters = {}
+
+    if action_ref:
+        filters['action__ref'] = action_ref
+    elif exclude_action_refs:
+        filters['action__ref__nin'] = list(exclude_action_refs)
+
+    if not purge_incomplete:
+        filters['status__in'] = COMPLETED_STATES
+
+    def delete_related(docs):
+        execution_ids = [str(doc['_id']) for doc in docs]
+        liveaction_ids = [_to_object_id(doc['liveaction']['id']) for doc in docs
+                          if doc.get('liveaction', {}).get('id', None)]
+
+        _delete_by_ids(LiveActionDB, liveaction_ids)
+        ActionExecutionOutputDB.objects(execution_id__in=execution_ids).delete()
+
+    count = _purge_in_batches(model=ActionExecutionDB, timestamp_field='start_timestamp',
+                              timestamp=timestamp, filters=filters, batch_size=batch_size,
+                              rate_limiter=rate_limiter, fields=['liveaction.id'],
+                              delete_related=delete_related)
+
+    LOG.info('Deleted %s executions started before %s%s.', count, timestamp,
+             ' (action=%s)' % (action_ref) if action_ref else '')
+    return count
+
+
+def purge_trigger_instances(timestamp, batch_size=DEFAULT_BATCH_SIZE, rate_limiter=None):
+    """
+    Purge trigger instances which occurred before the provided timestamp.
+
+    :return: Number of deleted trigger instances.
+    :rtype: ``int``
+    """
+    count = _purge_in_batches(model=TriggerInstanceDB, timestamp_field='occurrence_time',
+                              timestamp=timestamp, batch_size=batch_size,
+                              rate_limiter=rate_limiter)
+
+    LOG.info('Deleted %s trigger instances which occurred before %s.', count, timestamp)
+    return count
+
+
+def purge_traces(timestamp, batch_size=DEFAULT_BATCH_SIZE, rate_limiter=None):
+    """
+    Purge traces which have been started before the provided timestamp.
+
+    :return: Number of deleted traces.
+    :rtype: ``int``
+    """
+    count = _purge_in_batches(model=TraceDB, timestamp_field='start_timestamp',
+                              timestamp=timestamp, batch_size=batch_size,
+                              rate_limiter=rate_limiter)
+
+    LOG.info('Deleted %s traces started before %s.', count, timestamp)
+    return count
+
+
+def ensure_trigger_instances_ttl_index(ttl):
+    """
+    Make sure the trigger instance timestamp index matches the retention policy.
+
+    If ttl is provided, the index is a MongoDB TTL index so the database deletes the expired
+    trigger instances itself. Otherwise it's a regular index which is used by the batched purge.
+
+    Note: Only trigger instances can be expired using a TTL index. Timestamps of the other
+    objects are stored as integers and TTL indexes only work with dates.
+
+    :param ttl: Trigger instance time to live in seconds. None for a regular index.
+    :type ttl: ``int``
+    """
+    collection = _get_collection(TriggerInstanceDB)
+    index = collection.index_information().get(TRIGGER_INSTANCE_TIMESTAMP_INDEX_NAME, None)
+    current_ttl = index.get('expireAfterSeconds', None) if index else None
+
+    if index and current_ttl == ttl:
+        return
+
+    if index and current_ttl is not None and ttl is not None:
+        LOG.info('Changing trigger instances TTL from %s to %s seconds.', current_ttl, ttl)
+        collection.database.command('collMod', collection.name, index={
+            'keyPattern': {'occurrence_time': pymongo.ASCENDING},
+            'expireAfterSeconds': ttl
+        })
+        return
+
+    if index:
+        # Regular index can't be changed to a TTL index (and vice versa) so it's re-created
+        collection.drop_index(TRIGGER_INSTANCE_TIMESTAMP_INDEX_NAME)
+
+    kwargs = {'name': TRIGGER_INSTANCE_TIMESTAMP_INDEX_NAME, 'background': True}
+
+    if ttl is not None:
+        kwargs['expireAfterSeconds'] = ttl
+
+    LOG.info('Creating trigger instances timestamp index (ttl=%s).', ttl)
+    collection.create_index([('occurrence_time', pymongo.ASCENDING)], **kwargs)
+
+
+def _purge_in_batches(model, timestamp_field, timestamp, filters=None, batch_size=None,
+                      rate_limiter=None, fields=None, delete_related=None):
+    """
+    Delete objects of the provided model older than timestamp in batches, oldest first.
+
+    :param filters: Additional query filters.
+    :type filters: ``dict``
+
+    :param fields: Fields (in addition to the id) which are retrieved and passed to
+                   delete_related.
+    :type fields: ``list``
+
+    :param delete_related: Function which is called with the raw documents of each batch before
+                           they are deleted.
+    :type delete_related: ``callable``
+
+    :return: Number of deleted objects.
+    :rtype: ``int``
+    """
+    filters = dict(filters or {})
+    filters['%s__lt' % (timestamp_field)] = timestamp
+
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    queryset = model.objects(**filters).order_by(timestamp_field)
+    queryset = queryset.only(*(['id'] + (fields or []))).limit(batch_size)
+    count = 0
+
+    while True:
+        docs = list(queryset.clone().as_pymongo())
+
+        if not docs:
+            break
+
+        # Related objects are deleted first so a failed batch doesn't leave anything behind
+        # which can't be found by the next run
+        if delete_related:
+            delete_related(docs)
+
+        _delete_by_ids(model, [doc['_id'] for doc in docs])
+        count += len(docs)
+
+        LOG.debug('Deleted batch of %s %s objects (total=%s).', len(docs), model.__name__,
+                  count)
+
+        if rate_limiter:
+            rate_limiter.wait(len(docs))
+
+        if len(docs) < batch_size:
+            break
+
+        # Let other green threads run between the batches
+        eventlet.sleep(0)
+
+    return count
+
+
+def _delete_by_ids(model, ids):
+    if not ids:
+        return
+
+    # Note: Models don't define delete rules so this is a single server-side delete
+    model.objects(id__in=ids).delete()
+
+
+def _get_collection(model):
+    return model._get_collection()
+
+
+def _to_object_id(value):
+    try:
+        return ObjectId(value)
+    except Exception:
+        return value
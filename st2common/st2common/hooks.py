@@ -29,6 +29,7 @@ from st2common.exceptions import db as db_exceptions
 from st2common.exceptions import auth as auth_exceptions
 from st2common.exceptions import rbac as rbac_exceptions
 from st2common.exceptions.apivalidation import ValueValidationException
+from st2common.services import tokencache
 from st2common.util.jsonify import json_encode
 from st2common.util.auth import validate_token
 from st2common.constants.api import REQUEST_ID_HEADER
@@ -111,7 +112,7 @@ class AuthHook(PecanHook):
         token_db = self._validate_token(request=state.request)
 
         try:
-            user_db = User.get(token_db.user)
+            user_db = self._get_user(token_db.user)
         except ValueError:
             # User doesn't exist - we should probably also invalidate token if
             # this happens
@@ -161,6 +162,15 @@ class AuthHook(PecanHook):
 
         return webob.Response(body=body, status=status, headers=headers)
 
+    @staticmethod
+    def _get_user(username):
+        cache = tokencache.get_token_cache()
+
+        if not cache:
+            return User.get(username)
+
+        return cache.get_or_load_user(username, lambda: User.get(username))
+
     @staticmethod
     def _validate_token(request):
         """
@@ -21,9 +21,11 @@ from st2common.constants.action import LIVEACTION_STATUSES
 from st2common.util import isotime
 from st2common.models.api.base import BaseAPI
 from st2common.models.db.execution import ActionExecutionDB
+from st2common.models.db.execution import ActionExecutionOutputDB
 from st2common.models.api.trigger import TriggerTypeAPI, TriggerAPI, TriggerInstanceAPI
 from st2common.models.api.rule import RuleAPI
 from st2common.models.api.action import RunnerTypeAPI, ActionAPI, LiveActionAPI
+from st2common.services import snapshots as snapshot_service
 from st2common import log as logging
 
 
@@ -112,6 +114,10 @@ class ActionExecutionAPI(BaseAPI):
     @classmethod
     def from_model(cls, model, mask_secrets=False):
         doc = cls._from_model(model, mask_secrets=mask_secrets)
+
+        # Note: References contain the secret parameters so the secrets are masked above
+        doc = snapshot_service.hydrate_execution_doc(doc)
+
         start_timestamp = isotime.format(model.start_timestamp, offset=False)
         doc['start_timestamp'] = start_timestamp
 
@@ -143,3 +149,43 @@ class ActionExecutionAPI(BaseAPI):
 
         model = cls.model(**values)
         return model
+
+
+class ActionExecutionOutputAPI(BaseAPI):
+    model = ActionExecutionOutputDB
+    schema = {
+        "title": "ActionExecutionOutput",
+        "description": "Chunk of the output produced by an action execution.",
+        "type": "object",
+        "properties": {
+            "id": {
+                "type": "string"
+            },
+            "execution_id": {
+                "type": "string",
+                "required": True
+            },
+            "output_type": {
+                "description": "Type of the output (stdout, stderr).",
+                "type": "string",
+                "required": True
+            },
+            "timestamp": {
+                "description": "The timestamp when the output chunk was produced.",
+                "type": "string",
+                "pattern": isotime.ISO8601_UTC_REGEX
+            },
+            "data": {
+                "type": "string"
+            }
+        },
+        "additionalProperties": False
+    }
+
+    @classmethod
+    def from_model(cls, model, mask_secrets=False):
+        doc = cls._from_model(model, mask_secrets=mask_secrets)
+        doc['timestamp'] = isotime.format(model.timestamp, offset=False)
+
+        attrs = {attr: value for attr, value in six.iteritems(doc) if value is not None}
+        return cls(**attrs)
@@ -5,7 +5,6 @@ import six
 import mongoengine
 
 from st2common.util import isotime
-from st2common.models.db import stormbase
 from st2common import log as logging
 
 
@@ -145,12 +144,27 @@ class MongoDBAccess(object):
         return self.model.objects(**kwargs)._collection.aggregate(*args, **kwargs)
 
     def insert(self, instance):
-        instance = self.model.objects.insert(instance)
-        return self._undo_dict_field_escape(instance)
+        return self.model.objects.insert(instance)
+
+    def insert_many(self, instances):
+        """
+        Insert multiple new documents using a single bulk insert.
+
+        Note: Documents are not re-loaded from the database, only the generated ids are assigned.
+        """
+        if not instances:
+            return []
+
+        ids = self.model.objects.insert(instances, load_bulk=False)
+        for instance, instance_id in zip(instances, ids):
+            instance.id = instance_id
+        return instances
 
     def add_or_update(self, instance):
+        # Note: Escaping doesn't modify the instance values so they don't need to be unescaped
+        # after the save
         instance.save()
-        return self._undo_dict_field_escape(instance)
+        return instance
 
     def update(self, instance, **kwargs):
         return instance.update(**kwargs)
@@ -158,13 +172,6 @@ class MongoDBAccess(object):
     def delete(self, instance):
         instance.delete()
 
-    def _undo_dict_field_escape(self, instance):
-        for attr, field in instance._fields.iteritems():
-            if isinstance(field, stormbase.EscapedDictField):
-                value = getattr(instance, attr)
-                setattr(instance, attr, field.to_python(value))
-        return instance
-
     def _process_null_filters(self, filters):
         result = copy.deepcopy(filters)
 
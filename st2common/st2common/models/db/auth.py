@@ -20,7 +20,8 @@ from st2common.services.rbac import get_roles_for_user
 
 __all__ = [
     'UserDB',
-    'TokenDB'
+    'TokenDB',
+    'TokenRevocationDB'
 ]
 
 
@@ -49,4 +50,24 @@ class TokenDB(stormbase.StormFoundationDB):
                             help_text='Arbitrary metadata associated with this token')
 
 
-MODELS = [UserDB, TokenDB]
+class TokenRevocationDB(stormbase.StormFoundationDB):
+    """
+    Revoked signed token. Signed tokens are not stored so revoking one (e.g. on logout) requires
+    storing its id until the token expires.
+
+    Attribute:
+        token_id: Id of the revoked token.
+        expiry: Expiry of the revoked token. Revocation is removed by MongoDB once the token
+                expires.
+    """
+    token_id = me.StringField(required=True, unique=True)
+    expiry = me.DateTimeField(required=True)
+
+    meta = {
+        'indexes': [
+            {'fields': ['expiry'], 'expireAfterSeconds': 0}
+        ]
+    }
+
+
+MODELS = [UserDB, TokenDB, TokenRevocationDB]
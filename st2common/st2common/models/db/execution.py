@@ -26,7 +26,9 @@ from st2common.util.secrets import mask_secret_parameters
 from st2common.constants.types import ResourceType
 
 __all__ = [
-    'ActionExecutionDB'
+    'ActionExecutionDB',
+    'ActionExecutionOutputDB',
+    'ExecutionResourceSnapshotDB'
 ]
 
 
@@ -102,4 +104,44 @@ class ActionExecutionDB(stormbase.StormFoundationDB):
         return serializable_dict['parameters']
 
 
-MODELS = [ActionExecutionDB]
+class ActionExecutionOutputDB(stormbase.StormFoundationDB):
+    """
+    Chunk of the output (stdout, stderr) produced by an action execution.
+
+    Chunks are stored as they are produced so the output of a running execution can be tailed
+    and the whole output is available even if the execution result only holds a truncated view.
+    """
+    execution_id = me.StringField(required=True)
+    output_type = me.StringField(
+        required=True,
+        help_text='Type of the output (stdout, stderr).')
+    timestamp = ComplexDateTimeField(
+        default=date_utils.get_datetime_utc_now,
+        help_text='The timestamp when the output chunk was produced.')
+    data = me.StringField()
+
+    meta = {
+        'indexes': [
+            {'fields': ['execution_id', 'timestamp']},
+            {'fields': ['timestamp']}
+        ]
+    }
+
+
+class ExecutionResourceSnapshotDB(stormbase.StormFoundationDB):
+    """
+    Immutable snapshot of a resource (action, runner, rule, trigger, trigger type) referenced by
+    action executions.
+
+    Snapshots are content addressed so executions of the same version of a resource share a
+    single snapshot.
+    """
+    hash = me.StringField(
+        required=True,
+        unique=True,
+        help_text='Hash of the resource type and the snapshot data.')
+    resource_type = me.StringField(required=True)
+    data = stormbase.EscapedDictField()
+
+
+MODELS = [ActionExecutionDB, ActionExecutionOutputDB, ExecutionResourceSnapshotDB]
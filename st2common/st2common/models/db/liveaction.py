@@ -92,13 +92,8 @@ class LiveActionDB(stormbase.StormFoundationDB):
         result = copy.deepcopy(value)
         execution_parameters = value['parameters']
 
-        # TODO: This results into two DB looks, we should cache action and runner type object
-        # for each liveaction...
-        #
-        #       ,-'"-.
-        # .    f .--. \
-        # .\._,\._',' j_
-        #  7______""-'__`,
+        # Note: Action and runner type lookups are served from the resource cache in the services
+        # which run the cache watcher
         parameters = action_db.get_action_parameters_specs(action_ref=self.action)
 
         secret_parameters = get_secret_parameters(parameters=parameters)
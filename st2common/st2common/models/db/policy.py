@@ -23,7 +23,8 @@ from st2common.models.system import common as common_models
 
 __all__ = ['PolicyTypeReference',
            'PolicyTypeDB',
-           'PolicyDB']
+           'PolicyDB',
+           'ConcurrencySlotDB']
 
 LOG = logging.getLogger(__name__)
 
@@ -179,4 +180,36 @@ class PolicyDB(stormbase.StormFoundationDB, stormbase.ContentPackResourceMixin):
                                                                        name=self.name)
 
 
-MODELS = [PolicyTypeDB, PolicyDB]
+class ConcurrencySlotDB(stormbase.StormFoundationDB):
+    """
+    Concurrency slots of a concurrency policy.
+
+    Attribute:
+        key: Unique key of the slots (policy, action and the values of the policy attributes).
+        policy: Reference of the concurrency policy.
+        action: Reference of the action the policy is applied to.
+        attributes: Values of the action parameters the policy is applied to (if any).
+        holders: Ids of the live actions which hold a slot.
+        delayed: Ids of the delayed live actions waiting for a slot (oldest first).
+    """
+    key = me.StringField(
+        required=True,
+        unique=True,
+        help_text='Unique key of the slots.')
+    policy = me.StringField(
+        required=True,
+        help_text='Reference of the concurrency policy.')
+    action = me.StringField(
+        required=True,
+        help_text='Reference of the action the policy is applied to.')
+    attributes = stormbase.EscapedDictField(
+        help_text='Values of the action parameters the policy is applied to.')
+    holders = me.ListField(
+        field=me.StringField(),
+        help_text='Ids of the live actions which hold a slot.')
+    delayed = me.ListField(
+        field=me.StringField(),
+        help_text='Ids of the delayed live actions waiting for a slot, oldest first.')
+
+
+MODELS = [PolicyTypeDB, PolicyDB, ConcurrencySlotDB]
@@ -36,8 +36,20 @@ class Node(object):
             },
             "ref": {
                 "type": "string",
-                "description": "Ref of the action to be executed.",
-                "required": True
+                "description": "Ref of the action to be executed. Required unless the node is a"
+                               " parallel node."
+            },
+            "parallel": {
+                "type": "array",
+                "description": "Names of the nodes which start the branches executed in"
+                               " parallel. Chain continues with the on-success node (join node)"
+                               " once all the branches complete or with the on-failure node if"
+                               " any of the branches failed.",
+                "items": {
+                    "type": "string"
+                },
+                "minItems": 1,
+                "uniqueItems": True
             },
             "params": {
                 "type": "object",
@@ -106,6 +118,12 @@ class ActionChain(object):
                 "type": "string",
                 "description": "name of the action to be executed."
             },
+            "concurrency": {
+                "type": "integer",
+                "description": "Maximum number of tasks executed at the same time by the"
+                               " parallel branches.",
+                "minimum": 1
+            },
             "vars": {
                 "description": "",
                 "type": "object",
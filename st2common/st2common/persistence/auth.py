@@ -13,10 +13,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from st2common import transport
 from st2common.exceptions.auth import TokenNotFoundError
 from st2common.models.db import MongoDBAccess
-from st2common.models.db.auth import UserDB, TokenDB
+from st2common.models.db.auth import UserDB, TokenDB, TokenRevocationDB
 from st2common.persistence.base import Access
+from st2common.transport import utils as transport_utils
 
 
 class User(Access):
@@ -39,11 +41,19 @@ class User(Access):
 
 class Token(Access):
     impl = MongoDBAccess(TokenDB)
+    publisher = None
 
     @classmethod
     def _get_impl(cls):
         return cls.impl
 
+    @classmethod
+    def _get_publisher(cls):
+        if not cls.publisher:
+            cls.publisher = transport.auth.TokenCUDPublisher(
+                urls=transport_utils.get_messaging_urls())
+        return cls.publisher
+
     @classmethod
     def add_or_update(cls, model_object, publish=True):
         if not getattr(model_object, 'user', None):
@@ -59,3 +69,23 @@ class Token(Access):
         for model_object in TokenDB.objects(token=value):
             return model_object
         raise TokenNotFoundError()
+
+
+class TokenRevocation(Access):
+    impl = MongoDBAccess(TokenRevocationDB)
+    publisher = None
+
+    @classmethod
+    def _get_impl(cls):
+        return cls.impl
+
+    @classmethod
+    def _get_publisher(cls):
+        if not cls.publisher:
+            cls.publisher = transport.auth.TokenRevocationCUDPublisher(
+                urls=transport_utils.get_messaging_urls())
+        return cls.publisher
+
+    @classmethod
+    def is_revoked(cls, token_id):
+        return TokenRevocationDB.objects(token_id=token_id).count() > 0
@@ -16,6 +16,8 @@
 from st2common import transport
 from st2common.models.db import MongoDBAccess
 from st2common.models.db.execution import ActionExecutionDB
+from st2common.models.db.execution import ActionExecutionOutputDB
+from st2common.models.db.execution import ExecutionResourceSnapshotDB
 from st2common.persistence.base import Access
 from st2common.transport import utils as transport_utils
 
@@ -34,3 +36,21 @@ class ActionExecution(Access):
             cls.publisher = transport.execution.ActionExecutionPublisher(
                 urls=transport_utils.get_messaging_urls())
         return cls.publisher
+
+
+class ActionExecutionOutput(Access):
+    impl = MongoDBAccess(ActionExecutionOutputDB)
+    publisher = None
+
+    @classmethod
+    def _get_impl(cls):
+        return cls.impl
+
+
+class ExecutionResourceSnapshot(Access):
+    impl = MongoDBAccess(ExecutionResourceSnapshotDB)
+    publisher = None
+
+    @classmethod
+    def _get_impl(cls):
+        return cls.impl
@@ -13,6 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import six
+
 from st2common.models.db.trace import trace_access
 from st2common.persistence.base import Access
 
@@ -37,6 +39,34 @@ class Trace(Access):
             return cls.update(instance, **update_kwargs)
         return instance
 
+    @classmethod
+    def push_components_many(cls, components):
+        """
+        Push components to multiple traces using a single unordered bulk write.
+
+        :param components: Maps trace id to a dictionary with "action_executions", "rules" and
+                           "trigger_instances" lists of :class:`TraceComponentDB`.
+        :type components: ``dict``
+        """
+        collection = cls._get_impl().model._get_collection()
+        bulk = collection.initialize_unordered_bulk_op()
+        operations_count = 0
+
+        for trace_id, trace_components in six.iteritems(components):
+            push = {}
+            for field_name, values in six.iteritems(trace_components):
+                if values:
+                    push[field_name] = {'$each': [value.to_mongo() for value in values]}
+
+            if push:
+                bulk.find({'_id': trace_id}).update_one({'$push': push})
+                operations_count += 1
+
+        if operations_count:
+            bulk.execute()
+
+        return operations_count
+
     @classmethod
     def push_action_execution(cls, instance, action_execution):
         return cls.update(instance, push__action_executions=action_execution)
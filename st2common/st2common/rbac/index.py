@@ -0,0 +1,231 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Per-user index of the effective RBAC permissions.
+
+Index of a user holds the names of the roles assigned to the user and the permission types
+granted by those roles keyed by the resource type and uid, so the permission checks performed by
+the resolvers are dictionary lookups. Grants on a pack are keyed by the pack uid and are looked up
+directly for the resources which belong to the pack. System role permissions (admins have all the
+permissions and observers have "view" permission on all the resources) are precomputed as flags.
+
+Indexes are only cached in the service processes which run :class:`PermissionsIndexWatcher`.
+Whole cache is cleared on any role, role assignment and permission grant CUD event (those change
+rarely, e.g. when RBAC definitions are applied) and the cache is only used while the watcher is
+connected to the message bus. Cached indexes also expire after a TTL in case an event is lost.
+Other processes build the index on each check.
+"""
+
+import uuid
+
+from oslo_config import cfg
+
+from st2common.persistence.rbac import PermissionGrant
+from st2common.persistence.rbac import Role
+from st2common.persistence.rbac import UserRoleAssignment
+from st2common.rbac.types import PermissionType
+from st2common.rbac.types import SystemRole
+from st2common.services.caching import CacheWatcher
+from st2common.services.caching import TTLCache
+from st2common.transport import rbac as rbac_transport
+
+__all__ = [
+    'UserPermissionsIndex',
+    'PermissionsIndexCache',
+    'PermissionsIndexWatcher',
+
+    'build_user_permissions_index',
+    'get_user_permissions_index',
+    'get_permissions_index_watcher',
+    'get_permissions_index_stats'
+]
+
+# Roles which have all the permissions on all the resources
+ADMIN_ROLES = frozenset([SystemRole.SYSTEM_ADMIN, SystemRole.ADMIN])
+
+# Cache which is used by the permission checks (set once the watcher has been started)
+_PERMISSIONS_INDEX_CACHE = None
+
+
+class UserPermissionsIndex(object):
+    """
+    Effective roles and permission grants of a single user.
+    """
+
+    def __init__(self, role_names, permission_grant_dbs):
+        """
+        :param role_names: Names of the roles assigned to the user.
+        :type role_names: ``list`` of ``str``
+
+        :param permission_grant_dbs: Permission grants of all the roles assigned to the user.
+        :type permission_grant_dbs: ``list`` of :class:`PermissionGrantDB`
+        """
+        self.role_names = frozenset(role_names)
+        self.is_admin = not self.role_names.isdisjoint(ADMIN_ROLES)
+        self.is_observer = SystemRole.OBSERVER in self.role_names
+
+        # Maps (resource type, resource uid) to the set of the granted permission types
+        self._grants = {}
+
+        for permission_grant_db in permission_grant_dbs:
+            key = (permission_grant_db.resource_type, permission_grant_db.resource_uid)
+            permission_types = self._grants.setdefault(key, set())
+            permission_types.update(permission_grant_db.permission_types or [])
+
+    def has_role(self, role):
+        return role in self.role_names
+
+    def has_system_role_permission(self, permission_type):
+        """
+        Return True if the user has the provided permission on all the resources via a system
+        role.
+
+        :rtype: ``bool``
+        """
+        if self.is_admin:
+            return True
+
+        if self.is_observer and PermissionType.get_permission_name(permission_type) == 'view':
+            return True
+
+        return False
+
+    def has_permission_grant(self, resource_uid, resource_types, permission_types):
+        """
+        Return True if any of the user roles grants any of the provided permission types on the
+        resource with the provided uid.
+
+        :rtype: ``bool``
+        """
+        for resource_type in resource_types:
+            granted_permission_types = self._grants.get((resource_type, resource_uid), None)
+
+            if (granted_permission_types and
+                    not granted_permission_types.isdisjoint(permission_types)):
+                return True
+
+        return False
+
+
+class PermissionsIndexCache(TTLCache):
+    """
+    Cache of the user permission indexes keyed by the user name (with a bounded size and time to
+    live).
+    """
+    pass
+
+
+class PermissionsIndexWatcher(CacheWatcher):
+    """
+    Clears :class:`PermissionsIndexCache` by consuming RBAC CUD events.
+    """
+
+    name = 'RBAC permissions index cache'
+
+    def __init__(self, cache):
+        queue_suffix = uuid.uuid4().hex[-10:]
+        queues = [
+            rbac_transport.get_rbac_cud_queue(
+                'st2.rbac.index.%s' % (queue_suffix), routing_key='#', exclusive=True,
+                auto_delete=True)
+        ]
+
+        handlers = {
+            rbac_transport.RBAC_CUD_XCHG.name: self._handle_rbac_change
+        }
+
+        super(PermissionsIndexWatcher, self).__init__(cache=cache, queues=queues,
+                                                      handlers=handlers)
+
+    def _handle_rbac_change(self, body):
+        self._cache.clear()
+
+    def _set_cache(self, cache):
+        _set_permissions_index_cache(cache)
+
+
+def build_user_permissions_index(username):
+    """
+    Build permissions index for the provided user.
+
+    :rtype: :class:`UserPermissionsIndex`
+    """
+    role_names = UserRoleAssignment.query(user=username).only('role').scalar('role')
+    role_dbs = Role.query(name__in=list(role_names)).only('name', 'permission_grants')
+
+    role_names = []
+    permission_grant_ids = []
+
+    for role_db in role_dbs:
+        role_names.append(role_db.name)
+        permission_grant_ids.extend(role_db.permission_grants or [])
+
+    if permission_grant_ids:
+        permission_grant_dbs = PermissionGrant.query(id__in=permission_grant_ids)
+    else:
+        permission_grant_dbs = []
+
+    return UserPermissionsIndex(role_names=role_names, permission_grant_dbs=permission_grant_dbs)
+
+
+def get_user_permissions_index(user_db):
+    """
+    Return permissions index for the provided user. Index is cached if the permissions index
+    watcher runs in this process.
+
+    :param user_db: User to retrieve the index for.
+    :type user_db: :class:`UserDB`
+
+    :rtype: :class:`UserPermissionsIndex`
+    """
+    username = user_db.name
+    cache = _PERMISSIONS_INDEX_CACHE
+
+    if not cache:
+        return build_user_permissions_index(username=username)
+
+    return cache.get_or_load(username, lambda: build_user_permissions_index(username=username))
+
+
+def get_permissions_index_watcher():
+    """
+    Return a watcher which enables the process-wide permissions index cache once it's started
+    and keeps it up to date or None if RBAC or the cache is disabled.
+
+    :rtype: :class:`PermissionsIndexWatcher`
+    """
+    if not cfg.CONF.rbac.enable or cfg.CONF.rbac.index_cache_size <= 0:
+        return None
+
+    cache = PermissionsIndexCache(ttl=cfg.CONF.rbac.index_cache_ttl,
+                                  max_size=cfg.CONF.rbac.index_cache_size)
+    return PermissionsIndexWatcher(cache=cache)
+
+
+def get_permissions_index_stats():
+    """
+    Return statistics of the process-wide permissions index cache or None if the cache is not
+    used in this process.
+
+    :rtype: ``dict``
+    """
+    cache = _PERMISSIONS_INDEX_CACHE
+    return cache.get_stats() if cache else None
+
+
+def _set_permissions_index_cache(cache):
+    global _PERMISSIONS_INDEX_CACHE
+    _PERMISSIONS_INDEX_CACHE = cache
@@ -25,11 +25,9 @@ from st2common import log as logging
 from st2common.models.db.pack import PackDB
 from st2common.models.db.webhook import WebhookDB
 from st2common.constants.triggers import WEBHOOK_TRIGGER_TYPE
+from st2common.rbac.index import get_user_permissions_index
 from st2common.rbac.types import PermissionType
 from st2common.rbac.types import ResourceType
-from st2common.rbac.types import SystemRole
-from st2common.services.rbac import get_roles_for_user
-from st2common.services.rbac import get_all_permission_grants_for_user
 
 LOG = logging.getLogger(__name__)
 
@@ -61,22 +59,21 @@ class PermissionsResolver(object):
 
         :rtype: ``bool``
         """
-        permission_name = PermissionType.get_permission_name(permission_type)
+        permissions_index = get_user_permissions_index(user_db=user_db)
+        return permissions_index.has_system_role_permission(permission_type=permission_type)
 
-        user_role_dbs = get_roles_for_user(user_db=user_db)
-        user_role_names = [role_db.name for role_db in user_role_dbs]
-
-        if SystemRole.SYSTEM_ADMIN in user_role_names:
-            # System admin has all the permissions
-            return True
-        elif SystemRole.ADMIN in user_role_names:
-            # Admin has all the permissions
-            return True
-        elif SystemRole.OBSERVER in user_role_names and permission_name == 'view':
-            # Observer role has "view" permission on all the resources
-            return True
+    def _user_has_permission_grant(self, user_db, resource_uid, resource_types,
+                                   permission_types):
+        """
+        Check the user custom roles and return True if any of the roles grants any of the
+        provided permission types on the provided resource.
 
-        return False
+        :rtype: ``bool``
+        """
+        permissions_index = get_user_permissions_index(user_db=user_db)
+        return permissions_index.has_permission_grant(resource_uid=resource_uid,
+                                                      resource_types=resource_types,
+                                                      permission_types=permission_types)
 
     def _matches_permission_grant(self, resource_db, permission_grant, permission_type,
                                   all_permission_type):
@@ -143,12 +140,12 @@ class PackPermissionsResolver(PermissionsResolver):
         resource_uid = resource_db.get_uid()
         resource_types = [ResourceType.PACK]
         permission_types = [permission_type]
-        permission_grants = get_all_permission_grants_for_user(user_db=user_db,
+        has_permission_grant = self._user_has_permission_grant(user_db=user_db,
                                                                resource_uid=resource_uid,
                                                                resource_types=resource_types,
                                                                permission_types=permission_types)
 
-        if len(permission_grants) >= 1:
+        if has_permission_grant:
             self._log('Found a direct grant on the pack', extra=log_context)
             return True
 
@@ -194,22 +191,22 @@ class SensorPermissionsResolver(PermissionsResolver):
 
         # Check direct grants on the specified resource
         resource_types = [ResourceType.SENSOR]
-        permission_grants = get_all_permission_grants_for_user(user_db=user_db,
+        has_permission_grant = self._user_has_permission_grant(user_db=user_db,
                                                                resource_uid=sensor_uid,
                                                                resource_types=resource_types,
                                                                permission_types=permission_types)
-        if len(permission_grants) >= 1:
+        if has_permission_grant:
             self._log('Found a direct grant on the sensor', extra=log_context)
             return True
 
         # Check grants on the parent pack
         resource_types = [ResourceType.PACK]
-        permission_grants = get_all_permission_grants_for_user(user_db=user_db,
+        has_permission_grant = self._user_has_permission_grant(user_db=user_db,
                                                                resource_uid=pack_uid,
                                                                resource_types=resource_types,
                                                                permission_types=permission_types)
 
-        if len(permission_grants) >= 1:
+        if has_permission_grant:
             self._log('Found a grant on the sensor parent pack', extra=log_context)
             return True
 
@@ -262,22 +259,22 @@ class ActionPermissionsResolver(PermissionsResolver):
 
         # Check direct grants on the specified resource
         resource_types = [ResourceType.ACTION]
-        permission_grants = get_all_permission_grants_for_user(user_db=user_db,
+        has_permission_grant = self._user_has_permission_grant(user_db=user_db,
                                                                resource_uid=action_uid,
                                                                resource_types=resource_types,
                                                                permission_types=permission_types)
-        if len(permission_grants) >= 1:
+        if has_permission_grant:
             self._log('Found a direct grant on the action', extra=log_context)
             return True
 
         # Check grants on the parent pack
         resource_types = [ResourceType.PACK]
-        permission_grants = get_all_permission_grants_for_user(user_db=user_db,
+        has_permission_grant = self._user_has_permission_grant(user_db=user_db,
                                                                resource_uid=pack_uid,
                                                                resource_types=resource_types,
                                                                permission_types=permission_types)
 
-        if len(permission_grants) >= 1:
+        if has_permission_grant:
             self._log('Found a grant on the action parent pack', extra=log_context)
             return True
 
@@ -375,22 +372,22 @@ class RulePermissionsResolver(PermissionsResolver):
 
         # Check direct grants on the specified resource
         resource_types = [ResourceType.RULE]
-        permission_grants = get_all_permission_grants_for_user(user_db=user_db,
+        has_permission_grant = self._user_has_permission_grant(user_db=user_db,
                                                                resource_uid=rule_uid,
                                                                resource_types=resource_types,
                                                                permission_types=permission_types)
-        if len(permission_grants) >= 1:
+        if has_permission_grant:
             self._log('Found a direct grant on the rule', extra=log_context)
             return True
 
         # Check grants on the parent pack
         resource_types = [ResourceType.PACK]
-        permission_grants = get_all_permission_grants_for_user(user_db=user_db,
+        has_permission_grant = self._user_has_permission_grant(user_db=user_db,
                                                                resource_uid=pack_uid,
                                                                resource_types=resource_types,
                                                                permission_types=permission_types)
 
-        if len(permission_grants) >= 1:
+        if has_permission_grant:
             self._log('Found a grant on the rule parent pack', extra=log_context)
             return True
 
@@ -461,24 +458,24 @@ class ExecutionPermissionsResolver(PermissionsResolver):
         # Check grants on the pack of the action to which execution belongs to
         resource_types = [ResourceType.PACK]
         permission_types = [PermissionType.ACTION_ALL, action_permission_type]
-        permission_grants = get_all_permission_grants_for_user(user_db=user_db,
+        has_permission_grant = self._user_has_permission_grant(user_db=user_db,
                                                                resource_uid=action_pack_uid,
                                                                resource_types=resource_types,
                                                                permission_types=permission_types)
 
-        if len(permission_grants) >= 1:
+        if has_permission_grant:
             self._log('Found a grant on the execution action parent pack', extra=log_context)
             return True
 
         # Check grants on the action the execution belongs to
         resource_types = [ResourceType.ACTION]
         permission_types = [PermissionType.ACTION_ALL, action_permission_type]
-        permission_grants = get_all_permission_grants_for_user(user_db=user_db,
+        has_permission_grant = self._user_has_permission_grant(user_db=user_db,
                                                                resource_uid=action_uid,
                                                                resource_types=resource_types,
                                                                permission_types=permission_types)
 
-        if len(permission_grants) >= 1:
+        if has_permission_grant:
             self._log('Found a grant on the execution action', extra=log_context)
             return True
 
@@ -514,12 +511,12 @@ class WebhookPermissionsResolver(PermissionsResolver):
         # Check direct grants on the webhook
         resource_types = [ResourceType.WEBHOOK]
         permission_types = [PermissionType.WEBHOOK_ALL, permission_type]
-        permission_grants = get_all_permission_grants_for_user(user_db=user_db,
+        has_permission_grant = self._user_has_permission_grant(user_db=user_db,
                                                                resource_uid=webhook_uid,
                                                                resource_types=resource_types,
                                                                permission_types=permission_types)
 
-        if len(permission_grants) >= 1:
+        if has_permission_grant:
             self._log('Found a grant on the webhook', extra=log_context)
             return True
 
@@ -128,6 +128,9 @@ class RBACDefinitionsDBSyncer(object):
         PermissionGrant.query(id__in=permission_grant_ids_to_delete).delete()
         LOG.debug('Deleted %s stale permission grants' % (len(permission_grant_ids_to_delete)))
 
+        # Bulk deletes don't publish events so they are published explicitly
+        self._publish_delete(access_cls=Role, model_dbs=role_dbs_to_delete)
+
         ########
         # 2. Add new / updated roles to the DB
         ########
@@ -239,6 +242,8 @@ class RBACDefinitionsDBSyncer(object):
         UserRoleAssignment.query(user=user_db.name, role__in=role_names_to_delete).delete()
         LOG.debug('Removed %s assignments for user "%s"' %
                 (len(role_assignment_dbs_to_delete), user_db.name))
+        self._publish_delete(access_cls=UserRoleAssignment,
+                             model_dbs=role_assignment_dbs_to_delete)
 
         # Build a list of roles assignments to create
         role_names_to_create = new_role_names.union(updated_role_names)
@@ -258,3 +263,14 @@ class RBACDefinitionsDBSyncer(object):
                                                                 user_db.name))
 
         return (created_role_assignment_dbs, role_assignment_dbs_to_delete)
+
+    def _publish_delete(self, access_cls, model_dbs):
+        """
+        Publish delete events for the provided objects so the services invalidate the cached
+        permission indexes.
+        """
+        for model_db in model_dbs:
+            try:
+                access_cls.publish_delete(model_db)
+            except Exception:
+                LOG.exception('Publish failed.')
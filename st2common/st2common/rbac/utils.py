@@ -28,7 +28,7 @@ from st2common.rbac.types import PermissionType
 from st2common.rbac.types import ResourceType
 from st2common.rbac.types import SystemRole
 from st2common.rbac import resolvers
-from st2common.services import rbac as rbac_services
+from st2common.rbac.index import get_user_permissions_index
 from st2common.util import action_db as action_utils
 
 __all__ = [
@@ -250,10 +250,8 @@ def user_has_role(user_db, role):
     if not cfg.CONF.rbac.enable:
         return True
 
-    user_role_dbs = rbac_services.get_roles_for_user(user_db=user_db)
-    user_role_names = [role_db.name for role_db in user_role_dbs]
-
-    return role in user_role_names
+    permissions_index = get_user_permissions_index(user_db=user_db)
+    return permissions_index.has_role(role)
 
 
 def user_has_permission(user_db, permission_type):
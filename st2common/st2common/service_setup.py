@@ -28,6 +28,9 @@ from st2common import log as logging
 from st2common.models import db
 from st2common.constants.logging import DEFAULT_LOGGING_CONF_PATH
 from st2common.logging.misc import set_log_level_for_all_loggers
+from st2common.services.resourcecache import get_resource_cache_watcher
+from st2common.services.tokencache import get_token_cache_watcher
+from st2common.rbac.index import get_permissions_index_watcher
 from st2common.transport.bootstrap_utils import register_exchanges
 from st2common.signal_handlers import register_common_signal_handlers
 
@@ -43,9 +46,19 @@ __all__ = [
 
 LOG = logging.getLogger(__name__)
 
+# Watcher which keeps the action, runner type and policy cache of the service up to date
+_RESOURCE_CACHE_WATCHER = None
+
+# Watcher which keeps the access token cache of the service up to date
+_TOKEN_CACHE_WATCHER = None
+
+# Watcher which keeps the RBAC permissions index cache of the service up to date
+_PERMISSIONS_INDEX_WATCHER = None
+
 
 def setup(service, config, setup_db=True, register_mq_exchanges=True,
-          register_signal_handlers=True, run_migrations=True):
+          register_signal_handlers=True, run_migrations=True, use_resource_cache=False,
+          use_token_cache=False, use_permissions_index=False):
     """
     Common setup function.
 
@@ -56,10 +69,17 @@ def setup(service, config, setup_db=True, register_mq_exchanges=True,
     3. Set log level for all the loggers to DEBUG if --debug flag is present
     4. Registers RabbitMQ exchanges
     5. Registers common signal handlers
+    6. Starts the action, runner type and policy cache watcher (if use_resource_cache is True)
+    7. Starts the access token cache watcher (if use_token_cache is True)
+    8. Starts the RBAC permissions index watcher (if use_permissions_index is True)
 
     :param service: Name of the service.
     :param config: Config object to use to parse args.
     """
+    global _RESOURCE_CACHE_WATCHER
+    global _TOKEN_CACHE_WATCHER
+    global _PERMISSIONS_INDEX_WATCHER
+
     # Set up logger which logs everything which happens during and before config
     # parsing to sys.stdout
     logging.setup(DEFAULT_LOGGING_CONF_PATH)
@@ -101,11 +121,43 @@ def setup(service, config, setup_db=True, register_mq_exchanges=True,
                'You can either enable authentication or disable RBAC.')
         raise Exception(msg)
 
+    if use_resource_cache:
+        _RESOURCE_CACHE_WATCHER = get_resource_cache_watcher()
+
+        if _RESOURCE_CACHE_WATCHER:
+            _RESOURCE_CACHE_WATCHER.start()
+
+    if use_token_cache:
+        _TOKEN_CACHE_WATCHER = get_token_cache_watcher()
+        _TOKEN_CACHE_WATCHER.start()
+
+    if use_permissions_index:
+        _PERMISSIONS_INDEX_WATCHER = get_permissions_index_watcher()
+
+        if _PERMISSIONS_INDEX_WATCHER:
+            _PERMISSIONS_INDEX_WATCHER.start()
+
 
 def teardown():
     """
     Common teardown function.
     """
+    global _RESOURCE_CACHE_WATCHER
+    global _TOKEN_CACHE_WATCHER
+    global _PERMISSIONS_INDEX_WATCHER
+
+    if _RESOURCE_CACHE_WATCHER:
+        _RESOURCE_CACHE_WATCHER.stop()
+        _RESOURCE_CACHE_WATCHER = None
+
+    if _TOKEN_CACHE_WATCHER:
+        _TOKEN_CACHE_WATCHER.stop()
+        _TOKEN_CACHE_WATCHER = None
+
+    if _PERMISSIONS_INDEX_WATCHER:
+        _PERMISSIONS_INDEX_WATCHER.stop()
+        _PERMISSIONS_INDEX_WATCHER = None
+
     db_teardown()
 
 
@@ -19,16 +19,19 @@ import datetime
 from oslo_config import cfg
 
 from st2common.util import isotime
+from st2common.util import auth as auth_utils
 from st2common.util import date as date_utils
 from st2common.exceptions.auth import TokenNotFoundError
 from st2common.exceptions.auth import TTLTooLargeException
-from st2common.models.db.auth import TokenDB, UserDB
-from st2common.persistence.auth import Token, User
+from st2common.exceptions.db import StackStormDBObjectConflictError
+from st2common.models.db.auth import TokenDB, TokenRevocationDB, UserDB
+from st2common.persistence.auth import Token, TokenRevocation, User
 from st2common import log as logging
 
 __all__ = [
     'create_token',
-    'delete_token'
+    'delete_token',
+    'revoke_token'
 ]
 
 LOG = logging.getLogger(__name__)
@@ -45,6 +48,9 @@ def create_token(username, ttl=None, metadata=None):
 
     :param metadata: Optional metadata to associate with the token.
     :type metadata: ``dict``
+
+    If the auth.token_type option is "signed", a signed token is returned and nothing is stored
+    in the database.
     """
 
     if ttl:
@@ -66,10 +72,16 @@ def create_token(username, ttl=None, metadata=None):
             extra = {'username': username, 'user': user}
             LOG.audit('Registered new user "%s".' % (username), extra=extra)
 
-    token = uuid.uuid4().hex
     expiry = date_utils.get_datetime_utc_now() + datetime.timedelta(seconds=ttl)
-    token = TokenDB(user=username, token=token, expiry=expiry, metadata=metadata)
-    Token.add_or_update(token)
+
+    if cfg.CONF.auth.token_type == 'signed':
+        token = auth_utils.create_signed_token(username=username, expiry=expiry,
+                                               key=_get_token_signing_key(), metadata=metadata)
+        expiry = token.expiry
+    else:
+        token = uuid.uuid4().hex
+        token = TokenDB(user=username, token=token, expiry=expiry, metadata=metadata)
+        Token.add_or_update(token, publish=False)
 
     username_string = username if username else 'an anonymous user'
     token_expire_string = isotime.format(expiry, offset=False)
@@ -82,6 +94,12 @@ def create_token(username, ttl=None, metadata=None):
 
 
 def delete_token(token):
+    """
+    Delete the provided token. Signed tokens are revoked.
+    """
+    if auth_utils.is_signed_token(token):
+        return revoke_token(token)
+
     try:
         token_db = Token.get(token)
         return Token.delete(token_db)
@@ -89,3 +107,37 @@ def delete_token(token):
         pass
     except Exception:
         raise
+
+
+def revoke_token(token):
+    """
+    Revoke the provided signed token. Revocation is stored until the token expires and
+    propagated to the services which validate the tokens over the message bus.
+    """
+    try:
+        token_db = auth_utils.parse_signed_token(token_string=token, key=_get_token_signing_key())
+    except TokenNotFoundError:
+        return
+
+    if token_db.expiry <= date_utils.get_datetime_utc_now():
+        return
+
+    revocation_db = TokenRevocationDB(token_id=str(token_db.id), expiry=token_db.expiry)
+
+    try:
+        TokenRevocation.add_or_update(revocation_db, log_not_unique_error_as_debug=True)
+    except StackStormDBObjectConflictError:
+        # Token has already been revoked
+        pass
+
+    LOG.audit('Token with id "%s" has been revoked.' % (token_db.id))
+
+
+def _get_token_signing_key():
+    key = cfg.CONF.auth.token_signing_key
+
+    if not key:
+        raise ValueError('"token_signing_key" option in the "auth" section needs to be set to '
+                         'use signed tokens.')
+
+    return key
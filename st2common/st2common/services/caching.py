@@ -0,0 +1,282 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Building blocks of the process-local caches which are kept up to date using the CUD events.
+
+:class:`TTLCache` stores the cached values and :class:`CacheWatcher` consumes the events and
+enables the process-wide cache only while it receives them.
+"""
+
+import time
+
+import eventlet
+from kombu import Connection
+from kombu.mixins import ConsumerMixin
+
+from st2common import log as logging
+from st2common.transport import serialization
+from st2common.transport import utils as transport_utils
+from st2common.util.lru import LRUCache
+
+__all__ = [
+    'TTLCache',
+    'CacheWatcher'
+]
+
+LOG = logging.getLogger(__name__)
+
+
+class TTLCache(object):
+    """
+    Cache with a bounded size (least recently used values are evicted) and time to live.
+
+    The TTL only bounds the staleness if an invalidation event is lost.
+    """
+
+    def __init__(self, ttl, max_size):
+        """
+        :param ttl: How long (in seconds) a value is cached.
+        :type ttl: ``int``
+
+        :param max_size: Maximum number of cached values.
+        :type max_size: ``int``
+        """
+        self.ttl = ttl
+
+        self._items = LRUCache(max_size=max_size)
+        self._expirations = 0
+
+        # Incremented on each invalidation so a value which has been retrieved before an
+        # invalidation (but stored after it) isn't cached
+        self._generation = 0
+
+    def get(self, key):
+        """
+        :return: Tuple of (found, value).
+        :rtype: ``tuple``
+        """
+        item = self._items.get(key, None)
+
+        if not item:
+            return False, None
+
+        value, expire_timestamp = item
+
+        if expire_timestamp < time.time():
+            self._items.delete(key)
+            self._expirations += 1
+            return False, None
+
+        return True, value
+
+    def get_generation(self):
+        return self._generation
+
+    def set(self, key, value, generation=None, expire_timestamp=None):
+        """
+        :param generation: Value of get_generation() before the value has been retrieved. Value
+                           is not cached if the cache has been invalidated since.
+        :type generation: ``int``
+
+        :param expire_timestamp: Time (in seconds since epoch) after which the value must not be
+                                 used even if the TTL hasn't passed yet.
+        :type expire_timestamp: ``float``
+        """
+        if generation is not None and generation != self._generation:
+            return
+
+        item_expire_timestamp = time.time() + self.ttl
+
+        if expire_timestamp is not None:
+            item_expire_timestamp = min(item_expire_timestamp, expire_timestamp)
+
+        self._items.set(key, (value, item_expire_timestamp))
+
+    def get_or_load(self, key, load_func):
+        """
+        Return cached value for the provided key. If the value is not cached, it's retrieved
+        using load_func() and stored. Exceptions raised by load_func are not cached.
+        """
+        found, value = self.get(key)
+
+        if found:
+            return value
+
+        generation = self._generation
+        value = load_func()
+        self.set(key, value, generation=generation)
+
+        return value
+
+    def invalidate(self, key=None):
+        """
+        Invalidate cached value with the provided key or all the values if key is not provided.
+        """
+        self._generation += 1
+
+        if key is None:
+            self._items.clear()
+        else:
+            self._items.delete(key)
+
+    def clear(self):
+        self.invalidate()
+
+    def get_stats(self):
+        """
+        :return: Hit / miss counters and size of the cache.
+        :rtype: ``dict``
+        """
+        stats = self._items.get_stats()
+        stats['expirations'] = self._expirations
+        stats['invalidations'] = self._generation
+        return stats
+
+
+class CacheWatcher(ConsumerMixin):
+    """
+    Base class of the watchers which keep a process-wide cache up to date by consuming CUD
+    events.
+
+    Cache is only used while the watcher receives the events. It's enabled (and cleared, since
+    the events published in the meantime are lost) once the watcher queues have been declared
+    and bound and it's disabled while the watcher is disconnected.
+
+    Subclasses provide the queues, the event handlers and set the process-wide cache in
+    _set_cache().
+    """
+
+    # Name of the cache used in the log messages
+    name = 'cache'
+
+    def __init__(self, cache, queues, handlers, refresh_interval=None):
+        """
+        :param cache: Cache to keep up to date.
+        :type cache: :class:`TTLCache`
+
+        :param queues: Queues the events are consumed from.
+        :type queues: ``list`` of :class:`kombu.Queue`
+
+        :param handlers: Map of exchange name -> function which is called with the body of each
+                         event published to the exchange.
+        :type handlers: ``dict``
+
+        :param refresh_interval: How often (in seconds) refresh() is called while the watcher is
+                                 connected. None to only call it when the cache is enabled.
+        :type refresh_interval: ``int``
+        """
+        self._cache = cache
+        self._watch_qs = queues
+        self._handlers = handlers
+        self._refresh_interval = refresh_interval
+        self._last_refresh_timestamp = 0
+
+        self.connection = None
+        self._updates_thread = None
+
+    def get_consumers(self, Consumer, channel):
+        return [Consumer(queues=self._watch_qs, accept=serialization.ACCEPT_CONTENT,
+                         callbacks=[self.process_task])]
+
+    def process_task(self, body, message):
+        exchange = message.delivery_info.get('exchange', '')
+        handler = self._handlers.get(exchange, None)
+
+        try:
+            if handler:
+                handler(body)
+            else:
+                LOG.debug('Skipping message %s as no handler was found.', message)
+        except Exception as e:
+            LOG.exception('Handling failed. Message body: %s. Exception: %s', body, e.message)
+        finally:
+            message.ack()
+
+    def on_connection_error(self, exc, interval):
+        super(CacheWatcher, self).on_connection_error(exc, interval)
+
+        # Events aren't received while the watcher is disconnected
+        self._set_cache(None)
+
+    def on_connection_revived(self):
+        # Events published while the watcher was disconnected are lost, cache is enabled again
+        # once the queues have been declared
+        self._set_cache(None)
+
+    def on_consume_ready(self, connection, channel, consumers, **kwargs):
+        # Queues have been declared and bound so no event published from now on is missed
+        self._cache.clear()
+        self._refresh()
+
+    def on_iteration(self):
+        if (self._refresh_interval is not None and
+                time.time() - self._last_refresh_timestamp >= self._refresh_interval):
+            self._refresh()
+
+    def refresh(self):
+        """
+        Load the data which is not retrieved on demand (if any) into the cache. Called each time
+        the cache is enabled and every refresh_interval seconds.
+        """
+        pass
+
+    def start(self):
+        """
+        Start the watcher. Cache is used once the watcher has connected.
+        """
+        try:
+            self.connection = Connection(transport_utils.get_messaging_urls())
+            self._updates_thread = eventlet.spawn(self.run)
+        except:
+            LOG.exception('Failed to start %s watcher.', self.name)
+
+            if self.connection:
+                self.connection.release()
+
+            raise
+
+    def stop(self):
+        self._set_cache(None)
+        LOG.info('%s stats: %s', self.name.capitalize(), self._cache.get_stats())
+
+        try:
+            if self._updates_thread:
+                self._updates_thread = eventlet.kill(self._updates_thread)
+        finally:
+            if self.connection:
+                self.connection.release()
+
+    def _refresh(self):
+        """
+        Refresh the cache and enable it. If that fails, cache is disabled until the next refresh.
+        """
+        self._last_refresh_timestamp = time.time()
+
+        try:
+            self.refresh()
+        except Exception:
+            LOG.exception('Failed to refresh %s, it\'s not used until the next refresh.',
+                          self.name)
+            self._set_cache(None)
+            return
+
+        self._set_cache(self._cache)
+
+    def _set_cache(self, cache):
+        """
+        Set the process-wide cache (None if the cache must not be used).
+        """
+        raise NotImplementedError('_set_cache() is not implemented')
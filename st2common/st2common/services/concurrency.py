@@ -0,0 +1,262 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Concurrency slots used by the concurrency policies.
+
+Slots of each policy (and for the policies applied by attribute, each combination of the
+attribute values) are tracked in a single document which holds the ids of the live actions
+which hold a slot and a FIFO queue of the delayed live actions. Slots are acquired and released
+using atomic updates of that document so the scheduling decision doesn't depend on the number of
+the live actions in the database.
+
+Slot documents are reconciled with the live actions when they are created and periodically after
+that (see reconcile_slots) so the slots held by the live actions which were never released (e.g.
+because a service died) are freed eventually.
+
+Note: Callers are expected to hold the coordination lock returned by get_lock_uid while they
+operate on the slots.
+"""
+
+import json
+
+import six
+
+from st2common import log as logging
+from st2common.constants import action as action_constants
+from st2common.exceptions.db import StackStormDBObjectConflictError
+from st2common.models.db.policy import ConcurrencySlotDB
+from st2common.persistence.liveaction import LiveAction
+from st2common.persistence.policy import ConcurrencySlot
+from st2common.services import coordination
+
+__all__ = [
+    'SLOT_HOLDER_STATES',
+
+    'get_slot_key',
+    'get_lock_uid',
+    'ensure_slots',
+    'acquire_slot',
+    'release_slot',
+    'delay',
+    'acquire_slot_for_delayed',
+    'reconcile_slots'
+]
+
+LOG = logging.getLogger(__name__)
+
+# Live actions in these states hold a slot
+SLOT_HOLDER_STATES = [
+    action_constants.LIVEACTION_STATUS_SCHEDULED,
+    action_constants.LIVEACTION_STATUS_RUNNING
+]
+
+
+def get_slot_key(policy_ref, action_ref, attributes=None):
+    """
+    Return key of the slots for the provided policy, action and attribute values.
+
+    :param attributes: Values of the action parameters the policy is applied to.
+    :type attributes: ``dict``
+
+    :rtype: ``str``
+    """
+    key = {
+        'policy': policy_ref,
+        'action': action_ref,
+        'attributes': attributes or {}
+    }
+
+    return json.dumps(key, sort_keys=True)
+
+
+def get_lock_uid(slot_key):
+    return 'concurrency-slots:%s' % (slot_key)
+
+
+def ensure_slots(slot_key, policy_ref, action_ref, attributes=None):
+    """
+    Make sure the slots document exists. New document is reconciled with the live actions so
+    the live actions which were scheduled before the slots were tracked are accounted for.
+    """
+    if _get_collection().find_one({'key': slot_key}, fields={'_id': 1}):
+        return
+
+    slots_db = ConcurrencySlotDB(key=slot_key, policy=policy_ref, action=action_ref,
+                                 attributes=attributes or {})
+    slots_db.holders, slots_db.delayed = _get_slot_holders_and_delayed(slots_db)
+
+    try:
+        ConcurrencySlot.insert(slots_db, publish=False, dispatch_trigger=False,
+                               log_not_unique_error_as_debug=True)
+    except StackStormDBObjectConflictError:
+        # Slots have already been created by another process
+        pass
+
+
+def acquire_slot(slot_key, liveaction_id, threshold):
+    """
+    Acquire a slot for the provided live action. Acquiring a slot which is already held by the
+    live action succeeds.
+
+    :return: True if the slot has been acquired, False if all the slots are taken.
+    :rtype: ``bool``
+    """
+    if threshold <= 0:
+        return False
+
+    query = {
+        'key': slot_key,
+        '$or': [
+            {'holders': liveaction_id},
+            {'holders.%s' % (threshold - 1): {'$exists': False}}
+        ]
+    }
+    update = {
+        '$addToSet': {'holders': liveaction_id},
+        '$pull': {'delayed': liveaction_id}
+    }
+
+    result = _get_collection().update(query, update)
+    return bool(result and result.get('n', 0))
+
+
+def release_slot(slot_key, liveaction_id):
+    """
+    Release slot held by the provided live action and remove it from the delayed queue.
+    Releasing a slot which isn't held by the live action is a no-op.
+    """
+    update = {
+        '$pull': {'holders': liveaction_id, 'delayed': liveaction_id}
+    }
+
+    _get_collection().update({'key': slot_key}, update)
+
+
+def delay(slot_key, liveaction_id):
+    """
+    Add the provided live action to the end of the delayed queue. Live action which is already
+    queued keeps its position.
+    """
+    _get_collection().update({'key': slot_key}, {'$addToSet': {'delayed': liveaction_id}})
+
+
+def acquire_slot_for_delayed(slot_key, threshold):
+    """
+    If a slot is available, remove the oldest live action from the delayed queue and acquire the
+    slot for it.
+
+    :return: Id of the live action the slot has been acquired for or None.
+    :rtype: ``str``
+    """
+    if threshold <= 0:
+        return None
+
+    query = {
+        'key': slot_key,
+        'delayed.0': {'$exists': True},
+        'holders.%s' % (threshold - 1): {'$exists': False}
+    }
+
+    # Document is returned as it was before the update so it includes the removed id
+    doc = _get_collection().find_and_modify(query=query, update={'$pop': {'delayed': -1}},
+                                            fields={'delayed': {'$slice': 1}})
+
+    if not doc or not doc.get('delayed', None):
+        return None
+
+    liveaction_id = doc['delayed'][0]
+    _get_collection().update({'key': slot_key}, {'$addToSet': {'holders': liveaction_id}})
+
+    return liveaction_id
+
+
+def reconcile_slots():
+    """
+    Reconcile all the slot documents with the live actions. Slots without any holders and delayed
+    live actions are removed.
+
+    :return: Number of reconciled slot documents.
+    :rtype: ``int``
+    """
+    coordinator = coordination.get_coordinator()
+    count = 0
+
+    for slot_key in _get_collection().distinct('key'):
+        try:
+            with coordinator.get_lock(get_lock_uid(slot_key)):
+                _reconcile_slot(slot_key)
+        except Exception:
+            LOG.exception('Failed to reconcile concurrency slots "%s".', slot_key)
+            continue
+
+        count += 1
+
+    return count
+
+
+def _reconcile_slot(slot_key):
+    slots_db = ConcurrencySlot.query(key=slot_key).first()
+
+    if not slots_db:
+        return
+
+    holders, delayed = _get_slot_holders_and_delayed(slots_db)
+
+    if not holders and not delayed:
+        LOG.debug('Removing unused concurrency slots "%s".', slot_key)
+        _get_collection().remove({'key': slot_key})
+        return
+
+    if set(holders) != set(slots_db.holders or []):
+        LOG.info('Concurrency slots "%s" are out of sync (holders=%s, expected=%s).', slot_key,
+                 slots_db.holders, holders)
+
+    _get_collection().update({'key': slot_key},
+                             {'$set': {'holders': holders, 'delayed': delayed}})
+
+
+def _get_slot_holders_and_delayed(slots_db):
+    """
+    Retrieve ids of the live actions which hold a slot and of the delayed live actions (oldest
+    first) from the database.
+
+    Requested live actions which have been handed a slot of a completed live action keep it.
+    """
+    filters = {('parameters__%s' % (name)): value
+               for name, value in six.iteritems(slots_db.attributes or {})}
+    filters['action'] = slots_db.action
+
+    current_holders = set(slots_db.holders or [])
+    holders = []
+
+    statuses = SLOT_HOLDER_STATES + [action_constants.LIVEACTION_STATUS_REQUESTED]
+    liveactions = LiveAction.query(status__in=statuses, **filters).only('id', 'status')
+
+    for liveaction_db in liveactions:
+        liveaction_id = str(liveaction_db.id)
+
+        if liveaction_db.status in SLOT_HOLDER_STATES or liveaction_id in current_holders:
+            holders.append(liveaction_id)
+
+    liveactions = LiveAction.query(status=action_constants.LIVEACTION_STATUS_DELAYED,
+                                   order_by=['start_timestamp'], **filters).only('id')
+    delayed = [str(liveaction_db.id) for liveaction_db in liveactions]
+
+    return holders, delayed
+
+
+def _get_collection():
+    return ConcurrencySlotDB._get_collection()
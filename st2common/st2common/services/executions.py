@@ -29,18 +29,23 @@
 # limitations under the License.
 
 import six
+from oslo_config import cfg
 
 from st2common.util import reference
 import st2common.util.action_db as action_utils
 from st2common.constants.action import LIVEACTION_STATUS_CANCELED
 from st2common.persistence.execution import ActionExecution
+from st2common.persistence.execution import ActionExecutionOutput
 from st2common.persistence.runner import RunnerType
 from st2common.persistence.rule import Rule
 from st2common.persistence.trigger import TriggerType, Trigger, TriggerInstance
+from st2common.services import snapshots as snapshot_service
 from st2common.models.api.action import RunnerTypeAPI, ActionAPI, LiveActionAPI
 from st2common.models.api.rule import RuleAPI
 from st2common.models.api.trigger import TriggerTypeAPI, TriggerAPI, TriggerInstanceAPI
 from st2common.models.db.execution import ActionExecutionDB
+from st2common.models.db.execution import ActionExecutionOutputDB
+from st2common.util.output_capture import OutputCapture
 from st2common import log as logging
 
 __all__ = [
@@ -49,7 +54,11 @@ __all__ = [
     'is_execution_canceled',
     'AscendingSortedDescendantView',
     'DFSDescendantView',
-    'get_descendants'
+    'get_descendants',
+
+    'store_execution_output_data',
+    'get_execution_output_capture',
+    'get_truncated_output_info'
 ]
 
 LOG = logging.getLogger(__name__)
@@ -93,8 +102,6 @@ def create_execution_object(liveaction, publish=True):
                                                       ref=trigger_instance.trigger)
         trigger_type = reference.get_model_by_resource_ref(db_api=TriggerType,
                                                            ref=trigger.type)
-        trigger_instance = reference.get_model_from_ref(
-            TriggerInstance, liveaction.context.get('trigger_instance', {}))
         attrs['trigger_instance'] = vars(TriggerInstanceAPI.from_model(trigger_instance))
         attrs['trigger'] = vars(TriggerAPI.from_model(trigger))
         attrs['trigger_type'] = vars(TriggerTypeAPI.from_model(trigger_type))
@@ -103,6 +110,10 @@ def create_execution_object(liveaction, publish=True):
     if parent:
         attrs['parent'] = str(parent.id)
 
+    if cfg.CONF.execution.store_snapshots_by_reference:
+        # Resources are shared between executions, only references to their snapshots are stored
+        attrs = snapshot_service.get_snapshot_references(attrs)
+
     execution = ActionExecutionDB(**attrs)
     execution = ActionExecution.add_or_update(execution, publish=publish)
 
@@ -136,6 +147,61 @@ def update_execution(liveaction_db, publish=True):
     return execution
 
 
+def store_execution_output_data(execution_id, output_type, data):
+    """
+    Store a chunk of the action execution output.
+
+    :rtype: :class:`ActionExecutionOutputDB`
+    """
+    output_db = ActionExecutionOutputDB(execution_id=execution_id, output_type=output_type,
+                                        data=data)
+    return ActionExecutionOutput.add_or_update(output_db, publish=False)
+
+
+def get_execution_output_capture(execution_id, output_type):
+    """
+    Return a capture for the output of the provided execution which is configured using the
+    action_output config options.
+
+    If execution_id is provided and streaming is enabled, output is stored in chunks as it is
+    produced.
+
+    :rtype: :class:`st2common.util.output_capture.OutputCapture`
+    """
+    chunk_handler = None
+
+    if execution_id and cfg.CONF.action_output.stream:
+        def chunk_handler(output_type, data):
+            store_execution_output_data(execution_id=execution_id, output_type=output_type,
+                                        data=data)
+
+    return OutputCapture(output_type=output_type,
+                         max_memory_size=cfg.CONF.action_output.max_memory_size,
+                         max_result_size=cfg.CONF.action_output.max_result_size,
+                         chunk_handler=chunk_handler)
+
+
+def get_truncated_output_info(execution_id, captures):
+    """
+    Return attributes which are added to the execution result if any of the provided output
+    captures has been truncated.
+
+    :rtype: ``dict``
+    """
+    truncated = [capture.output_type for capture in captures if capture.truncated]
+
+    if not truncated:
+        return {}
+
+    result = {'output_truncated': truncated}
+
+    if execution_id and cfg.CONF.action_output.stream:
+        # Whole output can be retrieved using the API
+        result['output_ref'] = '/v1/executions/%s/output' % (execution_id)
+
+    return result
+
+
 def is_execution_canceled(execution_id):
     try:
         execution = ActionExecution.get_by_id(execution_id)
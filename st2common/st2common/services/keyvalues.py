@@ -13,7 +13,42 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import calendar
+import json
+import uuid
+
+import six
+from jinja2 import nodes
+from oslo_config import cfg
+
+from st2common import log as logging
+from st2common.constants.system import SYSTEM_KV_PREFIX
 from st2common.persistence.keyvalue import KeyValuePair
+from st2common.services.caching import CacheWatcher
+from st2common.services.caching import TTLCache
+from st2common.transport import keyvalue as keyvalue_transport
+from st2common.util import date as date_utils
+from st2common.util import jinja as jinja_utils
+from st2common.util.lru import LRUCache
+
+__all__ = [
+    'KeyValueLookup',
+    'KeyValueCache',
+    'KeyValueCacheWatcher',
+
+    'get_key_value_cache',
+    'get_key_value_cache_watcher',
+    'get_key_values',
+    'get_referenced_keys'
+]
+
+LOG = logging.getLogger(__name__)
+
+# Maps template source -> set of datastore keys referenced by the template
+_REFERENCED_KEYS_CACHE = LRUCache(max_size=jinja_utils.TEMPLATE_CACHE_SIZE)
+
+# Process-wide datastore value cache (set once the cache watcher has been started)
+_KEY_VALUE_CACHE = None
 
 
 class KeyValueLookup(object):
@@ -33,11 +68,32 @@ class KeyValueLookup(object):
     def __getattr__(self, name):
         return self._get(name)
 
+    def prefetch(self, templates):
+        """
+        Retrieve values of all the datastore keys referenced by the provided templates using a
+        single query. Subsequent lookups of those keys are served from the lookup cache.
+
+        :param templates: Template strings (or dicts and lists which are rendered as JSON) which
+                          will be rendered with this lookup.
+        :type templates: ``list``
+        """
+        keys = set()
+        for template in templates:
+            if isinstance(template, (dict, list)):
+                template = json.dumps(template)
+
+            keys.update(get_referenced_keys(template))
+
+        keys = [key for key in keys if key not in self._value_cache]
+        self._value_cache.update(get_key_values(keys))
+
     def _get(self, name):
         # get the value for this key and save in value_cache
         key = '%s.%s' % (self._key_prefix, name) if self._key_prefix else name
-        value = self._get_kv(key)
-        self._value_cache[key] = value
+
+        if key not in self._value_cache:
+            self._value_cache[key] = self._get_kv(key)
+
         # return a KeyValueLookup as response since the lookup may not be complete e.g. if
         # the lookup is for 'key_base.key_value' it is likely that the calling code, e.g. Jinja,
         # will expect to do a dictionary style lookup for key_base and key_value as subsequent
@@ -45,12 +101,192 @@ class KeyValueLookup(object):
         return KeyValueLookup(key, self._value_cache)
 
     def _get_kv(self, key):
-        kvp = None
+        return get_key_values([key])[key]
+
+
+class KeyValueCache(TTLCache):
+    """
+    Process-wide cache of datastore values with a bounded size and time to live.
+
+    Entries are also invalidated by the key value pair CUD events (see
+    :class:`KeyValueCacheWatcher`) so the TTL only bounds the staleness if an event is lost. Key
+    value pairs which expire are deleted by the database without an event, so an entry never
+    outlives the key value pair.
+    """
+    pass
+
+
+class KeyValueCacheWatcher(CacheWatcher):
+    """
+    Invalidates :class:`KeyValueCache` entries by consuming key value pair CUD events.
+    """
+
+    name = 'key value cache'
+
+    def __init__(self, cache):
+        """
+        :param cache: Cache to invalidate.
+        :type cache: :class:`KeyValueCache`
+        """
+        queues = [keyvalue_transport.get_key_value_pair_cud_queue(
+            'st2.key_value_pair.cache.%s' % (uuid.uuid4().hex[-10:]), routing_key='#',
+            exclusive=True, auto_delete=True)]
+        handlers = {
+            keyvalue_transport.KEY_VALUE_PAIR_CUD_XCHG.name: self._handle_key_value_pair
+        }
+
+        super(KeyValueCacheWatcher, self).__init__(cache=cache, queues=queues,
+                                                   handlers=handlers)
+
+    def _handle_key_value_pair(self, body):
+        self._cache.invalidate(body.name)
+
+    def _set_cache(self, cache):
+        _set_key_value_cache(cache)
+
+
+def get_key_value_cache():
+    """
+    Return process-wide datastore value cache or None if the cache is not used in this process.
+
+    Cache is only used while the cache watcher runs in the process (otherwise the cached values
+    wouldn't be invalidated when they change).
+
+    :rtype: :class:`KeyValueCache`
+    """
+    return _KEY_VALUE_CACHE
+
+
+def get_key_value_cache_watcher():
+    """
+    Return a watcher which enables the process-wide datastore value cache once it's started and
+    keeps it up to date or None if caching is disabled.
+
+    :rtype: :class:`KeyValueCacheWatcher`
+    """
+    if cfg.CONF.keyvalue.cache_ttl <= 0:
+        return None
+
+    cache = KeyValueCache(ttl=cfg.CONF.keyvalue.cache_ttl, max_size=cfg.CONF.keyvalue.cache_size)
+    return KeyValueCacheWatcher(cache=cache)
+
+
+def get_key_values(keys):
+    """
+    Retrieve values for the provided datastore keys. Keys which are not cached are retrieved
+    using a single query.
+
+    A good default value for un-matched key is empty string since that will be used for
+    rendering templates.
+
+    :param keys: Names of the key value pairs.
+    :type keys: ``list``
+
+    :return: Map of key -> value.
+    :rtype: ``dict``
+    """
+    cache = get_key_value_cache()
+    values = {}
+    missing_keys = []
+
+    for key in keys:
+        found, value = cache.get(key) if cache else (False, None)
+
+        if found:
+            values[key] = value
+        else:
+            missing_keys.append(key)
+
+    if not missing_keys:
+        return values
+
+    generation = cache.get_generation() if cache else None
+
+    if len(missing_keys) == 1:
+        kvps = KeyValuePair.query(name=missing_keys[0])
+    else:
+        kvps = KeyValuePair.query(name__in=missing_keys)
+
+    kvps = dict([(kvp.name, kvp) for kvp in kvps])
+
+    for key in missing_keys:
+        kvp = kvps.get(key, None)
+        values[key] = kvp.value if kvp else ''
+
+        if cache:
+            cache.set(key, values[key], generation=generation,
+                      expire_timestamp=_get_expire_timestamp(kvp))
+
+    return values
+
+
+def _get_expire_timestamp(kvp):
+    """
+    Return time (in seconds since epoch) when the provided key value pair expires or None.
+    """
+    if not kvp or not kvp.expire_timestamp:
+        return None
+
+    return calendar.timegm(date_utils.convert_to_utc(kvp.expire_timestamp).utctimetuple())
+
+
+def get_referenced_keys(template):
+    """
+    Return names of all the datastore keys a template can look up. For a reference such as
+    ``{{system.a.b.c}}`` this includes the partial lookups ("a", "a.b" and "a.b.c").
+
+    :param template: Template string.
+    :type template: ``str``
+
+    :rtype: ``set``
+    """
+    if not isinstance(template, six.string_types) or SYSTEM_KV_PREFIX not in template:
+        return set()
+
+    keys = _REFERENCED_KEYS_CACHE.get(template, None)
+
+    if keys is None:
         try:
-            kvp = KeyValuePair.get_by_name(key)
-        except ValueError:
-            # ValueErrors are expected in case of partial lookups
-            pass
-        # A good default value for un-matched value is empty string since that will be used
-        # for rendering templates.
-        return kvp.value if kvp else ''
+            template_ast = jinja_utils.get_shared_jinja_environment().parse(template)
+        except Exception:
+            # Invalid template, rendering will report the error
+            keys = set()
+        else:
+            keys = set()
+            for node in template_ast.find_all((nodes.Getattr, nodes.Getitem)):
+                key = _get_node_key(node)
+
+                if key:
+                    keys.add(key)
+
+        _REFERENCED_KEYS_CACHE.set(template, keys)
+
+    return keys
+
+
+def _get_node_key(node):
+    """
+    Return datastore key for the provided attribute / item lookup node or None if the lookup is
+    not a constant lookup on the system context.
+    """
+    names = []
+
+    while isinstance(node, (nodes.Getattr, nodes.Getitem)):
+        if isinstance(node, nodes.Getattr):
+            names.append(node.attr)
+        elif isinstance(node.arg, nodes.Const) and isinstance(node.arg.value, six.string_types):
+            names.append(node.arg.value)
+        else:
+            return None
+
+        node = node.node
+
+    if not isinstance(node, nodes.Name) or node.name != SYSTEM_KV_PREFIX:
+        return None
+
+    return '.'.join(reversed(names))
+
+
+def _set_key_value_cache(cache):
+    global _KEY_VALUE_CACHE
+    _KEY_VALUE_CACHE = cache
@@ -0,0 +1,165 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Watcher which lets green threads wait for a live action to complete using the live action status
+notifications instead of polling the database.
+"""
+
+import uuid
+
+import eventlet
+from eventlet import queue
+from kombu import Connection
+from kombu.mixins import ConsumerMixin
+
+from st2common import log as logging
+from st2common.constants.action import COMPLETED_STATES
+from st2common.transport import liveaction as liveaction_transport
+from st2common.transport import serialization
+from st2common.transport import utils as transport_utils
+from st2common.util import action_db as action_utils
+
+__all__ = [
+    'LiveActionStatusWatcher',
+
+    'get_liveaction_status_watcher'
+]
+
+LOG = logging.getLogger(__name__)
+
+# Process-wide watcher (created on first use)
+_LIVEACTION_STATUS_WATCHER = None
+
+
+class LiveActionStatusWatcher(ConsumerMixin):
+    """
+    Consumes live action status notifications and passes them to the green threads which are
+    waiting for the corresponding live action.
+
+    Only notifications of the completed states are consumed, so the waiters are only woken up by
+    the notifications when waiting for those states (other states are picked up by polling).
+    """
+
+    def __init__(self):
+        self._watch_q = liveaction_transport.get_statuses_management_queue(
+            'st2.liveaction.status.watch.%s' % (uuid.uuid4().hex[-10:]),
+            statuses=COMPLETED_STATES, exclusive=True, auto_delete=True)
+
+        # Maps live action id -> list of queues of the green threads waiting for the live action
+        self._waiters = {}
+
+        self.connection = None
+        self._updates_thread = None
+
+    @property
+    def running(self):
+        return self._updates_thread is not None
+
+    def get_consumers(self, Consumer, channel):
+        return [Consumer(queues=[self._watch_q], accept=serialization.ACCEPT_CONTENT,
+                         callbacks=[self.process_task])]
+
+    def process_task(self, body, message):
+        try:
+            for waiter in self._waiters.get(str(body.id), []):
+                waiter.put(body.status)
+        except Exception as e:
+            LOG.exception('Handling failed. Message body: %s. Exception: %s', body, e.message)
+        finally:
+            message.ack()
+
+    def start(self):
+        try:
+            self.connection = Connection(transport_utils.get_messaging_urls())
+            self._updates_thread = eventlet.spawn(self.run)
+        except:
+            LOG.exception('Failed to start live action status watcher.')
+            self._updates_thread = None
+            self.connection.release()
+            raise
+
+    def stop(self):
+        try:
+            if self._updates_thread:
+                self._updates_thread = eventlet.kill(self._updates_thread)
+        finally:
+            if self.connection:
+                self.connection.release()
+
+    def wait_for_status(self, liveaction_id, statuses, poll_interval):
+        """
+        Wait until the live action reaches one of the provided statuses.
+
+        Live action is re-read from the database when a notification with one of the provided
+        statuses is received or when no notification has been received for poll_interval
+        seconds (in case a notification is lost).
+
+        :param liveaction_id: Live action id.
+        :type liveaction_id: ``str``
+
+        :param statuses: Statuses to wait for (notifications are only received for the completed
+                         states).
+        :type statuses: ``list``
+
+        :param poll_interval: Maximum number of seconds between database reads.
+        :type poll_interval: ``int``
+
+        :rtype: :class:`LiveActionDB`
+        """
+        liveaction_id = str(liveaction_id)
+        waiter = queue.LightQueue()
+        self._waiters.setdefault(liveaction_id, []).append(waiter)
+
+        try:
+            while True:
+                # Note: Live action is read after the waiter has been registered so a status
+                # change which happens in between isn't missed
+                liveaction_db = action_utils.get_liveaction_by_id(liveaction_id)
+
+                if liveaction_db.status in statuses:
+                    return liveaction_db
+
+                self._wait_for_notification(waiter=waiter, statuses=statuses,
+                                            timeout=poll_interval)
+        finally:
+            waiters = self._waiters.get(liveaction_id, [])
+            waiters.remove(waiter)
+
+            if not waiters:
+                self._waiters.pop(liveaction_id, None)
+
+    @staticmethod
+    def _wait_for_notification(waiter, statuses, timeout):
+        try:
+            while waiter.get(timeout=timeout) not in statuses:
+                pass
+        except queue.Empty:
+            pass
+
+
+def get_liveaction_status_watcher():
+    """
+    Return process-wide live action status watcher. Watcher needs to be started by the service
+    before it's used.
+
+    :rtype: :class:`LiveActionStatusWatcher`
+    """
+    global _LIVEACTION_STATUS_WATCHER
+
+    if not _LIVEACTION_STATUS_WATCHER:
+        _LIVEACTION_STATUS_WATCHER = LiveActionStatusWatcher()
+
+    return _LIVEACTION_STATUS_WATCHER
@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from st2common import log as logging
 from st2common.rbac.types import PermissionType
 from st2common.rbac.types import ResourceType
 from st2common.rbac.types import SystemRole
@@ -43,6 +44,8 @@ __all__ = [
     'remove_permission_grant_for_resource_db'
 ]
 
+LOG = logging.getLogger(__name__)
+
 
 def get_all_roles(exclude_system=False):
     """
@@ -237,6 +240,7 @@ def create_permission_grant(role_db, resource_uid, resource_type, permission_typ
 
     # Add assignment to the role
     role_db.update(push__permission_grants=permission_grant_db.id)
+    _publish_role_update(role_db=role_db)
 
     return permission_grant_db
 
@@ -261,10 +265,24 @@ def remove_permission_grant_for_resource_db(role_db, resource_db, permission_typ
 
     # Remove assignment from a role
     role_db.update(pull__permission_grants=permission_grant_db.id)
+    _publish_role_update(role_db=role_db)
 
     return permission_grant_db
 
 
+def _publish_role_update(role_db):
+    """
+    Publish role update event so the cached permission indexes are invalidated.
+
+    Note: Permission grants are added to and removed from a role using an atomic update which
+    doesn't publish an event.
+    """
+    try:
+        Role.publish_update(role_db)
+    except Exception:
+        LOG.exception('Publish failed.')
+
+
 def _validate_resource_type(resource_db):
     """
     Validate that the permissions can be manipulated for the provided resource type.
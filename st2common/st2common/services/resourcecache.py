@@ -0,0 +1,207 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Process-local cache of the rarely changing content models (actions, runner types and policies)
+which are looked up many times during each execution.
+
+Cache is only used in the service processes which run :class:`ResourceCacheWatcher` (while the
+watcher is connected to the message bus). The watcher invalidates cached entries on the CUD events
+which are published when those models change. Entries also expire after a TTL in case an event
+is lost.
+
+Note: Cached objects are shared by all the callers in the process and must not be modified.
+"""
+
+import uuid
+
+import six
+from oslo_config import cfg
+
+from st2common.services.caching import CacheWatcher
+from st2common.services.caching import TTLCache
+from st2common.transport import action as action_transport
+from st2common.transport import policy as policy_transport
+
+__all__ = [
+    'RESOURCE_TYPE_ACTION',
+    'RESOURCE_TYPE_RUNNER_TYPE',
+    'RESOURCE_TYPE_POLICY',
+
+    'ResourceCache',
+    'ResourceCacheWatcher',
+
+    'get_resource_cache',
+    'get_resource_cache_watcher',
+    'get_resource_cache_stats'
+]
+
+# Actions keyed by ref
+RESOURCE_TYPE_ACTION = 'action'
+
+# Runner types keyed by name
+RESOURCE_TYPE_RUNNER_TYPE = 'runner_type'
+
+# Lists of policies keyed by the ref of the resource they apply to
+RESOURCE_TYPE_POLICY = 'policy'
+
+RESOURCE_TYPES = [RESOURCE_TYPE_ACTION, RESOURCE_TYPE_RUNNER_TYPE, RESOURCE_TYPE_POLICY]
+
+# Cache which is used by the lookups (set once the watcher has been started)
+_RESOURCE_CACHE = None
+
+
+class ResourceCache(object):
+    """
+    Cache of objects of multiple resource types with a bounded size and time to live.
+    """
+
+    def __init__(self, ttl, max_size):
+        """
+        :param ttl: How long (in seconds) an object is cached.
+        :type ttl: ``int``
+
+        :param max_size: Maximum number of cached objects of each resource type.
+        :type max_size: ``int``
+        """
+        self.ttl = ttl
+        self._items = dict([(resource_type, TTLCache(ttl=ttl, max_size=max_size))
+                            for resource_type in RESOURCE_TYPES])
+
+    def get(self, resource_type, key):
+        """
+        :return: Tuple of (found, value).
+        :rtype: ``tuple``
+        """
+        return self._items[resource_type].get(key)
+
+    def set(self, resource_type, key, value):
+        self._items[resource_type].set(key, value)
+
+    def get_or_load(self, resource_type, key, load_func):
+        """
+        Return cached object for the provided key. If the object is not cached, it's retrieved
+        using load_func() and stored. Exceptions raised by load_func are not cached.
+        """
+        return self._items[resource_type].get_or_load(key, load_func)
+
+    def invalidate(self, resource_type, key=None):
+        """
+        Invalidate cached object with the provided key or all the objects of the provided
+        resource type if key is not provided.
+        """
+        self._items[resource_type].invalidate(key)
+
+    def clear(self):
+        for resource_type in RESOURCE_TYPES:
+            self.invalidate(resource_type)
+
+    def get_stats(self):
+        """
+        :return: Hit / miss counters and size for each resource type.
+        :rtype: ``dict``
+        """
+        return dict([(resource_type, items.get_stats())
+                     for resource_type, items in six.iteritems(self._items)])
+
+
+class ResourceCacheWatcher(CacheWatcher):
+    """
+    Invalidates :class:`ResourceCache` entries by consuming action, runner type and policy CUD
+    events.
+    """
+
+    name = 'resource cache'
+
+    def __init__(self, cache):
+        """
+        :param cache: Cache to invalidate.
+        :type cache: :class:`ResourceCache`
+        """
+        queue_suffix = uuid.uuid4().hex[-10:]
+        queues = [
+            action_transport.get_action_cud_queue(
+                'st2.action.cache.%s' % (queue_suffix), routing_key='#', exclusive=True,
+                auto_delete=True),
+            action_transport.get_runner_type_cud_queue(
+                'st2.runner_type.cache.%s' % (queue_suffix), routing_key='#', exclusive=True,
+                auto_delete=True),
+            policy_transport.get_policy_cud_queue(
+                'st2.policy.cache.%s' % (queue_suffix), routing_key='#', exclusive=True,
+                auto_delete=True)
+        ]
+
+        handlers = {
+            action_transport.ACTION_CUD_XCHG.name: self._handle_action,
+            action_transport.RUNNER_TYPE_CUD_XCHG.name: self._handle_runner_type,
+            policy_transport.POLICY_CUD_XCHG.name: self._handle_policy
+        }
+
+        super(ResourceCacheWatcher, self).__init__(cache=cache, queues=queues,
+                                                   handlers=handlers)
+
+    def _handle_action(self, body):
+        self._cache.invalidate(RESOURCE_TYPE_ACTION, body.ref)
+
+    def _handle_runner_type(self, body):
+        self._cache.invalidate(RESOURCE_TYPE_RUNNER_TYPE, body.name)
+
+    def _handle_policy(self, body):
+        # Policies are cached by the resource they apply to which can change when a policy is
+        # updated so all the cached policies are invalidated
+        self._cache.invalidate(RESOURCE_TYPE_POLICY)
+
+    def _set_cache(self, cache):
+        _set_resource_cache(cache)
+
+
+def get_resource_cache():
+    """
+    Return process-wide resource cache or None if the cache is not used in this process.
+
+    :rtype: :class:`ResourceCache`
+    """
+    return _RESOURCE_CACHE
+
+
+def get_resource_cache_watcher():
+    """
+    Return a watcher which enables the process-wide resource cache once it's started and keeps
+    it up to date or None if caching is disabled.
+
+    :rtype: :class:`ResourceCacheWatcher`
+    """
+    if not cfg.CONF.resource_cache.enable:
+        return None
+
+    cache = ResourceCache(ttl=cfg.CONF.resource_cache.ttl,
+                          max_size=cfg.CONF.resource_cache.size)
+    return ResourceCacheWatcher(cache=cache)
+
+
+def get_resource_cache_stats():
+    """
+    Return statistics of the process-wide resource cache or None if the cache is not used in
+    this process.
+
+    :rtype: ``dict``
+    """
+    cache = get_resource_cache()
+    return cache.get_stats() if cache else None
+
+
+def _set_resource_cache(cache):
+    global _RESOURCE_CACHE
+    _RESOURCE_CACHE = cache
@@ -0,0 +1,211 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Content addressed snapshots of the resources (action, runner, rule, trigger, trigger type)
+referenced by action executions.
+
+If the execution.store_snapshots_by_reference option is enabled, executions store a small
+reference dict for each of those resources instead of a full copy. Reference contains the hash of
+the snapshot and the attributes which are used to filter executions, check permissions and mask
+secrets (so those work without the snapshot). Snapshots are immutable so they are cached in the
+service process without any invalidation.
+"""
+
+import copy
+import hashlib
+import json
+
+import six
+from oslo_config import cfg
+
+from st2common import log as logging
+from st2common.exceptions.db import StackStormDBObjectConflictError
+from st2common.models.db.execution import ExecutionResourceSnapshotDB
+from st2common.persistence.execution import ExecutionResourceSnapshot
+from st2common.util.lru import LRUCache
+from st2common.util.secrets import get_secret_parameters
+
+__all__ = [
+    'SNAPSHOT_ATTRIBUTES',
+    'SNAPSHOT_HASH_KEY',
+
+    'get_snapshot_reference',
+    'get_snapshot_references',
+    'is_snapshot_reference',
+    'hydrate_execution_doc'
+]
+
+LOG = logging.getLogger(__name__)
+
+# Execution attributes which can be stored as snapshot references
+SNAPSHOT_ATTRIBUTES = ['action', 'runner', 'rule', 'trigger', 'trigger_type']
+
+# Key of the snapshot hash in the reference dict
+SNAPSHOT_HASH_KEY = 'snapshot'
+
+# Resource attributes which are copied to the reference
+REFERENCE_ATTRIBUTES = ['id', 'uid', 'ref', 'name', 'pack']
+
+# Resource attributes which hold the parameters schema. Only the secret parameters are copied to
+# the reference so the execution parameters can be masked without the snapshot.
+PARAMETERS_ATTRIBUTES = ['parameters', 'runner_parameters']
+
+# Maps snapshot hash -> snapshot data
+_SNAPSHOT_CACHE = None
+
+
+def get_snapshot_reference(resource_type, data):
+    """
+    Store snapshot of the provided resource (unless it already exists) and return a reference
+    to it.
+
+    :param resource_type: Execution attribute the resource is stored in (e.g. action, runner).
+    :type resource_type: ``str``
+
+    :param data: Serialized resource (API model dict).
+    :type data: ``dict``
+
+    :rtype: ``dict``
+    """
+    snapshot_hash = _get_snapshot_hash(resource_type=resource_type, data=data)
+    cache = _get_snapshot_cache()
+
+    if snapshot_hash not in cache:
+        snapshot_db = ExecutionResourceSnapshotDB(hash=snapshot_hash, resource_type=resource_type,
+                                                  data=data)
+
+        try:
+            ExecutionResourceSnapshot.insert(snapshot_db, publish=False, dispatch_trigger=False,
+                                             log_not_unique_error_as_debug=True)
+        except StackStormDBObjectConflictError:
+            # Snapshot has already been stored (e.g. by another process)
+            pass
+
+        cache.set(snapshot_hash, data)
+
+    reference = {SNAPSHOT_HASH_KEY: snapshot_hash}
+
+    for attribute in REFERENCE_ATTRIBUTES:
+        if data.get(attribute, None) is not None:
+            reference[attribute] = data[attribute]
+
+    for attribute in PARAMETERS_ATTRIBUTES:
+        parameters = data.get(attribute, None) or {}
+        secret_parameters = get_secret_parameters(parameters=parameters)
+
+        if secret_parameters:
+            reference[attribute] = dict([(name, {'secret': True}) for name in secret_parameters])
+
+    return reference
+
+
+def get_snapshot_references(attrs):
+    """
+    Replace resources in the provided execution attributes with snapshot references.
+
+    :param attrs: Execution attributes.
+    :type attrs: ``dict``
+
+    :rtype: ``dict``
+    """
+    result = dict(attrs)
+
+    for attribute in SNAPSHOT_ATTRIBUTES:
+        value = attrs.get(attribute, None)
+
+        if value and not is_snapshot_reference(value):
+            result[attribute] = get_snapshot_reference(resource_type=attribute, data=value)
+
+    return result
+
+
+def is_snapshot_reference(value):
+    return isinstance(value, dict) and SNAPSHOT_HASH_KEY in value
+
+
+def hydrate_execution_doc(doc):
+    """
+    Replace snapshot references in the provided execution dict with the snapshots.
+
+    References to snapshots which don't exist are left as is.
+
+    :param doc: Serialized execution.
+    :type doc: ``dict``
+
+    :rtype: ``dict``
+    """
+    references = dict([(attribute, doc[attribute]) for attribute in SNAPSHOT_ATTRIBUTES
+                       if is_snapshot_reference(doc.get(attribute, None))])
+
+    if not references:
+        return doc
+
+    snapshots = _get_snapshots([reference[SNAPSHOT_HASH_KEY] for reference in
+                                six.itervalues(references)])
+
+    for attribute, reference in six.iteritems(references):
+        data = snapshots.get(reference[SNAPSHOT_HASH_KEY], None)
+
+        if data is None:
+            LOG.warning('Snapshot "%s" of execution %s "%s" doesn\'t exist.',
+                        reference[SNAPSHOT_HASH_KEY], attribute, doc.get('id', None))
+            continue
+
+        # Snapshots are shared between executions so each execution gets its own copy
+        doc[attribute] = copy.deepcopy(data)
+
+    return doc
+
+
+def _get_snapshots(snapshot_hashes):
+    """
+    Retrieve snapshots with the provided hashes. Snapshots which are not cached are retrieved
+    using a single query.
+
+    :rtype: ``dict``
+    """
+    cache = _get_snapshot_cache()
+    result = {}
+    missing_hashes = []
+
+    for snapshot_hash in snapshot_hashes:
+        data = cache.get(snapshot_hash, None)
+
+        if data is None:
+            missing_hashes.append(snapshot_hash)
+        else:
+            result[snapshot_hash] = data
+
+    if missing_hashes:
+        for snapshot_db in ExecutionResourceSnapshot.query(hash__in=missing_hashes):
+            cache.set(snapshot_db.hash, snapshot_db.data)
+            result[snapshot_db.hash] = snapshot_db.data
+
+    return result
+
+
+def _get_snapshot_hash(resource_type, data):
+    serialized = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1('%s:%s' % (resource_type, serialized)).hexdigest()
+
+
+def _get_snapshot_cache():
+    global _SNAPSHOT_CACHE
+
+    if _SNAPSHOT_CACHE is None:
+        _SNAPSHOT_CACHE = LRUCache(max_size=cfg.CONF.execution.snapshot_cache_size)
+
+    return _SNAPSHOT_CACHE
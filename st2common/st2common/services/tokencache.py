@@ -0,0 +1,253 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Process-local cache used to validate access tokens without a database lookup.
+
+Cache holds validated opaque tokens, users and the ids of the revoked signed tokens. It's only
+used in the service processes which run :class:`TokenCacheWatcher` and only while the watcher is
+connected to the message bus (otherwise tokens are validated using the database). The watcher
+evicts deleted opaque tokens and records revoked signed tokens using the CUD events which are
+published when those change. In case an event is lost, cached opaque tokens expire after a TTL
+and the revocations are reloaded from the database with the same interval.
+
+Note: Cached objects are shared by all the callers in the process and must not be modified.
+"""
+
+import uuid
+
+import six
+from oslo_config import cfg
+
+from st2common import log as logging
+from st2common.persistence.auth import TokenRevocation
+from st2common.services.caching import CacheWatcher
+from st2common.services.caching import TTLCache
+from st2common.transport import auth as auth_transport
+from st2common.transport import publishers
+from st2common.util import date as date_utils
+from st2common.util.lru import LRUCache
+
+__all__ = [
+    'TokenCache',
+    'TokenCacheWatcher',
+
+    'get_token_cache',
+    'get_token_cache_watcher',
+    'get_token_cache_stats',
+    'is_token_revoked'
+]
+
+LOG = logging.getLogger(__name__)
+
+# Maximum number of cached users
+USER_CACHE_SIZE = 1000
+
+# Cache which is used by the lookups (set once the watcher has been started)
+_TOKEN_CACHE = None
+
+
+class TokenCache(object):
+    """
+    Cache of validated opaque tokens (with a bounded size and time to live), users and ids of the
+    revoked signed tokens.
+    """
+
+    def __init__(self, ttl, max_size):
+        """
+        :param ttl: How long (in seconds) a token is cached.
+        :type ttl: ``int``
+
+        :param max_size: Maximum number of cached tokens. 0 to disable caching of the tokens.
+        :type max_size: ``int``
+        """
+        self.ttl = ttl
+
+        self._tokens = TTLCache(ttl=ttl, max_size=max_size) if max_size > 0 else None
+        self._users = LRUCache(max_size=USER_CACHE_SIZE)
+
+        # Maps id of a revoked token to the token expiry
+        self._revoked = {}
+
+    def get_or_load_token(self, token_string, load_func):
+        """
+        Return cached token. If the token is not cached, it's retrieved using load_func() and
+        stored. Exceptions raised by load_func (e.g. token doesn't exist) are not cached.
+
+        Note: Token expiry is not checked.
+        """
+        if self._tokens is None:
+            return load_func()
+
+        return self._tokens.get_or_load(token_string, load_func)
+
+    def invalidate_token(self, token_string):
+        if self._tokens is not None:
+            self._tokens.invalidate(token_string)
+
+    def get_or_load_user(self, username, load_func):
+        """
+        Return cached user. Users are never modified so they are cached without a TTL.
+        """
+        user = self._users.get(username, None)
+
+        if user is None:
+            user = load_func()
+            self._users.set(username, user)
+
+        return user
+
+    def revoke(self, token_id, expiry):
+        self._revoked[token_id] = expiry
+
+    def set_revocations(self, revoked):
+        """
+        :param revoked: Map of id of a revoked token to the token expiry.
+        :type revoked: ``dict``
+        """
+        self._revoked = revoked
+
+    def is_revoked(self, token_id):
+        return token_id in self._revoked
+
+    def remove_expired_revocations(self):
+        now = date_utils.get_datetime_utc_now()
+
+        for token_id, expiry in list(six.iteritems(self._revoked)):
+            if date_utils.convert_to_utc(expiry) <= now:
+                del self._revoked[token_id]
+
+    def clear(self):
+        if self._tokens is not None:
+            self._tokens.clear()
+
+        self._users.clear()
+        self._revoked = {}
+
+    def get_stats(self):
+        """
+        :return: Hit / miss counters and size of the token and user caches and the number of
+                 revoked tokens.
+        :rtype: ``dict``
+        """
+        return {
+            'tokens': self._tokens.get_stats() if self._tokens is not None else None,
+            'users': self._users.get_stats(),
+            'revoked': len(self._revoked)
+        }
+
+
+class TokenCacheWatcher(CacheWatcher):
+    """
+    Keeps :class:`TokenCache` up to date by consuming token delete and token revocation create
+    events.
+    """
+
+    name = 'token cache'
+
+    def __init__(self, cache):
+        """
+        :param cache: Cache to update.
+        :type cache: :class:`TokenCache`
+        """
+        queue_suffix = uuid.uuid4().hex[-10:]
+        queues = [
+            auth_transport.get_token_cud_queue(
+                'st2.token.cache.%s' % (queue_suffix), routing_key=publishers.DELETE_RK,
+                exclusive=True, auto_delete=True),
+            auth_transport.get_token_revocation_cud_queue(
+                'st2.token_revocation.cache.%s' % (queue_suffix),
+                routing_key=publishers.CREATE_RK, exclusive=True, auto_delete=True)
+        ]
+
+        handlers = {
+            auth_transport.TOKEN_CUD_XCHG.name: self._handle_token_delete,
+            auth_transport.TOKEN_REVOCATION_CUD_XCHG.name: self._handle_token_revocation
+        }
+
+        # Revocations are reloaded in case a revocation event is lost
+        super(TokenCacheWatcher, self).__init__(cache=cache, queues=queues, handlers=handlers,
+                                                refresh_interval=cache.ttl)
+
+    def refresh(self):
+        """
+        Reload revocations of the tokens which haven't expired yet.
+        """
+        now = date_utils.get_datetime_utc_now()
+        revoked = dict([(revocation_db.token_id, revocation_db.expiry)
+                        for revocation_db in TokenRevocation.query(expiry__gt=now)])
+        self._cache.set_revocations(revoked)
+
+    def _handle_token_delete(self, body):
+        self._cache.invalidate_token(body.token)
+
+    def _handle_token_revocation(self, body):
+        self._cache.remove_expired_revocations()
+        self._cache.revoke(body.token_id, body.expiry)
+
+    def _set_cache(self, cache):
+        _set_token_cache(cache)
+
+
+def get_token_cache():
+    """
+    Return process-wide token cache or None if the cache is not used in this process.
+
+    :rtype: :class:`TokenCache`
+    """
+    return _TOKEN_CACHE
+
+
+def get_token_cache_watcher():
+    """
+    Return a watcher which enables the process-wide token cache once it's started and keeps it
+    up to date.
+
+    :rtype: :class:`TokenCacheWatcher`
+    """
+    cache = TokenCache(ttl=cfg.CONF.auth.token_cache_ttl,
+                       max_size=cfg.CONF.auth.token_cache_size)
+    return TokenCacheWatcher(cache=cache)
+
+
+def get_token_cache_stats():
+    """
+    Return statistics of the process-wide token cache or None if the cache is not used in this
+    process.
+
+    :rtype: ``dict``
+    """
+    cache = get_token_cache()
+    return cache.get_stats() if cache else None
+
+
+def is_token_revoked(token_id):
+    """
+    Return True if the signed token with the provided id has been revoked. The database is only
+    queried if the token cache is not used in this process.
+
+    :rtype: ``bool``
+    """
+    cache = get_token_cache()
+
+    if cache:
+        return cache.is_revoked(token_id)
+
+    return TokenRevocation.is_revoked(token_id)
+
+
+def _set_token_cache(cache):
+    global _TOKEN_CACHE
+    _TOKEN_CACHE = cache
@@ -13,6 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import bson
+import six
 from mongoengine import ValidationError
 
 from st2common import log as logging
@@ -32,7 +34,10 @@ __all__ = [
     'get_trace_db_by_trigger_instance',
     'get_trace',
     'add_or_update_given_trace_context',
-    'add_or_update_given_trace_db'
+    'add_or_update_given_trace_contexts',
+    'add_or_update_given_trace_db',
+
+    'TraceComponentsBatch'
 ]
 
 
@@ -212,6 +217,64 @@ def add_or_update_given_trace_context(trace_context, action_executions=None, rul
                                         trigger_instances=trigger_instances)
 
 
+def add_or_update_given_trace_contexts(trace_contexts, trigger_instances):
+    """
+    Bulk version of :func:`add_or_update_given_trace_context`. All the existing traces are
+    retrieved using a single query, all the new traces are inserted using a single bulk insert
+    and components are pushed to the existing traces using a single bulk write.
+
+    :param trace_contexts: Context objects using which the traces can be found.
+    :type trace_contexts: ``list`` of ``dict`` or ``TraceContext``
+
+    :param trigger_instances: The trigger_instances to be added to each of the Traces. Should be
+                              a list of lists of object_ids, one for each trace context.
+    :type trigger_instances: ``list``
+
+    :return: TraceDB for each of the trace contexts. None for a trace context which references
+             a Trace which doesn't exist.
+    :rtype: ``list`` of ``TraceDB``
+    """
+    trace_contexts = [_get_valid_trace_context(trace_context)
+                      for trace_context in trace_contexts]
+
+    trace_ids = set([trace_context.id_ for trace_context in trace_contexts
+                     if trace_context.id_ and bson.ObjectId.is_valid(trace_context.id_)])
+    existing_trace_dbs = {}
+    if trace_ids:
+        for trace_db in Trace.query(id__in=list(trace_ids)):
+            existing_trace_dbs[str(trace_db.id)] = trace_db
+
+    trace_dbs = []
+    new_trace_dbs = []
+    trace_batch = TraceComponentsBatch()
+
+    for trace_context, trigger_instance_ids in zip(trace_contexts, trigger_instances):
+        if trace_context.id_:
+            trace_db = existing_trace_dbs.get(trace_context.id_, None)
+
+            if trace_db:
+                trace_batch.add(trace_db, trigger_instances=trigger_instance_ids)
+            else:
+                LOG.warning('Database lookup for Trace with id="%s" failed.', trace_context.id_)
+        elif trace_context.trace_tag:
+            trace_db = TraceDB(trace_tag=trace_context.trace_tag, action_executions=[], rules=[],
+                               trigger_instances=[TraceComponentDB(object_id=trigger_instance)
+                                                  for trigger_instance in trigger_instance_ids])
+            new_trace_dbs.append(trace_db)
+        else:
+            LOG.warning('Atleast one of id_ or trace_tag should be specified.')
+            trace_db = None
+
+        trace_dbs.append(trace_db)
+
+    if new_trace_dbs:
+        Trace.insert_many(new_trace_dbs)
+
+    trace_batch.commit()
+
+    return trace_dbs
+
+
 def add_or_update_given_trace_db(trace_db, action_executions=None, rules=None,
                                  trigger_instances=None):
     """
@@ -263,3 +326,54 @@ def add_or_update_given_trace_db(trace_db, action_executions=None, rules=None,
     trace_db.trigger_instances = trigger_instances
 
     return Trace.add_or_update(trace_db)
+
+
+class TraceComponentsBatch(object):
+    """
+    Collects components which are added to the existing Traces and pushes all of them using a
+    single bulk write on commit.
+    """
+
+    def __init__(self):
+        # Maps trace id -> {component field name -> [TraceComponentDB]}
+        self._components = {}
+
+    def add(self, trace_db, action_executions=None, rules=None, trigger_instances=None):
+        """
+        :param trace_db: The persisted TraceDB to update.
+        :type trace_db: ``TraceDB``
+        """
+        if trace_db is None or not trace_db.id:
+            raise ValueError('trace_db should be non-None and persisted.')
+
+        trace_components = self._components.setdefault(trace_db.id, {
+            'action_executions': [],
+            'rules': [],
+            'trigger_instances': []
+        })
+
+        components = {
+            'action_executions': action_executions,
+            'rules': rules,
+            'trigger_instances': trigger_instances
+        }
+        for field_name, object_ids in six.iteritems(components):
+            for object_id in (object_ids or []):
+                trace_components[field_name].append(TraceComponentDB(object_id=object_id))
+
+    def commit(self):
+        """
+        Push all the collected components.
+
+        :return: Number of updated traces.
+        :rtype: ``int``
+        """
+        components, self._components = self._components, {}
+
+        if not components:
+            return 0
+
+        return Trace.push_components_many(components)
+
+    def __len__(self):
+        return len(self._components)
@@ -20,7 +20,7 @@ from kombu import Connection
 
 from st2common import log as logging
 from st2common.persistence.trigger import Trigger
-from st2common.transport import reactor, publishers
+from st2common.transport import reactor, publishers, serialization
 from st2common.transport import utils as transport_utils
 
 LOG = logging.getLogger(__name__)
@@ -66,7 +66,7 @@ class TriggerWatcher(ConsumerMixin):
 
     def get_consumers(self, Consumer, channel):
         return [Consumer(queues=[self._trigger_watch_q],
-                         accept=['pickle'],
+                         accept=serialization.ACCEPT_CONTENT,
                          callbacks=[self.process_task])]
 
     def process_task(self, body, message):
@@ -20,18 +20,27 @@ the whole code base.
 
 from __future__ import absolute_import
 
+import os
 import signal
 import logging
 
 from st2common.logging.misc import reopen_log_files
+from st2common.rbac.index import get_permissions_index_stats
+from st2common.services.keyvalues import get_key_value_cache
+from st2common.services.resourcecache import get_resource_cache_stats
+from st2common.services.tokencache import get_token_cache_stats
+from st2common.util.jinja import get_template_cache_stats
 
 __all__ = [
     'register_common_signal_handlers',
 ]
 
+LOG = logging.getLogger(__name__)
+
 
 def register_common_signal_handlers():
     signal.signal(signal.SIGUSR1, handle_sigusr1)
+    signal.signal(signal.SIGUSR2, handle_sigusr2)
 
 
 def handle_sigusr1(signal_number, stack_frame):
@@ -42,3 +51,20 @@ def handle_sigusr1(signal_number, stack_frame):
     """
     handlers = logging.getLoggerClass().manager.root.handlers
     reopen_log_files(handlers=handlers)
+
+
+def handle_sigusr2(signal_number, stack_frame):
+    """
+    Global SIGUSR2 signal handler which logs statistics of the process-local caches.
+    """
+    key_value_cache = get_key_value_cache()
+
+    stats = {
+        'resource_cache': get_resource_cache_stats(),
+        'token_cache': get_token_cache_stats(),
+        'permissions_index_cache': get_permissions_index_stats(),
+        'key_value_cache': key_value_cache.get_stats() if key_value_cache else None,
+        'template_cache': get_template_cache_stats()
+    }
+
+    LOG.info('Cache stats (PID=%s): %s', os.getpid(), stats)
@@ -14,6 +14,7 @@
 # limitations under the License.
 
 from st2common.transport import liveaction, actionexecutionstate, execution, publishers, reactor
+from st2common.transport import keyvalue, action, policy, auth, rbac
 from st2common.transport import bootstrap_utils, utils, connection_retry_wrapper
 
 # TODO(manas) : Exchanges, Queues and RoutingKey design discussion pending.
@@ -24,6 +25,11 @@ __all__ = [
     'execution',
     'publishers',
     'reactor',
+    'keyvalue',
+    'action',
+    'policy',
+    'auth',
+    'rbac',
     'bootstrap_utils',
     'utils',
     'connection_retry_wrapper'
@@ -17,10 +17,15 @@ from kombu import Connection
 from st2common import log as logging
 from st2common.transport import utils as transport_utils
 from st2common.transport.connection_retry_wrapper import ConnectionRetryWrapper
+from st2common.transport.action import ACTION_CUD_XCHG, RUNNER_TYPE_CUD_XCHG
+from st2common.transport.auth import TOKEN_CUD_XCHG, TOKEN_REVOCATION_CUD_XCHG
 from st2common.transport.execution import EXECUTION_XCHG
+from st2common.transport.keyvalue import KEY_VALUE_PAIR_CUD_XCHG
 from st2common.transport.liveaction import LIVEACTION_XCHG
+from st2common.transport.policy import POLICY_CUD_XCHG
+from st2common.transport.rbac import RBAC_CUD_XCHG
 from st2common.transport.reactor import TRIGGER_CUD_XCHG, TRIGGER_INSTANCE_XCHG
-from st2common.transport.reactor import SENSOR_CUD_XCHG
+from st2common.transport.reactor import SENSOR_CUD_XCHG, RULE_CUD_XCHG
 
 LOG = logging.getLogger('st2common.transport.bootstrap')
 
@@ -29,7 +34,9 @@ __all__ = [
 ]
 
 EXCHANGES = [EXECUTION_XCHG, LIVEACTION_XCHG, TRIGGER_CUD_XCHG, TRIGGER_INSTANCE_XCHG,
-             SENSOR_CUD_XCHG]
+             SENSOR_CUD_XCHG, RULE_CUD_XCHG, KEY_VALUE_PAIR_CUD_XCHG, ACTION_CUD_XCHG,
+             RUNNER_TYPE_CUD_XCHG, POLICY_CUD_XCHG, TOKEN_CUD_XCHG, TOKEN_REVOCATION_CUD_XCHG,
+             RBAC_CUD_XCHG]
 
 
 def _do_register_exchange(exchange, connection, channel, retry_wrapper):
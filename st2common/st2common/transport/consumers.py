@@ -18,39 +18,88 @@ import eventlet
 import six
 
 from kombu.mixins import ConsumerMixin
+from oslo_config import cfg
 
 from st2common import log as logging
+from st2common.transport import serialization
 from st2common.util.greenpooldispatch import BufferedDispatcher
 
 
 LOG = logging.getLogger(__name__)
 
 
+__all__ = [
+    'QueueConsumer',
+    'BatchingQueueConsumer',
+    'MessageHandler',
+
+    'get_prefetch_count'
+]
+
+
 class QueueConsumer(ConsumerMixin):
-    def __init__(self, connection, queues, handler):
+    def __init__(self, connection, queues, handler, dispatch_pool_size=50,
+                 ack_after_process=False, prefetch_count=None):
+        """
+        :param dispatch_pool_size: Maximum number of messages which are processed concurrently.
+        :type dispatch_pool_size: ``int``
+
+        :param ack_after_process: True to acknowledge a message only after the handler has
+                                  processed it.
+        :type ack_after_process: ``bool``
+
+        :param prefetch_count: Maximum number of unacknowledged messages delivered by the broker.
+                               Defaults to 1 or to dispatch_pool_size if ack_after_process is
+                               True.
+        :type prefetch_count: ``int``
+        """
         self.connection = connection
-        self._dispatcher = BufferedDispatcher()
+        self._dispatcher = BufferedDispatcher(dispatch_pool_size=dispatch_pool_size)
         self._queues = queues
         self._handler = handler
+        self._ack_after_process = ack_after_process
+        self._prefetch_count = prefetch_count
 
     def shutdown(self):
         self._dispatcher.shutdown()
 
     def get_consumers(self, Consumer, channel):
-        consumer = Consumer(queues=self._queues, accept=['pickle'], callbacks=[self.process])
+        consumer = Consumer(queues=self._queues, accept=serialization.ACCEPT_CONTENT,
+                            callbacks=[self.process])
+        consumer.qos(prefetch_count=self.get_prefetch_count())
+        return [consumer]
 
-        # use prefetch_count=1 for fair dispatch. This way workers that finish an item get the next
-        # task and the work does not get queued behind any single large item.
-        consumer.qos(prefetch_count=1)
+    def get_prefetch_count(self):
+        if self._prefetch_count:
+            return self._prefetch_count
 
-        return [consumer]
+        if self._ack_after_process:
+            # Each unacknowledged message holds a dispatcher slot so the broker stops delivering
+            # messages once all the slots are busy.
+            return self._dispatcher.pool_size
+
+        # use prefetch_count=1 for fair dispatch. This way workers that finish an item get
+        # the next task and the work does not get queued behind any single large item.
+        return 1
 
     def process(self, body, message):
+        if self._ack_after_process:
+            self._dispatcher.dispatch(self._process_message_and_ack, body, message)
+            return
+
         try:
+            # Don't take (and acknowledge) a new message until there is a free slot to process it
+            self._dispatcher.wait_for_free_slot()
             self._dispatcher.dispatch(self._process_message, body)
         finally:
             message.ack()
 
+    def _process_message_and_ack(self, body, message):
+        try:
+            self._process_message(body)
+        finally:
+            message.ack()
+
     def _process_message(self, body):
         try:
             if not isinstance(body, self._handler.message_type):
@@ -61,12 +110,124 @@ class QueueConsumer(ConsumerMixin):
             LOG.exception('%s failed to process message: %s', self.__class__.__name__, body)
 
 
+class BatchingQueueConsumer(QueueConsumer):
+    """
+    Queue consumer which hands messages over to the handler in batches.
+
+    A batch is dispatched once it holds ``batch_size`` messages or once ``batch_timeout`` seconds
+    have passed since the first message of the batch has been received. Messages are only
+    acknowledged after the handler has processed the whole batch. If processing of the batch
+    fails, messages are processed (and acknowledged) one by one.
+    """
+
+    def __init__(self, connection, queues, handler, batch_size, batch_timeout,
+                 dispatch_pool_size=50, prefetch_count=None):
+        super(BatchingQueueConsumer, self).__init__(connection, queues, handler,
+                                                    dispatch_pool_size=dispatch_pool_size,
+                                                    ack_after_process=True,
+                                                    prefetch_count=prefetch_count)
+        self._batch_size = batch_size
+        self._batch_timeout = batch_timeout
+        self._batch = []
+        self._flush_thread = None
+
+    def shutdown(self):
+        self._flush()
+        super(BatchingQueueConsumer, self).shutdown()
+
+    def get_prefetch_count(self):
+        # Messages are acknowledged once the whole batch has been processed so the prefetch
+        # count needs to leave room for a batch which is being processed and one which is
+        # being filled.
+        return max(self._prefetch_count or 0, self._batch_size * 2)
+
+    def process(self, body, message):
+        self._batch.append((body, message))
+
+        if len(self._batch) >= self._batch_size:
+            self._flush()
+        elif not self._flush_thread:
+            self._flush_thread = eventlet.spawn_after(self._batch_timeout, self._flush)
+
+    def _flush(self):
+        if self._flush_thread:
+            # No-op if the flush is already running in the timer thread
+            self._flush_thread.cancel()
+            self._flush_thread = None
+
+        batch, self._batch = self._batch, []
+
+        if batch:
+            self._dispatcher.dispatch(self._process_batch, batch)
+
+    def _process_batch(self, batch):
+        messages = []
+
+        for body, message in batch:
+            if not isinstance(body, self._handler.message_type):
+                LOG.error('%s received an unexpected type "%s" for payload: %s',
+                          self.__class__.__name__, type(body), body)
+                message.ack()
+                continue
+
+            messages.append((body, message))
+
+        if not messages:
+            return
+
+        try:
+            self._handler.process_batch([body for body, _ in messages])
+        except:
+            # Batch hasn't been committed so the messages are processed one by one instead
+            # (same as with the regular consumer) before they are acknowledged
+            LOG.exception('%s failed to process a batch of %s message(s), processing messages '
+                          'one by one.', self.__class__.__name__, len(messages))
+
+            for body, message in messages:
+                try:
+                    self._process_message(body)
+                finally:
+                    message.ack()
+
+            return
+
+        for _, message in messages:
+            message.ack()
+
+
 @six.add_metaclass(abc.ABCMeta)
 class MessageHandler(object):
     message_type = None
 
-    def __init__(self, connection, queues):
-        self._queue_consumer = QueueConsumer(connection, queues, self)
+    # Name of the service used to look up per-service messaging options
+    service_name = None
+
+    def __init__(self, connection, queues, batch_size=1, batch_timeout=0):
+        """
+        :param batch_size: Maximum number of messages which are handed over to
+                           :meth:`process_batch` at once. 1 to process messages one by one
+                           using :meth:`process`.
+        :type batch_size: ``int``
+
+        :param batch_timeout: How long (in seconds) to wait for a batch to fill up.
+        :type batch_timeout: ``float``
+        """
+        consumer_kwargs = {
+            'dispatch_pool_size': cfg.CONF.messaging.dispatch_pool_size,
+            'prefetch_count': get_prefetch_count(service_name=self.service_name)
+        }
+
+        if batch_size > 1:
+            self._queue_consumer = BatchingQueueConsumer(connection, queues, self,
+                                                         batch_size=batch_size,
+                                                         batch_timeout=batch_timeout,
+                                                         **consumer_kwargs)
+        else:
+            self._queue_consumer = QueueConsumer(
+                connection, queues, self,
+                ack_after_process=cfg.CONF.messaging.ack_after_process,
+                **consumer_kwargs)
+
         self._consumer_thread = None
 
     def start(self, wait=False):
@@ -86,3 +247,32 @@ class MessageHandler(object):
     @abc.abstractmethod
     def process(self, message):
         pass
+
+    def process_batch(self, messages):
+        """
+        Process multiple messages. Only used if the handler is constructed with batch_size
+        larger than 1.
+
+        Handlers which can amortise work across messages should override this method. Default
+        implementation processes messages one by one.
+        """
+        for message in messages:
+            try:
+                self.process(message)
+            except:
+                LOG.exception('%s failed to process message: %s', self.__class__.__name__,
+                              message)
+
+
+def get_prefetch_count(service_name=None):
+    """
+    Return prefetch count configured for the provided service.
+
+    :rtype: ``int``
+    """
+    service_prefetch_counts = cfg.CONF.messaging.service_prefetch_counts or {}
+
+    if service_name and service_name in service_prefetch_counts:
+        return int(service_prefetch_counts[service_name])
+
+    return cfg.CONF.messaging.prefetch_count
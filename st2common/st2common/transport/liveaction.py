@@ -15,7 +15,7 @@
 
 # All Exchanges and Queues related to liveaction.
 
-from kombu import Exchange, Queue
+from kombu import Exchange, Queue, binding
 from st2common.transport import publishers
 
 
@@ -34,5 +34,17 @@ def get_queue(name, routing_key):
     return Queue(name, LIVEACTION_XCHG, routing_key=routing_key)
 
 
-def get_status_management_queue(name, routing_key):
-    return Queue(name, LIVEACTION_STATUS_MGMT_XCHG, routing_key=routing_key)
+def get_status_management_queue(name, routing_key, exclusive=False, auto_delete=False):
+    return Queue(name, LIVEACTION_STATUS_MGMT_XCHG, routing_key=routing_key, exclusive=exclusive,
+                 auto_delete=auto_delete)
+
+
+def get_statuses_management_queue(name, statuses, exclusive=False, auto_delete=False):
+    """
+    Return a queue which only receives the status notifications of the provided statuses.
+
+    :param statuses: Statuses to bind the queue to.
+    :type statuses: ``list`` of ``str``
+    """
+    bindings = [binding(LIVEACTION_STATUS_MGMT_XCHG, routing_key=status) for status in statuses]
+    return Queue(name, bindings=bindings, exclusive=exclusive, auto_delete=auto_delete)
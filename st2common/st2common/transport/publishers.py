@@ -13,12 +13,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
 import copy
+import weakref
 
 from kombu import Connection
 from kombu.messaging import Producer
+from oslo_config import cfg
 
 from st2common import log as logging
+from st2common.exceptions.transport import MessageNotConfirmedError
+from st2common.transport import serialization
 from st2common.transport.connection_retry_wrapper import ConnectionRetryWrapper
 
 ANY_RK = '*'
@@ -26,39 +31,188 @@ CREATE_RK = 'create'
 UPDATE_RK = 'update'
 DELETE_RK = 'delete'
 
+# Basic.Ack and Basic.Nack methods sent by the broker to confirm a published message
+CONFIRM_METHODS = [(60, 80), (60, 120)]
+
 LOG = logging.getLogger(__name__)
 
 
+class PublisherConfirms(object):
+    """
+    Tracks publisher confirms (RabbitMQ extension) for a single channel.
+
+    Messages are published without waiting for the broker to confirm each of them. All the
+    outstanding confirms are awaited at once which means many messages can be in flight.
+    """
+
+    def __init__(self, channel):
+        # Delivery tag of the last message published on the channel
+        self._delivery_tag = 0
+
+        # Maps delivery tag -> key of a message which hasn't been confirmed yet
+        self._pending = {}
+        self._nacked = []
+        self._undelivered = {}
+
+        channel.confirm_select()
+        channel.events['basic_ack'].add(self._on_ack)
+        channel.events['basic_nack'].add(self._on_nack)
+
+    def begin(self, undelivered):
+        """
+        Start tracking a new batch of messages.
+
+        :param undelivered: Messages which haven't been delivered yet keyed by the message key.
+                            Message is removed once the broker confirms it.
+        :type undelivered: ``dict``
+        """
+        self._pending = {}
+        self._nacked = []
+        self._undelivered = undelivered
+
+    def published(self, key):
+        self._delivery_tag += 1
+        self._pending[self._delivery_tag] = key
+
+    def wait(self, channel, timeout=None):
+        """
+        Wait until all the published messages are confirmed.
+
+        :return: Keys of the messages which were rejected by the broker.
+        :rtype: ``list``
+        """
+        while self._pending:
+            channel.wait(allowed_methods=CONFIRM_METHODS, timeout=timeout)
+
+        return self._nacked
+
+    def _on_ack(self, delivery_tag, multiple):
+        for key in self._settle(delivery_tag=delivery_tag, multiple=multiple):
+            self._undelivered.pop(key, None)
+
+    def _on_nack(self, delivery_tag, multiple, requeue=False):
+        self._nacked.extend(self._settle(delivery_tag=delivery_tag, multiple=multiple))
+
+    def _settle(self, delivery_tag, multiple):
+        if multiple:
+            delivery_tags = [tag for tag in self._pending if tag <= delivery_tag]
+        else:
+            delivery_tags = [delivery_tag]
+
+        return [self._pending.pop(tag) for tag in sorted(delivery_tags) if tag in self._pending]
+
+
 class PoolPublisher(object):
     def __init__(self, urls):
         self.pool = Connection(urls, failover_strategy='round-robin').Pool(limit=10)
         self.cluster_size = len(urls)
 
+        # Long-lived producer for each of the pooled connections and publisher confirms state
+        # for each of the channels. Both are reused across publishes. Confirms state doesn't
+        # reference the channel so it's dropped together with the channel.
+        self._producers = weakref.WeakKeyDictionary()
+        self._confirms = weakref.WeakKeyDictionary()
+
     def errback(self, exc, interval):
         LOG.error('Rabbitmq connection error: %s', exc.message, exc_info=False)
 
     def publish(self, payload, exchange, routing_key=''):
+        self.publish_many(messages=[(payload, routing_key)], exchange=exchange)
+
+    def publish_many(self, messages, exchange):
+        """
+        Publish multiple messages to the same exchange using a single connection and channel.
+
+        If publisher confirms are enabled, all the messages are published before waiting for the
+        broker to confirm them. In case of a connection error, messages which haven't been
+        confirmed yet are published again once the connection is re-established.
+
+        :param messages: List of (payload, routing_key) tuples.
+        :type messages: ``list``
+        """
+        serializer = serialization.get_exchange_serializer(exchange.name)
+
+        # Maps message index -> publish kwargs of all the messages which haven't been
+        # delivered yet
+        undelivered = collections.OrderedDict()
+
+        for index, (payload, routing_key) in enumerate(messages):
+            content_type, content_encoding, body = serialization.dumps(payload,
+                                                                       serializer=serializer)
+            undelivered[index] = {
+                'body': body,
+                'exchange': exchange,
+                'routing_key': routing_key,
+                'content_type': content_type,
+                'content_encoding': content_encoding
+            }
+
+        if not undelivered:
+            return
+
         with self.pool.acquire(block=True) as connection:
             retry_wrapper = ConnectionRetryWrapper(cluster_size=self.cluster_size, logger=LOG)
 
             def do_publish(connection, channel):
-                # ProducerPool ends up creating it own ConnectionPool which ends up completely
-                # invalidating this ConnectionPool. Also, a ConnectionPool for producer does not
-                # really solve any problems for us so better to create a Producer for each
-                # publish.
-                producer = Producer(channel)
-                kwargs = {
-                    'body': payload,
-                    'exchange': exchange,
-                    'routing_key': routing_key,
-                    'serializer': 'pickle'
-                }
-                retry_wrapper.ensured(connection=connection,
-                                      obj=producer,
-                                      to_ensure_func=producer.publish,
-                                      **kwargs)
-
-            retry_wrapper.run(connection=connection, wrapped_callback=do_publish)
+                producer = self._get_producer(connection=connection, channel=channel)
+                confirms = self._get_confirms(channel=channel)
+
+                if confirms:
+                    confirms.begin(undelivered=undelivered)
+
+                for index, kwargs in list(undelivered.items()):
+                    retry_wrapper.ensured(connection=connection,
+                                          obj=producer,
+                                          to_ensure_func=producer.publish,
+                                          **kwargs)
+
+                    if confirms:
+                        confirms.published(index)
+                    else:
+                        del undelivered[index]
+
+                if confirms:
+                    timeout = cfg.CONF.messaging.publisher_confirm_timeout
+                    nacked = confirms.wait(channel=channel, timeout=timeout)
+
+                    if nacked:
+                        raise MessageNotConfirmedError('Broker rejected %s of %s message(s) '
+                                                       'published to exchange "%s".' %
+                                                       (len(nacked), len(messages),
+                                                        exchange.name))
+
+            retry_wrapper.run(connection=connection, wrapped_callback=do_publish,
+                              reuse_channel=True)
+
+    def _get_producer(self, connection, channel):
+        # Creating a producer doesn't talk to the broker, the expensive part is opening a
+        # channel for each publish which is avoided by using the default channel of the
+        # connection.
+        producer = self._producers.get(connection, None)
+
+        if not producer:
+            producer = Producer(channel)
+            self._producers[connection] = producer
+        elif producer.channel is not channel:
+            producer.revive(channel)
+
+        return producer
+
+    def _get_confirms(self, channel):
+        if not cfg.CONF.messaging.publisher_confirms:
+            return None
+
+        if not hasattr(channel, 'confirm_select'):
+            # Publisher confirms are only supported by the amqp transports
+            return None
+
+        confirms = self._confirms.get(channel, None)
+
+        if not confirms:
+            confirms = PublisherConfirms(channel)
+            self._confirms[channel] = confirms
+
+        return confirms
 
 
 class SharedPoolPublishers(object):
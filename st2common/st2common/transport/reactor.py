@@ -13,23 +13,36 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from kombu import Exchange, Queue
+import zlib
+
+import six
+from kombu import Exchange, Queue, binding
 
 from st2common import log as logging
 from st2common.constants.trace import TRACE_CONTEXT
 from st2common.models.api.trace import TraceContext
+from st2common.models.system.common import ResourceReference
 from st2common.transport import publishers
 from st2common.transport import utils as transport_utils
 
 __all__ = [
+    'RuleCUDPublisher',
     'TriggerCUDPublisher',
     'TriggerInstancePublisher',
 
     'TriggerDispatcher',
 
+    'get_rule_cud_queue',
     'get_sensor_cud_queue',
     'get_trigger_cud_queue',
-    'get_trigger_instances_queue'
+    'get_trigger_instances_queue',
+    'get_trigger_instances_partitions_queue',
+
+    'get_trigger_ref',
+    'get_trigger_ref_hash',
+    'get_trigger_instance_partition',
+    'get_trigger_instance_partition_key',
+    'get_trigger_instance_routing_key'
 ]
 
 LOG = logging.getLogger(__name__)
@@ -40,6 +53,21 @@ TRIGGER_CUD_XCHG = Exchange('st2.trigger', type='topic')
 # Exchange for TriggerInstance events
 TRIGGER_INSTANCE_XCHG = Exchange('st2.trigger_instances_dispatch', type='topic')
 
+# Exchange for Rule CUD events
+RULE_CUD_XCHG = Exchange('st2.rule', type='topic')
+
+# Prefix of the routing key used for the dispatched trigger instances. Full routing key is of
+# the form trigger_instance.<partition>.<trigger ref>
+TRIGGER_INSTANCE_RK = 'trigger_instance'
+
+# Number of partitions the trigger references are hashed into. Partition is the top bits of the
+# trigger reference hash so a hash range always maps to a continuous range of partitions.
+# Changing this value changes the routing keys so it's not configurable.
+TRIGGER_INSTANCE_PARTITIONS = 64
+
+# Upper bound (exclusive) of the trigger reference hash
+TRIGGER_REF_HASH_MAX = 2 ** 32
+
 # Exchane for Sensor CUD events
 SENSOR_CUD_XCHG = Exchange('st2.sensor', type='topic')
 
@@ -62,14 +90,29 @@ class TriggerCUDPublisher(publishers.CUDPublisher):
         super(TriggerCUDPublisher, self).__init__(urls, TRIGGER_CUD_XCHG)
 
 
+class RuleCUDPublisher(publishers.CUDPublisher):
+    """
+    Publisher responsible for publishing Rule model CUD events.
+    """
+
+    def __init__(self, urls):
+        super(RuleCUDPublisher, self).__init__(urls, RULE_CUD_XCHG)
+
+
 class TriggerInstancePublisher(object):
     def __init__(self, urls):
-        self._publisher = publishers.PoolPublisher(urls=urls)
+        self._publisher = publishers.SharedPoolPublishers().get_publisher(urls=urls)
 
     def publish_trigger(self, payload=None, routing_key=None):
-        # TODO: We should use trigger reference as a routing key
         self._publisher.publish(payload, TRIGGER_INSTANCE_XCHG, routing_key)
 
+    def publish_triggers(self, messages):
+        """
+        :param messages: List of (payload, routing_key) tuples.
+        :type messages: ``list``
+        """
+        self._publisher.publish_many(messages, TRIGGER_INSTANCE_XCHG)
+
 
 class TriggerDispatcher(object):
     """
@@ -93,27 +136,132 @@ class TriggerDispatcher(object):
         :param trace_context: Trace context to associate with Trigger.
         :type trace_context: ``TraceContext``
         """
+        payload = self._get_message_payload(trigger=trigger, payload=payload,
+                                            trace_context=trace_context)
+
+        routing_key = get_trigger_instance_routing_key(trigger)
+
+        self._logger.debug('Dispatching trigger (trigger=%s,payload=%s)', trigger, payload)
+        self._publisher.publish_trigger(payload=payload, routing_key=routing_key)
+
+    def dispatch_many(self, triggers):
+        """
+        Method which dispatches multiple triggers at once. All the trigger instances are
+        published using a single channel.
+
+        :param triggers: List of (trigger, payload, trace_context) tuples.
+        :type triggers: ``list``
+        """
+        messages = []
+        for trigger, payload, trace_context in triggers:
+            payload = self._get_message_payload(trigger=trigger, payload=payload,
+                                                trace_context=trace_context)
+            messages.append((payload, get_trigger_instance_routing_key(trigger)))
+
+        self._logger.debug('Dispatching %s trigger(s)', len(messages))
+        self._publisher.publish_triggers(messages=messages)
+
+    @staticmethod
+    def _get_message_payload(trigger, payload, trace_context):
         assert isinstance(payload, (type(None), dict))
         assert isinstance(trace_context, (type(None), TraceContext))
 
-        payload = {
+        return {
             'trigger': trigger,
             'payload': payload,
             TRACE_CONTEXT: trace_context
         }
-        routing_key = 'trigger_instance'
 
-        self._logger.debug('Dispatching trigger (trigger=%s,payload=%s)', trigger, payload)
-        self._publisher.publish_trigger(payload=payload, routing_key=routing_key)
 
+def get_trigger_cud_queue(name, routing_key, exclusive=False, auto_delete=False):
+    return Queue(name, TRIGGER_CUD_XCHG, routing_key=routing_key, exclusive=exclusive,
+                 auto_delete=auto_delete)
 
-def get_trigger_cud_queue(name, routing_key):
-    return Queue(name, TRIGGER_CUD_XCHG, routing_key=routing_key)
+
+def get_rule_cud_queue(name, routing_key, exclusive=False, auto_delete=False):
+    return Queue(name, RULE_CUD_XCHG, routing_key=routing_key, exclusive=exclusive,
+                 auto_delete=auto_delete)
 
 
 def get_trigger_instances_queue(name, routing_key):
     return Queue(name, TRIGGER_INSTANCE_XCHG, routing_key=routing_key)
 
 
+def get_trigger_instances_partitions_queue(name, partitions):
+    """
+    Return a queue which only receives trigger instances of the provided partitions.
+
+    :param partitions: Partitions to bind the queue to.
+    :type partitions: ``list`` of ``int``
+    """
+    bindings = [binding(TRIGGER_INSTANCE_XCHG, routing_key='%s.%s.#' % (TRIGGER_INSTANCE_RK,
+                                                                        partition))
+                for partition in partitions]
+    return Queue(name, bindings=bindings)
+
+
+def get_trigger_ref(trigger):
+    """
+    Return reference of the provided trigger. Trigger can be a string reference or a ``dict``.
+
+    :return: Trigger reference or None if the trigger is identified by the type and parameters.
+    :rtype: ``str``
+    """
+    if isinstance(trigger, six.string_types):
+        return trigger
+
+    if trigger.get('ref', None):
+        return trigger['ref']
+
+    if trigger.get('pack', None) and trigger.get('name', None):
+        return ResourceReference.to_string_reference(pack=trigger['pack'], name=trigger['name'])
+
+    return None
+
+
+def get_trigger_ref_hash(trigger_ref):
+    """
+    :rtype: ``int`` in the range [0, TRIGGER_REF_HASH_MAX)
+    """
+    if isinstance(trigger_ref, six.text_type):
+        trigger_ref = trigger_ref.encode('utf-8')
+
+    return zlib.crc32(trigger_ref) & 0xffffffff
+
+
+def get_trigger_instance_partition(trigger_ref):
+    return get_trigger_ref_hash(trigger_ref) * TRIGGER_INSTANCE_PARTITIONS // TRIGGER_REF_HASH_MAX
+
+
+def get_trigger_instance_partition_key(trigger):
+    """
+    Return value which is used to assign the trigger instances of the provided trigger to a
+    partition.
+
+    Trigger reference is used. Triggers which are identified by the type and parameters are
+    partitioned by the trigger type.
+
+    :rtype: ``str``
+    """
+    trigger_ref = get_trigger_ref(trigger)
+
+    if trigger_ref:
+        return trigger_ref
+
+    return trigger.get('type', None) or ''
+
+
+def get_trigger_instance_routing_key(trigger):
+    """
+    Return routing key for the trigger instances of the provided trigger.
+
+    :rtype: ``str``
+    """
+    partition_key = get_trigger_instance_partition_key(trigger)
+    partition = get_trigger_instance_partition(partition_key)
+
+    return '%s.%s.%s' % (TRIGGER_INSTANCE_RK, partition, partition_key)
+
+
 def get_sensor_cud_queue(name, routing_key):
     return Queue(name, SENSOR_CUD_XCHG, routing_key=routing_key)
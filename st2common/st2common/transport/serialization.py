@@ -0,0 +1,215 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Serialization of the internal message bus payloads.
+
+Besides pickle, two additional serializers are available:
+
+* st2json - JSON
+* st2msgpack - msgpack (only if the msgpack library is installed)
+
+Database model objects are encoded using their database (son) representation together with a
+reference to the model class and decoded the same way as if they were loaded from the database.
+Other bson values (ObjectId, datetime, ...) are encoded using their extended JSON representation
+under a private key, so user data which happens to look like extended JSON is left as is.
+
+Consumers accept all the available content types and the serializer used by the publisher is
+selected per exchange which means a cluster can be switched over one exchange at a time.
+"""
+
+import importlib
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+import mongoengine as me
+from bson import json_util
+from kombu.exceptions import EncodeError, SerializerNotInstalled
+from kombu.serialization import prepare_accept_content, registry
+from oslo_config import cfg
+
+from st2common import log as logging
+from st2common.models.api.trace import TraceContext
+
+__all__ = [
+    'ACCEPT_CONTENT',
+
+    'SERIALIZER_PICKLE',
+    'SERIALIZER_JSON',
+    'SERIALIZER_MSGPACK',
+
+    'get_exchange_serializer',
+    'dumps',
+    'loads'
+]
+
+LOG = logging.getLogger(__name__)
+
+SERIALIZER_PICKLE = 'pickle'
+SERIALIZER_JSON = 'st2json'
+SERIALIZER_MSGPACK = 'st2msgpack'
+
+JSON_CONTENT_TYPE = 'application/x-st2-json'
+MSGPACK_CONTENT_TYPE = 'application/x-st2-msgpack'
+
+# Key under which reference to the model class of an encoded model object is stored
+MODEL_KEY = '$st2_model'
+
+# Key under which son representation of an encoded model object is stored
+DOCUMENT_KEY = '$st2_document'
+
+# Key under which extended JSON representation of an encoded bson value is stored
+BSON_KEY = '$st2_bson'
+
+# Only model classes from this package can be instantiated when decoding
+MODELS_PACKAGE = 'st2common.models.db'
+
+_MODEL_CLASSES = {}
+
+
+def _encode_value(value):
+    if isinstance(value, me.Document):
+        model_cls = value.__class__
+        return {
+            MODEL_KEY: '%s:%s' % (model_cls.__module__, model_cls.__name__),
+            DOCUMENT_KEY: value.to_mongo()
+        }
+
+    if isinstance(value, TraceContext):
+        # Consumers accept trace context both as an object and as a dictionary
+        return vars(value)
+
+    # Handles ObjectId, datetime and other bson types. Raises TypeError for unsupported types.
+    return {BSON_KEY: json_util.default(value)}
+
+
+def _decode_value(value):
+    model_ref = value.get(MODEL_KEY, None)
+
+    if model_ref is not None:
+        model_cls = _get_model_class(model_ref)
+        return model_cls._from_son(value[DOCUMENT_KEY])
+
+    if BSON_KEY in value:
+        return _decode_bson_value(value[BSON_KEY])
+
+    return value
+
+
+def _decode_bson_value(value):
+    # Nested dictionaries (e.g. ObjectId of a DBRef) have already been passed to the object hook
+    # without being converted
+    if isinstance(value, dict):
+        value = dict((key, _decode_bson_value(item)) for key, item in value.items())
+        return json_util.object_hook(value)
+
+    if isinstance(value, list):
+        return [_decode_bson_value(item) for item in value]
+
+    return value
+
+
+def _get_model_class(model_ref):
+    model_cls = _MODEL_CLASSES.get(model_ref, None)
+
+    if model_cls:
+        return model_cls
+
+    module_name, _, class_name = model_ref.partition(':')
+
+    if module_name != MODELS_PACKAGE and not module_name.startswith(MODELS_PACKAGE + '.'):
+        raise ValueError('Model class "%s" is not allowed.' % (model_ref))
+
+    module = importlib.import_module(module_name)
+    model_cls = getattr(module, class_name, None)
+
+    if not isinstance(model_cls, type) or not issubclass(model_cls, me.Document):
+        raise ValueError('"%s" is not a model class.' % (model_ref))
+
+    _MODEL_CLASSES[model_ref] = model_cls
+    return model_cls
+
+
+def json_encode(payload):
+    return json.dumps(payload, default=_encode_value, separators=(',', ':'))
+
+
+def json_decode(data):
+    return json.loads(data, object_hook=_decode_value)
+
+
+def msgpack_encode(payload):
+    return msgpack.packb(payload, default=_encode_value, use_bin_type=True)
+
+
+def msgpack_decode(data):
+    return msgpack.unpackb(data, object_hook=_decode_value, raw=False)
+
+
+def register_serializers():
+    registry.register(SERIALIZER_JSON, json_encode, json_decode,
+                      content_type=JSON_CONTENT_TYPE, content_encoding='utf-8')
+
+    if msgpack:
+        registry.register(SERIALIZER_MSGPACK, msgpack_encode, msgpack_decode,
+                          content_type=MSGPACK_CONTENT_TYPE, content_encoding='binary')
+
+
+register_serializers()
+
+# Content types accepted by all the consumers
+ACCEPT_CONTENT = [SERIALIZER_PICKLE, SERIALIZER_JSON]
+if msgpack:
+    ACCEPT_CONTENT.append(SERIALIZER_MSGPACK)
+
+
+def get_exchange_serializer(exchange_name):
+    """
+    Return name of the serializer configured for the provided exchange.
+
+    :rtype: ``str``
+    """
+    exchange_serializers = cfg.CONF.messaging.exchange_serializers or {}
+    return exchange_serializers.get(exchange_name, cfg.CONF.messaging.serializer)
+
+
+def dumps(payload, serializer=SERIALIZER_PICKLE):
+    """
+    Serialize the provided payload. If the payload can't be serialized using the requested
+    serializer, pickle is used.
+
+    :rtype: ``tuple`` of (content_type, content_encoding, body)
+    """
+    if serializer != SERIALIZER_PICKLE:
+        try:
+            return registry.dumps(payload, serializer=serializer)
+        except (EncodeError, SerializerNotInstalled):
+            LOG.debug('Failed to serialize payload using "%s", falling back to pickle.',
+                      serializer, exc_info=True)
+
+    return registry.dumps(payload, serializer=SERIALIZER_PICKLE)
+
+
+def loads(body, content_type, content_encoding):
+    return registry.loads(body, content_type=content_type, content_encoding=content_encoding,
+                          accept=prepare_accept_content(ACCEPT_CONTENT))
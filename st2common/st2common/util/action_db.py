@@ -23,7 +23,9 @@ from st2common.constants.action import (LIVEACTION_STATUSES)
 from st2common.exceptions.db import StackStormDBObjectNotFoundError
 from st2common.persistence.action import Action
 from st2common.persistence.liveaction import LiveAction
+from st2common.persistence.policy import Policy
 from st2common.persistence.runner import RunnerType
+from st2common.services import resourcecache
 
 LOG = logging.getLogger(__name__)
 
@@ -76,6 +78,16 @@ def get_runnertype_by_name(runnertype_name):
         Get an runnertype by name.
         On error, raise ST2ObjectNotFoundError.
     """
+    cache = resourcecache.get_resource_cache()
+
+    if cache:
+        return cache.get_or_load(resourcecache.RESOURCE_TYPE_RUNNER_TYPE, runnertype_name,
+                                 lambda: _get_runnertype_by_name(runnertype_name))
+
+    return _get_runnertype_by_name(runnertype_name)
+
+
+def _get_runnertype_by_name(runnertype_name):
     try:
         runnertypes = RunnerType.query(name=runnertype_name)
     except (ValueError, ValidationError) as e:
@@ -123,6 +135,16 @@ def get_action_by_ref(ref):
 
     :rtype action: ``object``
     """
+    cache = resourcecache.get_resource_cache()
+
+    if cache:
+        return cache.get_or_load(resourcecache.RESOURCE_TYPE_ACTION, ref,
+                                 lambda: _get_action_by_ref(ref))
+
+    return _get_action_by_ref(ref)
+
+
+def _get_action_by_ref(ref):
     try:
         return Action.get_by_ref(ref)
     except ValueError as e:
@@ -131,6 +153,24 @@ def get_action_by_ref(ref):
         return None
 
 
+def get_policies_by_resource_ref(resource_ref):
+    """
+    Returns the policies which apply to the resource with the provided ref.
+
+    :param resource_ref: Reference to the resource (e.g. action).
+    :type resource_ref: ``str``
+
+    :rtype: ``list`` of :class:`PolicyDB`
+    """
+    cache = resourcecache.get_resource_cache()
+
+    if cache:
+        return cache.get_or_load(resourcecache.RESOURCE_TYPE_POLICY, resource_ref,
+                                 lambda: list(Policy.query(resource_ref=resource_ref)))
+
+    return list(Policy.query(resource_ref=resource_ref))
+
+
 def get_liveaction_by_id(liveaction_id):
     """
         Get LiveAction by id.
@@ -13,17 +13,37 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import base64
+import calendar
+import datetime
+import hashlib
+import hmac
+import json
+
+import bson
+import six
+from oslo_config import cfg
+
 from st2common import log as logging
+from st2common.models.db.auth import TokenDB
 from st2common.persistence.auth import Token
 from st2common.exceptions import auth as exceptions
+from st2common.services import tokencache
 from st2common.util import date as date_utils
 
 __all__ = [
-    'validate_token'
+    'validate_token',
+
+    'is_signed_token',
+    'create_signed_token',
+    'parse_signed_token'
 ]
 
 LOG = logging.getLogger(__name__)
 
+# Separates the payload and the signature of a signed token. Opaque tokens never contain it.
+SIGNED_TOKEN_SEPARATOR = '.'
+
 
 def validate_token(token_in_headers, token_in_query_params):
     """
@@ -49,7 +69,11 @@ def validate_token(token_in_headers, token_in_query_params):
         LOG.audit('Token provided in query parameters')
 
     token_string = token_in_headers or token_in_query_params
-    token = Token.get(token_string)
+
+    if is_signed_token(token_string):
+        token = _get_signed_token(token_string)
+    else:
+        token = _get_opaque_token(token_string)
 
     if token.expiry <= date_utils.get_datetime_utc_now():
         # TODO: purge expired tokens
@@ -58,3 +82,106 @@ def validate_token(token_in_headers, token_in_query_params):
 
     LOG.audit('Token with id "%s" is validated.' % (token.id))
     return token
+
+
+def is_signed_token(token_string):
+    return SIGNED_TOKEN_SEPARATOR in token_string
+
+
+def create_signed_token(username, expiry, key, metadata=None):
+    """
+    Create a signed token which carries the user, expiry and metadata so it can be validated
+    without a database lookup.
+
+    Note: Expiry is stored with a second precision.
+
+    :param key: Secret key used to sign the token.
+    :type key: ``str``
+
+    :return: TokenDB object which is not stored in the database.
+    :rtype: :class:`.TokenDB`
+    """
+    payload = {
+        'id': str(bson.ObjectId()),
+        'user': username,
+        'expiry': calendar.timegm(expiry.utctimetuple()),
+        'metadata': metadata or {}
+    }
+
+    encoded_payload = _b64encode(json.dumps(payload, sort_keys=True, separators=(',', ':')))
+    signature = _b64encode(_get_signature(encoded_payload, key))
+    token_string = SIGNED_TOKEN_SEPARATOR.join([encoded_payload, signature])
+
+    return _get_token_db(payload=payload, token_string=token_string)
+
+
+def parse_signed_token(token_string, key):
+    """
+    Verify signature of the provided signed token and return the token.
+
+    Note: Expiry and revocation are not checked.
+
+    :rtype: :class:`.TokenDB`
+    """
+    try:
+        # Valid token only contains ASCII characters (base64)
+        encoded_payload, signature = str(token_string).split(SIGNED_TOKEN_SEPARATOR)
+        signature = _b64decode(signature)
+    except (ValueError, TypeError, UnicodeError):
+        raise exceptions.TokenNotFoundError('Token is malformed.')
+
+    if not hmac.compare_digest(signature, _get_signature(encoded_payload, key)):
+        raise exceptions.TokenNotFoundError('Token signature is invalid.')
+
+    try:
+        payload = json.loads(_b64decode(encoded_payload))
+        return _get_token_db(payload=payload, token_string=token_string)
+    except (ValueError, TypeError, KeyError):
+        raise exceptions.TokenNotFoundError('Token is malformed.')
+
+
+def _get_signed_token(token_string):
+    key = cfg.CONF.auth.token_signing_key
+
+    if not key:
+        LOG.audit('Signed token was provided but signed tokens are not enabled.')
+        raise exceptions.TokenNotFoundError('Signed tokens are not enabled.')
+
+    token = parse_signed_token(token_string=token_string, key=key)
+
+    if tokencache.is_token_revoked(str(token.id)):
+        LOG.audit('Token with id "%s" has been revoked.' % (token.id))
+        raise exceptions.TokenNotFoundError('Token has been revoked.')
+
+    return token
+
+
+def _get_opaque_token(token_string):
+    cache = tokencache.get_token_cache()
+
+    if not cache:
+        return Token.get(token_string)
+
+    return cache.get_or_load_token(token_string, lambda: Token.get(token_string))
+
+
+def _get_token_db(payload, token_string):
+    expiry = datetime.datetime.utcfromtimestamp(payload['expiry'])
+
+    return TokenDB(id=payload['id'], user=payload['user'], token=token_string,
+                   expiry=date_utils.add_utc_tz(expiry), metadata=payload['metadata'])
+
+
+def _get_signature(encoded_payload, key):
+    if isinstance(key, six.text_type):
+        key = key.encode('utf-8')
+
+    return hmac.new(key, encoded_payload, hashlib.sha256).digest()
+
+
+def _b64encode(value):
+    return base64.urlsafe_b64encode(value).rstrip('=')
+
+
+def _b64decode(value):
+    return base64.urlsafe_b64decode(str(value) + '=' * (-len(value) % 4))
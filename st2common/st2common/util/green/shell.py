@@ -23,15 +23,21 @@ import six
 import eventlet
 from eventlet.green import subprocess
 
+from st2common.util.output_capture import OutputCapture
+
 __all__ = [
     'run_command'
 ]
 
 TIMEOUT_EXIT_CODE = -9
 
+# Maximum number of bytes read at once from the process output
+READ_CHUNK_SIZE = 4096
+
 
 def run_command(cmd, stdin=None, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=False,
-                cwd=None, env=None, timeout=60, preexec_func=None, kill_func=None):
+                cwd=None, env=None, timeout=60, preexec_func=None, kill_func=None,
+                stdout_capture=None, stderr_capture=None):
     """
     Run the provided command in a subprocess and wait until it completes.
 
@@ -67,6 +73,13 @@ def run_command(cmd, stdin=None, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
                       If not provided, it defaults to `process.kill`
     :type kill_func: ``callable``
 
+    :param stdout_capture: Optional capture which process stdout is streamed into as it's
+                           produced. If provided, returned stdout is the capture value.
+    :type stdout_capture: :class:`st2common.util.output_capture.OutputCapture`
+
+    :param stderr_capture: Optional capture which process stderr is streamed into as it's
+                           produced. If provided, returned stderr is the capture value.
+    :type stderr_capture: :class:`st2common.util.output_capture.OutputCapture`
 
     :rtype: ``tuple`` (exit_code, stdout, stderr, timed_out)
     """
@@ -96,7 +109,13 @@ def run_command(cmd, stdin=None, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
                 process.kill()
 
     timeout_thread = eventlet.spawn(on_timeout_expired, timeout)
-    stdout, stderr = process.communicate()
+
+    if stdout_capture or stderr_capture:
+        stdout, stderr = _stream_output(process=process, stdout_capture=stdout_capture,
+                                        stderr_capture=stderr_capture)
+    else:
+        stdout, stderr = process.communicate()
+
     timeout_thread.cancel()
     exit_code = process.returncode
 
@@ -106,3 +125,48 @@ def run_command(cmd, stdin=None, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
         timed_out = False
 
     return (exit_code, stdout, stderr, timed_out)
+
+
+def _stream_output(process, stdout_capture=None, stderr_capture=None):
+    """
+    Stream process output into the provided captures (instead of buffering the whole output in
+    memory with process.communicate()) and wait for the process to exit.
+
+    :rtype: ``tuple`` (stdout, stderr)
+    """
+    if process.stdin:
+        process.stdin.close()
+
+    # Note: Both the streams need to be read concurrently, otherwise the process could block
+    # writing to a full pipe which is not being read
+    stdout_capture = stdout_capture or OutputCapture(output_type='stdout')
+    stderr_capture = stderr_capture or OutputCapture(output_type='stderr')
+
+    readers = []
+    for stream, capture in [(process.stdout, stdout_capture), (process.stderr, stderr_capture)]:
+        if stream:
+            readers.append(eventlet.spawn(_read_stream, stream, capture))
+
+    for reader in readers:
+        reader.wait()
+
+    process.wait()
+
+    stdout = stdout_capture.getvalue() if process.stdout else None
+    stderr = stderr_capture.getvalue() if process.stderr else None
+    return stdout, stderr
+
+
+def _read_stream(stream, capture):
+    while True:
+        # Note: readline is used so a chunk doesn't end in the middle of a line unless the line
+        # is longer than the chunk size
+        data = stream.readline(READ_CHUNK_SIZE)
+
+        if not data:
+            break
+
+        capture.write(data)
+
+    capture.flush()
+    stream.close()
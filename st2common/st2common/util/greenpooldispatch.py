@@ -13,39 +13,102 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+
 import eventlet
-import Queue
+from eventlet.semaphore import Semaphore
+
+from st2common import log as logging
+
+__all__ = [
+    'BufferedDispatcher'
+]
+
+LOG = logging.getLogger(__name__)
 
 
 class BufferedDispatcher(object):
+    """
+    Dispatches work to a bounded green thread pool.
+
+    Work which is dispatched while all the pool slots are busy is buffered and picked up as soon
+    as a slot is released - the green thread which releases the slot dispatches the next item
+    from the buffer so there is no polling involved.
 
-    def __init__(self, dispatch_pool_size=50, monitor_thread_empty_q_sleep_time=5,
-                 monitor_thread_no_workers_sleep_time=1):
+    Callers which want to apply backpressure instead of buffering can block on
+    :meth:`wait_for_free_slot` before dispatching.
+    """
+
+    def __init__(self, dispatch_pool_size=50, monitor_thread_empty_q_sleep_time=None,
+                 monitor_thread_no_workers_sleep_time=None):
+        """
+        :param dispatch_pool_size: Maximum number of concurrently running handlers.
+        :type dispatch_pool_size: ``int``
+
+        Note: monitor_thread_* arguments are not used anymore and are only accepted for
+        backward compatibility.
+        """
         self._pool_limit = dispatch_pool_size
         self._dispatcher_pool = eventlet.GreenPool(dispatch_pool_size)
-        self._dispatch_monitor_thread = eventlet.greenthread.spawn(self._flush)
-        self._monitor_thread_empty_q_sleep_time = monitor_thread_empty_q_sleep_time
-        self._monitor_thread_no_workers_sleep_time = monitor_thread_no_workers_sleep_time
-        self._work_buffer = Queue.Queue()
+        self._work_buffer = collections.deque()
+
+        # Each running handler holds one slot. Slot is handed over to the next buffered item
+        # when the handler finishes and only released if the buffer is empty.
+        self._slots = Semaphore(dispatch_pool_size)
+        self._shutdown = False
+
+    @property
+    def pool_size(self):
+        return self._pool_limit
+
+    def free(self):
+        """
+        Return number of slots available for dispatching work without buffering it.
+
+        :rtype: ``int``
+        """
+        return max(self._slots.balance, 0)
+
+    def buffered(self):
+        """
+        Return number of items waiting in the buffer for a free slot.
+
+        :rtype: ``int``
+        """
+        return len(self._work_buffer)
+
+    def wait_for_free_slot(self):
+        """
+        Block the calling green thread until a slot is available.
+        """
+        self._slots.acquire()
+        self._slots.release()
 
     def dispatch(self, handler, *args):
-        self._work_buffer.put((handler, args), block=True, timeout=1)
-        self._flush_now()
+        if self._shutdown:
+            raise RuntimeError('Dispatcher has been shut down.')
+
+        if self._slots.acquire(blocking=False):
+            self._spawn(handler, args)
+        else:
+            self._work_buffer.append((handler, args))
 
     def shutdown(self):
-        self._dispatch_monitor_thread.kill()
-
-    def _flush(self):
-        while True:
-            while self._work_buffer.empty():
-                eventlet.greenthread.sleep(self._monitor_thread_empty_q_sleep_time)
-            while self._dispatcher_pool.free() <= 0:
-                eventlet.greenthread.sleep(self._monitor_thread_no_workers_sleep_time)
-            self._flush_now()
-
-    def _flush_now(self):
-        if self._dispatcher_pool.free() <= 0:
-            return
-        while not self._work_buffer.empty() and self._dispatcher_pool.free() > 0:
-            (handler, args) = self._work_buffer.get_nowait()
-            self._dispatcher_pool.spawn(handler, *args)
+        self._shutdown = True
+
+        if self._work_buffer:
+            LOG.warning('Shutting down dispatcher with %s buffered item(s).',
+                        len(self._work_buffer))
+            self._work_buffer.clear()
+
+    def _spawn(self, handler, args):
+        thread = self._dispatcher_pool.spawn(handler, *args)
+        # Linked after the pool's own callback so the pool slot is already free when called
+        thread.link(self._on_handler_done)
+
+    def _on_handler_done(self, thread):
+        if self._work_buffer and not self._shutdown:
+            (handler, args) = self._work_buffer.popleft()
+            self._spawn(handler, args)
+        else:
+            self._slots.release()
@@ -0,0 +1,87 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Simple in-process histogram with fixed buckets.
+"""
+
+import bisect
+
+__all__ = [
+    'Histogram',
+
+    'DEFAULT_LATENCY_BUCKETS'
+]
+
+# Upper bounds (in milliseconds) of the default latency buckets
+DEFAULT_LATENCY_BUCKETS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class Histogram(object):
+    """
+    Histogram which counts observed values in buckets with fixed upper bounds. Values larger
+    than the last bound are counted in an overflow bucket.
+    """
+
+    def __init__(self, buckets=None):
+        """
+        :param buckets: Sorted list of bucket upper bounds (inclusive).
+        :type buckets: ``list``
+        """
+        self.buckets = list(buckets or DEFAULT_LATENCY_BUCKETS)
+
+        if self.buckets != sorted(self.buckets):
+            raise ValueError('Bucket bounds need to be sorted.')
+
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0
+        self._max = None
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        self._counts[index] += 1
+        self._count += 1
+        self._sum += value
+
+        if self._max is None or value > self._max:
+            self._max = value
+
+    def reset(self):
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0
+        self._max = None
+
+    def get_stats(self):
+        """
+        :return: Dictionary with number of observed values, their sum, maximum and a list of
+                 (bucket upper bound, count) tuples. Upper bound of the overflow bucket is None.
+        :rtype: ``dict``
+        """
+        return {
+            'count': self._count,
+            'sum': self._sum,
+            'max': self._max,
+            'buckets': list(zip(self.buckets + [None], self._counts))
+        }
+
+    def __str__(self):
+        buckets = ', '.join(['<=%s: %s' % (bound, count) if bound is not None else
+                             '>%s: %s' % (self.buckets[-1], count)
+                             for bound, count in zip(self.buckets + [None], self._counts)
+                             if count])
+        return 'Histogram(count=%s, sum=%s, max=%s, buckets=[%s])' % (
+            self._count, self._sum, self._max, buckets)
@@ -13,12 +13,42 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
 import json
 import jinja2
 import six
 import re
 
 import semver
+from jinja2 import meta
+
+from st2common.util.lru import LRUCache
+
+__all__ = [
+    'CustomFilters',
+
+    'get_jinja_environment',
+    'get_shared_jinja_environment',
+    'get_compiled_template',
+    'get_template',
+    'get_template_cache_stats',
+    'render_values'
+]
+
+# Maximum number of compiled templates which are kept in the process-wide cache
+TEMPLATE_CACHE_SIZE = 5000
+
+# Longer template strings are not cached (those are usually parameter values, not templates)
+TEMPLATE_CACHE_MAX_KEY_LENGTH = 4096
+
+# Compiled template and names of the (undeclared) variables referenced by the template
+CompiledTemplate = collections.namedtuple('CompiledTemplate', ['template', 'variables'])
+
+# Maps allow_undefined flag -> shared jinja2.Environment
+_ENVIRONMENTS = {}
+
+# Maps (allow_undefined, template source) -> CompiledTemplate
+_TEMPLATE_CACHE = LRUCache(max_size=TEMPLATE_CACHE_SIZE)
 
 
 class CustomFilters(object):
@@ -124,6 +154,80 @@ def get_jinja_environment(allow_undefined=False):
     return env
 
 
+def get_shared_jinja_environment(allow_undefined=False):
+    '''
+    Process-wide jinja2.Environment for the provided undefined mode. Same setup as
+    get_jinja_environment, but the environment is only created once and shouldn't be modified by
+    the caller.
+
+    :param allow_undefined: If should allow undefined variables in templates
+    :type allow_undefined: ``bool``
+    '''
+    env = _ENVIRONMENTS.get(allow_undefined, None)
+
+    if not env:
+        env = get_jinja_environment(allow_undefined=allow_undefined)
+        _ENVIRONMENTS[allow_undefined] = env
+
+    return env
+
+
+def get_compiled_template(value, allow_undefined=False):
+    '''
+    Return compiled template for the provided template string. Compiled templates are stored in a
+    process-wide LRU cache keyed by the template source so each template is only parsed once.
+
+    Only strings which contain the template markers and are at most TEMPLATE_CACHE_MAX_KEY_LENGTH
+    characters long are cached. Other strings are usually plain (and possibly large or secret)
+    parameter values which shouldn't be kept in memory.
+
+    :param value: Template string.
+    :type value: ``str``
+
+    :rtype: :class:`CompiledTemplate`
+    '''
+    env = get_shared_jinja_environment(allow_undefined=allow_undefined)
+    cacheable = _is_cacheable(env=env, value=value)
+    key = (allow_undefined, value)
+    compiled = _TEMPLATE_CACHE.get(key, None) if cacheable else None
+
+    if not compiled:
+        template_ast = env.parse(value)
+        compiled = CompiledTemplate(template=env.from_string(template_ast),
+                                    variables=meta.find_undeclared_variables(template_ast))
+
+        if cacheable:
+            _TEMPLATE_CACHE.set(key, compiled)
+
+    return compiled
+
+
+def get_template(value, allow_undefined=False):
+    '''
+    Return (cached) jinja2.Template object for the provided template string.
+
+    :rtype: :class:`jinja2.Template`
+    '''
+    return get_compiled_template(value, allow_undefined=allow_undefined).template
+
+
+def get_template_cache_stats():
+    '''
+    Return hit / miss counters and size of the compiled template cache.
+
+    :rtype: ``dict``
+    '''
+    return _TEMPLATE_CACHE.get_stats()
+
+
+def _is_cacheable(env, value):
+    if len(value) > TEMPLATE_CACHE_MAX_KEY_LENGTH:
+        return False
+
+    markers = [env.variable_start_string, env.block_start_string, env.comment_start_string]
+    return any(marker in value for marker in markers)
+
+
 def render_values(mapping=None, context=None, allow_undefined=False):
     """
     Render an incoming mapping using context provided in context using Jinja2. Returns a dict
@@ -141,7 +245,6 @@ def render_values(mapping=None, context=None, allow_undefined=False):
     if not context or not mapping:
         return mapping
 
-    env = get_jinja_environment(allow_undefined=allow_undefined)
     rendered_mapping = {}
     for k, v in six.iteritems(mapping):
         # jinja2 works with string so transform list and dict to strings.
@@ -151,7 +254,7 @@ def render_values(mapping=None, context=None, allow_undefined=False):
             reverse_json_dumps = True
         else:
             v = str(v)
-        rendered_v = env.from_string(v).render(context)
+        rendered_v = get_template(v, allow_undefined=allow_undefined).render(context)
         # no change therefore no templatization so pick params from original to retain
         # original type
         if rendered_v == v:
@@ -0,0 +1,108 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Simple in-process LRU cache.
+"""
+
+import collections
+
+__all__ = [
+    'LRUCache'
+]
+
+# Marker for a missing value (None can be cached)
+_MISSING = object()
+
+
+class LRUCache(object):
+    """
+    Dictionary-like cache with a bounded size. Once the cache is full, the least recently used
+    item is evicted.
+
+    Operations don't yield so the cache can be shared between green threads without locking.
+    """
+
+    def __init__(self, max_size=1000):
+        """
+        :param max_size: Maximum number of cached items.
+        :type max_size: ``int``
+        """
+        if max_size < 1:
+            raise ValueError('max_size needs to be at least 1.')
+
+        self.max_size = max_size
+
+        self._items = collections.OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        try:
+            value = self._items.pop(key)
+        except KeyError:
+            self._misses += 1
+            return default
+
+        # Re-inserted item becomes the most recently used one
+        self._items[key] = value
+        self._hits += 1
+        return value
+
+    def set(self, key, value):
+        self._items.pop(key, None)
+        self._items[key] = value
+
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+            self._evictions += 1
+
+    def get_or_set(self, key, value_func):
+        """
+        Return cached value for the provided key. If the key is not cached, value is created
+        using value_func(key) and stored.
+        """
+        value = self.get(key, _MISSING)
+
+        if value is _MISSING:
+            value = value_func(key)
+            self.set(key, value)
+
+        return value
+
+    def delete(self, key):
+        self._items.pop(key, None)
+
+    def clear(self):
+        self._items.clear()
+
+    def get_stats(self):
+        """
+        :rtype: ``dict``
+        """
+        return {
+            'size': len(self._items),
+            'max_size': self.max_size,
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions
+        }
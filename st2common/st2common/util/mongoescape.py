@@ -13,8 +13,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import copy
+from collections import OrderedDict
+
 import six
+from bson.son import SON
 
 # http://docs.mongodb.org/manual/faq/developers/#faq-dollar-sign-escaping
 UNESCAPED = ['.', '$']
@@ -30,49 +32,103 @@ RULE_CRITERIA_ESCAPE_TRANSLATION = dict(zip(RULE_CRITERIA_UNESCAPED,
 RULE_CRITERIA_UNESCAPE_TRANSLATION = dict(zip(RULE_CRITERIA_ESCAPED,
                                               RULE_CRITERIA_UNESCAPED))
 
+# (character, replacement) pairs used by escape_chars and unescape_chars
+_ESCAPE_PAIRS = list(ESCAPE_TRANSLATION.items())
+_UNESCAPE_PAIRS = (list(UNESCAPE_TRANSLATION.items()) +
+                   list(RULE_CRITERIA_UNESCAPE_TRANSLATION.items()))
 
-def _prep_work_items(d):
-    return [(k, v, d) for k, v in six.iteritems(d)]
 
+def _translate_key(key, pairs):
+    if not isinstance(key, six.string_types):
+        return key
 
-def _translate_chars(field, translation):
-    # Only translate the fields of a dict
-    if not isinstance(field, dict):
-        return field
+    for char, replacement in pairs:
+        if char in key:
+            key = key.replace(char, replacement)
+
+    return key
 
-    work_items = _prep_work_items(field)
 
-    while len(work_items) > 0:
-        work_item = work_items.pop(0)
-        oldkey = work_item[0]
-        value = work_item[1]
-        work_field = work_item[2]
-        newkey = oldkey
+def _translate_dict(field, pairs):
+    """
+    Return a dict with the keys translated (recursively).
 
-        for t_k, t_v in six.iteritems(translation):
-            newkey = newkey.replace(t_k, t_v)
+    The value is rebuilt in a single pass without copying it first. Dicts and lists which don't
+    contain any key that needs to be translated are not copied, the original object is returned
+    instead.
+    """
+    changes = None
 
-        if newkey != oldkey:
-            work_field[newkey] = value
-            del work_field[oldkey]
+    for key, value in six.iteritems(field):
+        new_key = _translate_key(key, pairs)
 
         if isinstance(value, dict):
-            work_items.extend(_prep_work_items(value))
+            new_value = _translate_dict(value, pairs)
         elif isinstance(value, list):
-            for item in value:
-                if isinstance(item, dict):
-                    work_items.extend(_prep_work_items(item))
+            new_value = _translate_list(value, pairs)
+        else:
+            new_value = value
+
+        if new_key is not key or new_value is not value:
+            if changes is None:
+                changes = []
+            changes.append((key, new_key, new_value))
+
+    if changes is None:
+        return field
+
+    if isinstance(field, (SON, OrderedDict)):
+        result = field.__class__(field)
+    else:
+        result = dict(field)
+
+    for key, new_key, new_value in changes:
+        if new_key is not key:
+            del result[key]
+        result[new_key] = new_value
+
+    return result
+
 
-    return field
+def _translate_list(field, pairs):
+    # Note: Only the dicts which are list items are translated (lists nested directly in a list
+    # are not traversed)
+    result = None
+
+    for index, item in enumerate(field):
+        if not isinstance(item, dict):
+            continue
+
+        new_item = _translate_dict(item, pairs)
+
+        if new_item is not item:
+            if result is None:
+                result = list(field)
+            result[index] = new_item
+
+    return field if result is None else result
+
+
+def _translate_chars(field, pairs):
+    # Only translate the fields of a dict
+    if not isinstance(field, dict):
+        return field
+
+    return _translate_dict(field, pairs)
 
 
 def escape_chars(field):
-    value = copy.deepcopy(field)
-    return _translate_chars(value, ESCAPE_TRANSLATION)
+    """
+    Escape the characters which are not allowed in the MongoDB keys.
+
+    Note: Provided value is not modified, parts of the value which don't need to be escaped are
+    shared with the returned value.
+    """
+    return _translate_chars(field, _ESCAPE_PAIRS)
 
 
 def unescape_chars(field):
-    value = copy.deepcopy(field)
-    translated = _translate_chars(value, UNESCAPE_TRANSLATION)
-    translated = _translate_chars(value, RULE_CRITERIA_UNESCAPE_TRANSLATION)
-    return translated
+    """
+    Reverse of escape_chars (including the characters used by the old rule criteria escaping).
+    """
+    return _translate_chars(field, _UNESCAPE_PAIRS)
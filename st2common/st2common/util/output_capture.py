@@ -0,0 +1,168 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Bounded-memory capture of the output (stdout, stderr) produced by an action.
+"""
+
+import codecs
+import tempfile
+
+import eventlet
+import six
+from eventlet.semaphore import Semaphore
+
+from st2common import log as logging
+
+__all__ = [
+    'OutputCapture'
+]
+
+LOG = logging.getLogger(__name__)
+
+# Output above this size is spilled from memory to a temporary file
+DEFAULT_MAX_MEMORY_SIZE = 1024 * 1024
+
+# Pending output is passed to the chunk handler once it reaches this size...
+CHUNK_FLUSH_SIZE = 64 * 1024
+
+# ...or at most this many seconds after it has been written (so the output of a process which
+# writes a line and goes quiet can be tailed)
+CHUNK_FLUSH_INTERVAL = 1
+
+
+class OutputCapture(object):
+    """
+    Captures output written in chunks as it's produced.
+
+    Up to max_memory_size bytes of the output are kept in memory, the rest is spilled to a
+    temporary file. If a chunk handler is provided, output is also passed to the handler in
+    chunks as it arrives (e.g. so it can be persisted and tailed while the action is running).
+    """
+
+    def __init__(self, output_type='stdout', max_memory_size=DEFAULT_MAX_MEMORY_SIZE,
+                 max_result_size=None, chunk_handler=None):
+        """
+        :param output_type: Type of the captured output (stdout, stderr).
+        :type output_type: ``str``
+
+        :param max_memory_size: Maximum number of bytes kept in memory.
+        :type max_memory_size: ``int``
+
+        :param max_result_size: Maximum number of bytes returned by getvalue(). None means the
+                                whole output is returned.
+        :type max_result_size: ``int``
+
+        :param chunk_handler: Optional function which is called with (output_type, data) for each
+                              chunk of the output.
+        :type chunk_handler: ``callable``
+        """
+        self.output_type = output_type
+        self.size = 0
+
+        self._max_result_size = max_result_size
+        self._chunk_handler = chunk_handler
+        self._file = tempfile.SpooledTemporaryFile(max_size=max_memory_size)
+
+        self._pending = []
+        self._pending_size = 0
+        self._flush_timer = None
+
+        # Chunks are decoded incrementally so a character split between two chunks is preserved
+        self._decoder = codecs.getincrementaldecoder('utf-8')('replace')
+
+        # Chunks are passed to the handler one at a time and in order
+        self._flush_lock = Semaphore(1)
+
+    @property
+    def truncated(self):
+        """
+        True if getvalue() doesn't return the whole output.
+        """
+        return self._max_result_size is not None and self.size > self._max_result_size
+
+    def write(self, data):
+        if not data:
+            return
+
+        if isinstance(data, six.text_type):
+            data = data.encode('utf-8')
+
+        self._file.write(data)
+        self.size += len(data)
+
+        if not self._chunk_handler:
+            return
+
+        self._pending.append(data)
+        self._pending_size += len(data)
+
+        if self._pending_size >= CHUNK_FLUSH_SIZE:
+            self.flush()
+        elif not self._flush_timer:
+            self._flush_timer = eventlet.spawn_after(CHUNK_FLUSH_INTERVAL, self._flush_on_timer)
+
+    def flush(self, final=False):
+        """
+        Pass pending output to the chunk handler.
+
+        :param final: True if no more output will be written (incomplete character at the end of
+                      the output is passed to the handler as a replacement character).
+        :type final: ``bool``
+        """
+        if self._flush_timer:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+        if not self._chunk_handler:
+            return
+
+        with self._flush_lock:
+            data = self._decoder.decode(''.join(self._pending), final)
+            self._pending = []
+            self._pending_size = 0
+
+            if not data:
+                return
+
+            try:
+                self._chunk_handler(self.output_type, data)
+            except Exception:
+                # Failing to store a chunk shouldn't fail the action
+                LOG.exception('Failed to handle %s output chunk.', self.output_type)
+
+    def _flush_on_timer(self):
+        self._flush_timer = None
+        self.flush()
+
+    def getvalue(self):
+        """
+        Return captured output. If the output is longer than max_result_size bytes, only the
+        last max_result_size bytes are returned (end of the output usually includes the errors
+        and the result).
+
+        :rtype: ``unicode``
+        """
+        if self.truncated:
+            self._file.seek(-self._max_result_size, 2)
+        else:
+            self._file.seek(0)
+
+        data = self._file.read()
+        return data.decode('utf-8', 'replace')
+
+    def close(self):
+        self.flush(final=True)
+        self._file.close()
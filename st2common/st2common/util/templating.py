@@ -14,17 +14,31 @@
 # limitations under the License.
 
 import six
-from jinja2 import Environment, StrictUndefined
 
 from st2common.constants.system import SYSTEM_KV_PREFIX
 from st2common.services.keyvalues import KeyValueLookup
+from st2common.util import jinja as jinja_utils
 
 __all__ = [
+    'get_system_context',
+
     'render_template',
     'render_template_with_system_context'
 ]
 
 
+def get_system_context():
+    """
+    Return a default template context with the datastore (system) lookup.
+
+    :rtype: ``dict``
+    """
+    context = {
+        SYSTEM_KV_PREFIX: KeyValueLookup(),
+    }
+    return context
+
+
 def render_template(value, context=None):
     """
     Render provided template with the provided context.
@@ -38,8 +52,7 @@ def render_template(value, context=None):
     assert isinstance(value, six.string_types)
     context = context or {}
 
-    env = Environment(undefined=StrictUndefined)
-    template = env.from_string(value)
+    template = jinja_utils.get_template(value)
     rendered = template.render(context)
 
     return rendered
@@ -55,9 +68,7 @@ def render_template_with_system_context(value):
     :param context: Template context.
     :type context: ``dict``
     """
-    context = {
-        SYSTEM_KV_PREFIX: KeyValueLookup(),
-    }
+    context = get_system_context()
 
     rendered = render_template(value=value, context=context)
     return rendered
@@ -21,7 +21,7 @@ from st2tests.base import DbTestCase
 from st2common.util import isotime
 from st2common.util import date as date_utils
 from st2common.exceptions.auth import TokenNotFoundError
-from st2common.persistence.auth import Token
+from st2common.persistence.auth import Token, TokenRevocation
 from st2common.services import access
 import st2tests.config as tests_config
 
@@ -82,3 +82,27 @@ class AccessServiceTest(DbTestCase):
         self.assertTrue(token.token is not None)
         self.assertEqual(token.user, USERNAME)
         self.assertLess(isotime.parse(token.expiry), expected_expiry)
+
+    def test_create_signed_token(self):
+        cfg.CONF.set_override(name='token_type', override='signed', group='auth')
+        cfg.CONF.set_override(name='token_signing_key', override='secret', group='auth')
+        self.addCleanup(cfg.CONF.clear_override, name='token_type', group='auth')
+        self.addCleanup(cfg.CONF.clear_override, name='token_signing_key', group='auth')
+
+        token = access.create_token(USERNAME)
+        self.assertEqual(token.user, USERNAME)
+
+        # Signed tokens are not stored
+        self.assertRaises(TokenNotFoundError, Token.get, token.token)
+
+        access.delete_token(token.token)
+        self.assertTrue(TokenRevocation.is_revoked(str(token.id)))
+
+        # Revoking a token twice is a no-op
+        access.delete_token(token.token)
+
+    def test_create_signed_token_without_key(self):
+        cfg.CONF.set_override(name='token_type', override='signed', group='auth')
+        self.addCleanup(cfg.CONF.clear_override, name='token_type', group='auth')
+
+        self.assertRaises(ValueError, access.create_token, USERNAME)
@@ -0,0 +1,142 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mock
+import unittest2
+
+from st2common.services.caching import CacheWatcher
+from st2common.services.caching import TTLCache
+
+
+class MockCacheWatcher(CacheWatcher):
+    def __init__(self, cache, handlers=None, refresh_interval=None):
+        super(MockCacheWatcher, self).__init__(cache=cache, queues=[], handlers=handlers or {},
+                                               refresh_interval=refresh_interval)
+        self.refresh = mock.Mock()
+        self.cache = None
+
+    def _set_cache(self, cache):
+        self.cache = cache
+
+
+class TTLCacheTestCase(unittest2.TestCase):
+    @mock.patch('time.time')
+    def test_get_or_load(self, mock_time):
+        mock_time.return_value = 1000
+        cache = TTLCache(ttl=60, max_size=10)
+        load_func = mock.Mock(return_value='v1')
+
+        for _ in range(3):
+            self.assertEqual(cache.get_or_load('k1', load_func), 'v1')
+
+        self.assertEqual(load_func.call_count, 1)
+
+        mock_time.return_value = 1061
+        self.assertEqual(cache.get('k1'), (False, None))
+
+        cache.get_or_load('k1', load_func)
+        cache.invalidate('k1')
+        cache.get_or_load('k1', load_func)
+        self.assertEqual(load_func.call_count, 3)
+
+        stats = cache.get_stats()
+        self.assertEqual(stats['misses'], 3)
+        self.assertEqual(stats['expirations'], 1)
+        self.assertEqual(stats['invalidations'], 1)
+
+    def test_value_loaded_before_invalidation_is_not_cached(self):
+        cache = TTLCache(ttl=60, max_size=10)
+
+        def load_func():
+            cache.clear()
+            return 'v1'
+
+        self.assertEqual(cache.get_or_load('k1', load_func), 'v1')
+        self.assertEqual(cache.get('k1'), (False, None))
+
+    @mock.patch('time.time', mock.Mock(return_value=1000))
+    def test_set_expire_timestamp(self):
+        cache = TTLCache(ttl=60, max_size=10)
+        cache.set('k1', 'v1', expire_timestamp=1010)
+        cache.set('k2', 'v2', expire_timestamp=2000)
+
+        with mock.patch('time.time', mock.Mock(return_value=1011)):
+            self.assertEqual(cache.get('k1'), (False, None))
+            self.assertEqual(cache.get('k2'), (True, 'v2'))
+
+
+class CacheWatcherTestCase(unittest2.TestCase):
+    def test_process_task(self):
+        handler = mock.Mock()
+        watcher = MockCacheWatcher(cache=TTLCache(ttl=60, max_size=10),
+                                   handlers={'st2.exchange': handler})
+
+        for exchange in ['st2.exchange', 'st2.other']:
+            message = mock.Mock()
+            message.delivery_info = {'exchange': exchange}
+            watcher.process_task({'name': 'k1'}, message)
+            self.assertEqual(message.ack.call_count, 1)
+
+        handler.assert_called_once_with({'name': 'k1'})
+
+        # Message is acknowledged even if the handler fails
+        handler.side_effect = Exception('Boom!')
+        message = mock.Mock()
+        message.delivery_info = {'exchange': 'st2.exchange'}
+        watcher.process_task({'name': 'k1'}, message)
+        self.assertEqual(message.ack.call_count, 1)
+
+    def test_cache_is_only_used_while_connected(self):
+        cache = TTLCache(ttl=60, max_size=10)
+        cache.set('k1', 'v1')
+        watcher = MockCacheWatcher(cache=cache)
+
+        # Events published before the queues are bound are lost
+        watcher.on_consume_ready(connection=None, channel=None, consumers=[])
+        self.assertEqual(watcher.cache, cache)
+        self.assertEqual(cache.get('k1'), (False, None))
+        self.assertEqual(watcher.refresh.call_count, 1)
+
+        watcher.on_connection_revived()
+        self.assertIsNone(watcher.cache)
+
+        watcher.on_consume_ready(connection=None, channel=None, consumers=[])
+        watcher.on_connection_error(exc=Exception('Boom!'), interval=1)
+        self.assertIsNone(watcher.cache)
+
+    @mock.patch('time.time')
+    def test_refresh(self, mock_time):
+        mock_time.return_value = 1000
+        watcher = MockCacheWatcher(cache=TTLCache(ttl=60, max_size=10), refresh_interval=30)
+        watcher.on_consume_ready(connection=None, channel=None, consumers=[])
+
+        mock_time.return_value = 1029
+        watcher.on_iteration()
+        self.assertEqual(watcher.refresh.call_count, 1)
+
+        mock_time.return_value = 1030
+        watcher.on_iteration()
+        self.assertEqual(watcher.refresh.call_count, 2)
+
+        # Cache is disabled until the next successful refresh
+        watcher.refresh.side_effect = Exception('Boom!')
+        mock_time.return_value = 1060
+        watcher.on_iteration()
+        self.assertIsNone(watcher.cache)
+
+        watcher.refresh.side_effect = None
+        mock_time.return_value = 1090
+        watcher.on_iteration()
+        self.assertIsNotNone(watcher.cache)
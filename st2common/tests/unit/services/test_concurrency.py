@@ -0,0 +1,114 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from st2common.constants import action as action_constants
+from st2common.models.db.liveaction import LiveActionDB
+from st2common.persistence.liveaction import LiveAction
+from st2common.persistence.policy import ConcurrencySlot
+from st2common.services import concurrency as concurrency_service
+from st2tests import CleanDbTestCase
+
+POLICY_REF = 'wolfpack.action-1.concurrency'
+ACTION_REF = 'wolfpack.action-1'
+
+
+class ConcurrencyServiceTestCase(CleanDbTestCase):
+    def _create_liveaction(self, status, parameters=None):
+        liveaction_db = LiveActionDB(action=ACTION_REF, status=status,
+                                     parameters=parameters or {})
+        liveaction_db = LiveAction.add_or_update(liveaction_db, publish=False)
+        return str(liveaction_db.id)
+
+    def _ensure_slots(self, attributes=None):
+        slot_key = concurrency_service.get_slot_key(policy_ref=POLICY_REF, action_ref=ACTION_REF,
+                                                    attributes=attributes)
+        concurrency_service.ensure_slots(slot_key=slot_key, policy_ref=POLICY_REF,
+                                         action_ref=ACTION_REF, attributes=attributes)
+        return slot_key
+
+    def _get_slots(self, slot_key):
+        return ConcurrencySlot.query(key=slot_key).first()
+
+    def test_get_slot_key_doesnt_depend_on_attributes_order(self):
+        key1 = concurrency_service.get_slot_key(POLICY_REF, ACTION_REF, {'a': 1, 'b': 2})
+        key2 = concurrency_service.get_slot_key(POLICY_REF, ACTION_REF, {'b': 2, 'a': 1})
+        key3 = concurrency_service.get_slot_key(POLICY_REF, ACTION_REF, {'a': 2, 'b': 2})
+
+        self.assertEqual(key1, key2)
+        self.assertNotEqual(key1, key3)
+
+    def test_ensure_slots_reconciles_new_slots(self):
+        running_id = self._create_liveaction(action_constants.LIVEACTION_STATUS_RUNNING)
+        delayed_id = self._create_liveaction(action_constants.LIVEACTION_STATUS_DELAYED)
+        self._create_liveaction(action_constants.LIVEACTION_STATUS_SUCCEEDED)
+
+        slot_key = self._ensure_slots()
+        slots_db = self._get_slots(slot_key)
+
+        self.assertEqual(slots_db.holders, [running_id])
+        self.assertEqual(slots_db.delayed, [delayed_id])
+
+    def test_acquire_and_release_slot(self):
+        slot_key = self._ensure_slots()
+
+        self.assertTrue(concurrency_service.acquire_slot(slot_key, 'a', 2))
+        self.assertTrue(concurrency_service.acquire_slot(slot_key, 'b', 2))
+        self.assertFalse(concurrency_service.acquire_slot(slot_key, 'c', 2))
+
+        # Acquiring a slot which is already held succeeds
+        self.assertTrue(concurrency_service.acquire_slot(slot_key, 'a', 2))
+        self.assertEqual(self._get_slots(slot_key).holders, ['a', 'b'])
+
+        concurrency_service.release_slot(slot_key, 'a')
+        concurrency_service.release_slot(slot_key, 'a')
+        self.assertTrue(concurrency_service.acquire_slot(slot_key, 'c', 2))
+        self.assertEqual(self._get_slots(slot_key).holders, ['b', 'c'])
+
+    def test_acquire_slot_zero_threshold(self):
+        slot_key = self._ensure_slots()
+        self.assertFalse(concurrency_service.acquire_slot(slot_key, 'a', 0))
+
+    def test_delayed_queue_is_fifo(self):
+        slot_key = self._ensure_slots()
+        concurrency_service.acquire_slot(slot_key, 'a', 1)
+
+        concurrency_service.delay(slot_key, 'b')
+        concurrency_service.delay(slot_key, 'c')
+        concurrency_service.delay(slot_key, 'b')
+        self.assertEqual(self._get_slots(slot_key).delayed, ['b', 'c'])
+
+        # No slot is available
+        self.assertEqual(concurrency_service.acquire_slot_for_delayed(slot_key, 1), None)
+
+        concurrency_service.release_slot(slot_key, 'a')
+        self.assertEqual(concurrency_service.acquire_slot_for_delayed(slot_key, 1), 'b')
+
+        slots_db = self._get_slots(slot_key)
+        self.assertEqual(slots_db.holders, ['b'])
+        self.assertEqual(slots_db.delayed, ['c'])
+
+    def test_reconcile_slots(self):
+        running_id = self._create_liveaction(action_constants.LIVEACTION_STATUS_RUNNING,
+                                             parameters={'actionstr': 'foo'})
+        slot_key = self._ensure_slots(attributes={'actionstr': 'foo'})
+        unused_slot_key = self._ensure_slots(attributes={'actionstr': 'bar'})
+
+        # Slot which was never released is freed
+        concurrency_service.acquire_slot(slot_key, 'lost', 2)
+        self.assertEqual(self._get_slots(slot_key).holders, [running_id, 'lost'])
+
+        self.assertEqual(concurrency_service.reconcile_slots(), 2)
+        self.assertEqual(self._get_slots(slot_key).holders, [running_id])
+        self.assertEqual(self._get_slots(unused_slot_key), None)
@@ -0,0 +1,88 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import eventlet
+import mock
+import unittest2
+
+from st2common.constants.action import COMPLETED_STATES
+from st2common.constants.action import LIVEACTION_STATUS_RUNNING
+from st2common.constants.action import LIVEACTION_STATUS_SUCCEEDED
+from st2common.models.db.liveaction import LiveActionDB
+from st2common.services import liveaction_watcher
+from st2common.services.liveaction_watcher import LiveActionStatusWatcher
+
+LIVEACTION_ID = '5614cfa4c4da5f5c2a5a2d81'
+
+
+class LiveActionStatusWatcherTestCase(unittest2.TestCase):
+    def _get_liveaction(self, status):
+        return LiveActionDB(id=LIVEACTION_ID, action='core.local', status=status)
+
+    def test_queue_is_only_bound_to_completed_states(self):
+        watcher = LiveActionStatusWatcher()
+        routing_keys = [b.routing_key for b in watcher._watch_q.bindings]
+        self.assertItemsEqual(routing_keys, COMPLETED_STATES)
+
+    @mock.patch.object(liveaction_watcher.action_utils, 'get_liveaction_by_id')
+    def test_wait_for_status_already_completed(self, get_liveaction_by_id):
+        get_liveaction_by_id.return_value = self._get_liveaction(LIVEACTION_STATUS_SUCCEEDED)
+
+        watcher = LiveActionStatusWatcher()
+        liveaction_db = watcher.wait_for_status(liveaction_id=LIVEACTION_ID,
+                                                statuses=[LIVEACTION_STATUS_SUCCEEDED],
+                                                poll_interval=60)
+        self.assertEqual(liveaction_db.status, LIVEACTION_STATUS_SUCCEEDED)
+        self.assertEqual(get_liveaction_by_id.call_count, 1)
+        self.assertEqual(watcher._waiters, {})
+
+    @mock.patch.object(liveaction_watcher.action_utils, 'get_liveaction_by_id')
+    def test_wait_for_status_notification(self, get_liveaction_by_id):
+        get_liveaction_by_id.side_effect = [self._get_liveaction(LIVEACTION_STATUS_RUNNING),
+                                            self._get_liveaction(LIVEACTION_STATUS_SUCCEEDED)]
+
+        watcher = LiveActionStatusWatcher()
+        thread = eventlet.spawn(watcher.wait_for_status, liveaction_id=LIVEACTION_ID,
+                                statuses=[LIVEACTION_STATUS_SUCCEEDED], poll_interval=60)
+        eventlet.sleep(0)
+
+        # Notifications about other statuses and other live actions don't wake up the waiter
+        for liveaction_id, status in [(LIVEACTION_ID, LIVEACTION_STATUS_RUNNING),
+                                      ('5614cfa4c4da5f5c2a5a2d82', LIVEACTION_STATUS_SUCCEEDED)]:
+            watcher.process_task(LiveActionDB(id=liveaction_id, status=status), mock.Mock())
+            eventlet.sleep(0)
+            self.assertEqual(get_liveaction_by_id.call_count, 1)
+
+        message = mock.Mock()
+        watcher.process_task(self._get_liveaction(LIVEACTION_STATUS_SUCCEEDED), message)
+        self.assertEqual(message.ack.call_count, 1)
+
+        liveaction_db = thread.wait()
+        self.assertEqual(liveaction_db.status, LIVEACTION_STATUS_SUCCEEDED)
+        self.assertEqual(get_liveaction_by_id.call_count, 2)
+        self.assertEqual(watcher._waiters, {})
+
+    @mock.patch.object(liveaction_watcher.action_utils, 'get_liveaction_by_id')
+    def test_wait_for_status_poll_fallback(self, get_liveaction_by_id):
+        get_liveaction_by_id.side_effect = [self._get_liveaction(LIVEACTION_STATUS_RUNNING),
+                                            self._get_liveaction(LIVEACTION_STATUS_RUNNING),
+                                            self._get_liveaction(LIVEACTION_STATUS_SUCCEEDED)]
+
+        watcher = LiveActionStatusWatcher()
+        liveaction_db = watcher.wait_for_status(liveaction_id=LIVEACTION_ID,
+                                                statuses=[LIVEACTION_STATUS_SUCCEEDED],
+                                                poll_interval=0.01)
+        self.assertEqual(liveaction_db.status, LIVEACTION_STATUS_SUCCEEDED)
+        self.assertEqual(get_liveaction_by_id.call_count, 3)
@@ -0,0 +1,166 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mock
+import unittest2
+
+from st2common.models.db.action import ActionDB
+from st2common.models.db.policy import PolicyDB
+from st2common.models.db.runner import RunnerTypeDB
+from st2common.persistence.action import Action
+from st2common.persistence.policy import Policy
+from st2common.services import resourcecache
+from st2common.services.resourcecache import RESOURCE_TYPE_ACTION
+from st2common.services.resourcecache import RESOURCE_TYPE_POLICY
+from st2common.services.resourcecache import RESOURCE_TYPE_RUNNER_TYPE
+from st2common.services.resourcecache import ResourceCache
+from st2common.services.resourcecache import ResourceCacheWatcher
+from st2common.transport import action as action_transport
+from st2common.transport import policy as policy_transport
+from st2common.util import action_db as action_utils
+
+ACTION_DB = ActionDB(pack='core', name='local', runner_type={'name': 'run-local'})
+
+
+class ResourceCacheTestCase(unittest2.TestCase):
+    def test_get_or_load(self):
+        cache = ResourceCache(ttl=60, max_size=10)
+        load_func = mock.Mock(return_value=ACTION_DB)
+
+        for _ in range(3):
+            value = cache.get_or_load(RESOURCE_TYPE_ACTION, 'core.local', load_func)
+            self.assertEqual(value, ACTION_DB)
+
+        self.assertEqual(load_func.call_count, 1)
+
+        # Missing objects are cached as well
+        load_func = mock.Mock(return_value=None)
+        cache.get_or_load(RESOURCE_TYPE_ACTION, 'core.missing', load_func)
+        cache.get_or_load(RESOURCE_TYPE_ACTION, 'core.missing', load_func)
+        self.assertEqual(load_func.call_count, 1)
+
+        stats = cache.get_stats()[RESOURCE_TYPE_ACTION]
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['hits'], 3)
+        self.assertEqual(stats['misses'], 2)
+
+    def test_get_or_load_exception_is_not_cached(self):
+        cache = ResourceCache(ttl=60, max_size=10)
+        load_func = mock.Mock(side_effect=ValueError('not found'))
+
+        self.assertRaises(ValueError, cache.get_or_load, RESOURCE_TYPE_RUNNER_TYPE, 'foo',
+                          load_func)
+        self.assertRaises(ValueError, cache.get_or_load, RESOURCE_TYPE_RUNNER_TYPE, 'foo',
+                          load_func)
+        self.assertEqual(load_func.call_count, 2)
+
+    @mock.patch('time.time')
+    def test_ttl(self, mock_time):
+        mock_time.return_value = 1000
+        cache = ResourceCache(ttl=60, max_size=10)
+        cache.set(RESOURCE_TYPE_ACTION, 'core.local', ACTION_DB)
+
+        mock_time.return_value = 1059
+        self.assertEqual(cache.get(RESOURCE_TYPE_ACTION, 'core.local'), (True, ACTION_DB))
+
+        mock_time.return_value = 1061
+        self.assertEqual(cache.get(RESOURCE_TYPE_ACTION, 'core.local'), (False, None))
+        self.assertEqual(cache.get_stats()[RESOURCE_TYPE_ACTION]['expirations'], 1)
+
+    def test_invalidate(self):
+        cache = ResourceCache(ttl=60, max_size=10)
+        cache.set(RESOURCE_TYPE_ACTION, 'core.local', ACTION_DB)
+        cache.set(RESOURCE_TYPE_ACTION, 'core.remote', ACTION_DB)
+        cache.set(RESOURCE_TYPE_POLICY, 'core.local', [])
+
+        cache.invalidate(RESOURCE_TYPE_ACTION, 'core.local')
+        self.assertEqual(cache.get(RESOURCE_TYPE_ACTION, 'core.local'), (False, None))
+        self.assertEqual(cache.get(RESOURCE_TYPE_ACTION, 'core.remote'), (True, ACTION_DB))
+
+        cache.invalidate(RESOURCE_TYPE_ACTION)
+        self.assertEqual(cache.get(RESOURCE_TYPE_ACTION, 'core.remote'), (False, None))
+        self.assertEqual(cache.get(RESOURCE_TYPE_POLICY, 'core.local'), (True, []))
+
+    def test_invalidate_during_load(self):
+        cache = ResourceCache(ttl=60, max_size=10)
+
+        def load_func():
+            # Object changes while it's being retrieved
+            cache.invalidate(RESOURCE_TYPE_ACTION, 'core.local')
+            return ACTION_DB
+
+        self.assertEqual(cache.get_or_load(RESOURCE_TYPE_ACTION, 'core.local', load_func),
+                         ACTION_DB)
+        self.assertEqual(cache.get(RESOURCE_TYPE_ACTION, 'core.local'), (False, None))
+
+
+class ResourceCacheWatcherTestCase(unittest2.TestCase):
+    def _get_message(self, exchange):
+        message = mock.Mock()
+        message.delivery_info = {'exchange': exchange.name}
+        return message
+
+    def test_process_task(self):
+        cache = ResourceCache(ttl=60, max_size=10)
+        cache.set(RESOURCE_TYPE_ACTION, 'core.local', ACTION_DB)
+        cache.set(RESOURCE_TYPE_RUNNER_TYPE, 'run-local', RunnerTypeDB(name='run-local'))
+        cache.set(RESOURCE_TYPE_POLICY, 'core.local', [])
+
+        watcher = ResourceCacheWatcher(cache=cache)
+
+        message = self._get_message(action_transport.ACTION_CUD_XCHG)
+        watcher.process_task(ACTION_DB, message)
+        self.assertEqual(message.ack.call_count, 1)
+        self.assertEqual(cache.get(RESOURCE_TYPE_ACTION, 'core.local'), (False, None))
+
+        message = self._get_message(action_transport.RUNNER_TYPE_CUD_XCHG)
+        watcher.process_task(RunnerTypeDB(name='run-local'), message)
+        self.assertEqual(cache.get(RESOURCE_TYPE_RUNNER_TYPE, 'run-local'), (False, None))
+
+        message = self._get_message(policy_transport.POLICY_CUD_XCHG)
+        watcher.process_task(PolicyDB(pack='core', name='p1', resource_ref='core.remote'), message)
+        self.assertEqual(cache.get(RESOURCE_TYPE_POLICY, 'core.local'), (False, None))
+
+
+class CachedLookupsTestCase(unittest2.TestCase):
+    def setUp(self):
+        super(CachedLookupsTestCase, self).setUp()
+        resourcecache._set_resource_cache(ResourceCache(ttl=60, max_size=10))
+
+    def tearDown(self):
+        super(CachedLookupsTestCase, self).tearDown()
+        resourcecache._set_resource_cache(None)
+
+    @mock.patch.object(Action, 'get_by_ref', mock.MagicMock(return_value=ACTION_DB))
+    def test_get_action_by_ref(self):
+        for _ in range(3):
+            self.assertEqual(action_utils.get_action_by_ref('core.local'), ACTION_DB)
+
+        self.assertEqual(Action.get_by_ref.call_count, 1)
+
+    @mock.patch.object(Policy, 'query', mock.MagicMock(return_value=[]))
+    def test_get_policies_by_resource_ref(self):
+        for _ in range(3):
+            self.assertEqual(action_utils.get_policies_by_resource_ref('core.local'), [])
+
+        self.assertEqual(Policy.query.call_count, 1)
+
+    @mock.patch.object(Action, 'get_by_ref', mock.MagicMock(return_value=ACTION_DB))
+    def test_cache_not_used_without_watcher(self):
+        resourcecache._set_resource_cache(None)
+
+        action_utils.get_action_by_ref('core.local')
+        action_utils.get_action_by_ref('core.local')
+        self.assertEqual(Action.get_by_ref.call_count, 2)
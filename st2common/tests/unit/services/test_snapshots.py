@@ -0,0 +1,134 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+
+import mock
+import unittest2
+
+from st2common.constants.secrets import MASKED_ATTRIBUTE_VALUE
+from st2common.models.api.execution import ActionExecutionAPI
+from st2common.models.db.execution import ActionExecutionDB
+from st2common.models.db.execution import ExecutionResourceSnapshotDB
+from st2common.persistence.execution import ActionExecution
+from st2common.services import snapshots as snapshot_service
+from st2tests.base import DbTestCase
+import st2tests.config as tests_config
+tests_config.parse_args()
+
+
+ACTION = {
+    'id': '5614cfa4c4da5f5c2a5a2d81',
+    'uid': 'action:core:local',
+    'ref': 'core.local',
+    'name': 'local',
+    'pack': 'core',
+    'runner_type': 'run-local',
+    'description': 'Action that executes an arbitrary Linux command on the localhost.',
+    'parameters': {
+        'cmd': {'type': 'string', 'required': True},
+        'password': {'type': 'string', 'secret': True}
+    }
+}
+
+RUNNER = {
+    'id': '5614cfa4c4da5f5c2a5a2d82',
+    'uid': 'runner_type:run-local',
+    'name': 'run-local',
+    'description': 'A runner to execute local actions as a fixed user.',
+    'runner_module': 'st2actions.runners.localrunner',
+    'runner_parameters': {
+        'sudo': {'type': 'boolean', 'default': False}
+    }
+}
+
+
+class SnapshotReferenceTestCase(unittest2.TestCase):
+    def setUp(self):
+        super(SnapshotReferenceTestCase, self).setUp()
+        snapshot_service._SNAPSHOT_CACHE = None
+
+    @mock.patch.object(snapshot_service.ExecutionResourceSnapshot, 'insert')
+    def test_reference_contains_filter_attributes_and_secrets(self, mock_insert):
+        reference = snapshot_service.get_snapshot_reference(resource_type='action', data=ACTION)
+
+        self.assertEqual(mock_insert.call_count, 1)
+        self.assertEqual(reference['ref'], 'core.local')
+        self.assertEqual(reference['uid'], 'action:core:local')
+        self.assertEqual(reference['pack'], 'core')
+        self.assertEqual(reference['parameters'], {'password': {'secret': True}})
+        self.assertNotIn('description', reference)
+        self.assertTrue(snapshot_service.is_snapshot_reference(reference))
+
+    @mock.patch.object(snapshot_service.ExecutionResourceSnapshot, 'insert')
+    def test_snapshot_is_stored_once(self, mock_insert):
+        reference1 = snapshot_service.get_snapshot_reference(resource_type='runner', data=RUNNER)
+        reference2 = snapshot_service.get_snapshot_reference(resource_type='runner',
+                                                             data=copy.deepcopy(RUNNER))
+        self.assertEqual(reference1, reference2)
+        self.assertEqual(mock_insert.call_count, 1)
+
+        # Different version of the resource is a different snapshot
+        runner = copy.deepcopy(RUNNER)
+        runner['description'] = 'Updated.'
+        reference3 = snapshot_service.get_snapshot_reference(resource_type='runner', data=runner)
+        self.assertNotEqual(reference1['snapshot'], reference3['snapshot'])
+        self.assertEqual(mock_insert.call_count, 2)
+
+    @mock.patch.object(snapshot_service.ExecutionResourceSnapshot, 'query')
+    @mock.patch.object(snapshot_service.ExecutionResourceSnapshot, 'insert')
+    def test_hydrate_execution_doc_uses_cache(self, mock_insert, mock_query):
+        doc = snapshot_service.get_snapshot_references({'action': ACTION, 'runner': RUNNER,
+                                                        'status': 'succeeded'})
+        self.assertNotEqual(doc['action'], ACTION)
+
+        doc = snapshot_service.hydrate_execution_doc(doc)
+        self.assertEqual(doc['action'], ACTION)
+        self.assertEqual(doc['runner'], RUNNER)
+        self.assertEqual(doc['status'], 'succeeded')
+        self.assertEqual(mock_query.call_count, 0)
+
+
+class SnapshotServiceTestCase(DbTestCase):
+    def setUp(self):
+        super(SnapshotServiceTestCase, self).setUp()
+        snapshot_service._SNAPSHOT_CACHE = None
+
+    def test_execution_with_references(self):
+        attrs = snapshot_service.get_snapshot_references({'action': ACTION, 'runner': RUNNER})
+        self.assertEqual(len(ExecutionResourceSnapshotDB.objects()), 2)
+
+        execution_db = ActionExecution.add_or_update(ActionExecutionDB(
+            action=attrs['action'], runner=attrs['runner'], liveaction={'id': 'abcd'},
+            status='succeeded', parameters={'cmd': 'uname', 'password': 'secret'}))
+
+        # Executions can still be filtered by the resource attributes
+        self.assertEqual(len(ActionExecution.query(action__ref='core.local')), 1)
+
+        # Snapshots are retrieved from the database if they are not cached
+        snapshot_service._SNAPSHOT_CACHE = None
+        execution_api = ActionExecutionAPI.from_model(execution_db, mask_secrets=True)
+        self.assertEqual(execution_api.action, ACTION)
+        self.assertEqual(execution_api.runner, RUNNER)
+        self.assertEqual(execution_api.parameters['cmd'], 'uname')
+        self.assertEqual(execution_api.parameters['password'], MASKED_ATTRIBUTE_VALUE)
+
+    def test_existing_snapshot_is_reused(self):
+        snapshot_service.get_snapshot_reference(resource_type='action', data=ACTION)
+
+        # Other process which doesn't have the snapshot cached
+        snapshot_service._SNAPSHOT_CACHE = None
+        snapshot_service.get_snapshot_reference(resource_type='action', data=ACTION)
+        self.assertEqual(len(ExecutionResourceSnapshotDB.objects()), 1)
@@ -0,0 +1,234 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+
+import mock
+import unittest2
+
+from st2common.exceptions.auth import TokenNotFoundError
+from st2common.models.db.auth import TokenDB, TokenRevocationDB
+from st2common.persistence.auth import Token, TokenRevocation
+from st2common.services import tokencache
+from st2common.services.tokencache import TokenCache
+from st2common.services.tokencache import TokenCacheWatcher
+from st2common.transport import auth as auth_transport
+from st2common.util import auth as auth_utils
+from st2common.util import date as date_utils
+import st2tests.config as tests_config
+
+TOKEN_DB = TokenDB(user='stanley', token='abcd',
+                   expiry=date_utils.get_datetime_utc_now() + datetime.timedelta(hours=1))
+
+
+class TokenCacheTestCase(unittest2.TestCase):
+    def test_get_or_load_token(self):
+        cache = TokenCache(ttl=60, max_size=10)
+        load_func = mock.Mock(return_value=TOKEN_DB)
+
+        for _ in range(3):
+            self.assertEqual(cache.get_or_load_token('abcd', load_func), TOKEN_DB)
+
+        self.assertEqual(load_func.call_count, 1)
+
+        # Tokens which don't exist are not cached
+        load_func = mock.Mock(side_effect=TokenNotFoundError())
+        self.assertRaises(TokenNotFoundError, cache.get_or_load_token, 'efgh', load_func)
+        self.assertRaises(TokenNotFoundError, cache.get_or_load_token, 'efgh', load_func)
+        self.assertEqual(load_func.call_count, 2)
+
+    def test_get_or_load_token_cache_disabled(self):
+        cache = TokenCache(ttl=60, max_size=0)
+        load_func = mock.Mock(return_value=TOKEN_DB)
+
+        cache.get_or_load_token('abcd', load_func)
+        cache.get_or_load_token('abcd', load_func)
+        self.assertEqual(load_func.call_count, 2)
+        self.assertEqual(cache.get_stats()['tokens'], None)
+
+    @mock.patch('time.time')
+    def test_ttl(self, mock_time):
+        mock_time.return_value = 1000
+        cache = TokenCache(ttl=60, max_size=10)
+        load_func = mock.Mock(return_value=TOKEN_DB)
+
+        cache.get_or_load_token('abcd', load_func)
+        mock_time.return_value = 1059
+        cache.get_or_load_token('abcd', load_func)
+        self.assertEqual(load_func.call_count, 1)
+
+        mock_time.return_value = 1061
+        cache.get_or_load_token('abcd', load_func)
+        self.assertEqual(load_func.call_count, 2)
+
+    def test_invalidate_during_load(self):
+        cache = TokenCache(ttl=60, max_size=10)
+
+        def load_func():
+            # Token is deleted while it's being retrieved
+            cache.invalidate_token('abcd')
+            return TOKEN_DB
+
+        cache.get_or_load_token('abcd', load_func)
+        load_func = mock.Mock(return_value=TOKEN_DB)
+        cache.get_or_load_token('abcd', load_func)
+        self.assertEqual(load_func.call_count, 1)
+
+    def test_revocations(self):
+        cache = TokenCache(ttl=60, max_size=10)
+        now = date_utils.get_datetime_utc_now()
+
+        cache.revoke('a', now - datetime.timedelta(seconds=1))
+        cache.revoke('b', now + datetime.timedelta(hours=1))
+        self.assertTrue(cache.is_revoked('a'))
+        self.assertTrue(cache.is_revoked('b'))
+        self.assertFalse(cache.is_revoked('c'))
+
+        # Revocations of the expired tokens are not needed anymore
+        cache.remove_expired_revocations()
+        self.assertFalse(cache.is_revoked('a'))
+        self.assertTrue(cache.is_revoked('b'))
+
+
+class TokenCacheWatcherTestCase(unittest2.TestCase):
+    def tearDown(self):
+        super(TokenCacheWatcherTestCase, self).tearDown()
+        tokencache._set_token_cache(None)
+
+    def _get_message(self, exchange):
+        message = mock.Mock()
+        message.delivery_info = {'exchange': exchange.name}
+        return message
+
+    def test_process_task(self):
+        cache = TokenCache(ttl=60, max_size=10)
+        cache.get_or_load_token('abcd', mock.Mock(return_value=TOKEN_DB))
+        watcher = TokenCacheWatcher(cache=cache)
+
+        message = self._get_message(auth_transport.TOKEN_CUD_XCHG)
+        watcher.process_task(TOKEN_DB, message)
+        self.assertEqual(message.ack.call_count, 1)
+
+        load_func = mock.Mock(return_value=TOKEN_DB)
+        cache.get_or_load_token('abcd', load_func)
+        self.assertEqual(load_func.call_count, 1)
+
+        message = self._get_message(auth_transport.TOKEN_REVOCATION_CUD_XCHG)
+        revocation_db = TokenRevocationDB(token_id='a', expiry=TOKEN_DB.expiry)
+        watcher.process_task(revocation_db, message)
+        self.assertTrue(cache.is_revoked('a'))
+
+    @mock.patch.object(TokenRevocation, 'query')
+    def test_cache_is_enabled_once_revocations_are_loaded(self, mock_query):
+        mock_query.return_value = [TokenRevocationDB(token_id='a', expiry=TOKEN_DB.expiry)]
+        cache = TokenCache(ttl=60, max_size=10)
+        watcher = TokenCacheWatcher(cache=cache)
+
+        # Revocations are loaded once the queues have been declared and bound
+        self.assertIsNone(tokencache.get_token_cache())
+        watcher.on_consume_ready(connection=None, channel=None, consumers=[])
+        self.assertEqual(tokencache.get_token_cache(), cache)
+        self.assertTrue(cache.is_revoked('a'))
+
+        # Revocation events published while the watcher is disconnected are lost
+        watcher.on_connection_revived()
+        self.assertIsNone(tokencache.get_token_cache())
+
+        mock_query.return_value = [TokenRevocationDB(token_id='b', expiry=TOKEN_DB.expiry)]
+        watcher.on_consume_ready(connection=None, channel=None, consumers=[])
+        self.assertEqual(tokencache.get_token_cache(), cache)
+        self.assertFalse(cache.is_revoked('a'))
+        self.assertTrue(cache.is_revoked('b'))
+
+        watcher.on_connection_error(exc=Exception('Boom!'), interval=1)
+        self.assertIsNone(tokencache.get_token_cache())
+
+    @mock.patch('time.time')
+    @mock.patch.object(TokenRevocation, 'query')
+    def test_revocations_are_refreshed(self, mock_query, mock_time):
+        mock_time.return_value = 1000
+        mock_query.return_value = []
+        cache = TokenCache(ttl=60, max_size=10)
+        watcher = TokenCacheWatcher(cache=cache)
+        watcher.on_consume_ready(connection=None, channel=None, consumers=[])
+
+        # Revocation event has been lost
+        mock_query.return_value = [TokenRevocationDB(token_id='a', expiry=TOKEN_DB.expiry)]
+        mock_time.return_value = 1059
+        watcher.on_iteration()
+        self.assertFalse(cache.is_revoked('a'))
+
+        mock_time.return_value = 1060
+        watcher.on_iteration()
+        self.assertTrue(cache.is_revoked('a'))
+        self.assertEqual(mock_query.call_count, 2)
+
+        # Tokens are validated using the database if the revocations can't be loaded
+        mock_query.side_effect = Exception('Boom!')
+        mock_time.return_value = 1120
+        watcher.on_iteration()
+        self.assertIsNone(tokencache.get_token_cache())
+
+
+class ValidateTokenTestCase(unittest2.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super(ValidateTokenTestCase, cls).setUpClass()
+        tests_config.parse_args()
+
+    def setUp(self):
+        super(ValidateTokenTestCase, self).setUp()
+        tokencache._set_token_cache(TokenCache(ttl=60, max_size=10))
+
+    def tearDown(self):
+        super(ValidateTokenTestCase, self).tearDown()
+        tokencache._set_token_cache(None)
+
+    @mock.patch.object(Token, 'get', mock.MagicMock(return_value=TOKEN_DB))
+    def test_opaque_token_is_cached(self):
+        for _ in range(3):
+            token_db = auth_utils.validate_token(token_in_headers='abcd',
+                                                 token_in_query_params=None)
+            self.assertEqual(token_db, TOKEN_DB)
+
+        self.assertEqual(Token.get.call_count, 1)
+
+    @mock.patch.object(Token, 'get', mock.MagicMock(return_value=TOKEN_DB))
+    def test_cache_not_used_without_watcher(self):
+        tokencache._set_token_cache(None)
+
+        auth_utils.validate_token(token_in_headers='abcd', token_in_query_params=None)
+        auth_utils.validate_token(token_in_headers='abcd', token_in_query_params=None)
+        self.assertEqual(Token.get.call_count, 2)
+
+    @mock.patch.object(TokenRevocation, 'is_revoked', mock.MagicMock(return_value=False))
+    def test_revoked_signed_token(self):
+        tests_config.CONF.set_override(name='token_signing_key', override='secret', group='auth')
+        self.addCleanup(tests_config.CONF.clear_override, name='token_signing_key',
+                        group='auth')
+
+        token_db = auth_utils.create_signed_token(username='stanley', expiry=TOKEN_DB.expiry,
+                                                  key='secret')
+
+        result = auth_utils.validate_token(token_in_headers=token_db.token,
+                                           token_in_query_params=None)
+        self.assertEqual(result.user, 'stanley')
+
+        tokencache.get_token_cache().revoke(str(token_db.id), token_db.expiry)
+        self.assertRaises(TokenNotFoundError, auth_utils.validate_token,
+                          token_in_headers=token_db.token, token_in_query_params=None)
+
+        # Revocations are only looked up in the database if the cache is not used
+        self.assertEqual(TokenRevocation.is_revoked.call_count, 0)
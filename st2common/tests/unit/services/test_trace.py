@@ -301,6 +301,70 @@ class TestTraceService(DbTestCase):
 
         Trace.delete(retrieved_trace_db)
 
+    def test_add_or_update_given_trace_contexts(self):
+        trace_contexts = [
+            {'id_': str(self.trace_empty.id)},
+            {'trace_tag': 'awesome_bulk_test_trace'},
+            {'id_': str(bson.ObjectId())}
+        ]
+        trigger_instances = [['trigger_instance_1'], ['trigger_instance_2'], ['trigger_instance_3']]
+
+        pre_add_or_update_traces = len(Trace.get_all())
+        trace_dbs = trace_service.add_or_update_given_trace_contexts(
+            trace_contexts=trace_contexts, trigger_instances=trigger_instances)
+        post_add_or_update_traces = len(Trace.get_all())
+
+        self.assertEqual(post_add_or_update_traces, pre_add_or_update_traces + 1,
+                         'Expected new Trace to be created.')
+        self.assertEqual(len(trace_dbs), 3)
+        self.assertEqual(trace_dbs[0].id, self.trace_empty.id)
+        self.assertEqual(trace_dbs[2], None, 'Expected no Trace for an unknown id.')
+
+        retrieved_trace_db = Trace.get_by_id(self.trace_empty.id)
+        self.assertEqual(len(retrieved_trace_db.trigger_instances), 1,
+                         'Expected updated trigger_instances.')
+        self.assertEqual(retrieved_trace_db.trigger_instances[0].object_id, 'trigger_instance_1',
+                         'Expected updated trigger_instances.')
+        Trace.delete(retrieved_trace_db)
+        Trace.add_or_update(self.trace_empty)
+
+        retrieved_trace_db = Trace.get_by_id(trace_dbs[1].id)
+        self.assertEqual(retrieved_trace_db.trace_tag, 'awesome_bulk_test_trace')
+        self.assertEqual(len(retrieved_trace_db.trigger_instances), 1,
+                         'Expected updated trigger_instances.')
+        self.assertEqual(retrieved_trace_db.trigger_instances[0].object_id, 'trigger_instance_2',
+                         'Expected updated trigger_instances.')
+        Trace.delete(retrieved_trace_db)
+
+    def test_trace_components_batch(self):
+        to_save = copy.copy(self.trace_empty)
+        to_save.id = None
+        saved = trace_service.add_or_update_given_trace_db(to_save)
+
+        trace_batch = trace_service.TraceComponentsBatch()
+        trace_batch.add(saved, rules=['rule_1'])
+        trace_batch.add(saved, rules=['rule_2'], action_executions=['action_execution_1'])
+        self.assertEqual(len(trace_batch), 1)
+
+        retrieved_trace_db = Trace.get_by_id(saved.id)
+        self.assertEqual(len(retrieved_trace_db.rules), 0, 'Expected no update before commit.')
+
+        self.assertEqual(trace_batch.commit(), 1)
+        self.assertEqual(len(trace_batch), 0)
+
+        retrieved_trace_db = Trace.get_by_id(saved.id)
+        self.assertEqual([rule.object_id for rule in retrieved_trace_db.rules],
+                         ['rule_1', 'rule_2'], 'Expected updated rules.')
+        self.assertEqual(len(retrieved_trace_db.action_executions), 1,
+                         'Expected updated action_executions.')
+
+        Trace.delete(retrieved_trace_db)
+
+    def test_trace_components_batch_fail(self):
+        trace_batch = trace_service.TraceComponentsBatch()
+        self.assertRaises(ValueError, trace_batch.add, None)
+        self.assertEqual(trace_batch.commit(), 0)
+
 
 class TestTraceContext(TestCase):
 
@@ -15,7 +15,10 @@
 
 import unittest
 
+import mock
+
 from st2common.transport.connection_retry_wrapper import ClusterRetryContext
+from st2common.transport.connection_retry_wrapper import ConnectionRetryWrapper
 
 
 class TestClusterRetryContext(unittest.TestCase):
@@ -59,3 +62,29 @@ class TestClusterRetryContext(unittest.TestCase):
         should_stop, wait = retry_context.test_should_stop()
         self.assertTrue(should_stop, 'Done trying.')
         self.assertEqual(wait, -1)
+
+
+class TestConnectionRetryWrapper(unittest.TestCase):
+
+    def test_run_opens_and_closes_channel(self):
+        connection = mock.Mock()
+        callback = mock.Mock()
+
+        retry_wrapper = ConnectionRetryWrapper(cluster_size=1, logger=mock.Mock())
+        retry_wrapper.run(connection=connection, wrapped_callback=callback)
+
+        callback.assert_called_once_with(connection=connection,
+                                         channel=connection.channel.return_value)
+        connection.channel.return_value.close.assert_called_once_with()
+
+    def test_run_reuse_channel(self):
+        connection = mock.Mock()
+        callback = mock.Mock()
+
+        retry_wrapper = ConnectionRetryWrapper(cluster_size=1, logger=mock.Mock())
+        retry_wrapper.run(connection=connection, wrapped_callback=callback, reuse_channel=True)
+
+        callback.assert_called_once_with(connection=connection,
+                                         channel=connection.default_channel)
+        self.assertFalse(connection.channel.called)
+        self.assertFalse(connection.default_channel.close.called)
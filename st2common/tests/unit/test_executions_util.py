@@ -14,15 +14,18 @@
 # limitations under the License.
 
 import six
+from oslo_config import cfg
 
 from st2common.constants import action as action_constants
 from st2common.models.api.action import RunnerTypeAPI, ActionAPI, LiveActionAPI
 from st2common.models.api.trigger import TriggerTypeAPI, TriggerAPI, TriggerInstanceAPI
 from st2common.models.api.rule import RuleAPI
+from st2common.models.api.execution import ActionExecutionAPI
 from st2common.persistence.liveaction import LiveAction
 from st2common.persistence.runner import RunnerType
 from st2common.persistence.execution import ActionExecution
 import st2common.services.executions as executions_util
+from st2common.services import snapshots as snapshot_service
 import st2common.util.action_db as action_utils
 
 from st2tests.base import CleanDbTestCase
@@ -108,6 +111,28 @@ class ExecutionsUtilTestCase(CleanDbTestCase):
         liveaction = LiveAction.get_by_id(str(liveaction.id))
         self.assertEquals(execution.liveaction['id'], str(liveaction.id))
 
+    def test_execution_creation_snapshots_by_reference(self):
+        cfg.CONF.set_override('store_snapshots_by_reference', True, group='execution')
+
+        try:
+            liveaction = self.MODELS['liveactions']['liveaction1.yaml']
+            executions_util.create_execution_object(liveaction)
+        finally:
+            cfg.CONF.clear_override('store_snapshots_by_reference', group='execution')
+
+        execution = self._get_action_execution(liveaction__id=str(liveaction.id),
+                                               raise_exception=True)
+        action = action_utils.get_action_by_ref('core.local')
+        runner = RunnerType.get_by_name(action.runner_type['name'])
+        self.assertTrue(snapshot_service.is_snapshot_reference(execution.action))
+        self.assertTrue(snapshot_service.is_snapshot_reference(execution.runner))
+        self.assertEqual(execution.action['ref'], 'core.local')
+        self.assertEqual(execution.runner['name'], runner.name)
+
+        execution_api = ActionExecutionAPI.from_model(execution)
+        self.assertDictEqual(execution_api.action, vars(ActionAPI.from_model(action)))
+        self.assertDictEqual(execution_api.runner, vars(RunnerTypeAPI.from_model(runner)))
+
     def test_execution_creation_chains(self):
         """
         Test children and parent relationship is established.
@@ -0,0 +1,163 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+
+import mock
+import unittest2
+
+from st2common.constants import action as action_constants
+from st2common.garbage_collection import purge
+from st2common.garbage_collection.purge import RateLimiter
+from st2common.models.db.execution import ActionExecutionDB
+from st2common.models.db.execution import ActionExecutionOutputDB
+from st2common.models.db.liveaction import LiveActionDB
+from st2common.models.db.trace import TraceDB
+from st2common.models.db.trigger import TriggerInstanceDB
+from st2common.persistence.execution import ActionExecution
+from st2common.persistence.execution import ActionExecutionOutput
+from st2common.persistence.liveaction import LiveAction
+from st2common.persistence.trace import Trace
+from st2common.persistence.trigger import TriggerInstance
+from st2common.util import date as date_utils
+from st2tests import DbTestCase
+
+
+class RateLimiterTestCase(unittest2.TestCase):
+    @mock.patch.object(purge.eventlet, 'sleep')
+    @mock.patch.object(purge.time, 'time')
+    def test_wait_sleeps_when_rate_is_exceeded(self, mock_time, mock_sleep):
+        mock_time.return_value = 100
+        rate_limiter = RateLimiter(max_per_second=100)
+
+        mock_time.return_value = 100.5
+        rate_limiter.wait(100)
+        mock_sleep.assert_called_once_with(0.5)
+
+    @mock.patch.object(purge.eventlet, 'sleep')
+    @mock.patch.object(purge.time, 'time')
+    def test_wait_doesnt_sleep_when_rate_is_not_exceeded(self, mock_time, mock_sleep):
+        mock_time.return_value = 100
+        rate_limiter = RateLimiter(max_per_second=100)
+
+        mock_time.return_value = 102
+        rate_limiter.wait(100)
+        self.assertEqual(mock_sleep.call_count, 0)
+
+    @mock.patch.object(purge.eventlet, 'sleep')
+    def test_wait_no_limit(self, mock_sleep):
+        rate_limiter = RateLimiter(max_per_second=0)
+        rate_limiter.wait(100000)
+        self.assertEqual(mock_sleep.call_count, 0)
+
+
+class PurgeTestCase(DbTestCase):
+    def setUp(self):
+        super(PurgeTestCase, self).setUp()
+        self.now = date_utils.get_datetime_utc_now()
+
+    def tearDown(self):
+        for model in [ActionExecutionDB, ActionExecutionOutputDB, LiveActionDB, TraceDB,
+                      TriggerInstanceDB]:
+            model.drop_collection()
+
+        super(PurgeTestCase, self).tearDown()
+
+    def test_purge_executions(self):
+        old = self.now - datetime.timedelta(days=10)
+        self._create_execution(action_ref='core.local', start_timestamp=old)
+        self._create_execution(action_ref='core.local', start_timestamp=old)
+        self._create_execution(action_ref='core.local', start_timestamp=old,
+                               status=action_constants.LIVEACTION_STATUS_RUNNING)
+        self._create_execution(action_ref='core.local', start_timestamp=self.now)
+
+        timestamp = self.now - datetime.timedelta(days=1)
+        count = purge.purge_executions(timestamp=timestamp, batch_size=1)
+
+        # Incomplete and newer executions are kept
+        self.assertEqual(count, 2)
+        self.assertEqual(len(ActionExecution.get_all()), 2)
+        self.assertEqual(len(LiveAction.get_all()), 2)
+        self.assertEqual(len(ActionExecutionOutput.get_all()), 2)
+
+        count = purge.purge_executions(timestamp=timestamp, purge_incomplete=True)
+        self.assertEqual(count, 1)
+        self.assertEqual(len(ActionExecution.get_all()), 1)
+        self.assertEqual(len(LiveAction.get_all()), 1)
+
+    def test_purge_executions_action_ref_filters(self):
+        old = self.now - datetime.timedelta(days=10)
+        self._create_execution(action_ref='core.local', start_timestamp=old)
+        self._create_execution(action_ref='core.http', start_timestamp=old)
+        self._create_execution(action_ref='core.remote', start_timestamp=old)
+
+        timestamp = self.now - datetime.timedelta(days=1)
+        count = purge.purge_executions(timestamp=timestamp,
+                                       exclude_action_refs=['core.local', 'core.http'])
+        self.assertEqual(count, 1)
+
+        count = purge.purge_executions(timestamp=timestamp, action_ref='core.http')
+        self.assertEqual(count, 1)
+
+        executions = ActionExecution.get_all()
+        self.assertEqual(len(executions), 1)
+        self.assertEqual(executions[0].action['ref'], 'core.local')
+
+    def test_purge_trigger_instances(self):
+        for occurrence_time in [self.now - datetime.timedelta(days=10), self.now]:
+            TriggerInstance.add_or_update(TriggerInstanceDB(trigger='dummy_pack.trigger',
+                                                            payload={},
+                                                            occurrence_time=occurrence_time))
+
+        count = purge.purge_trigger_instances(timestamp=self.now - datetime.timedelta(days=1))
+        self.assertEqual(count, 1)
+        self.assertEqual(len(TriggerInstance.get_all()), 1)
+
+    def test_purge_traces(self):
+        for start_timestamp in [self.now - datetime.timedelta(days=10), self.now]:
+            Trace.add_or_update(TraceDB(trace_tag='tag', start_timestamp=start_timestamp))
+
+        count = purge.purge_traces(timestamp=self.now - datetime.timedelta(days=1))
+        self.assertEqual(count, 1)
+        self.assertEqual(len(Trace.get_all()), 1)
+
+    def test_ensure_trigger_instances_ttl_index(self):
+        collection = TriggerInstanceDB._get_collection()
+        name = purge.TRIGGER_INSTANCE_TIMESTAMP_INDEX_NAME
+
+        purge.ensure_trigger_instances_ttl_index(ttl=None)
+        self.assertNotIn('expireAfterSeconds', collection.index_information()[name])
+
+        purge.ensure_trigger_instances_ttl_index(ttl=3600)
+        self.assertEqual(collection.index_information()[name]['expireAfterSeconds'], 3600)
+
+        purge.ensure_trigger_instances_ttl_index(ttl=7200)
+        self.assertEqual(collection.index_information()[name]['expireAfterSeconds'], 7200)
+
+        purge.ensure_trigger_instances_ttl_index(ttl=None)
+        self.assertNotIn('expireAfterSeconds', collection.index_information()[name])
+
+    def _create_execution(self, action_ref, start_timestamp,
+                          status=action_constants.LIVEACTION_STATUS_SUCCEEDED):
+        liveaction_db = LiveAction.add_or_update(LiveActionDB(action=action_ref, status=status,
+                                                              start_timestamp=start_timestamp))
+        execution_db = ActionExecution.add_or_update(ActionExecutionDB(
+            action={'ref': action_ref}, runner={'name': 'run-local'},
+            liveaction={'id': str(liveaction_db.id)}, status=status,
+            start_timestamp=start_timestamp))
+        ActionExecutionOutput.add_or_update(ActionExecutionOutputDB(
+            execution_id=str(execution_db.id), output_type='stdout', data='output'))
+
+        return execution_db
@@ -14,6 +14,7 @@
 # limitations under the License.
 
 import eventlet
+import eventlet.event
 import mock
 
 from st2common.util.greenpooldispatch import BufferedDispatcher
@@ -49,3 +50,63 @@ class TestGreenPoolDispatch(TestCase):
         dispatcher.shutdown()
         call_args_list = [(args[0][0], args[0][1]) for args in mock_handler.call_args_list]
         self.assertItemsEqual(expected, call_args_list)
+
+    def test_buffered_work_is_dispatched_when_slot_is_released(self):
+        dispatcher = BufferedDispatcher(dispatch_pool_size=1)
+        event = eventlet.event.Event()
+        calls = []
+
+        def blocking_handler():
+            event.wait()
+            calls.append('blocking')
+
+        def handler():
+            calls.append('handler')
+
+        dispatcher.dispatch(blocking_handler)
+        dispatcher.dispatch(handler)
+        self.assertEqual(dispatcher.free(), 0)
+        self.assertEqual(dispatcher.buffered(), 1)
+
+        eventlet.sleep(0)
+        self.assertEqual(calls, [])
+
+        event.send()
+        eventlet.sleep(0)
+        eventlet.sleep(0)
+        self.assertEqual(calls, ['blocking', 'handler'])
+        self.assertEqual(dispatcher.free(), 1)
+        self.assertEqual(dispatcher.buffered(), 0)
+        dispatcher.shutdown()
+
+    def test_handler_exception_releases_slot(self):
+        dispatcher = BufferedDispatcher(dispatch_pool_size=1)
+        mock_handler = mock.MagicMock(side_effect=Exception('failure'))
+
+        dispatcher.dispatch(mock_handler)
+        dispatcher.dispatch(mock_handler)
+        while mock_handler.call_count < 2:
+            eventlet.sleep(0.01)
+        eventlet.sleep(0)
+
+        self.assertEqual(dispatcher.free(), 1)
+        dispatcher.shutdown()
+
+    def test_wait_for_free_slot(self):
+        dispatcher = BufferedDispatcher(dispatch_pool_size=1)
+        event = eventlet.event.Event()
+        dispatcher.dispatch(event.wait)
+
+        waiter = eventlet.spawn(dispatcher.wait_for_free_slot)
+        eventlet.sleep(0)
+        self.assertFalse(waiter.dead)
+
+        event.send()
+        waiter.wait()
+        self.assertEqual(dispatcher.free(), 1)
+        dispatcher.shutdown()
+
+    def test_dispatch_after_shutdown(self):
+        dispatcher = BufferedDispatcher(dispatch_pool_size=1)
+        dispatcher.shutdown()
+        self.assertRaises(RuntimeError, dispatcher.dispatch, mock.MagicMock())
@@ -13,10 +13,24 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import datetime
+import time
+
+import mock
+import unittest2
+from oslo_config import cfg
+
+import st2tests.config as tests_config
+tests_config.parse_args()
+
 from st2tests.base import CleanDbTestCase
 from st2common.models.db.keyvalue import KeyValuePairDB
 from st2common.persistence.keyvalue import KeyValuePair
-from st2common.services.keyvalues import KeyValueLookup
+from st2common.services import caching
+from st2common.services import keyvalues
+from st2common.services.keyvalues import KeyValueCache, KeyValueLookup
+from st2common.transport.keyvalue import KEY_VALUE_PAIR_CUD_XCHG
+from st2common.util import date as date_utils
 
 
 class TestKeyValueLookup(CleanDbTestCase):
@@ -57,3 +71,130 @@ class TestKeyValueLookup(CleanDbTestCase):
         lookup = KeyValueLookup()
         self.assertEquals(str(lookup.missing_key), '')
         self.assertTrue(lookup.missing_key, 'Should be not none.')
+
+    def test_prefetch(self):
+        KeyValuePair.add_or_update(KeyValuePairDB(name='a.b', value='v1'))
+        KeyValuePair.add_or_update(KeyValuePairDB(name='k1', value='v2'))
+
+        lookup = KeyValueLookup()
+        with mock.patch.object(KeyValuePair, 'query', wraps=KeyValuePair.query) as mock_query:
+            lookup.prefetch(['{{system.a.b.c}} {{system.k1}}', {'k': '{{system.k1}}'}, 'plain'])
+            self.assertEqual(mock_query.call_count, 1)
+
+            self.assertEquals(str(lookup.a.b), 'v1')
+            self.assertEquals(str(lookup.a.b.c), '')
+            self.assertEquals(str(lookup.k1), 'v2')
+            self.assertEqual(mock_query.call_count, 1)
+
+
+class KeyValueCacheTestCase(unittest2.TestCase):
+
+    def tearDown(self):
+        super(KeyValueCacheTestCase, self).tearDown()
+        cfg.CONF.clear_override(name='cache_ttl', group='keyvalue')
+        keyvalues._KEY_VALUE_CACHE = None
+
+    def test_get_referenced_keys(self):
+        self.assertEqual(keyvalues.get_referenced_keys('{{system.a.b.c}}'),
+                         set(['a', 'a.b', 'a.b.c']))
+        self.assertEqual(keyvalues.get_referenced_keys('{{system["a"].b}} {{system.k1 | int}}'),
+                         set(['a', 'a.b', 'k1']))
+        self.assertEqual(keyvalues.get_referenced_keys('{{trigger.a}} {{system[name]}}'), set())
+        self.assertEqual(keyvalues.get_referenced_keys('{{system.a'), set())
+        self.assertEqual(keyvalues.get_referenced_keys(1), set())
+
+    def test_cache_expires_values(self):
+        cache = KeyValueCache(ttl=10, max_size=10)
+        cache.set('k1', 'v1')
+        self.assertEqual(cache.get('k1'), (True, 'v1'))
+
+        with mock.patch('time.time', mock.Mock(return_value=time.time() + 11)):
+            self.assertEqual(cache.get('k1'), (False, None))
+
+        cache.set('k1', 'v1')
+        cache.invalidate('k1')
+        self.assertEqual(cache.get('k1'), (False, None))
+
+    def test_cache_doesnt_store_values_retrieved_before_invalidation(self):
+        cache = KeyValueCache(ttl=10, max_size=10)
+
+        generation = cache.get_generation()
+        cache.invalidate('k1')
+        cache.set('k1', 'v1', generation=generation)
+        self.assertEqual(cache.get('k1'), (False, None))
+
+        cache.set('k1', 'v2', generation=cache.get_generation())
+        self.assertEqual(cache.get('k1'), (True, 'v2'))
+
+    @mock.patch.object(caching, 'Connection', mock.Mock())
+    @mock.patch.object(caching.eventlet, 'spawn', mock.Mock())
+    @mock.patch.object(KeyValuePair, 'query')
+    def test_cached_value_doesnt_outlive_key_value_pair(self, mock_query):
+        expire_timestamp = date_utils.get_datetime_utc_now() + datetime.timedelta(seconds=5)
+        mock_query.return_value = [KeyValuePairDB(name='k1', value='v1',
+                                                  expire_timestamp=expire_timestamp)]
+
+        cfg.CONF.set_override(name='cache_ttl', override=60, group='keyvalue')
+        watcher = keyvalues.get_key_value_cache_watcher()
+        watcher.start()
+        watcher.on_consume_ready(connection=None, channel=None, consumers=[])
+
+        self.assertEqual(keyvalues.get_key_values(['k1']), {'k1': 'v1'})
+        self.assertEqual(keyvalues.get_key_value_cache().get('k1'), (True, 'v1'))
+
+        # Key value pair is deleted by the database without an event once it expires
+        with mock.patch('time.time', mock.Mock(return_value=time.time() + 6)):
+            self.assertEqual(keyvalues.get_key_value_cache().get('k1'), (False, None))
+
+        watcher.stop()
+
+    @mock.patch.object(caching, 'Connection', mock.Mock())
+    @mock.patch.object(caching.eventlet, 'spawn', mock.Mock())
+    @mock.patch.object(KeyValuePair, 'query')
+    def test_get_key_values(self, mock_query):
+        mock_query.return_value = [KeyValuePairDB(name='k1', value='v1')]
+
+        # Cache is disabled by default
+        self.assertIsNone(keyvalues.get_key_value_cache())
+        self.assertIsNone(keyvalues.get_key_value_cache_watcher())
+
+        # Cache is only used once the watcher which invalidates it has been started
+        cfg.CONF.set_override(name='cache_ttl', override=60, group='keyvalue')
+        self.assertIsNone(keyvalues.get_key_value_cache())
+        keyvalues.get_key_values(['k1', 'k2'])
+        keyvalues.get_key_values(['k1', 'k2'])
+        self.assertEqual(mock_query.call_count, 2)
+
+        mock_query.reset_mock()
+        watcher = keyvalues.get_key_value_cache_watcher()
+        watcher.start()
+        self.assertIsNone(keyvalues.get_key_value_cache())
+        watcher.on_consume_ready(connection=None, channel=None, consumers=[])
+
+        self.assertEqual(keyvalues.get_key_values(['k1', 'k2']), {'k1': 'v1', 'k2': ''})
+        mock_query.assert_called_once_with(name__in=['k1', 'k2'])
+
+        # Values (including missing keys) are served from the cache
+        self.assertEqual(keyvalues.get_key_values(['k1', 'k2']), {'k1': 'v1', 'k2': ''})
+        self.assertEqual(mock_query.call_count, 1)
+
+        # Cache is invalidated by CUD events
+        message = mock.Mock()
+        message.delivery_info = {'exchange': KEY_VALUE_PAIR_CUD_XCHG.name}
+        watcher.process_task(KeyValuePairDB(name='k2', value='v2'), message)
+        message.ack.assert_called_once_with()
+
+        mock_query.return_value = [KeyValuePairDB(name='k2', value='v2')]
+        self.assertEqual(keyvalues.get_key_values(['k1', 'k2']), {'k1': 'v1', 'k2': 'v2'})
+        mock_query.assert_called_with(name='k2')
+
+        # Cache is disabled while the watcher reconnects and cleared once it has reconnected
+        # since events could have been lost
+        watcher.on_connection_revived()
+        self.assertIsNone(keyvalues.get_key_value_cache())
+        watcher.on_consume_ready(connection=None, channel=None, consumers=[])
+        keyvalues.get_key_values(['k1', 'k2'])
+        mock_query.assert_called_with(name__in=['k1', 'k2'])
+
+        watcher.stop()
+        self.assertIsNone(keyvalues.get_key_value_cache())
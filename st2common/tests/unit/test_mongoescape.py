@@ -15,6 +15,8 @@
 
 import unittest
 
+from bson.son import SON
+
 from st2common.util import mongoescape
 
 
@@ -89,3 +91,36 @@ class TestMongoEscape(unittest.TestCase):
 
         unescaped = mongoescape.unescape_chars(escaped)
         self.assertDictEqual(field, unescaped)
+
+    def test_unchanged_values_are_not_copied(self):
+        unchanged = {'k1': {'k2': [{'k3': 'v3'}]}}
+        field = {'k1.k2': {'k3': 'v3'}, 'k4': unchanged}
+
+        escaped = mongoescape.escape_chars(field)
+        self.assertIs(escaped['k4'], unchanged)
+        self.assertIn('k1.k2', field)
+
+        # Nothing to escape
+        self.assertIs(mongoescape.escape_chars(unchanged), unchanged)
+        self.assertIs(mongoescape.unescape_chars(unchanged), unchanged)
+
+    def test_original_nested_value_is_not_modified(self):
+        field = {'k1': [{'l1.l2': '123'}, 'a'], 'k2': {'k3.k4': {'k5$': 'v'}}}
+
+        escaped = mongoescape.escape_chars(field)
+        self.assertEqual(escaped, {'k1': [{u'l1\uff0el2': '123'}, 'a'],
+                                   'k2': {u'k3\uff0ek4': {u'k5\uff04': 'v'}}})
+        self.assertEqual(field, {'k1': [{'l1.l2': '123'}, 'a'],
+                                 'k2': {'k3.k4': {'k5$': 'v'}}})
+
+    def test_son_key_order_is_preserved(self):
+        field = SON([('b', 1), ('a.b', {'c': 2}), ('c', 3)])
+
+        escaped = mongoescape.escape_chars(field)
+        self.assertIsInstance(escaped, SON)
+        self.assertEqual(escaped.keys(), ['b', 'c', u'a\uff0eb'])
+
+    def test_non_dict_values_are_not_escaped(self):
+        field = [{'k1.k2': 'v'}]
+        self.assertIs(mongoescape.escape_chars(field), field)
+        self.assertEqual(mongoescape.escape_chars('a.b'), 'a.b')
@@ -0,0 +1,192 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import defaultdict
+
+import mock
+import unittest2
+from kombu import Exchange, Queue
+from oslo_config import cfg
+
+import st2tests.config as tests_config
+tests_config.parse_args()
+
+from st2common.exceptions.transport import MessageNotConfirmedError
+from st2common.transport import publishers
+from st2common.transport import serialization
+
+FAKE_XCHG = Exchange('st2.tests.publisher', type='topic')
+
+
+def get_queue(connection, name):
+    queue = Queue(name, FAKE_XCHG, routing_key='#')(connection.default_channel)
+    queue.declare()
+    return queue
+
+
+def get_payload(queue):
+    message = queue.get(accept=serialization.ACCEPT_CONTENT)
+    return message.payload if message else None
+
+
+class FakeConfirmChannel(object):
+    """
+    Channel which confirms messages the same way as RabbitMQ - with a single "multiple" ack.
+    """
+
+    def __init__(self, nack_delivery_tags=None):
+        self.events = defaultdict(set)
+        self.published = 0
+        self.nack_delivery_tags = nack_delivery_tags or []
+        self.confirm_select = mock.Mock()
+
+    def basic_publish(self):
+        self.published += 1
+
+    def wait(self, allowed_methods=None, timeout=None):
+        for delivery_tag in self.nack_delivery_tags:
+            for callback in self.events['basic_nack']:
+                callback(delivery_tag, False, False)
+
+        for callback in self.events['basic_ack']:
+            callback(self.published, True)
+
+
+class FakeProducer(object):
+    def __init__(self, channel):
+        self.channel = channel
+        self.published = []
+
+    def publish(self, **kwargs):
+        self.published.append(kwargs)
+        self.channel.basic_publish()
+
+
+class PoolPublisherTest(unittest2.TestCase):
+
+    def setUp(self):
+        super(PoolPublisherTest, self).setUp()
+        self.publisher = publishers.PoolPublisher(urls=['memory://'])
+
+    def tearDown(self):
+        super(PoolPublisherTest, self).tearDown()
+        cfg.CONF.clear_override(name='publisher_confirms', group='messaging')
+
+    def test_publish_reuses_channel_and_producer(self):
+        with self.publisher.pool.acquire(block=True) as connection:
+            queue = get_queue(connection, 'st2.tests.publisher.reuse')
+            channel = connection.default_channel
+
+        with mock.patch.object(channel, 'close') as mock_close:
+            self.publisher.publish({'index': 0}, FAKE_XCHG, 'create')
+            producer = self.publisher._producers.values()[0]
+            self.publisher.publish({'index': 1}, FAKE_XCHG, 'update')
+
+        self.assertFalse(mock_close.called)
+        self.assertEqual(len(self.publisher._producers), 1)
+        self.assertIs(self.publisher._producers.values()[0], producer)
+        self.assertIs(producer.channel, channel)
+
+        self.assertEqual(get_payload(queue), {'index': 0})
+        self.assertEqual(get_payload(queue), {'index': 1})
+
+    def test_publish_many(self):
+        with self.publisher.pool.acquire(block=True) as connection:
+            queue = get_queue(connection, 'st2.tests.publisher.many')
+
+        messages = [({'index': index}, 'create') for index in range(10)]
+        self.publisher.publish_many(messages, FAKE_XCHG)
+
+        for index in range(10):
+            message = queue.get(accept=serialization.ACCEPT_CONTENT)
+            self.assertEqual(message.payload, {'index': index})
+            self.assertEqual(message.delivery_info['routing_key'], 'create')
+        self.assertIsNone(get_payload(queue))
+
+    def test_publish_many_no_messages(self):
+        with mock.patch.object(self.publisher.pool, 'acquire') as mock_acquire:
+            self.publisher.publish_many([], FAKE_XCHG)
+        self.assertFalse(mock_acquire.called)
+
+    def test_confirms_are_not_used_by_default_or_if_not_supported(self):
+        self.assertIsNone(self.publisher._get_confirms(channel=FakeConfirmChannel()))
+
+        cfg.CONF.set_override(name='publisher_confirms', override=True, group='messaging')
+        self.assertIsNone(self.publisher._get_confirms(channel=object()))
+
+        channel = FakeConfirmChannel()
+        confirms = self.publisher._get_confirms(channel=channel)
+        self.assertIsNotNone(confirms)
+        self.assertIs(self.publisher._get_confirms(channel=channel), confirms)
+        channel.confirm_select.assert_called_once_with()
+
+    def test_publish_many_waits_for_confirms_once(self):
+        cfg.CONF.set_override(name='publisher_confirms', override=True, group='messaging')
+        channel = FakeConfirmChannel()
+        producer = FakeProducer(channel)
+
+        with mock.patch.object(self.publisher, '_get_producer', return_value=producer), \
+                mock.patch.object(channel, 'wait', wraps=channel.wait) as mock_wait, \
+                mock.patch('kombu.Connection.default_channel', channel):
+            messages = [({'index': index}, 'create') for index in range(5)]
+            self.publisher.publish_many(messages, FAKE_XCHG)
+
+        self.assertEqual(len(producer.published), 5)
+        self.assertEqual(mock_wait.call_count, 1)
+
+    def test_publish_many_rejected_messages(self):
+        cfg.CONF.set_override(name='publisher_confirms', override=True, group='messaging')
+        channel = FakeConfirmChannel(nack_delivery_tags=[2])
+        producer = FakeProducer(channel)
+
+        with mock.patch.object(self.publisher, '_get_producer', return_value=producer), \
+                mock.patch('kombu.Connection.default_channel', channel):
+            messages = [({'index': index}, 'create') for index in range(3)]
+            self.assertRaises(MessageNotConfirmedError, self.publisher.publish_many, messages,
+                              FAKE_XCHG)
+
+
+class PublisherConfirmsTest(unittest2.TestCase):
+
+    def test_ack_and_nack(self):
+        undelivered = {0: 'a', 1: 'b', 2: 'c', 3: 'd'}
+        confirms = publishers.PublisherConfirms(FakeConfirmChannel())
+        confirms.begin(undelivered=undelivered)
+
+        for key in range(4):
+            confirms.published(key)
+
+        confirms._on_ack(2, True)
+        self.assertEqual(undelivered, {2: 'c', 3: 'd'})
+
+        confirms._on_nack(3, False, False)
+        confirms._on_ack(4, False)
+        self.assertEqual(undelivered, {2: 'c'})
+        self.assertEqual(confirms.wait(channel=None), [2])
+
+    def test_delivery_tags_continue_across_batches(self):
+        channel = FakeConfirmChannel()
+        confirms = publishers.PublisherConfirms(channel)
+
+        for batch in range(2):
+            undelivered = {0: 'a', 1: 'b'}
+            confirms.begin(undelivered=undelivered)
+
+            for key in range(2):
+                channel.basic_publish()
+                confirms.published(key)
+
+            self.assertEqual(confirms.wait(channel=channel), [])
+            self.assertEqual(undelivered, {})
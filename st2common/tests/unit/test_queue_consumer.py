@@ -13,8 +13,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import eventlet
+import eventlet.event
 import mock
+import unittest2
 from kombu import Connection, Exchange, Queue
+from oslo_config import cfg
+
+import st2tests.config as tests_config
+tests_config.parse_args()
 
 from st2common.transport import consumers
 from st2common.transport import utils as transport_utils
@@ -38,6 +45,29 @@ def get_handler():
         return FakeMessageHandler(conn, [FAKE_WORK_Q])
 
 
+def get_queue_consumer(ack_after_process=False):
+    handler = mock.Mock()
+    handler.message_type = FakeModelDB
+    with Connection(transport_utils.get_messaging_urls()) as conn:
+        consumer = consumers.QueueConsumer(conn, [FAKE_WORK_Q], handler, dispatch_pool_size=2,
+                                           ack_after_process=ack_after_process)
+    return consumer, handler
+
+
+def get_batching_consumer(batch_size=3, batch_timeout=10):
+    handler = mock.Mock()
+    handler.message_type = FakeModelDB
+    with Connection(transport_utils.get_messaging_urls()) as conn:
+        consumer = consumers.BatchingQueueConsumer(conn, [FAKE_WORK_Q], handler,
+                                                   batch_size=batch_size,
+                                                   batch_timeout=batch_timeout)
+
+    # Process batches synchronously
+    consumer._dispatcher = mock.Mock()
+    consumer._dispatcher.dispatch.side_effect = lambda func, *args: func(*args)
+    return consumer, handler
+
+
 class QueueConsumerTest(DbTestCase):
 
     @mock.patch.object(FakeMessageHandler, 'process', mock.MagicMock())
@@ -53,3 +83,208 @@ class QueueConsumerTest(DbTestCase):
         handler = get_handler()
         handler._queue_consumer._process_message(payload)
         self.assertFalse(FakeMessageHandler.process.called)
+
+
+class QueueConsumerAckTest(unittest2.TestCase):
+
+    def test_ack_before_process(self):
+        consumer, handler = get_queue_consumer(ack_after_process=False)
+        handler.process.side_effect = lambda payload: eventlet.sleep(0.01)
+        payload = FakeModelDB()
+        message = mock.Mock()
+
+        consumer.process(payload, message)
+        message.ack.assert_called_once_with()
+        self.assertFalse(handler.process.called)
+
+        while not handler.process.called:
+            eventlet.sleep(0.01)
+        handler.process.assert_called_once_with(payload)
+
+    def test_ack_after_process(self):
+        consumer, handler = get_queue_consumer(ack_after_process=True)
+        handler.process.side_effect = lambda payload: eventlet.sleep(0.01)
+        payload = FakeModelDB()
+        message = mock.Mock()
+
+        consumer.process(payload, message)
+        self.assertFalse(message.ack.called)
+
+        while not message.ack.called:
+            eventlet.sleep(0.01)
+        handler.process.assert_called_once_with(payload)
+        message.ack.assert_called_once_with()
+
+    def test_ack_after_process_failure(self):
+        consumer, handler = get_queue_consumer(ack_after_process=True)
+        handler.process.side_effect = Exception('failure')
+        message = mock.Mock()
+
+        consumer.process(FakeModelDB(), message)
+        while not message.ack.called:
+            eventlet.sleep(0.01)
+        message.ack.assert_called_once_with()
+
+    def test_prefetch_count(self):
+        for ack_after_process, prefetch_count in [(False, 1), (True, 2)]:
+            consumer, _ = get_queue_consumer(ack_after_process=ack_after_process)
+            kombu_consumer = mock.Mock()
+            consumer.get_consumers(mock.Mock(return_value=kombu_consumer), mock.Mock())
+            kombu_consumer.qos.assert_called_once_with(prefetch_count=prefetch_count)
+
+    def test_prefetch_count_configured(self):
+        with Connection(transport_utils.get_messaging_urls()) as conn:
+            consumer = consumers.QueueConsumer(conn, [FAKE_WORK_Q], mock.Mock(),
+                                               prefetch_count=10)
+        self.assertEqual(consumer.get_prefetch_count(), 10)
+
+    def test_backpressure(self):
+        consumer, handler = get_queue_consumer(ack_after_process=False)
+        event = eventlet.event.Event()
+        handler.process.side_effect = lambda payload: event.wait()
+        messages = [mock.Mock(), mock.Mock(), mock.Mock()]
+
+        consumer.process(FakeModelDB(), messages[0])
+        consumer.process(FakeModelDB(), messages[1])
+
+        # All the slots are busy so the third message is not taken until one is released
+        thread = eventlet.spawn(consumer.process, FakeModelDB(), messages[2])
+        eventlet.sleep(0.01)
+        self.assertFalse(messages[2].ack.called)
+
+        event.send()
+        thread.wait()
+        messages[2].ack.assert_called_once_with()
+
+
+class MessageHandlerTest(unittest2.TestCase):
+
+    def tearDown(self):
+        super(MessageHandlerTest, self).tearDown()
+        cfg.CONF.clear_override(name='prefetch_count', group='messaging')
+        cfg.CONF.clear_override(name='service_prefetch_counts', group='messaging')
+
+    def test_get_prefetch_count(self):
+        self.assertEqual(consumers.get_prefetch_count(service_name='scheduler'), None)
+
+        cfg.CONF.set_override(name='prefetch_count', override=10, group='messaging')
+        cfg.CONF.set_override(name='service_prefetch_counts', override={'scheduler': '100'},
+                              group='messaging')
+        self.assertEqual(consumers.get_prefetch_count(service_name='scheduler'), 100)
+        self.assertEqual(consumers.get_prefetch_count(service_name='rulesengine'), 10)
+        self.assertEqual(consumers.get_prefetch_count(), 10)
+
+    def test_service_prefetch_count_is_used(self):
+        cfg.CONF.set_override(name='service_prefetch_counts', override={'fake': '100'},
+                              group='messaging')
+
+        handler = get_handler()
+        self.assertEqual(handler._queue_consumer.get_prefetch_count(), 1)
+
+        FakeMessageHandler.service_name = 'fake'
+        try:
+            handler = get_handler()
+        finally:
+            FakeMessageHandler.service_name = None
+        self.assertEqual(handler._queue_consumer.get_prefetch_count(), 100)
+
+    def test_batching_consumer_is_used_for_batch_size(self):
+        with Connection(transport_utils.get_messaging_urls()) as conn:
+            handler = FakeMessageHandler(conn, [FAKE_WORK_Q])
+            self.assertFalse(isinstance(handler._queue_consumer,
+                                        consumers.BatchingQueueConsumer))
+
+            handler = FakeMessageHandler(conn, [FAKE_WORK_Q], batch_size=10, batch_timeout=1)
+            self.assertTrue(isinstance(handler._queue_consumer,
+                                       consumers.BatchingQueueConsumer))
+            self.assertEqual(handler._queue_consumer.get_prefetch_count(), 20)
+
+    @mock.patch.object(FakeMessageHandler, 'process', mock.MagicMock(
+        side_effect=[Exception('failure'), None]))
+    def test_default_process_batch(self):
+        handler = get_handler()
+        payloads = [FakeModelDB(), FakeModelDB()]
+        handler.process_batch(payloads)
+
+        self.assertEqual(FakeMessageHandler.process.call_args_list,
+                         [mock.call(payloads[0]), mock.call(payloads[1])])
+
+
+class BatchingQueueConsumerTest(unittest2.TestCase):
+
+    def test_batch_is_processed_when_full(self):
+        consumer, handler = get_batching_consumer(batch_size=3)
+        payloads = [FakeModelDB(), FakeModelDB(), FakeModelDB()]
+        messages = [mock.Mock(), mock.Mock(), mock.Mock()]
+
+        consumer.process(payloads[0], messages[0])
+        consumer.process(payloads[1], messages[1])
+        self.assertFalse(handler.process_batch.called)
+        self.assertFalse(messages[0].ack.called)
+
+        consumer.process(payloads[2], messages[2])
+        handler.process_batch.assert_called_once_with(payloads)
+        for message in messages:
+            message.ack.assert_called_once_with()
+
+    def test_partial_batch_is_processed_on_timeout(self):
+        consumer, handler = get_batching_consumer(batch_size=3)
+        payload = FakeModelDB()
+        message = mock.Mock()
+
+        with mock.patch('eventlet.spawn_after') as spawn_after:
+            consumer.process(payload, message)
+            self.assertEqual(spawn_after.call_count, 1)
+            self.assertEqual(spawn_after.call_args[0][0], 10)
+
+            # Simulate the timer firing
+            flush = spawn_after.call_args[0][1]
+            flush()
+
+        handler.process_batch.assert_called_once_with([payload])
+        message.ack.assert_called_once_with()
+
+    def test_messages_are_processed_one_by_one_if_batch_fails(self):
+        consumer, handler = get_batching_consumer(batch_size=2)
+        payloads = [FakeModelDB(), FakeModelDB()]
+        messages = [mock.Mock(), mock.Mock()]
+
+        def process(payload):
+            # Messages are only acknowledged once they have been processed
+            self.assertFalse(messages[payloads.index(payload)].ack.called)
+
+        handler.process_batch.side_effect = Exception('failure')
+        handler.process.side_effect = process
+
+        consumer.process(payloads[0], messages[0])
+        consumer.process(payloads[1], messages[1])
+
+        self.assertEqual(handler.process.call_args_list,
+                         [mock.call(payloads[0]), mock.call(payloads[1])])
+        for message in messages:
+            message.ack.assert_called_once_with()
+
+    def test_messages_are_acked_if_processing_fails(self):
+        consumer, handler = get_batching_consumer(batch_size=2)
+        handler.process_batch.side_effect = Exception('failure')
+        handler.process.side_effect = Exception('failure')
+        messages = [mock.Mock(), mock.Mock()]
+
+        consumer.process(FakeModelDB(), messages[0])
+        consumer.process(FakeModelDB(), messages[1])
+
+        self.assertEqual(handler.process.call_count, 2)
+        for message in messages:
+            message.ack.assert_called_once_with()
+
+    def test_wrong_payload_type_is_skipped(self):
+        consumer, handler = get_batching_consumer(batch_size=2)
+        payload = FakeModelDB()
+        messages = [mock.Mock(), mock.Mock()]
+
+        consumer.process(100, messages[0])
+        consumer.process(payload, messages[1])
+
+        handler.process_batch.assert_called_once_with([payload])
+        for message in messages:
+            message.ack.assert_called_once_with()
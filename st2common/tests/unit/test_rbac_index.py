@@ -0,0 +1,179 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mock
+import unittest2
+
+from st2common.models.db.auth import UserDB
+from st2common.models.db.rbac import PermissionGrantDB
+from st2common.rbac import index as rbac_index
+from st2common.rbac.index import UserPermissionsIndex
+from st2common.rbac.index import PermissionsIndexCache
+from st2common.rbac.index import PermissionsIndexWatcher
+from st2common.rbac.types import PermissionType
+from st2common.rbac.types import ResourceType
+from st2common.rbac.types import SystemRole
+from st2common.transport import rbac as rbac_transport
+
+PERMISSION_GRANT_DBS = [
+    PermissionGrantDB(resource_uid='pack:dummy_pack_1', resource_type=ResourceType.PACK,
+                      permission_types=[PermissionType.ACTION_VIEW]),
+    PermissionGrantDB(resource_uid='action:dummy_pack_2:my_action',
+                      resource_type=ResourceType.ACTION,
+                      permission_types=[PermissionType.ACTION_EXECUTE]),
+    PermissionGrantDB(resource_uid='action:dummy_pack_2:my_action',
+                      resource_type=ResourceType.ACTION,
+                      permission_types=[PermissionType.ACTION_VIEW])
+]
+
+
+class UserPermissionsIndexTestCase(unittest2.TestCase):
+    def test_has_role(self):
+        index = UserPermissionsIndex(role_names=['role_one', 'role_two'], permission_grant_dbs=[])
+
+        self.assertTrue(index.has_role('role_one'))
+        self.assertTrue(index.has_role('role_two'))
+        self.assertFalse(index.has_role('role_three'))
+        self.assertFalse(index.is_admin)
+        self.assertFalse(index.is_observer)
+
+    def test_has_system_role_permission(self):
+        for role in [SystemRole.SYSTEM_ADMIN, SystemRole.ADMIN]:
+            index = UserPermissionsIndex(role_names=[role], permission_grant_dbs=[])
+            self.assertTrue(index.has_system_role_permission(PermissionType.ACTION_EXECUTE))
+            self.assertTrue(index.has_system_role_permission(PermissionType.RULE_DELETE))
+
+        index = UserPermissionsIndex(role_names=[SystemRole.OBSERVER], permission_grant_dbs=[])
+        self.assertTrue(index.has_system_role_permission(PermissionType.ACTION_VIEW))
+        self.assertFalse(index.has_system_role_permission(PermissionType.ACTION_EXECUTE))
+
+        index = UserPermissionsIndex(role_names=['role_one'], permission_grant_dbs=[])
+        self.assertFalse(index.has_system_role_permission(PermissionType.ACTION_VIEW))
+
+    def test_has_permission_grant(self):
+        index = UserPermissionsIndex(role_names=['role_one'],
+                                     permission_grant_dbs=PERMISSION_GRANT_DBS)
+
+        self.assertTrue(index.has_permission_grant(
+            resource_uid='pack:dummy_pack_1', resource_types=[ResourceType.PACK],
+            permission_types=[PermissionType.ACTION_VIEW, PermissionType.ACTION_ALL]))
+        self.assertFalse(index.has_permission_grant(
+            resource_uid='pack:dummy_pack_1', resource_types=[ResourceType.PACK],
+            permission_types=[PermissionType.ACTION_EXECUTE]))
+
+        # Grants of multiple roles on the same resource are merged
+        for permission_type in [PermissionType.ACTION_VIEW, PermissionType.ACTION_EXECUTE]:
+            self.assertTrue(index.has_permission_grant(
+                resource_uid='action:dummy_pack_2:my_action',
+                resource_types=[ResourceType.ACTION], permission_types=[permission_type]))
+
+        # Resource type is a part of the key
+        self.assertFalse(index.has_permission_grant(
+            resource_uid='action:dummy_pack_2:my_action', resource_types=[ResourceType.RULE],
+            permission_types=[PermissionType.ACTION_VIEW]))
+        self.assertFalse(index.has_permission_grant(
+            resource_uid='pack:dummy_pack_2', resource_types=[ResourceType.PACK],
+            permission_types=[PermissionType.ACTION_VIEW]))
+
+
+class PermissionsIndexCacheTestCase(unittest2.TestCase):
+    def tearDown(self):
+        super(PermissionsIndexCacheTestCase, self).tearDown()
+        rbac_index._set_permissions_index_cache(None)
+
+    def test_get_or_load(self):
+        cache = PermissionsIndexCache(ttl=60, max_size=10)
+        build_func = mock.Mock(return_value='index')
+
+        for _ in range(3):
+            self.assertEqual(cache.get_or_load('user1', build_func), 'index')
+
+        self.assertEqual(build_func.call_count, 1)
+
+        cache.clear()
+        cache.get_or_load('user1', build_func)
+        self.assertEqual(build_func.call_count, 2)
+        self.assertEqual(cache.get_stats()['invalidations'], 1)
+
+    def test_clear_during_build(self):
+        cache = PermissionsIndexCache(ttl=60, max_size=10)
+
+        def build_func():
+            # Role is changed while the index is being built
+            cache.clear()
+            return 'index'
+
+        self.assertEqual(cache.get_or_load('user1', build_func), 'index')
+        self.assertEqual(cache.get_or_load('user1', lambda: 'index2'), 'index2')
+
+    @mock.patch('st2common.services.caching.time.time')
+    def test_get_or_load_expired(self, mock_time):
+        cache = PermissionsIndexCache(ttl=60, max_size=10)
+        build_func = mock.Mock(return_value='index')
+
+        mock_time.return_value = 1000
+        cache.get_or_load('user1', build_func)
+
+        mock_time.return_value = 1060
+        cache.get_or_load('user1', build_func)
+        self.assertEqual(build_func.call_count, 1)
+
+        # Index is rebuilt once it expires (e.g. an invalidation event has been lost)
+        mock_time.return_value = 1061
+        cache.get_or_load('user1', build_func)
+        self.assertEqual(build_func.call_count, 2)
+
+    def test_watcher_process_task_clears_cache(self):
+        cache = PermissionsIndexCache(ttl=60, max_size=10)
+        cache.get_or_load('user1', lambda: 'index')
+
+        watcher = PermissionsIndexWatcher(cache=cache)
+        message = mock.Mock()
+        message.delivery_info = {'exchange': rbac_transport.RBAC_CUD_XCHG.name}
+        watcher.process_task(body={}, message=message)
+
+        self.assertEqual(cache.get_or_load('user1', lambda: 'index2'), 'index2')
+        self.assertEqual(message.ack.call_count, 1)
+
+    def test_watcher_reconnect_clears_cache(self):
+        cache = PermissionsIndexCache(ttl=60, max_size=10)
+        watcher = PermissionsIndexWatcher(cache=cache)
+        watcher.on_consume_ready(connection=None, channel=None, consumers=[])
+        self.assertEqual(rbac_index.get_permissions_index_stats(), cache.get_stats())
+        cache.get_or_load('user1', lambda: 'index')
+
+        # Events published while the watcher was disconnected are lost
+        watcher.on_connection_revived()
+        self.assertEqual(rbac_index.get_permissions_index_stats(), None)
+
+        watcher.on_consume_ready(connection=None, channel=None, consumers=[])
+        self.assertEqual(cache.get_or_load('user1', lambda: 'index2'), 'index2')
+
+    @mock.patch.object(rbac_index, 'build_user_permissions_index')
+    def test_get_user_permissions_index(self, mock_build):
+        mock_build.return_value = 'index'
+        user_db = UserDB(name='user1')
+
+        # Index is built on each call if the cache is not used in this process
+        rbac_index.get_user_permissions_index(user_db=user_db)
+        rbac_index.get_user_permissions_index(user_db=user_db)
+        self.assertEqual(mock_build.call_count, 2)
+        self.assertEqual(rbac_index.get_permissions_index_stats(), None)
+
+        rbac_index._set_permissions_index_cache(PermissionsIndexCache(ttl=60, max_size=10))
+        rbac_index.get_user_permissions_index(user_db=user_db)
+        rbac_index.get_user_permissions_index(user_db=user_db)
+        self.assertEqual(mock_build.call_count, 3)
+        mock_build.assert_called_with(username='user1')
@@ -0,0 +1,173 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+
+import bson
+import mock
+import unittest2
+from kombu import Exchange
+from kombu.exceptions import DecodeError
+from oslo_config import cfg
+
+import st2tests.config as tests_config
+tests_config.parse_args()
+
+from st2common.models.api.trace import TraceContext
+from st2common.models.db.execution import ActionExecutionDB
+from st2common.models.db.liveaction import LiveActionDB
+from st2common.transport import publishers
+from st2common.transport import serialization
+from st2common.util import date as date_utils
+
+SERIALIZERS = [serialization.SERIALIZER_JSON]
+if serialization.SERIALIZER_MSGPACK in serialization.ACCEPT_CONTENT:
+    SERIALIZERS.append(serialization.SERIALIZER_MSGPACK)
+
+
+def get_liveaction_db():
+    return LiveActionDB(
+        id=bson.ObjectId(),
+        status='succeeded',
+        start_timestamp=date_utils.get_datetime_utc_now(),
+        end_timestamp=date_utils.get_datetime_utc_now() + datetime.timedelta(seconds=1),
+        action='core.local',
+        parameters={'cmd': 'echo \xe9'.decode('latin-1')},
+        context={'user': 'stanley'},
+        result={'stdout': 'a\nb', 'key.with.dots': 1, '$dollar': [1, 2]})
+
+
+class SerializationTest(unittest2.TestCase):
+
+    def tearDown(self):
+        super(SerializationTest, self).tearDown()
+        cfg.CONF.clear_override(name='serializer', group='messaging')
+        cfg.CONF.clear_override(name='exchange_serializers', group='messaging')
+
+    def _roundtrip(self, payload, serializer):
+        content_type, content_encoding, body = serialization.dumps(payload,
+                                                                   serializer=serializer)
+        return content_type, serialization.loads(body, content_type=content_type,
+                                                 content_encoding=content_encoding)
+
+    def test_liveaction_roundtrip(self):
+        liveaction_db = get_liveaction_db()
+
+        for serializer in SERIALIZERS:
+            content_type, result = self._roundtrip(liveaction_db, serializer)
+
+            self.assertIn('x-st2', content_type)
+            self.assertIsInstance(result, LiveActionDB)
+            self.assertEqual(result.id, liveaction_db.id)
+            self.assertEqual(result.parameters, liveaction_db.parameters)
+            self.assertEqual(result.result, liveaction_db.result)
+            self.assertEqual(result.to_mongo(), liveaction_db.to_mongo())
+
+    def test_execution_roundtrip(self):
+        liveaction_db = get_liveaction_db()
+        execution_db = ActionExecutionDB(
+            id=bson.ObjectId(), action={'ref': 'core.local'}, runner={'name': 'local-shell-cmd'},
+            liveaction=liveaction_db.to_mongo().to_dict(), status=liveaction_db.status,
+            result=liveaction_db.result, children=['a', 'b'])
+
+        for serializer in SERIALIZERS:
+            _, result = self._roundtrip(execution_db, serializer)
+
+            self.assertIsInstance(result, ActionExecutionDB)
+            self.assertEqual(result.id, execution_db.id)
+            self.assertEqual(result.liveaction['_id'], liveaction_db.id)
+            self.assertEqual(result.result, liveaction_db.result)
+            self.assertEqual(result.children, ['a', 'b'])
+
+    def test_nested_payload_with_trace_context(self):
+        liveaction_db = get_liveaction_db()
+        payload = {
+            'liveaction': liveaction_db,
+            'trace_context': TraceContext(id_='abc', trace_tag='tag')
+        }
+
+        for serializer in SERIALIZERS:
+            _, result = self._roundtrip(payload, serializer)
+
+            self.assertEqual(result['liveaction'].id, liveaction_db.id)
+            self.assertEqual(result['trace_context'], {'id_': 'abc', 'trace_tag': 'tag'})
+
+    def test_bson_values_roundtrip(self):
+        object_id = bson.ObjectId()
+        timestamp = date_utils.get_datetime_utc_now().replace(microsecond=0)
+        payload = {'id': object_id, 'values': [timestamp]}
+
+        for serializer in SERIALIZERS:
+            _, result = self._roundtrip(payload, serializer)
+
+            self.assertEqual(result['id'], object_id)
+            self.assertEqual(result['values'], [timestamp])
+
+    def test_user_data_which_looks_like_extended_json_is_not_converted(self):
+        payload = {
+            'date': {'$date': 5},
+            'regex': {'$regex': 'a.*', '$options': ''},
+            'undefined': {'$undefined': True},
+            'oid': {'$oid': '5660c6a2f90d5d3f4bf4ac9d'}
+        }
+
+        for serializer in SERIALIZERS:
+            _, result = self._roundtrip(payload, serializer)
+            self.assertEqual(result, payload)
+
+    def test_unsupported_payload_falls_back_to_pickle(self):
+        for serializer in SERIALIZERS:
+            content_type, result = self._roundtrip({'values': set([1])}, serializer)
+
+            self.assertEqual(content_type, 'application/x-python-serialize')
+            self.assertEqual(result, {'values': set([1])})
+
+    def test_model_class_outside_of_models_package_is_rejected(self):
+        body = serialization.json_encode({
+            serialization.MODEL_KEY: 'st2common.transport.publishers:PoolPublisher',
+            serialization.DOCUMENT_KEY: {}
+        })
+
+        self.assertRaises(DecodeError, serialization.loads, body,
+                          content_type=serialization.JSON_CONTENT_TYPE,
+                          content_encoding='utf-8')
+
+    def test_get_exchange_serializer(self):
+        self.assertEqual(serialization.get_exchange_serializer('st2.liveaction'),
+                         serialization.SERIALIZER_PICKLE)
+
+        cfg.CONF.set_override(name='serializer', override=serialization.SERIALIZER_JSON,
+                              group='messaging')
+        cfg.CONF.set_override(name='exchange_serializers',
+                              override={'st2.execution': serialization.SERIALIZER_PICKLE},
+                              group='messaging')
+
+        self.assertEqual(serialization.get_exchange_serializer('st2.liveaction'),
+                         serialization.SERIALIZER_JSON)
+        self.assertEqual(serialization.get_exchange_serializer('st2.execution'),
+                         serialization.SERIALIZER_PICKLE)
+
+    @mock.patch.object(publishers.ConnectionRetryWrapper, 'ensured')
+    def test_publisher_uses_exchange_serializer(self, mock_ensured):
+        cfg.CONF.set_override(name='exchange_serializers',
+                              override={'st2.test': serialization.SERIALIZER_JSON},
+                              group='messaging')
+
+        publisher = publishers.PoolPublisher(urls=['memory://'])
+        publisher.publish({'a': 1}, Exchange('st2.test', type='topic'), routing_key='create')
+
+        kwargs = mock_ensured.call_args[1]
+        self.assertEqual(kwargs['content_type'], serialization.JSON_CONTENT_TYPE)
+        self.assertEqual(serialization.json_decode(kwargs['body']), {'a': 1})
@@ -0,0 +1,109 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+
+import unittest2
+
+from st2common.exceptions.auth import TokenExpiredError
+from st2common.exceptions.auth import TokenNotFoundError
+from st2common.util import auth as auth_utils
+from st2common.util import date as date_utils
+import st2tests.config as tests_config
+
+KEY = 'secret'
+
+
+class SignedTokenTestCase(unittest2.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super(SignedTokenTestCase, cls).setUpClass()
+        tests_config.parse_args()
+
+    def _get_expiry(self, seconds=3600):
+        return date_utils.get_datetime_utc_now() + datetime.timedelta(seconds=seconds)
+
+    def test_create_and_parse_signed_token(self):
+        expiry = self._get_expiry()
+        token_db = auth_utils.create_signed_token(username='stanley', expiry=expiry, key=KEY,
+                                                  metadata={'service': 'actionrunner'})
+
+        self.assertTrue(auth_utils.is_signed_token(token_db.token))
+        self.assertEqual(token_db.expiry, expiry.replace(microsecond=0))
+
+        result = auth_utils.parse_signed_token(token_string=token_db.token, key=KEY)
+        self.assertEqual(result.id, token_db.id)
+        self.assertEqual(result.user, 'stanley')
+        self.assertEqual(result.expiry, token_db.expiry)
+        self.assertEqual(result.metadata, {'service': 'actionrunner'})
+
+    def test_signed_tokens_are_unique(self):
+        expiry = self._get_expiry()
+        token1 = auth_utils.create_signed_token(username='stanley', expiry=expiry, key=KEY)
+        token2 = auth_utils.create_signed_token(username='stanley', expiry=expiry, key=KEY)
+        self.assertNotEqual(token1.token, token2.token)
+
+    def test_parse_invalid_signed_token(self):
+        token_db = auth_utils.create_signed_token(username='stanley', expiry=self._get_expiry(),
+                                                  key=KEY)
+        payload, signature = token_db.token.split('.')
+
+        self.assertRaises(TokenNotFoundError, auth_utils.parse_signed_token,
+                          token_string=token_db.token, key='other')
+
+        # Payload has been tampered with
+        other_db = auth_utils.create_signed_token(username='admin', expiry=self._get_expiry(),
+                                                  key='other')
+        token_string = '%s.%s' % (other_db.token.split('.')[0], signature)
+        self.assertRaises(TokenNotFoundError, auth_utils.parse_signed_token,
+                          token_string=token_string, key=KEY)
+
+        for token_string in ['%s.' % (payload), 'a.b.c', '.%s' % (signature),
+                             u'%s\xe9.%s' % (payload, signature), u'%s.\xe9' % (payload),
+                             '%s\xc3\xa9.%s' % (str(payload), str(signature))]:
+            self.assertRaises(TokenNotFoundError, auth_utils.parse_signed_token,
+                              token_string=token_string, key=KEY)
+
+        # Non-ASCII key
+        token_db = auth_utils.create_signed_token(username='stanley', expiry=self._get_expiry(),
+                                                  key=u'k\xe9y')
+        self.assertEqual(auth_utils.parse_signed_token(token_db.token, key=u'k\xe9y').user,
+                         'stanley')
+
+    def test_validate_signed_token(self):
+        tests_config.CONF.set_override(name='token_signing_key', override=KEY, group='auth')
+        self.addCleanup(tests_config.CONF.clear_override, name='token_signing_key',
+                        group='auth')
+
+        token_db = auth_utils.create_signed_token(username='stanley', expiry=self._get_expiry(),
+                                                  key=KEY)
+        auth_utils.tokencache._set_token_cache(auth_utils.tokencache.TokenCache(ttl=60,
+                                                                                max_size=10))
+        self.addCleanup(auth_utils.tokencache._set_token_cache, None)
+
+        result = auth_utils.validate_token(token_in_headers=None,
+                                           token_in_query_params=token_db.token)
+        self.assertEqual(result.user, 'stanley')
+
+        token_db = auth_utils.create_signed_token(username='stanley',
+                                                  expiry=self._get_expiry(seconds=-10), key=KEY)
+        self.assertRaises(TokenExpiredError, auth_utils.validate_token, token_in_headers=None,
+                          token_in_query_params=token_db.token)
+
+    def test_signed_tokens_not_enabled(self):
+        token_db = auth_utils.create_signed_token(username='stanley', expiry=self._get_expiry(),
+                                                  key=KEY)
+        self.assertRaises(TokenNotFoundError, auth_utils.validate_token,
+                          token_in_headers=token_db.token, token_in_query_params=None)
@@ -0,0 +1,53 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest2
+
+from st2common.util.histogram import Histogram
+
+
+class HistogramTestCase(unittest2.TestCase):
+
+    def test_observe(self):
+        histogram = Histogram(buckets=[1, 10, 100])
+
+        for value in [0.5, 1, 5, 10, 50, 1000]:
+            histogram.observe(value)
+
+        stats = histogram.get_stats()
+        self.assertEqual(stats['count'], 6)
+        self.assertEqual(stats['sum'], 1066.5)
+        self.assertEqual(stats['max'], 1000)
+        self.assertEqual(stats['buckets'], [(1, 2), (10, 2), (100, 1), (None, 1)])
+
+    def test_reset(self):
+        histogram = Histogram(buckets=[1, 10])
+        histogram.observe(5)
+        histogram.reset()
+
+        stats = histogram.get_stats()
+        self.assertEqual(stats['count'], 0)
+        self.assertEqual(stats['max'], None)
+        self.assertEqual(stats['buckets'], [(1, 0), (10, 0), (None, 0)])
+
+    def test_str(self):
+        histogram = Histogram(buckets=[1, 10])
+        histogram.observe(5)
+        histogram.observe(20)
+        self.assertEqual(str(histogram),
+                         'Histogram(count=2, sum=25, max=20, buckets=[<=10: 1, >10: 1])')
+
+    def test_unsorted_buckets(self):
+        self.assertRaises(ValueError, Histogram, buckets=[10, 1])
@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import jinja2
 import unittest2
 
 from st2common.util import jinja as jinja_utils
@@ -35,6 +36,51 @@ class JinjaUtilsRenderTestCase(unittest2.TestCase):
         expected = {'k2': 'v2', 'k1': 'v1', 'k3': ''}
         self.assertEqual(actual, expected)
 
+    def test_render_values_uses_template_cache(self):
+        jinja_utils._TEMPLATE_CACHE.clear()
+        stats = jinja_utils.get_template_cache_stats()
+
+        for _ in range(3):
+            actual = jinja_utils.render_values(mapping={'k1': '{{a}}', 'k2': 'static'},
+                                               context={'a': 'v1'})
+            self.assertEqual(actual, {'k1': 'v1', 'k2': 'static'})
+
+        # Plain strings are not cached
+        new_stats = jinja_utils.get_template_cache_stats()
+        self.assertEqual(new_stats['size'], 1)
+        self.assertEqual(new_stats['misses'] - stats['misses'], 1)
+        self.assertEqual(new_stats['hits'] - stats['hits'], 2)
+
+    def test_only_short_templates_are_cached(self):
+        jinja_utils._TEMPLATE_CACHE.clear()
+
+        long_template = '{{a}}' + 'x' * jinja_utils.TEMPLATE_CACHE_MAX_KEY_LENGTH
+        for value in ['secret value', long_template]:
+            self.assertEqual(jinja_utils.get_template(value).render({'a': ''}), value.replace(
+                '{{a}}', ''))
+
+        for value in ['{{a}}', '{% if a %}{% endif %}', '{# comment #}']:
+            jinja_utils.get_template(value)
+
+        self.assertEqual(jinja_utils.get_template_cache_stats()['size'], 3)
+
+    def test_template_cache_is_per_undefined_mode(self):
+        strict = jinja_utils.get_template('{{a}}')
+        lenient = jinja_utils.get_template('{{a}}', allow_undefined=True)
+
+        self.assertIsNot(strict, lenient)
+        self.assertIs(jinja_utils.get_template('{{a}}'), strict)
+        self.assertEqual(lenient.render({}), '')
+        self.assertRaises(jinja2.UndefinedError, strict.render, {})
+
+        self.assertIs(jinja_utils.get_shared_jinja_environment(),
+                      jinja_utils.get_shared_jinja_environment())
+        self.assertIn('regex_match', jinja_utils.get_shared_jinja_environment().filters)
+
+    def test_get_compiled_template_variables(self):
+        compiled = jinja_utils.get_compiled_template('{{a}} {{b.c | regex_match("x")}}')
+        self.assertEqual(compiled.variables, set(['a', 'b']))
+
 
 class JinjaUtilsRegexFilterTestCase(unittest2.TestCase):
 
@@ -0,0 +1,75 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest2
+
+from st2common.util.lru import LRUCache
+
+
+class LRUCacheTestCase(unittest2.TestCase):
+
+    def test_get_and_set(self):
+        cache = LRUCache(max_size=10)
+
+        self.assertEqual(cache.get('a'), None)
+        self.assertEqual(cache.get('a', 'default'), 'default')
+
+        cache.set('a', 1)
+        cache.set('b', None)
+        self.assertIn('a', cache)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('b', 'default'), None)
+        self.assertEqual(len(cache), 2)
+
+        cache.delete('a')
+        self.assertNotIn('a', cache)
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_item_is_evicted(self):
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+
+        # "a" becomes the most recently used item
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+
+    def test_get_or_set(self):
+        cache = LRUCache(max_size=10)
+        calls = []
+
+        def value_func(key):
+            calls.append(key)
+            return key.upper()
+
+        self.assertEqual(cache.get_or_set('a', value_func), 'A')
+        self.assertEqual(cache.get_or_set('a', value_func), 'A')
+        self.assertEqual(calls, ['a'])
+
+        stats = cache.get_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['size'], 1)
+        self.assertEqual(stats['max_size'], 10)
+
+    def test_invalid_max_size(self):
+        self.assertRaises(ValueError, LRUCache, max_size=0)
@@ -0,0 +1,129 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import eventlet
+import mock
+import unittest2
+
+from st2common.util import output_capture
+from st2common.util.output_capture import OutputCapture
+from st2common.util.green.shell import run_command
+
+
+class OutputCaptureTestCase(unittest2.TestCase):
+    def test_getvalue(self):
+        capture = OutputCapture()
+        capture.write('line 1\n')
+        capture.write(u'line 2 \u2603\n')
+
+        self.assertEqual(capture.getvalue(), u'line 1\nline 2 \u2603\n')
+        self.assertFalse(capture.truncated)
+
+    def test_output_is_spilled_to_file(self):
+        capture = OutputCapture(max_memory_size=10)
+        capture.write('a' * 100)
+
+        self.assertTrue(capture._file._rolled)
+        self.assertEqual(capture.getvalue(), 'a' * 100)
+
+    def test_getvalue_is_truncated(self):
+        capture = OutputCapture(max_result_size=5)
+        capture.write('12345')
+        self.assertFalse(capture.truncated)
+
+        capture.write('67890')
+        self.assertTrue(capture.truncated)
+        self.assertEqual(capture.size, 10)
+        self.assertEqual(capture.getvalue(), '67890')
+
+        # Writes after getvalue() are appended
+        capture.write('1')
+        self.assertEqual(capture.getvalue(), '78901')
+
+    @mock.patch.object(output_capture, 'CHUNK_FLUSH_INTERVAL', 1000)
+    @mock.patch.object(output_capture, 'CHUNK_FLUSH_SIZE', 10)
+    def test_chunk_handler(self):
+        chunk_handler = mock.Mock()
+        capture = OutputCapture(output_type='stderr', chunk_handler=chunk_handler)
+
+        capture.write('12345')
+        self.assertEqual(chunk_handler.call_count, 0)
+
+        capture.write('67890')
+        chunk_handler.assert_called_once_with('stderr', '1234567890')
+
+        capture.write('1')
+        capture.close()
+        self.assertEqual(chunk_handler.call_count, 2)
+        chunk_handler.assert_called_with('stderr', '1')
+
+    @mock.patch.object(output_capture, 'CHUNK_FLUSH_INTERVAL', 0.1)
+    def test_pending_output_is_flushed_after_interval(self):
+        chunk_handler = mock.Mock()
+        capture = OutputCapture(chunk_handler=chunk_handler)
+
+        # Output is flushed even if nothing else is written
+        capture.write('line 1\n')
+        self.assertEqual(chunk_handler.call_count, 0)
+
+        eventlet.sleep(0.3)
+        chunk_handler.assert_called_once_with('stdout', 'line 1\n')
+
+        capture.close()
+        self.assertEqual(chunk_handler.call_count, 1)
+
+    @mock.patch.object(output_capture, 'CHUNK_FLUSH_SIZE', 1)
+    def test_character_split_between_chunks_is_preserved(self):
+        chunk_handler = mock.Mock()
+        capture = OutputCapture(chunk_handler=chunk_handler)
+
+        data = u'a\u2603b'.encode('utf-8')
+        for index in range(len(data)):
+            capture.write(data[index])
+
+        capture.write('\xe2')
+        capture.close()
+
+        chunks = [call[0][1] for call in chunk_handler.call_args_list]
+        self.assertEqual(u''.join(chunks), u'a\u2603b\ufffd')
+
+    def test_chunk_handler_failure_is_ignored(self):
+        capture = OutputCapture(chunk_handler=mock.Mock(side_effect=Exception('Boom!')))
+        capture.write('1')
+        capture.flush()
+
+        self.assertEqual(capture.getvalue(), '1')
+
+    def test_run_command_streams_output(self):
+        chunk_handler = mock.Mock()
+        stdout_capture = OutputCapture(max_result_size=6, chunk_handler=chunk_handler)
+        cmd = 'echo line1; echo error >&2; echo line2'
+
+        exit_code, stdout, stderr, timed_out = run_command(cmd=cmd, shell=True,
+                                                           stdout_capture=stdout_capture)
+
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(stdout, 'line2\n')
+        self.assertEqual(stderr, 'error\n')
+        self.assertFalse(timed_out)
+        self.assertTrue(stdout_capture.truncated)
+
+        data = ''.join([call[0][1] for call in chunk_handler.call_args_list])
+        self.assertEqual(data, 'line1\nline2\n')
+
+    def test_run_command_timeout(self):
+        exit_code, _, _, timed_out = run_command(cmd='sleep 10', shell=True, timeout=0.1,
+                                                 stdout_capture=OutputCapture())
+        self.assertTrue(timed_out)
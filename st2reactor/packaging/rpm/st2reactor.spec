@@ -29,6 +29,8 @@ cp -R st2reactor %{buildroot}%{python2_sitelib}/
 cp -R conf/* %{buildroot}/etc/st2reactor
 install -m755 bin/st2sensorcontainer %{buildroot}/usr/bin/st2sensorcontainer
 install -m755 bin/st2rulesengine %{buildroot}/usr/bin/st2rulesengine
+/usr/bin/st2garbagecollector
+install -m755 bin/st2garbagecollector %{buildroot}/usr/bin/st2garbagecollector
 install -m755 bin/st2-rule-tester %{buildroot}/usr/bin/st2-rule-tester
 
 %files
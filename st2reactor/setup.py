@@ -44,6 +44,7 @@ setup(
     scripts=[
         'bin/st2-rule-tester',
         'bin/st2-trigger-refire',
+        'bin/st2garbagecollector',
         'bin/st2rulesengine',
         'bin/st2sensorcontainer'
     ]
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import eventlet
+
+from st2common import log as logging
+from st2common.service_setup import setup as common_setup
+from st2common.service_setup import teardown as common_teardown
+from st2reactor.garbage_collector import config
+from st2reactor.garbage_collector.base import GarbageCollectorService
+
+eventlet.monkey_patch(
+    os=True,
+    select=True,
+    socket=True,
+    thread=False if '--use-debugger' in sys.argv else True,
+    time=True)
+
+LOG = logging.getLogger('st2reactor.bin.garbagecollector')
+
+
+def _setup():
+    common_setup(service='garbagecollector', config=config, setup_db=True,
+                 register_mq_exchanges=False, register_signal_handlers=True)
+
+
+def _teardown():
+    common_teardown()
+
+
+def _run_worker():
+    LOG.info('(PID=%s) GarbageCollector started.', os.getpid())
+
+    garbage_collector = GarbageCollectorService()
+
+    try:
+        garbage_collector.run()
+    except (KeyboardInterrupt, SystemExit):
+        LOG.info('(PID=%s) GarbageCollector stopped.', os.getpid())
+        garbage_collector.shutdown()
+    except:
+        LOG.exception('(PID:%s) GarbageCollector quit due to exception.', os.getpid())
+        return 1
+
+    return 0
+
+
+def main():
+    try:
+        _setup()
+        return _run_worker()
+    except SystemExit as exit_code:
+        sys.exit(exit_code)
+    except:
+        LOG.exception('(PID=%s) GarbageCollector quit due to exception.', os.getpid())
+        return 1
+    finally:
+        _teardown()
@@ -23,7 +23,7 @@ LOG = logging.getLogger('st2reactor.bin.rulesengine')
 
 def _setup():
     common_setup(service='rulesengine', config=config, setup_db=True, register_mq_exchanges=True,
-                 register_signal_handlers=True)
+                 register_signal_handlers=True, use_resource_cache=True)
 
 
 def _teardown():
@@ -36,14 +36,7 @@ def create_trigger_instance(trigger, payload, occurrence_time, raise_on_no_trigg
     :param payload: Trigger payload.
     :type payload: ``dict``
     """
-    # TODO: This is nasty, this should take a unique reference and not a dict
-    if isinstance(trigger, six.string_types):
-        trigger_db = TriggerService.get_trigger_db_by_ref(trigger)
-    else:
-        type_ = trigger.get('type', None)
-        parameters = trigger.get('parameters', {})
-        trigger_db = TriggerService.get_trigger_db_given_type_and_params(type=type_,
-                                                                         parameters=parameters)
+    trigger_db = get_trigger_db(trigger)
 
     if trigger_db is None:
         LOG.debug('No trigger in db for %s', trigger)
@@ -51,10 +44,35 @@ def create_trigger_instance(trigger, payload, occurrence_time, raise_on_no_trigg
             raise StackStormDBObjectNotFoundError('Trigger not found for %s', trigger)
         return None
 
-    trigger_ref = trigger_db.get_reference().ref
+    trigger_instance = create_trigger_instance_db(trigger_db, payload, occurrence_time)
+    return TriggerInstance.add_or_update(trigger_instance)
+
+
+def get_trigger_db(trigger):
+    """
+    Return a trigger object given a string reference (pack.name) or a ``dict`` containing
+    'type' and 'parameters'.
+
+    :rtype: ``TriggerDB``
+    """
+    # TODO: This is nasty, this should take a unique reference and not a dict
+    if isinstance(trigger, six.string_types):
+        return TriggerService.get_trigger_db_by_ref(trigger)
+
+    type_ = trigger.get('type', None)
+    parameters = trigger.get('parameters', {})
+    return TriggerService.get_trigger_db_given_type_and_params(type=type_,
+                                                               parameters=parameters)
+
 
+def create_trigger_instance_db(trigger_db, payload, occurrence_time):
+    """
+    Create a trigger instance object for the provided trigger. Object is not persisted.
+
+    :rtype: ``TriggerInstanceDB``
+    """
     trigger_instance = TriggerInstanceDB()
-    trigger_instance.trigger = trigger_ref
+    trigger_instance.trigger = trigger_db.get_reference().ref
     trigger_instance.payload = payload
     trigger_instance.occurrence_time = occurrence_time
-    return TriggerInstance.add_or_update(trigger_instance)
+    return trigger_instance
@@ -0,0 +1,145 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Garbage collection service which periodically purges old executions, trigger instances and
+traces based on the configured retention policies.
+"""
+
+import datetime
+
+import eventlet
+from oslo_config import cfg
+
+from st2common import log as logging
+from st2common.garbage_collection import purge
+from st2common.util import date as date_utils
+
+__all__ = [
+    'GarbageCollectorService'
+]
+
+LOG = logging.getLogger(__name__)
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+class GarbageCollectorService(object):
+    def __init__(self, collection_interval=None, batch_size=None, rate_limit=None):
+        """
+        :param collection_interval: How often (in seconds) to purge the old objects.
+        :type collection_interval: ``int``
+
+        :param batch_size: Maximum number of objects deleted with a single query.
+        :type batch_size: ``int``
+
+        :param rate_limit: Maximum number of objects deleted per second.
+        :type rate_limit: ``int``
+        """
+        config = cfg.CONF.garbagecollector
+
+        self._collection_interval = collection_interval or config.collection_interval
+        self._batch_size = batch_size or config.batch_size
+        self._rate_limit = rate_limit if rate_limit is not None else config.rate_limit
+        self._running = True
+
+    def run(self):
+        self._setup_indexes()
+
+        while self._running:
+            self._perform_garbage_collection()
+            eventlet.sleep(self._collection_interval)
+
+    def shutdown(self):
+        self._running = False
+
+    def _setup_indexes(self):
+        config = cfg.CONF.garbagecollector
+        ttl = None
+
+        if config.use_ttl_indexes and config.trigger_instances_ttl > 0:
+            ttl = config.trigger_instances_ttl * DAY_SECONDS
+
+        purge.ensure_trigger_instances_ttl_index(ttl=ttl)
+
+    def _perform_garbage_collection(self):
+        LOG.info('Performing garbage collection...')
+
+        # Each purge is a separate step so a failure in one of them doesn't affect the others.
+        # Interrupted purge continues on the next run.
+        for method in [self._purge_action_executions, self._purge_trigger_instances,
+                       self._purge_traces]:
+            try:
+                method()
+            except Exception:
+                LOG.exception('Garbage collection step %s failed.', method.__name__)
+
+    def _purge_action_executions(self):
+        config = cfg.CONF.garbagecollector
+        ttl_per_action = self._get_action_executions_ttl_per_action()
+
+        for action_ref, ttl in sorted(ttl_per_action.items()):
+            if ttl <= 0:
+                continue
+
+            purge.purge_executions(timestamp=self._get_timestamp(ttl), action_ref=action_ref,
+                                   batch_size=self._batch_size,
+                                   rate_limiter=self._get_rate_limiter())
+
+        if config.action_executions_ttl > 0:
+            # Actions with their own retention policy are handled above
+            purge.purge_executions(timestamp=self._get_timestamp(config.action_executions_ttl),
+                                   exclude_action_refs=list(ttl_per_action.keys()),
+                                   batch_size=self._batch_size,
+                                   rate_limiter=self._get_rate_limiter())
+
+    def _purge_trigger_instances(self):
+        config = cfg.CONF.garbagecollector
+
+        if config.trigger_instances_ttl <= 0 or config.use_ttl_indexes:
+            # With TTL index the trigger instances are expired by MongoDB itself
+            return
+
+        purge.purge_trigger_instances(timestamp=self._get_timestamp(config.trigger_instances_ttl),
+                                      batch_size=self._batch_size,
+                                      rate_limiter=self._get_rate_limiter())
+
+    def _purge_traces(self):
+        config = cfg.CONF.garbagecollector
+
+        if config.traces_ttl <= 0:
+            return
+
+        purge.purge_traces(timestamp=self._get_timestamp(config.traces_ttl),
+                           batch_size=self._batch_size, rate_limiter=self._get_rate_limiter())
+
+    def _get_action_executions_ttl_per_action(self):
+        result = {}
+
+        for action_ref, ttl in (cfg.CONF.garbagecollector.action_executions_ttl_per_action or
+                                {}).items():
+            try:
+                result[action_ref] = int(ttl)
+            except ValueError:
+                LOG.warning('Ignoring invalid TTL "%s" for action "%s".', ttl, action_ref)
+
+        return result
+
+    def _get_rate_limiter(self):
+        return purge.RateLimiter(max_per_second=self._rate_limit)
+
+    @staticmethod
+    def _get_timestamp(ttl):
+        return date_utils.get_datetime_utc_now() - datetime.timedelta(days=ttl)
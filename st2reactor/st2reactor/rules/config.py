@@ -46,6 +46,48 @@ def _register_rules_engine_opts():
     ]
     CONF.register_opts(logging_opts, group='rulesengine')
 
+    rule_index_opts = [
+        cfg.BoolOpt('rule_index_enable', default=True,
+                    help='Keep an in-memory index of enabled rules and triggers instead of '
+                         'querying the database for each trigger instance.'),
+        cfg.IntOpt('rule_index_check_interval', default=300,
+                   help='How often (in seconds) to compare the rule index with the database. '
+                        '0 to disable.'),
+        cfg.BoolOpt('rules_network_enable', default=True,
+                    help='Match all the rules of a trigger using a shared matching network. '
+                         'Only used if the rule index is enabled.')
+    ]
+    CONF.register_opts(rule_index_opts, group='rulesengine')
+
+    batch_opts = [
+        cfg.IntOpt('trigger_instances_batch_size', default=1,
+                   help='Maximum number of trigger instances which are persisted and traced '
+                        'together using bulk writes. 1 to disable batching.'),
+        cfg.IntOpt('trigger_instances_batch_timeout', default=50,
+                   help='How long (in milliseconds) to wait for a batch of trigger instances '
+                        'to fill up before it is processed.')
+    ]
+    CONF.register_opts(batch_opts, group='rulesengine')
+
+    enforcement_opts = [
+        cfg.IntOpt('rule_enforcement_pool_size', default=10,
+                   help='Maximum number of rules which are enforced concurrently. 1 to enforce '
+                        'rules one after another.'),
+        cfg.BoolOpt('rule_enforcement_ordered', default=False,
+                    help='Enforce the rules matched by a trigger instance one after another, '
+                         'ordered by the rule reference.')
+    ]
+    CONF.register_opts(enforcement_opts, group='rulesengine')
+
+    partition_opts = [
+        cfg.StrOpt('partition_hash_ranges', default=None,
+                   help='Hash ranges of the trigger references this rules engine is responsible '
+                        'for, e.g. "MIN..2147483648". Rules engines with different ranges '
+                        'consume separate queues. If not set, all the trigger instances are '
+                        'processed.')
+    ]
+    CONF.register_opts(partition_opts, group='rulesengine')
+
     timer_opts = [
         cfg.StrOpt('local_timezone', default='America/Los_Angeles',
                    help='Timezone pertaining to the location where st2 is run.')
@@ -0,0 +1,292 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compiled form of rule criteria.
+
+Parsing of the criteria (JSONPath expressions, criteria pattern templates, regular expressions
+and operator lookup) happens once when the criteria is compiled. Evaluating compiled criteria
+against a trigger instance payload doesn't perform any parsing.
+"""
+
+import copy
+import re
+
+import six
+from jsonpath_rw import parse
+
+from st2common import log as logging
+from st2common.constants.system import SYSTEM_KV_PREFIX
+import st2common.operators as criteria_operators
+from st2common.util import jinja as jinja_utils
+from st2common.util import templating as templating_utils
+
+__all__ = [
+    'CompiledCriterion',
+    'CompiledCriteria',
+
+    'get_compiled_criteria'
+]
+
+LOG = logging.getLogger(__name__)
+
+# Name of the attribute under which compiled criteria is cached on the RuleDB object
+COMPILED_CRITERIA_ATTRIBUTE = '_compiled_criteria'
+
+
+class CompiledCriterion(object):
+    """
+    Single compiled criterion (payload key, operator and pattern).
+    """
+
+    def __init__(self, key, criterion):
+        """
+        :param key: Criterion key (JSONPath expression for the payload lookup).
+        :type key: ``str``
+
+        :param criterion: Criterion definition with "type" and "pattern" attributes.
+        :type criterion: ``dict``
+        """
+        self.key = key
+        self.operator = criterion.get('type', None)
+        self.pattern = criterion.get('pattern', None)
+
+        # True if the pattern doesn't reference any variables and can be evaluated once
+        self.is_static = True
+
+        self._expression = None
+        self._expression_error = None
+        self._template = None
+        self._pattern_error = None
+        self._op_func = None
+        self._op_error = None
+
+        if self.operator is not None:
+            self._compile()
+
+    @property
+    def is_valid(self):
+        """
+        False if the criterion can never match (e.g. operator is missing).
+        """
+        return self.operator is not None
+
+    @property
+    def is_compiled(self):
+        """
+        True if key, pattern and operator have all been compiled without an error.
+        """
+        return (self.is_valid and not self._expression_error and not self._pattern_error and
+                not self._op_error)
+
+    @property
+    def op_func(self):
+        if self._op_error:
+            raise self._op_error
+        return self._op_func
+
+    def get_pattern(self):
+        """
+        Return rendered criteria pattern.
+        """
+        if self._pattern_error:
+            raise self._pattern_error
+
+        if self.is_static:
+            return self.pattern
+
+        context = templating_utils.get_system_context()
+        context[SYSTEM_KV_PREFIX].prefetch([self.pattern])
+        return self._template.render(context)
+
+    def get_payload_value(self, payload_lookup):
+        """
+        Return the value for this criterion key from the provided payload lookup.
+
+        :type payload_lookup: :class:`st2reactor.rules.filter.PayloadLookup`
+        """
+        if self._expression_error:
+            raise self._expression_error
+
+        matches = payload_lookup.find(self._expression)
+
+        # pick value if only 1 matches else will end up being an array match.
+        if matches:
+            return matches[0] if len(matches) > 0 else matches
+
+        return None
+
+    def evaluate(self, payload_lookup, logger_context=None, value_cache=None):
+        """
+        Evaluate this criterion against the provided payload.
+
+        :param value_cache: Optional dictionary with already extracted payload values keyed by
+                            the criterion key. Extracted value is stored in it.
+        :type value_cache: ``dict``
+
+        :rtype: ``bool``
+        """
+        if not self.is_valid:
+            # Comparison operator type not specified, can't perform a comparison
+            return False
+
+        try:
+            criteria_pattern = self.get_pattern()
+        except Exception:
+            LOG.exception('Failed to render pattern value "%s" for key "%s"' %
+                          (self.pattern, self.key), extra=logger_context)
+            return False
+
+        if value_cache is not None and self.key in value_cache:
+            payload_value = value_cache[self.key]
+        else:
+            try:
+                payload_value = self.get_payload_value(payload_lookup)
+            except:
+                LOG.exception('Failed transforming criteria key %s', self.key,
+                              extra=logger_context)
+                return False
+
+            if value_cache is not None:
+                value_cache[self.key] = payload_value
+
+        return self.evaluate_value(payload_value=payload_value, criteria_pattern=criteria_pattern,
+                                   logger_context=logger_context)
+
+    def evaluate_value(self, payload_value, criteria_pattern, logger_context=None):
+        op_func = self.op_func
+
+        try:
+            result = op_func(value=payload_value, criteria_pattern=criteria_pattern)
+        except:
+            LOG.exception('There might be a problem with critera in rule %s.',
+                          (logger_context or {}).get('rule', None), extra=logger_context)
+            return False
+
+        return result
+
+    def _compile(self):
+        try:
+            self._expression = parse(self.key)
+        except Exception as e:
+            self._expression_error = e
+
+        try:
+            self._compile_pattern()
+        except Exception as e:
+            self._pattern_error = e
+
+        try:
+            self._op_func = criteria_operators.get_operator(self.operator)
+        except Exception as e:
+            self._op_error = e
+            return
+
+        if (self.operator.lower() == criteria_operators.MATCH_REGEX and self.is_static and
+                not self._pattern_error and self.pattern is not None):
+            self._op_func = self._get_compiled_regex_op_func(self.pattern)
+
+    def _compile_pattern(self):
+        if not self.pattern:
+            self.pattern = None
+            return
+
+        if not isinstance(self.pattern, six.string_types):
+            # We only perform rendering if value is a string - rendering a non-string value
+            # makes no sense
+            return
+
+        # Same environment as st2common.util.templating.render_template
+        compiled = jinja_utils.get_compiled_template(self.pattern)
+
+        if compiled.variables:
+            self.is_static = False
+            self._template = compiled.template
+        else:
+            # Pattern doesn't reference any variables so the rendered value never changes
+            self.pattern = compiled.template.render({})
+
+    @staticmethod
+    def _get_compiled_regex_op_func(pattern):
+        try:
+            regex = re.compile(pattern)
+        except Exception:
+            # Let the operator raise during evaluation
+            return criteria_operators.match_regex
+
+        def match_compiled_regex(value, criteria_pattern):
+            # check for a match and not for details of the match.
+            return regex.match(value) is not None
+
+        return match_compiled_regex
+
+
+class CompiledCriteria(object):
+    """
+    Compiled form of the rule criteria.
+    """
+
+    def __init__(self, criteria):
+        """
+        :param criteria: Rule criteria.
+        :type criteria: ``dict``
+        """
+        # Copy is stored so staleness of the cached compiled criteria can be detected
+        self.criteria = copy.deepcopy(criteria or {})
+        self.criteria_list = [CompiledCriterion(key=key, criterion=criterion) for key, criterion
+                              in six.iteritems(self.criteria)]
+
+    def __len__(self):
+        return len(self.criteria_list)
+
+    def __iter__(self):
+        return iter(self.criteria_list)
+
+    def is_compiled_from(self, criteria):
+        return self.criteria == (criteria or {})
+
+    def evaluate(self, payload_lookup, logger_context=None):
+        """
+        :rtype: ``bool``
+        """
+        value_cache = {}
+
+        for criterion in self.criteria_list:
+            if not criterion.evaluate(payload_lookup=payload_lookup,
+                                      logger_context=logger_context,
+                                      value_cache=value_cache):
+                return False
+
+        return True
+
+
+def get_compiled_criteria(rule):
+    """
+    Return compiled criteria for the provided rule. Compiled criteria is cached on the rule
+    object and only re-compiled if the rule criteria changes.
+
+    :param rule: Rule DB object.
+    :type rule: :class:`RuleDB`
+
+    :rtype: :class:`CompiledCriteria`
+    """
+    compiled_criteria = getattr(rule, COMPILED_CRITERIA_ATTRIBUTE, None)
+
+    if compiled_criteria and compiled_criteria.is_compiled_from(rule.criteria):
+        return compiled_criteria
+
+    compiled_criteria = CompiledCriteria(criteria=rule.criteria)
+    setattr(rule, COMPILED_CRITERIA_ATTRIBUTE, compiled_criteria)
+    return compiled_criteria
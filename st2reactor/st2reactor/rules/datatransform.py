@@ -15,6 +15,8 @@
 
 import copy
 
+import six
+
 from st2common.constants.rules import TRIGGER_PAYLOAD_PREFIX
 from st2common.constants.system import SYSTEM_KV_PREFIX
 from st2common.services.keyvalues import KeyValueLookup
@@ -29,6 +31,10 @@ class Jinja2BasedTransformer(object):
     def __call__(self, mapping):
         context = copy.copy(self._payload_context)
         context[SYSTEM_KV_PREFIX] = KeyValueLookup()
+
+        # Retrieve all the datastore values referenced by the mapping at once
+        context[SYSTEM_KV_PREFIX].prefetch(six.itervalues(mapping or {}))
+
         return jinja_utils.render_values(mapping=mapping, context=context)
 
     @staticmethod
@@ -33,9 +33,20 @@ LOG = logging.getLogger('st2reactor.ruleenforcement.enforce')
 
 
 class RuleEnforcer(object):
-    def __init__(self, trigger_instance, rule):
+    def __init__(self, trigger_instance, rule, trace_db=None, trace_batch=None):
+        """
+        :param trace_db: Optional Trace of the trigger instance. If not provided, it's looked up
+                         using the trigger instance.
+        :type trace_db: ``TraceDB``
+
+        :param trace_batch: Optional batch to which the rule is added instead of updating the
+                            Trace right away. Caller is responsible for committing the batch.
+        :type trace_batch: :class:`st2common.services.trace.TraceComponentsBatch`
+        """
         self.trigger_instance = trigger_instance
         self.rule = rule
+        self.trace_db = trace_db
+        self.trace_batch = trace_batch
 
         try:
             self.data_transformer = get_transformer(trigger_instance.payload)
@@ -89,18 +100,23 @@ class RuleEnforcer(object):
         """
         :rtype: ``dict`` trace_context as a dict; could be None
         """
-        trace_db = None
-        try:
-            trace_db = trace_service.get_trace_db_by_trigger_instance(self.trigger_instance)
-        except:
-            LOG.exception('No Trace found for TriggerInstance %s.', self.trigger_instance.id)
-            return None
+        trace_db = self.trace_db
+
+        if not trace_db:
+            try:
+                trace_db = trace_service.get_trace_db_by_trigger_instance(self.trigger_instance)
+            except:
+                LOG.exception('No Trace found for TriggerInstance %s.', self.trigger_instance.id)
+                return None
 
         # This would signify some sort of coding error so assert.
         assert trace_db
 
-        trace_db = trace_service.add_or_update_given_trace_db(trace_db=trace_db,
-                                                              rules=[str(self.rule.id)])
+        if self.trace_batch is not None:
+            self.trace_batch.add(trace_db, rules=[str(self.rule.id)])
+        else:
+            trace_db = trace_service.add_or_update_given_trace_db(trace_db=trace_db,
+                                                                  rules=[str(self.rule.id)])
         return vars(TraceContext(id_=str(trace_db.id), trace_tag=trace_db.trace_tag))
 
     @staticmethod
@@ -13,8 +13,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import time
+
+import eventlet
+
 from st2common import log as logging
 from st2common.persistence.rule import Rule
+from st2common.util.histogram import Histogram
 from st2common.services.triggers import get_trigger_db_by_ref
 from st2reactor.rules.enforcer import RuleEnforcer
 from st2reactor.rules.matcher import RulesMatcher
@@ -23,31 +28,79 @@ LOG = logging.getLogger('st2reactor.rules.RulesEngine')
 
 
 class RulesEngine(object):
-    def handle_trigger_instance(self, trigger_instance):
+    def __init__(self, rule_index=None, use_rules_network=True, enforcement_pool_size=1,
+                 enforcement_ordered=False):
+        """
+        :param rule_index: Optional in-memory index which is used to look up trigger and rule
+                           objects instead of querying the database for each trigger instance.
+        :type rule_index: :class:`st2reactor.rules.index.RuleIndex`
+
+        :param use_rules_network: True to match all the rules of a trigger using a shared
+                                  matching network built by the rule index.
+        :type use_rules_network: ``bool``
+
+        :param enforcement_pool_size: Maximum number of rules which are enforced concurrently.
+                                      1 to enforce rules one after another.
+        :type enforcement_pool_size: ``int``
+
+        :param enforcement_ordered: True to enforce the matching rules of a trigger instance one
+                                    after another, ordered by the rule reference.
+        :type enforcement_ordered: ``bool``
+        """
+        self.rule_index = rule_index
+        self.use_rules_network = use_rules_network
+        self.enforcement_ordered = enforcement_ordered
+
+        self._enforcement_pool = None
+        if enforcement_pool_size > 1 and not enforcement_ordered:
+            self._enforcement_pool = eventlet.GreenPool(enforcement_pool_size)
+
+        # Time (in milliseconds) it took to enforce all the matching rules of a trigger instance
+        self.enforcement_latency = Histogram()
+
+    def handle_trigger_instance(self, trigger_instance, trace_db=None, trace_batch=None):
+        """
+        :param trace_db: Optional Trace of the trigger instance.
+        :type trace_db: ``TraceDB``
+
+        :param trace_batch: Optional batch which collects the Trace updates.
+        :type trace_batch: :class:`st2common.services.trace.TraceComponentsBatch`
+        """
         # Find matching rules for trigger instance.
         matching_rules = self.get_matching_rules_for_trigger(trigger_instance)
 
         # Create rule enforcers.
-        enforcers = self.create_rule_enforcers(trigger_instance, matching_rules)
+        enforcers = self.create_rule_enforcers(trigger_instance, matching_rules,
+                                               trace_db=trace_db, trace_batch=trace_batch)
 
         # Enforce the rules.
         self.enforce_rules(enforcers)
 
     def get_matching_rules_for_trigger(self, trigger_instance):
-        trigger = trigger_instance.trigger
-        trigger = get_trigger_db_by_ref(trigger_instance.trigger)
-        rules = Rule.query(trigger=trigger_instance.trigger, enabled=True)
+        network = None
+
+        if self.rule_index:
+            trigger, rules = self.rule_index.get_trigger_and_rules(trigger_instance.trigger)
+
+            if self.use_rules_network:
+                network = self.rule_index.get_rules_network(trigger_instance.trigger,
+                                                            rules=rules)
+        else:
+            trigger = get_trigger_db_by_ref(trigger_instance.trigger)
+            rules = Rule.query(trigger=trigger_instance.trigger, enabled=True)
+
         LOG.info('Found %d rules defined for trigger %s (type=%s)', len(rules), trigger['name'],
                  trigger['type'])
         matcher = RulesMatcher(trigger_instance=trigger_instance,
-                               trigger=trigger, rules=rules)
+                               trigger=trigger, rules=rules, network=network)
 
         matching_rules = matcher.get_matching_rules()
         LOG.info('Matched %s rule(s) for trigger_instance %s (type=%s)', len(matching_rules),
                  trigger['name'], trigger['type'])
         return matching_rules
 
-    def create_rule_enforcers(self, trigger_instance, matching_rules):
+    def create_rule_enforcers(self, trigger_instance, matching_rules, trace_db=None,
+                              trace_batch=None):
         """
         Creates a RuleEnforcer matching to each rule.
 
@@ -56,12 +109,41 @@ class RulesEngine(object):
         """
         enforcers = []
         for matching_rule in matching_rules:
-            enforcers.append(RuleEnforcer(trigger_instance, matching_rule))
+            enforcers.append(RuleEnforcer(trigger_instance, matching_rule, trace_db=trace_db,
+                                          trace_batch=trace_batch))
         return enforcers
 
     def enforce_rules(self, enforcers):
-        for enforcer in enforcers:
-            try:
-                enforcer.enforce()  # Should this happen in an eventlet pool?
-            except:
-                LOG.exception('Exception enforcing rule %s.', enforcer.rule)
+        """
+        Enforce the provided rules. Failure to enforce a rule doesn't affect the other rules.
+
+        :rtype: ``list`` of :class:`LiveActionDB` with an item (None on failure) for each of
+                the enforcers.
+        """
+        start_time = time.time()
+
+        if self.enforcement_ordered:
+            enforcers = sorted(enforcers, key=lambda enforcer: enforcer.rule.ref)
+
+        if self._enforcement_pool and len(enforcers) > 1:
+            pile = eventlet.GreenPile(self._enforcement_pool)
+            for enforcer in enforcers:
+                pile.spawn(self._enforce_rule, enforcer)
+            results = list(pile)
+        else:
+            results = [self._enforce_rule(enforcer) for enforcer in enforcers]
+
+        if enforcers:
+            duration = (time.time() - start_time) * 1000
+            self.enforcement_latency.observe(duration)
+            LOG.debug('Enforced %s rule(s) in %.2f ms.', len(enforcers), duration)
+
+        return results
+
+    def _enforce_rule(self, enforcer):
+        try:
+            return enforcer.enforce()
+        except:
+            LOG.exception('Exception enforcing rule %s.', enforcer.rule)
+
+        return None
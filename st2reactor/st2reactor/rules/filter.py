@@ -13,15 +13,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import six
 from jsonpath_rw import parse
 
 from st2common import log as logging
-import st2common.operators as criteria_operators
 from st2common.constants.rules import TRIGGER_PAYLOAD_PREFIX, RULE_TYPE_BACKSTOP
 from st2common.constants.system import SYSTEM_KV_PREFIX
 from st2common.services.keyvalues import KeyValueLookup
-from st2common.util.templating import render_template_with_system_context
+from st2reactor.rules.criteria import get_compiled_criteria
 
 
 LOG = logging.getLogger('st2reactor.ruleenforcement.filter')
@@ -62,8 +60,7 @@ class RuleFilter(object):
         if not self.rule.enabled:
             return False
 
-        criteria = self.rule.criteria
-        is_rule_applicable = True
+        criteria = get_compiled_criteria(self.rule)
 
         if criteria and not self.trigger_instance.payload:
             return False
@@ -73,11 +70,8 @@ class RuleFilter(object):
         LOG.debug('Trigger payload: %s', self.trigger_instance.payload,
                   extra=self._base_logger_context)
 
-        for criterion_k in criteria.keys():
-            criterion_v = criteria[criterion_k]
-            is_rule_applicable = self._check_criterion(criterion_k, criterion_v, payload_lookup)
-            if not is_rule_applicable:
-                break
+        is_rule_applicable = criteria.evaluate(payload_lookup=payload_lookup,
+                                               logger_context=self._base_logger_context)
 
         if not is_rule_applicable:
             LOG.debug('Rule %s not applicable for %s.', self.rule.id, self.trigger['name'],
@@ -85,57 +79,6 @@ class RuleFilter(object):
 
         return is_rule_applicable
 
-    def _check_criterion(self, criterion_k, criterion_v, payload_lookup):
-        if 'type' not in criterion_v:
-            # Comparison operator type not specified, can't perform a comparison
-            return False
-
-        criteria_operator = criterion_v['type']
-        criteria_pattern = criterion_v.get('pattern', None)
-
-        # Render the pattern (it can contain a jinja expressions)
-        try:
-            criteria_pattern = self._render_criteria_pattern(criteria_pattern=criteria_pattern)
-        except Exception:
-            LOG.exception('Failed to render pattern value "%s" for key "%s"' %
-                          (criteria_pattern, criterion_k), extra=self._base_logger_context)
-            return False
-
-        try:
-            matches = payload_lookup.get_value(criterion_k)
-            # pick value if only 1 matches else will end up being an array match.
-            if matches:
-                payload_value = matches[0] if len(matches) > 0 else matches
-            else:
-                payload_value = None
-        except:
-            LOG.exception('Failed transforming criteria key %s', criterion_k,
-                          extra=self._base_logger_context)
-            return False
-
-        op_func = criteria_operators.get_operator(criteria_operator)
-
-        try:
-            result = op_func(value=payload_value, criteria_pattern=criteria_pattern)
-        except:
-            LOG.exception('There might be a problem with critera in rule %s.', self.rule,
-                          extra=self._base_logger_context)
-            return False
-
-        return result
-
-    def _render_criteria_pattern(self, criteria_pattern):
-        if not criteria_pattern:
-            return None
-
-        if not isinstance(criteria_pattern, six.string_types):
-            # We only perform rendering if value is a string - rendering a non-string value
-            # makes no sense
-            return criteria_pattern
-
-        criteria_pattern = render_template_with_system_context(value=criteria_pattern)
-        return criteria_pattern
-
 
 class SecondPassRuleFilter(RuleFilter):
     """
@@ -179,6 +122,12 @@ class PayloadLookup(object):
 
     def get_value(self, lookup_key):
         expr = parse(lookup_key)
+        return self.find(expr)
+
+    def find(self, expr):
+        """
+        Return values matching an already parsed JSONPath expression.
+        """
         matches = [match.value for match in expr.find(self._context)]
         if not matches:
             return None
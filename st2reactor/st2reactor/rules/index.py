@@ -0,0 +1,404 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import uuid
+
+import eventlet
+import six
+from kombu import Connection
+from kombu.mixins import ConsumerMixin
+
+from st2common import log as logging
+from st2common.persistence.rule import Rule
+from st2common.persistence.trigger import Trigger
+from st2common.services.triggers import get_trigger_db_by_ref
+from st2common.transport import publishers, reactor, serialization
+from st2common.transport import utils as transport_utils
+from st2reactor.rules.criteria import get_compiled_criteria
+from st2reactor.rules.network import RulesNetwork
+
+__all__ = [
+    'RuleIndex',
+    'RuleIndexWatcher'
+]
+
+LOG = logging.getLogger(__name__)
+
+
+class RuleIndex(object):
+    """
+    In-memory index of enabled rules and trigger objects keyed by the trigger reference.
+
+    The index is seeded from the database once and then kept current by applying the rule and
+    trigger CUD events which are published on the message bus. A lookup for a trigger
+    reference which is not in the index falls back to the database and the result is stored in
+    the index.
+
+    If a trigger filter is provided, only the triggers (and rules of the triggers) accepted by
+    the filter are indexed.
+    """
+
+    def __init__(self, trigger_filter=None):
+        """
+        :param trigger_filter: Function which returns True for the trigger objects which should
+                               be indexed.
+        :type trigger_filter: ``callable``
+        """
+        self._trigger_filter = trigger_filter
+
+        # Maps trigger ref -> TriggerDB
+        self._triggers = {}
+
+        # Maps trigger ref -> {rule id -> RuleDB}
+        self._rules = {}
+
+        # Maps rule id -> trigger ref the rule is currently indexed under
+        self._rule_trigger_refs = {}
+
+        # Maps trigger ref -> RulesNetwork built from the indexed rules
+        self._networks = {}
+
+        self._hits = 0
+        self._misses = 0
+
+    def seed(self):
+        """
+        (Re)build the whole index from the database.
+        """
+        triggers, rules, rule_trigger_refs = self._load_from_db()
+
+        self._triggers = triggers
+        self._rules = rules
+        self._rule_trigger_refs = rule_trigger_refs
+        self._networks = {}
+
+        LOG.info('Rule index seeded with %s trigger(s) and %s enabled rule(s).',
+                 len(triggers), len(rule_trigger_refs))
+
+    def get_trigger_and_rules(self, trigger_ref):
+        """
+        Return a trigger object and a list of enabled rules for the provided trigger reference.
+
+        :param trigger_ref: Reference of the trigger.
+        :type trigger_ref: ``str``
+
+        :rtype: ``tuple`` of (:class:`TriggerDB`, ``list`` of :class:`RuleDB`)
+        """
+        trigger_db = self._triggers.get(trigger_ref, None)
+
+        if trigger_db:
+            self._hits += 1
+            return trigger_db, list(six.itervalues(self._rules.get(trigger_ref, {})))
+
+        self._misses += 1
+        LOG.debug('Rule index miss for trigger "%s", falling back to the database.',
+                  trigger_ref)
+
+        trigger_db = get_trigger_db_by_ref(trigger_ref)
+        rule_dbs = list(Rule.query(trigger=trigger_ref, enabled=True))
+
+        if trigger_db and self._is_indexed(trigger_db):
+            self._triggers[trigger_ref] = trigger_db
+
+            for rule_db in rule_dbs:
+                self.add_or_update_rule(rule_db)
+
+        return trigger_db, rule_dbs
+
+    def get_trigger(self, trigger_ref):
+        """
+        Return a trigger object for the provided trigger reference.
+
+        :rtype: :class:`TriggerDB`
+        """
+        trigger_db = self._triggers.get(trigger_ref, None)
+
+        if trigger_db:
+            return trigger_db
+
+        trigger_db, _ = self.get_trigger_and_rules(trigger_ref)
+        return trigger_db
+
+    def get_rules_network(self, trigger_ref, rules):
+        """
+        Return a matching network for all the rules of the provided trigger.
+
+        Network of an indexed trigger is built on first use and cached until the rules of the
+        trigger change. Network of a trigger which is not indexed is built from the provided
+        rules (as returned by :meth:`get_trigger_and_rules`) and not cached.
+
+        :param rules: Enabled rules of the trigger.
+        :type rules: ``list`` of :class:`RuleDB`
+
+        :rtype: :class:`st2reactor.rules.network.RulesNetwork`
+        """
+        if trigger_ref not in self._triggers:
+            return RulesNetwork(rules=rules)
+
+        network = self._networks.get(trigger_ref, None)
+
+        if not network:
+            network = RulesNetwork(rules=list(six.itervalues(self._rules.get(trigger_ref, {}))))
+            self._networks[trigger_ref] = network
+
+        return network
+
+    def get_stats(self):
+        """
+        Return index hit / miss counters and size information.
+
+        :rtype: ``dict``
+        """
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'triggers': len(self._triggers),
+            'rules': len(self._rule_trigger_refs)
+        }
+
+    def add_or_update_trigger(self, trigger_db):
+        trigger_ref = trigger_db.get_reference().ref
+
+        if not self._is_indexed(trigger_db):
+            return
+
+        self._triggers[trigger_ref] = trigger_db
+
+    def delete_trigger(self, trigger_db):
+        trigger_ref = trigger_db.get_reference().ref
+        self._triggers.pop(trigger_ref, None)
+
+    def add_or_update_rule(self, rule_db):
+        # Rule could have been moved to a different trigger or disabled so it's always
+        # removed from the old bucket first
+        self.delete_rule(rule_db)
+
+        if not rule_db.enabled or not self._is_rule_indexed(rule_db):
+            return
+
+        # Criteria is compiled when the rule is loaded so matching doesn't need to parse it
+        get_compiled_criteria(rule_db)
+
+        rule_id = str(rule_db.id)
+        self._rules.setdefault(rule_db.trigger, {})[rule_id] = rule_db
+        self._rule_trigger_refs[rule_id] = rule_db.trigger
+        self._networks.pop(rule_db.trigger, None)
+
+    def delete_rule(self, rule_db):
+        rule_id = str(rule_db.id)
+        trigger_ref = self._rule_trigger_refs.pop(rule_id, None)
+
+        if trigger_ref is None:
+            return
+
+        self._networks.pop(trigger_ref, None)
+
+        bucket = self._rules.get(trigger_ref, {})
+        bucket.pop(rule_id, None)
+
+        if not bucket:
+            self._rules.pop(trigger_ref, None)
+
+    def check_consistency(self, repair=True):
+        """
+        Compare the index with the database content.
+
+        :param repair: True to replace the index with the database content if an inconsistency
+                       is detected.
+        :type repair: ``bool``
+
+        :return: True if the index is consistent with the database.
+        :rtype: ``bool``
+        """
+        triggers, rules, rule_trigger_refs = self._load_from_db()
+
+        indexed_triggers = set(self._triggers.keys())
+        db_triggers = set(triggers.keys())
+        indexed_rules = dict(self._rule_trigger_refs)
+
+        consistent = True
+
+        if indexed_triggers != db_triggers:
+            consistent = False
+            LOG.warning('Rule index is inconsistent, trigger(s) missing from the index: %s, '
+                        'stale trigger(s) in the index: %s.',
+                        list(db_triggers - indexed_triggers),
+                        list(indexed_triggers - db_triggers))
+
+        if indexed_rules != rule_trigger_refs:
+            consistent = False
+            LOG.warning('Rule index is inconsistent, rule(s) missing from the index: %s, '
+                        'stale rule(s) in the index: %s.',
+                        list(set(rule_trigger_refs.items()) - set(indexed_rules.items())),
+                        list(set(indexed_rules.items()) - set(rule_trigger_refs.items())))
+
+        if not consistent and repair:
+            self._triggers = triggers
+            self._rules = rules
+            self._rule_trigger_refs = rule_trigger_refs
+            self._networks = {}
+
+        LOG.info('Rule index consistency check finished (consistent=%s, stats=%s).',
+                 consistent, self.get_stats())
+        return consistent
+
+    def _is_indexed(self, trigger_db):
+        return not self._trigger_filter or self._trigger_filter(trigger_db)
+
+    def _is_rule_indexed(self, rule_db):
+        if not self._trigger_filter or rule_db.trigger in self._triggers:
+            return True
+
+        # Trigger event could arrive after the rule event
+        trigger_db = get_trigger_db_by_ref(rule_db.trigger)
+
+        if not trigger_db or not self._is_indexed(trigger_db):
+            return False
+
+        self._triggers[rule_db.trigger] = trigger_db
+        return True
+
+    def _load_from_db(self):
+        triggers = {}
+        for trigger_db in Trigger.get_all():
+            trigger_ref = trigger_db.get_reference().ref
+
+            if self._is_indexed(trigger_db):
+                triggers[trigger_ref] = trigger_db
+
+        if self._trigger_filter:
+            # Only rules of the indexed triggers are loaded
+            rule_dbs = Rule.query(enabled=True, trigger__in=list(triggers.keys()))
+        else:
+            rule_dbs = Rule.query(enabled=True)
+
+        rules = {}
+        rule_trigger_refs = {}
+        for rule_db in rule_dbs:
+            get_compiled_criteria(rule_db)
+
+            rule_id = str(rule_db.id)
+            rules.setdefault(rule_db.trigger, {})[rule_id] = rule_db
+            rule_trigger_refs[rule_id] = rule_db.trigger
+
+        return triggers, rules, rule_trigger_refs
+
+
+class RuleIndexWatcher(ConsumerMixin):
+    """
+    Keeps a :class:`RuleIndex` current by consuming rule and trigger CUD events.
+    """
+
+    def __init__(self, rule_index, consistency_check_interval=300):
+        """
+        :param rule_index: Index to keep up to date.
+        :type rule_index: :class:`RuleIndex`
+
+        :param consistency_check_interval: How often (in seconds) to compare the index with the
+                                           database. 0 disables the check.
+        :type consistency_check_interval: ``int``
+        """
+        self._rule_index = rule_index
+        self._consistency_check_interval = consistency_check_interval
+
+        queue_suffix = uuid.uuid4().hex[-10:]
+        self._rule_watch_q = reactor.get_rule_cud_queue(
+            'st2.rule.index.%s' % (queue_suffix), routing_key='#', exclusive=True,
+            auto_delete=True)
+        self._trigger_watch_q = reactor.get_trigger_cud_queue(
+            'st2.trigger.index.%s' % (queue_suffix), routing_key='#', exclusive=True,
+            auto_delete=True)
+
+        self.connection = None
+        self._updates_thread = None
+        self._consistency_check_thread = None
+
+        self._rule_handlers = {
+            publishers.CREATE_RK: self._rule_index.add_or_update_rule,
+            publishers.UPDATE_RK: self._rule_index.add_or_update_rule,
+            publishers.DELETE_RK: self._rule_index.delete_rule
+        }
+        self._trigger_handlers = {
+            publishers.CREATE_RK: self._rule_index.add_or_update_trigger,
+            publishers.UPDATE_RK: self._rule_index.add_or_update_trigger,
+            publishers.DELETE_RK: self._rule_index.delete_trigger
+        }
+
+    def get_consumers(self, Consumer, channel):
+        return [
+            Consumer(queues=[self._rule_watch_q], accept=serialization.ACCEPT_CONTENT,
+                     callbacks=[self.process_rule_task]),
+            Consumer(queues=[self._trigger_watch_q], accept=serialization.ACCEPT_CONTENT,
+                     callbacks=[self.process_trigger_task])
+        ]
+
+    def process_rule_task(self, body, message):
+        self._process_task(body=body, message=message, handlers=self._rule_handlers)
+
+    def process_trigger_task(self, body, message):
+        self._process_task(body=body, message=message, handlers=self._trigger_handlers)
+
+    def start(self):
+        try:
+            self.connection = Connection(transport_utils.get_messaging_urls())
+            self._updates_thread = eventlet.spawn(self.run)
+
+            # Seed after the consumers have been spawned so changes made while the index is being
+            # loaded are not lost.
+            eventlet.sleep(0)
+            self._rule_index.seed()
+
+            if self._consistency_check_interval:
+                self._consistency_check_thread = eventlet.spawn(self._check_consistency)
+        except:
+            LOG.exception('Failed to start rule index watcher.')
+            self.connection.release()
+            raise
+
+    def stop(self):
+        try:
+            if self._consistency_check_thread:
+                self._consistency_check_thread = eventlet.kill(self._consistency_check_thread)
+            if self._updates_thread:
+                self._updates_thread = eventlet.kill(self._updates_thread)
+        finally:
+            if self.connection:
+                self.connection.release()
+
+    def _process_task(self, body, message, handlers):
+        routing_key = message.delivery_info.get('routing_key', '')
+        handler = handlers.get(routing_key, None)
+
+        try:
+            if not handler:
+                LOG.debug('Skipping message %s as no handler was found.', message)
+                return
+
+            try:
+                handler(body)
+            except Exception as e:
+                LOG.exception('Handling failed. Message body: %s. Exception: %s',
+                              body, e.message)
+        finally:
+            message.ack()
+
+    def _check_consistency(self):
+        while True:
+            eventlet.sleep(self._consistency_check_interval)
+
+            try:
+                self._rule_index.check_consistency(repair=True)
+            except:
+                LOG.exception('Rule index consistency check failed.')
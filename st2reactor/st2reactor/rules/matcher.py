@@ -21,31 +21,46 @@ LOG = logging.getLogger('st2reactor.rules.RulesMatcher')
 
 
 class RulesMatcher(object):
-    def __init__(self, trigger_instance, trigger, rules):
+    def __init__(self, trigger_instance, trigger, rules, network=None):
+        """
+        :param network: Optional pre-built matching network for the provided rules. If not
+                        provided, each rule is evaluated independently.
+        :type network: :class:`st2reactor.rules.network.RulesNetwork`
+        """
         self.trigger_instance = trigger_instance
         self.trigger = trigger
         self.rules = rules
+        self.network = network
 
     def get_matching_rules(self):
+        if self.network:
+            matched_rules, matched_in_second_pass = self.network.get_matching_rules(
+                trigger_instance=self.trigger_instance, trigger=self.trigger)
+        else:
+            matched_rules, matched_in_second_pass = self._get_matching_rules_linear()
+
+        LOG.debug('[1st_pass] %d rule(s) found to enforce for %s.', len(matched_rules),
+                  self.trigger['name'])
+        LOG.debug('[2nd_pass] %d rule(s) found to enforce for %s.', len(matched_in_second_pass),
+                  self.trigger['name'])
+        matched_rules = matched_rules + matched_in_second_pass
+        LOG.info('%d rule(s) found to enforce for %s.', len(matched_rules),
+                 self.trigger['name'])
+        return matched_rules
+
+    def _get_matching_rules_linear(self):
         first_pass, second_pass = self._split_rules_into_passes()
         # first pass
         rule_filters = [RuleFilter(self.trigger_instance, self.trigger, rule)
                         for rule in first_pass]
         matched_rules = [rule_filter.rule for rule_filter in rule_filters if rule_filter.filter()]
-        LOG.debug('[1st_pass] %d rule(s) found to enforce for %s.', len(matched_rules),
-                  self.trigger['name'])
         # second pass
         rule_filters = [SecondPassRuleFilter(self.trigger_instance, self.trigger, rule,
                                              matched_rules)
                         for rule in second_pass]
         matched_in_second_pass = [rule_filter.rule for rule_filter in rule_filters
                                   if rule_filter.filter()]
-        LOG.debug('[2nd_pass] %d rule(s) found to enforce for %s.', len(matched_in_second_pass),
-                  self.trigger['name'])
-        matched_rules.extend(matched_in_second_pass)
-        LOG.info('%d rule(s) found to enforce for %s.', len(matched_rules),
-                 self.trigger['name'])
-        return matched_rules
+        return matched_rules, matched_in_second_pass
 
     def _split_rules_into_passes(self):
         """
@@ -0,0 +1,249 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Discrimination network for matching all the rules of a single trigger at once.
+
+Each payload field referenced by the rule criteria is extracted only once per trigger instance.
+"equals", "exists" and "nexists" criteria with a static pattern are indexed in hash tables and
+used to prune the candidate rules. Only the remaining (non-indexable) criteria are evaluated for
+each candidate rule.
+"""
+
+import six
+
+from st2common import log as logging
+import st2common.operators as criteria_operators
+from st2common.constants.rules import RULE_TYPE_BACKSTOP
+from st2reactor.rules.criteria import get_compiled_criteria
+from st2reactor.rules.filter import PayloadLookup
+
+__all__ = [
+    'RulesNetwork'
+]
+
+LOG = logging.getLogger(__name__)
+
+EQUALS_OPERATORS = [criteria_operators.EQUALS_SHORT, criteria_operators.EQUALS_LONG]
+EXISTS_OPERATORS = [criteria_operators.KEY_EXISTS]
+NEXISTS_OPERATORS = [criteria_operators.KEY_NOT_EXISTS]
+
+
+class DiscriminationTree(object):
+    """
+    Matching structure for a list of rules which are evaluated in the same pass.
+    """
+
+    def __init__(self, rules):
+        """
+        :param rules: Rules to match.
+        :type rules: ``list`` of :class:`RuleDB`
+        """
+        self.rules = list(rules)
+
+        # Criterion used to extract the value for each of the indexed keys
+        self._key_criteria = {}
+
+        # key -> {pattern -> [rule position]}
+        self._equals = {}
+
+        # key -> [rule position]
+        self._exists = {}
+        self._nexists = {}
+
+        # Number of indexed criteria per rule
+        self._indexed_counts = []
+
+        # Criteria which need to be evaluated for each candidate rule
+        self._residual_criteria = []
+
+        self._has_criteria = []
+
+        for position, rule in enumerate(self.rules):
+            self._add_rule(position=position, rule=rule)
+
+    def match(self, payload_lookup, payload, value_cache, logger_context=None):
+        """
+        Return rules matching the provided payload in the original order.
+
+        :param value_cache: Dictionary with the payload values extracted so far keyed by the
+                            criteria key. It's shared between the passes.
+        :type value_cache: ``dict``
+
+        :rtype: ``list``
+        """
+        if not payload:
+            # Rules with criteria can't match an empty payload
+            return [rule for position, rule in enumerate(self.rules)
+                    if rule.enabled and not self._has_criteria[position]]
+
+        satisfied_counts = [0] * len(self.rules)
+
+        for key, criterion in six.iteritems(self._key_criteria):
+            if key in value_cache:
+                value = value_cache[key]
+            else:
+                try:
+                    value = criterion.get_payload_value(payload_lookup)
+                except:
+                    LOG.exception('Failed transforming criteria key %s', key,
+                                  extra=logger_context)
+                    continue
+
+                value_cache[key] = value
+
+            for position in self._get_satisfied_positions(key=key, value=value):
+                satisfied_counts[position] += 1
+
+        matched_rules = []
+        for position, rule in enumerate(self.rules):
+            if not rule.enabled:
+                continue
+
+            if satisfied_counts[position] != self._indexed_counts[position]:
+                continue
+
+            rule_logger_context = dict(logger_context or {})
+            rule_logger_context['rule'] = rule
+
+            is_rule_applicable = True
+            for criterion in self._residual_criteria[position]:
+                if not criterion.evaluate(payload_lookup=payload_lookup,
+                                          logger_context=rule_logger_context,
+                                          value_cache=value_cache):
+                    is_rule_applicable = False
+                    break
+
+            if is_rule_applicable:
+                matched_rules.append(rule)
+
+        return matched_rules
+
+    def _get_satisfied_positions(self, key, value):
+        positions = []
+
+        if value is not None:
+            positions.extend(self._exists.get(key, []))
+        else:
+            positions.extend(self._nexists.get(key, []))
+
+        equals = self._equals.get(key, None)
+        if equals and value is not None:
+            try:
+                positions.extend(equals.get(value, []))
+            except TypeError:
+                # Unhashable payload value (e.g. list or dict), compare against all the patterns
+                for pattern, pattern_positions in six.iteritems(equals):
+                    if value == pattern:
+                        positions.extend(pattern_positions)
+
+        return positions
+
+    def _add_rule(self, position, rule):
+        criteria = get_compiled_criteria(rule)
+
+        indexed_count = 0
+        residual_criteria = []
+
+        for criterion in criteria:
+            if self._index_criterion(position=position, criterion=criterion):
+                indexed_count += 1
+            else:
+                residual_criteria.append(criterion)
+
+        self._indexed_counts.append(indexed_count)
+        self._residual_criteria.append(residual_criteria)
+        self._has_criteria.append(len(criteria) > 0)
+
+    def _index_criterion(self, position, criterion):
+        if not criterion.is_compiled or not criterion.is_static:
+            return False
+
+        operator = criterion.operator.lower()
+
+        if operator in EQUALS_OPERATORS:
+            if criterion.pattern is None:
+                return False
+
+            try:
+                hash(criterion.pattern)
+            except TypeError:
+                return False
+
+            patterns = self._equals.setdefault(criterion.key, {})
+            patterns.setdefault(criterion.pattern, []).append(position)
+        elif operator in EXISTS_OPERATORS:
+            self._exists.setdefault(criterion.key, []).append(position)
+        elif operator in NEXISTS_OPERATORS:
+            self._nexists.setdefault(criterion.key, []).append(position)
+        else:
+            return False
+
+        self._key_criteria.setdefault(criterion.key, criterion)
+        return True
+
+
+class RulesNetwork(object):
+    """
+    Shared matching structure for all the enabled rules of a single trigger.
+
+    Rules are split in two passes the same way as in
+    :class:`st2reactor.rules.matcher.RulesMatcher` - backstop rules are only considered if no
+    other rule has matched.
+    """
+
+    def __init__(self, rules):
+        """
+        :param rules: Rules of a single trigger.
+        :type rules: ``list`` of :class:`RuleDB`
+        """
+        first_pass = []
+        second_pass = []
+
+        for rule in rules:
+            if rule.type['ref'] != RULE_TYPE_BACKSTOP:
+                first_pass.append(rule)
+            else:
+                second_pass.append(rule)
+
+        self._first_pass = DiscriminationTree(first_pass)
+        self._second_pass = DiscriminationTree(second_pass)
+
+    def get_matching_rules(self, trigger_instance, trigger):
+        """
+        :rtype: ``tuple`` of (``list``, ``list``) with rules matched in the first and second pass.
+        """
+        logger_context = {
+            'trigger': trigger,
+            'trigger_instance': trigger_instance
+        }
+
+        payload = trigger_instance.payload
+        payload_lookup = PayloadLookup(payload)
+        value_cache = {}
+
+        matched_rules = self._first_pass.match(payload_lookup=payload_lookup, payload=payload,
+                                               value_cache=value_cache,
+                                               logger_context=logger_context)
+
+        # backstop rules only apply if no rule matched in the first pass.
+        if matched_rules:
+            return matched_rules, []
+
+        matched_in_second_pass = self._second_pass.match(payload_lookup=payload_lookup,
+                                                         payload=payload,
+                                                         value_cache=value_cache,
+                                                         logger_context=logger_context)
+        return matched_rules, matched_in_second_pass
@@ -0,0 +1,114 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from st2common.transport import reactor
+from st2reactor.container.hash_partitioner import Range, SUB_RANGE_SEPARATOR
+
+__all__ = [
+    'TriggerInstancePartitioner'
+]
+
+
+class TriggerInstancePartitioner(object):
+    """
+    Decides which trigger instances a rules engine is responsible for.
+
+    Rules engine owns the triggers whose reference hash falls into one of the configured hash
+    ranges. Ranges use the same format as the sensor container hash partitioner (e.g.
+    MIN..2147483648|3221225472..MAX). The work queue of the rules engine is only bound to the
+    partitions which overlap with the ranges.
+    """
+
+    def __init__(self, hash_ranges):
+        """
+        :param hash_ranges: Hash ranges of the owned trigger references.
+        :type hash_ranges: ``str``
+        """
+        self._hash_ranges = [Range(range_repr.strip())
+                             for range_repr in hash_ranges.split(SUB_RANGE_SEPARATOR)]
+
+    def get_partitions(self):
+        """
+        Return partitions which overlap with any of the hash ranges.
+
+        :rtype: ``list`` of ``int``
+        """
+        partition_size = reactor.TRIGGER_REF_HASH_MAX // reactor.TRIGGER_INSTANCE_PARTITIONS
+
+        partitions = set()
+        for hash_range in self._hash_ranges:
+            if hash_range.range_start >= hash_range.range_end:
+                continue
+
+            first_partition = hash_range.range_start // partition_size
+            last_partition = min((hash_range.range_end - 1) // partition_size,
+                                 reactor.TRIGGER_INSTANCE_PARTITIONS - 1)
+            partitions.update(range(first_partition, last_partition + 1))
+
+        return sorted(partitions)
+
+    def get_queue_name_suffix(self):
+        """
+        Return suffix for the name of the work queue. Rules engines configured with the same
+        ranges share the work queue.
+
+        :rtype: ``str``
+        """
+        return '_'.join(['%s-%s' % (hash_range.range_start, hash_range.range_end)
+                         for hash_range in self._hash_ranges])
+
+    def is_trigger_owner(self, trigger_ref):
+        """
+        :param trigger_ref: Trigger reference.
+        :type trigger_ref: ``str``
+
+        :rtype: ``bool``
+        """
+        trigger_ref_hash = reactor.get_trigger_ref_hash(trigger_ref)
+
+        for hash_range in self._hash_ranges:
+            if trigger_ref_hash in hash_range:
+                return True
+
+        return False
+
+    def is_trigger_db_owner(self, trigger_db):
+        """
+        Return True if the rules engine can receive trigger instances of the provided trigger.
+
+        Trigger instances are routed by the trigger reference or, if the sensor identifies the
+        trigger by the type and parameters, by the trigger type (see
+        :func:`st2common.transport.reactor.get_trigger_instance_partition_key`) so the trigger is
+        owned if either of them is owned.
+
+        :param trigger_db: Trigger object.
+        :type trigger_db: :class:`TriggerDB`
+
+        :rtype: ``bool``
+        """
+        if self.is_trigger_owner(trigger_db.get_reference().ref):
+            return True
+
+        return bool(trigger_db.type) and self.is_trigger_owner(trigger_db.type)
+
+    def is_trigger_instance_owner(self, instance):
+        """
+        :param instance: Trigger instance message with the "trigger" attribute.
+        :type instance: ``dict``
+
+        :rtype: ``bool``
+        """
+        partition_key = reactor.get_trigger_instance_partition_key(instance['trigger'])
+        return self.is_trigger_owner(partition_key)
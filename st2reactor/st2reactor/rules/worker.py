@@ -13,16 +13,25 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import six
 from kombu import Connection
+from oslo_config import cfg
 
 from st2common import log as logging
 from st2common.constants.trace import TRACE_CONTEXT, TRACE_ID
+from st2common.exceptions.db import StackStormDBObjectNotFoundError
+from st2common.persistence.trigger import TriggerInstance
 from st2common.util import date as date_utils
+from st2common.services.keyvalues import get_key_value_cache_watcher
 from st2common.services.trace import add_or_update_given_trace_context
+from st2common.services.trace import add_or_update_given_trace_contexts
+from st2common.services.trace import TraceComponentsBatch
 from st2common.transport import consumers, reactor
 from st2common.transport import utils as transport_utils
 import st2reactor.container.utils as container_utils
 from st2reactor.rules.engine import RulesEngine
+from st2reactor.rules.index import RuleIndex, RuleIndexWatcher
+from st2reactor.rules.partitioner import TriggerInstancePartitioner
 
 
 LOG = logging.getLogger(__name__)
@@ -33,12 +42,62 @@ RULESENGINE_WORK_Q = reactor.get_trigger_instances_queue(
 
 class TriggerInstanceDispatcher(consumers.MessageHandler):
     message_type = dict
+    service_name = 'rulesengine'
 
-    def __init__(self, connection, queues):
-        super(TriggerInstanceDispatcher, self).__init__(connection, queues)
-        self.rules_engine = RulesEngine()
+    def __init__(self, connection, queues, partitioner=None):
+        """
+        :param partitioner: Partitioner used in the sharded mode. Only trigger instances owned by
+                            the partitioner are processed and only rules of the owned triggers
+                            are indexed.
+        :type partitioner: :class:`TriggerInstancePartitioner`
+        """
+        super(TriggerInstanceDispatcher, self).__init__(
+            connection, queues,
+            batch_size=cfg.CONF.rulesengine.trigger_instances_batch_size,
+            batch_timeout=cfg.CONF.rulesengine.trigger_instances_batch_timeout / 1000.0)
+
+        self._partitioner = partitioner
+        self._rule_index_watcher = None
+        self._kv_cache_watcher = get_key_value_cache_watcher()
+        rule_index = None
+
+        if cfg.CONF.rulesengine.rule_index_enable:
+            trigger_filter = partitioner.is_trigger_db_owner if partitioner else None
+            rule_index = RuleIndex(trigger_filter=trigger_filter)
+            self._rule_index_watcher = RuleIndexWatcher(
+                rule_index=rule_index,
+                consistency_check_interval=cfg.CONF.rulesengine.rule_index_check_interval)
+
+        self.rules_engine = RulesEngine(
+            rule_index=rule_index,
+            use_rules_network=cfg.CONF.rulesengine.rules_network_enable,
+            enforcement_pool_size=cfg.CONF.rulesengine.rule_enforcement_pool_size,
+            enforcement_ordered=cfg.CONF.rulesengine.rule_enforcement_ordered)
+
+    def start(self, wait=False):
+        if self._rule_index_watcher:
+            self._rule_index_watcher.start()
+
+        if self._kv_cache_watcher:
+            self._kv_cache_watcher.start()
+
+        super(TriggerInstanceDispatcher, self).start(wait=wait)
+
+    def shutdown(self):
+        super(TriggerInstanceDispatcher, self).shutdown()
+
+        LOG.info('Rule enforcement latency (ms): %s', self.rules_engine.enforcement_latency)
+
+        if self._rule_index_watcher:
+            self._rule_index_watcher.stop()
+
+        if self._kv_cache_watcher:
+            self._kv_cache_watcher.stop()
 
     def process(self, instance):
+        if not self._is_owner(instance):
+            return
+
         trigger = instance['trigger']
         payload = instance['payload']
 
@@ -57,13 +116,7 @@ class TriggerInstanceDispatcher(consumers.MessageHandler):
 
         if trigger_instance:
             try:
-                # Use trace_context from the instance and if not found create a new context
-                # and use the trigger_instance.id as trace_tag.
-                trace_context = instance.get(TRACE_CONTEXT, None)
-                if not trace_context:
-                    trace_context = {
-                        TRACE_ID: 'trigger_instance-%s' % str(trigger_instance.id)
-                    }
+                trace_context = self._get_trace_context(instance, trigger_instance)
                 # add a trace or update an existing trace with trigger_instance
                 add_or_update_given_trace_context(trace_context=trace_context,
                                                   trigger_instances=[str(trigger_instance.id)])
@@ -76,7 +129,112 @@ class TriggerInstanceDispatcher(consumers.MessageHandler):
                 LOG.exception('Failed to handle trigger_instance %s.', instance)
                 return
 
+    def process_batch(self, instances):
+        """
+        Process multiple trigger instances. Trigger instances and new traces are inserted using
+        a single bulk insert each and trace updates are grouped in bulk writes.
+        """
+        valid_instances = []
+        trigger_instances = []
+        for instance in instances:
+            if not self._is_owner(instance):
+                continue
+
+            try:
+                trigger_db = self._get_trigger_db(instance['trigger'])
+                if trigger_db is None:
+                    raise StackStormDBObjectNotFoundError('Trigger not found for %s' %
+                                                          (instance['trigger']))
+
+                trigger_instance = container_utils.create_trigger_instance_db(
+                    trigger_db,
+                    instance['payload'] or {},
+                    date_utils.get_datetime_utc_now())
+            except:
+                LOG.exception('Failed to create trigger_instance %s.', instance)
+                continue
+
+            valid_instances.append(instance)
+            trigger_instances.append(trigger_instance)
+
+        if not trigger_instances:
+            return
+
+        trigger_instances = TriggerInstance.insert_many(trigger_instances)
+
+        trace_contexts = [self._get_trace_context(instance, trigger_instance_db)
+                          for instance, trigger_instance_db
+                          in zip(valid_instances, trigger_instances)]
+        trace_dbs = add_or_update_given_trace_contexts(
+            trace_contexts=trace_contexts,
+            trigger_instances=[[str(trigger_instance_db.id)]
+                               for trigger_instance_db in trigger_instances])
+
+        # Rules added to the traces by the enforcers are pushed using a single bulk write
+        trace_batch = TraceComponentsBatch()
+
+        for instance, trigger_instance, trace_db in zip(valid_instances, trigger_instances,
+                                                        trace_dbs):
+            if not trace_db:
+                LOG.error('Failed to handle trigger_instance %s, trace for context %s not found.',
+                          instance, instance.get(TRACE_CONTEXT, None))
+                continue
+
+            try:
+                self.rules_engine.handle_trigger_instance(trigger_instance, trace_db=trace_db,
+                                                          trace_batch=trace_batch)
+            except:
+                LOG.exception('Failed to handle trigger_instance %s.', instance)
+
+        try:
+            trace_batch.commit()
+        except:
+            # Rules have already been enforced so the failure mustn't propagate (trigger instances
+            # would be processed again one by one)
+            LOG.exception('Failed to add rules to the traces of %s trigger instances.',
+                          len(trigger_instances))
+
+    def _is_owner(self, instance):
+        if not self._partitioner or self._partitioner.is_trigger_instance_owner(instance):
+            return True
+
+        # Partitions of the work queue can overlap with partitions of another rules engine if
+        # the hash ranges are not aligned to the partition boundaries
+        LOG.debug('Skipping trigger instance %s owned by another rules engine.', instance)
+        return False
+
+    def _get_trigger_db(self, trigger):
+        rule_index = self.rules_engine.rule_index
+
+        if rule_index and isinstance(trigger, six.string_types):
+            return rule_index.get_trigger(trigger)
+
+        return container_utils.get_trigger_db(trigger)
+
+    @staticmethod
+    def _get_trace_context(instance, trigger_instance):
+        # Use trace_context from the instance and if not found create a new context
+        # and use the trigger_instance.id as trace_tag.
+        trace_context = instance.get(TRACE_CONTEXT, None)
+        if not trace_context:
+            trace_context = {
+                TRACE_ID: 'trigger_instance-%s' % str(trigger_instance.id)
+            }
+        return trace_context
+
 
 def get_worker():
+    partitioner = None
+    work_q = RULESENGINE_WORK_Q
+
+    if cfg.CONF.rulesengine.partition_hash_ranges:
+        partitioner = TriggerInstancePartitioner(cfg.CONF.rulesengine.partition_hash_ranges)
+        work_q = reactor.get_trigger_instances_partitions_queue(
+            name='%s.%s' % (RULESENGINE_WORK_Q.name, partitioner.get_queue_name_suffix()),
+            partitions=partitioner.get_partitions())
+
+        LOG.info('Rules engine is sharded, consuming partitions %s.',
+                 partitioner.get_partitions())
+
     with Connection(transport_utils.get_messaging_urls()) as conn:
-        return TriggerInstanceDispatcher(conn, [RULESENGINE_WORK_Q])
+        return TriggerInstanceDispatcher(conn, [work_q], partitioner=partitioner)
@@ -0,0 +1,84 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mock
+import unittest2
+from oslo_config import cfg
+
+import st2tests.config as tests_config
+tests_config.parse_args()
+
+from st2reactor.garbage_collector import base
+from st2reactor.garbage_collector.base import GarbageCollectorService
+
+
+@mock.patch.object(base, 'purge')
+class GarbageCollectorServiceTestCase(unittest2.TestCase):
+    def tearDown(self):
+        super(GarbageCollectorServiceTestCase, self).tearDown()
+        cfg.CONF.clear_override('action_executions_ttl', group='garbagecollector')
+        cfg.CONF.clear_override('action_executions_ttl_per_action', group='garbagecollector')
+        cfg.CONF.clear_override('trigger_instances_ttl', group='garbagecollector')
+        cfg.CONF.clear_override('traces_ttl', group='garbagecollector')
+        cfg.CONF.clear_override('use_ttl_indexes', group='garbagecollector')
+
+    def test_nothing_is_purged_by_default(self, mock_purge):
+        service = GarbageCollectorService()
+        service._perform_garbage_collection()
+
+        self.assertEqual(mock_purge.purge_executions.call_count, 0)
+        self.assertEqual(mock_purge.purge_trigger_instances.call_count, 0)
+        self.assertEqual(mock_purge.purge_traces.call_count, 0)
+
+    def test_per_action_ttl(self, mock_purge):
+        cfg.CONF.set_override('action_executions_ttl', 30, group='garbagecollector')
+        cfg.CONF.set_override('action_executions_ttl_per_action',
+                              {'core.local': '7', 'core.http': '0'}, group='garbagecollector')
+
+        service = GarbageCollectorService()
+        service._perform_garbage_collection()
+
+        calls = mock_purge.purge_executions.call_args_list
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[0][1]['action_ref'], 'core.local')
+
+        # Actions with their own TTL are excluded from the global one (also if they are kept
+        # forever)
+        self.assertItemsEqual(calls[1][1]['exclude_action_refs'], ['core.local', 'core.http'])
+        self.assertTrue(calls[1][1]['timestamp'] < calls[0][1]['timestamp'])
+
+    def test_trigger_instances_ttl_index(self, mock_purge):
+        cfg.CONF.set_override('trigger_instances_ttl', 2, group='garbagecollector')
+        service = GarbageCollectorService()
+
+        service._setup_indexes()
+        mock_purge.ensure_trigger_instances_ttl_index.assert_called_with(ttl=None)
+        service._perform_garbage_collection()
+        self.assertEqual(mock_purge.purge_trigger_instances.call_count, 1)
+
+        cfg.CONF.set_override('use_ttl_indexes', True, group='garbagecollector')
+        service._setup_indexes()
+        mock_purge.ensure_trigger_instances_ttl_index.assert_called_with(ttl=2 * 24 * 60 * 60)
+        service._perform_garbage_collection()
+        self.assertEqual(mock_purge.purge_trigger_instances.call_count, 1)
+
+    def test_failed_step_doesnt_stop_collection(self, mock_purge):
+        cfg.CONF.set_override('action_executions_ttl', 30, group='garbagecollector')
+        cfg.CONF.set_override('traces_ttl', 30, group='garbagecollector')
+        mock_purge.purge_executions.side_effect = Exception('failure')
+
+        service = GarbageCollectorService()
+        service._perform_garbage_collection()
+        self.assertEqual(mock_purge.purge_traces.call_count, 1)
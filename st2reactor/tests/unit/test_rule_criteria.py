@@ -0,0 +1,74 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mock
+import unittest2
+
+from st2common.models.db.rule import RuleDB
+from st2reactor.rules import criteria as criteria_module
+from st2reactor.rules.criteria import CompiledCriterion, get_compiled_criteria
+from st2reactor.rules.filter import PayloadLookup
+
+PAYLOAD = {'p1': 'v1', 'p2': 'preYYYpost', 'int': 1}
+
+
+class CompiledCriteriaTestCase(unittest2.TestCase):
+
+    def test_static_pattern_is_rendered_once(self):
+        criterion = CompiledCriterion('trigger.p1', {'type': 'equals', 'pattern': '{{ "v" }}1'})
+        self.assertTrue(criterion.is_static)
+        self.assertEqual(criterion.get_pattern(), 'v1')
+        self.assertTrue(criterion.evaluate(PayloadLookup(PAYLOAD)))
+
+    def test_dynamic_pattern(self):
+        criterion = CompiledCriterion('trigger.p1',
+                                      {'type': 'equals', 'pattern': '{{ system.value }}'})
+        self.assertFalse(criterion.is_static)
+
+        mock_lookup = mock.MagicMock()
+        mock_lookup.value = 'v1'
+        with mock.patch('st2common.util.templating.KeyValueLookup',
+                        mock.MagicMock(return_value=mock_lookup)):
+            self.assertTrue(criterion.evaluate(PayloadLookup(PAYLOAD)))
+
+    def test_regex_is_compiled_once(self):
+        criterion = CompiledCriterion('trigger.p2', {'type': 'matchregex',
+                                                     'pattern': '^pre.*post$'})
+
+        with mock.patch.object(criteria_module.re, 'compile', mock.MagicMock()) as mock_compile:
+            for _ in range(5):
+                self.assertTrue(criterion.evaluate(PayloadLookup(PAYLOAD)))
+            self.assertEqual(mock_compile.call_count, 0)
+
+    def test_missing_operator_never_matches(self):
+        criterion = CompiledCriterion('trigger.p1', {'pattern': 'v1'})
+        self.assertFalse(criterion.is_valid)
+        self.assertFalse(criterion.evaluate(PayloadLookup(PAYLOAD)))
+
+    def test_invalid_operator_raises_on_evaluation(self):
+        criterion = CompiledCriterion('trigger.p1', {'type': 'invalid', 'pattern': 'v1'})
+        self.assertRaises(Exception, criterion.evaluate, PayloadLookup(PAYLOAD))
+
+    def test_compiled_criteria_is_cached_on_the_rule(self):
+        rule = RuleDB(pack='wolfpack', name='some1',
+                      criteria={'trigger.p1': {'type': 'equals', 'pattern': 'v1'}})
+        compiled_criteria = get_compiled_criteria(rule)
+        self.assertTrue(get_compiled_criteria(rule) is compiled_criteria)
+        self.assertEqual(len(compiled_criteria), 1)
+
+        # Changed criteria is re-compiled
+        rule.criteria = {'trigger.p1': {'type': 'equals', 'pattern': 'v2'}}
+        self.assertFalse(get_compiled_criteria(rule) is compiled_criteria)
+        self.assertFalse(get_compiled_criteria(rule).evaluate(PayloadLookup(PAYLOAD)))
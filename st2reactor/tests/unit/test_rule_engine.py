@@ -13,7 +13,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import eventlet
 import mock
+import unittest2
 from mongoengine import NotUniqueError
 
 from st2common.models.api.rule import RuleAPI
@@ -242,3 +244,81 @@ class RuleEngineTest(DbTestCase):
         rules.append(rule_db)
 
         return rules
+
+
+class FakeEnforcer(object):
+    def __init__(self, ref, sleep=0, fail=False, calls=None):
+        self.rule = mock.Mock(ref=ref)
+        self._sleep = sleep
+        self._fail = fail
+        self._calls = calls if calls is not None else []
+
+    def enforce(self):
+        self._calls.append(('start', self.rule.ref))
+        eventlet.sleep(self._sleep)
+        self._calls.append(('end', self.rule.ref))
+
+        if self._fail:
+            raise ValueError('Enforcement of %s failed' % (self.rule.ref))
+
+        return self.rule.ref
+
+
+class RuleEnforcementTest(unittest2.TestCase):
+
+    def test_enforce_rules_serial(self):
+        calls = []
+        enforcers = [FakeEnforcer('pack.b', calls=calls), FakeEnforcer('pack.a', calls=calls)]
+
+        rules_engine = RulesEngine(enforcement_pool_size=1)
+        results = rules_engine.enforce_rules(enforcers)
+
+        self.assertEqual(results, ['pack.b', 'pack.a'])
+        self.assertEqual(calls, [('start', 'pack.b'), ('end', 'pack.b'),
+                                 ('start', 'pack.a'), ('end', 'pack.a')])
+
+    def test_enforce_rules_concurrently(self):
+        calls = []
+        enforcers = [FakeEnforcer('pack.rule%s' % (index), sleep=0.01, calls=calls)
+                     for index in range(0, 4)]
+
+        rules_engine = RulesEngine(enforcement_pool_size=2)
+        results = rules_engine.enforce_rules(enforcers)
+
+        # Results are returned in the enforcers order
+        self.assertEqual(results, ['pack.rule0', 'pack.rule1', 'pack.rule2', 'pack.rule3'])
+
+        # At most 2 rules are enforced at the same time
+        self.assertEqual(calls[:2], [('start', 'pack.rule0'), ('start', 'pack.rule1')])
+        in_progress = 0
+        for call, _ in calls:
+            in_progress += 1 if call == 'start' else -1
+            self.assertTrue(in_progress <= 2)
+
+    def test_enforce_rules_failure_is_isolated(self):
+        enforcers = [FakeEnforcer('pack.a', fail=True), FakeEnforcer('pack.b')]
+
+        for pool_size in [1, 10]:
+            rules_engine = RulesEngine(enforcement_pool_size=pool_size)
+            results = rules_engine.enforce_rules(enforcers)
+            self.assertEqual(results, [None, 'pack.b'])
+
+    def test_enforce_rules_ordered(self):
+        calls = []
+        enforcers = [FakeEnforcer('pack.c', calls=calls), FakeEnforcer('pack.a', calls=calls),
+                     FakeEnforcer('pack.b', calls=calls)]
+
+        rules_engine = RulesEngine(enforcement_pool_size=10, enforcement_ordered=True)
+        results = rules_engine.enforce_rules(enforcers)
+
+        self.assertEqual(results, ['pack.a', 'pack.b', 'pack.c'])
+        self.assertEqual([ref for call, ref in calls if call == 'start'],
+                         ['pack.a', 'pack.b', 'pack.c'])
+
+    def test_enforcement_latency_is_recorded(self):
+        rules_engine = RulesEngine(enforcement_pool_size=10)
+        rules_engine.enforce_rules([FakeEnforcer('pack.a'), FakeEnforcer('pack.b')])
+        rules_engine.enforce_rules([FakeEnforcer('pack.a')])
+        rules_engine.enforce_rules([])
+
+        self.assertEqual(rules_engine.enforcement_latency.get_stats()['count'], 2)
@@ -0,0 +1,184 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bson
+import mock
+import unittest2
+
+from st2common.models.db.rule import RuleDB
+from st2common.models.db.trigger import TriggerDB
+from st2common.persistence.rule import Rule
+from st2common.persistence.trigger import Trigger
+from st2common.transport import reactor
+from st2reactor.rules import index as index_module
+from st2reactor.rules.index import RuleIndex
+from st2reactor.rules.partitioner import TriggerInstancePartitioner
+
+TRIGGER_1 = TriggerDB(pack='dummy_pack_1', name='trigger1', type='dummy_pack_1.type1')
+TRIGGER_2 = TriggerDB(pack='dummy_pack_1', name='trigger2', type='dummy_pack_1.type1')
+
+
+def _get_rule_db(name, trigger, enabled=True):
+    rule_db = RuleDB(pack='sixpack', name=name, trigger=trigger, enabled=enabled)
+    rule_db.id = bson.ObjectId()
+    return rule_db
+
+
+RULE_1 = _get_rule_db('rule1', 'dummy_pack_1.trigger1')
+RULE_2 = _get_rule_db('rule2', 'dummy_pack_1.trigger1')
+RULE_3 = _get_rule_db('rule3', 'dummy_pack_1.trigger2')
+
+
+@mock.patch.object(Trigger, 'get_all', mock.MagicMock(return_value=[TRIGGER_1, TRIGGER_2]))
+@mock.patch.object(Rule, 'query', mock.MagicMock(return_value=[RULE_1, RULE_2, RULE_3]))
+class RuleIndexTestCase(unittest2.TestCase):
+
+    def test_seed_and_lookup(self):
+        rule_index = RuleIndex()
+        rule_index.seed()
+
+        trigger_db, rule_dbs = rule_index.get_trigger_and_rules('dummy_pack_1.trigger1')
+        self.assertEqual(trigger_db, TRIGGER_1)
+        self.assertItemsEqual(rule_dbs, [RULE_1, RULE_2])
+
+        trigger_db, rule_dbs = rule_index.get_trigger_and_rules('dummy_pack_1.trigger2')
+        self.assertEqual(trigger_db, TRIGGER_2)
+        self.assertItemsEqual(rule_dbs, [RULE_3])
+
+        stats = rule_index.get_stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 0)
+        self.assertEqual(stats['triggers'], 2)
+        self.assertEqual(stats['rules'], 3)
+
+    @mock.patch.object(index_module, 'get_trigger_db_by_ref', mock.MagicMock(return_value=None))
+    def test_lookup_miss_falls_back_to_db(self):
+        rule_index = RuleIndex()
+        rule_index.seed()
+
+        Rule.query.reset_mock()
+        trigger_db, _ = rule_index.get_trigger_and_rules('dummy_pack_1.unknown')
+        self.assertEqual(trigger_db, None)
+        Rule.query.assert_called_once_with(trigger='dummy_pack_1.unknown', enabled=True)
+        self.assertEqual(rule_index.get_stats()['misses'], 1)
+
+    def test_rule_cud_events(self):
+        rule_index = RuleIndex()
+        rule_index.seed()
+
+        # Rule moved to a different trigger
+        moved_rule = _get_rule_db('rule1', 'dummy_pack_1.trigger2')
+        moved_rule.id = RULE_1.id
+        rule_index.add_or_update_rule(moved_rule)
+
+        _, rule_dbs = rule_index.get_trigger_and_rules('dummy_pack_1.trigger1')
+        self.assertItemsEqual(rule_dbs, [RULE_2])
+        _, rule_dbs = rule_index.get_trigger_and_rules('dummy_pack_1.trigger2')
+        self.assertItemsEqual(rule_dbs, [moved_rule, RULE_3])
+
+        # Rule disabled
+        disabled_rule = _get_rule_db('rule3', 'dummy_pack_1.trigger2', enabled=False)
+        disabled_rule.id = RULE_3.id
+        rule_index.add_or_update_rule(disabled_rule)
+
+        _, rule_dbs = rule_index.get_trigger_and_rules('dummy_pack_1.trigger2')
+        self.assertItemsEqual(rule_dbs, [moved_rule])
+
+        # Rule deleted
+        rule_index.delete_rule(RULE_2)
+        _, rule_dbs = rule_index.get_trigger_and_rules('dummy_pack_1.trigger1')
+        self.assertEqual(rule_dbs, [])
+
+    def test_trigger_cud_events(self):
+        rule_index = RuleIndex()
+        rule_index.seed()
+
+        trigger_3 = TriggerDB(pack='dummy_pack_1', name='trigger3', type='dummy_pack_1.type1')
+        rule_index.add_or_update_trigger(trigger_3)
+
+        trigger_db, rule_dbs = rule_index.get_trigger_and_rules('dummy_pack_1.trigger3')
+        self.assertEqual(trigger_db, trigger_3)
+        self.assertEqual(rule_dbs, [])
+        self.assertEqual(rule_index.get_stats()['misses'], 0)
+
+        rule_index.delete_trigger(TRIGGER_1)
+        self.assertEqual(rule_index.get_stats()['triggers'], 2)
+
+    def test_check_consistency(self):
+        rule_index = RuleIndex()
+        rule_index.seed()
+        self.assertTrue(rule_index.check_consistency())
+
+        rule_index.delete_rule(RULE_1)
+        self.assertFalse(rule_index.check_consistency(repair=True))
+
+        # Index has been repaired with the database content
+        self.assertTrue(rule_index.check_consistency())
+        _, rule_dbs = rule_index.get_trigger_and_rules('dummy_pack_1.trigger1')
+        self.assertItemsEqual(rule_dbs, [RULE_1, RULE_2])
+
+    @mock.patch.object(index_module, 'get_trigger_db_by_ref',
+                       mock.MagicMock(return_value=TRIGGER_1))
+    def test_trigger_filter(self):
+        rule_index = RuleIndex(trigger_filter=lambda trigger_db: trigger_db.name == 'trigger2')
+        rule_index.seed()
+
+        Rule.query.assert_called_with(enabled=True, trigger__in=['dummy_pack_1.trigger2'])
+        self.assertEqual(rule_index.get_stats()['triggers'], 1)
+
+        # Rules and triggers which are not owned are not indexed
+        rule_index.add_or_update_rule(_get_rule_db('rule4', 'dummy_pack_1.trigger1'))
+        rule_index.add_or_update_trigger(TRIGGER_1)
+        self.assertEqual(rule_index.get_stats()['triggers'], 1)
+
+        # Lookup of a trigger which is not owned still falls back to the database
+        trigger_db, rule_dbs = rule_index.get_trigger_and_rules('dummy_pack_1.trigger1')
+        self.assertEqual(trigger_db, TRIGGER_1)
+        self.assertEqual(rule_index.get_stats()['triggers'], 1)
+
+        # Network of a trigger which is not owned is built from the rules which have been
+        # returned by the lookup and it's not cached
+        with mock.patch.object(index_module, 'RulesNetwork') as mock_network:
+            rule_index.get_rules_network('dummy_pack_1.trigger1', rules=rule_dbs)
+            rule_index.get_rules_network('dummy_pack_1.trigger1', rules=rule_dbs)
+
+        self.assertEqual(mock_network.call_args_list, [mock.call(rules=rule_dbs)] * 2)
+
+    @mock.patch.object(index_module, 'get_trigger_db_by_ref', mock.MagicMock(return_value=None))
+    def test_sharded_trigger_identified_by_type_and_parameters(self):
+        # Rules engine only owns the trigger type (and not the trigger references)
+        type_hash = reactor.get_trigger_ref_hash('dummy_pack_1.type1')
+        partitioner = TriggerInstancePartitioner('%s..%s' % (type_hash, type_hash + 1))
+        instance = {'trigger': {'type': 'dummy_pack_1.type1', 'parameters': {}}}
+        self.assertTrue(partitioner.is_trigger_instance_owner(instance))
+
+        rule_index = RuleIndex(trigger_filter=partitioner.is_trigger_db_owner)
+        rule_index.seed()
+
+        # Triggers of the owned type are indexed so trigger instances routed by the type use the
+        # index and the cached network
+        self.assertEqual(rule_index.get_stats()['triggers'], 2)
+        trigger_db, rule_dbs = rule_index.get_trigger_and_rules('dummy_pack_1.trigger1')
+        self.assertEqual(trigger_db, TRIGGER_1)
+        self.assertItemsEqual(rule_dbs, [RULE_1, RULE_2])
+        self.assertEqual(rule_index.get_stats()['misses'], 0)
+
+        with mock.patch.object(index_module, 'RulesNetwork') as mock_network:
+            network = rule_index.get_rules_network('dummy_pack_1.trigger1', rules=rule_dbs)
+            self.assertEqual(rule_index.get_rules_network('dummy_pack_1.trigger1', rules=[]),
+                             network)
+
+        self.assertEqual(mock_network.call_count, 1)
+        self.assertItemsEqual(mock_network.call_args[1]['rules'], [RULE_1, RULE_2])
@@ -0,0 +1,171 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bson
+import mock
+import unittest2
+from oslo_config import cfg
+
+import st2tests.config as tests_config
+tests_config.parse_args()
+
+from st2common.constants.trace import TRACE_CONTEXT
+from st2common.models.db.trace import TraceDB
+from st2common.models.db.trigger import TriggerDB
+from st2common.persistence.trigger import TriggerInstance
+from st2common.transport import consumers
+from st2common.transport import reactor
+from st2reactor.rules import worker
+from st2reactor.rules.engine import RulesEngine
+
+TRIGGER_1 = TriggerDB(pack='dummy_pack_1', name='trigger1', type='dummy_pack_1.type1')
+
+
+def _insert_many(model_objects):
+    for model_object in model_objects:
+        model_object.id = bson.ObjectId()
+    return model_objects
+
+
+def _add_or_update_given_trace_contexts(trace_contexts, trigger_instances):
+    trace_dbs = []
+    for trace_context in trace_contexts:
+        trace_db = TraceDB(trace_tag=trace_context.get('trace_tag', 'tag'))
+        trace_db.id = bson.ObjectId()
+        trace_dbs.append(trace_db)
+    return trace_dbs
+
+
+class TriggerInstanceDispatcherBatchTestCase(unittest2.TestCase):
+
+    def setUp(self):
+        super(TriggerInstanceDispatcherBatchTestCase, self).setUp()
+        cfg.CONF.set_override(name='rule_index_enable', override=False, group='rulesengine')
+
+        patchers = [
+            mock.patch.object(TriggerInstance, 'insert_many',
+                              mock.MagicMock(side_effect=_insert_many)),
+            mock.patch.object(worker, 'add_or_update_given_trace_contexts',
+                              mock.MagicMock(side_effect=_add_or_update_given_trace_contexts)),
+            mock.patch.object(worker.container_utils, 'get_trigger_db',
+                              mock.MagicMock(return_value=TRIGGER_1)),
+            mock.patch.object(worker.TraceComponentsBatch, 'commit',
+                              mock.MagicMock(return_value=1)),
+            mock.patch.object(RulesEngine, 'handle_trigger_instance', mock.MagicMock())
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        super(TriggerInstanceDispatcherBatchTestCase, self).tearDown()
+        cfg.CONF.clear_override(name='rule_index_enable', group='rulesengine')
+        cfg.CONF.clear_override(name='trigger_instances_batch_size', group='rulesengine')
+        cfg.CONF.clear_override(name='partition_hash_ranges', group='rulesengine')
+
+    def test_batching_consumer_is_used_when_enabled(self):
+        dispatcher = worker.get_worker()
+        self.assertFalse(isinstance(dispatcher._queue_consumer, consumers.BatchingQueueConsumer))
+
+        cfg.CONF.set_override(name='trigger_instances_batch_size', override=10,
+                              group='rulesengine')
+        dispatcher = worker.get_worker()
+        self.assertTrue(isinstance(dispatcher._queue_consumer, consumers.BatchingQueueConsumer))
+
+    def test_process_batch(self):
+        dispatcher = worker.get_worker()
+        instances = [
+            {'trigger': 'dummy_pack_1.trigger1', 'payload': {'k1': 'v1'}},
+            {'trigger': 'dummy_pack_1.trigger1', 'payload': None,
+             TRACE_CONTEXT: {'trace_tag': 'user_tag'}}
+        ]
+
+        dispatcher.process_batch(instances)
+
+        # All trigger instances are inserted at once
+        self.assertEqual(TriggerInstance.insert_many.call_count, 1)
+        trigger_instances = TriggerInstance.insert_many.call_args[0][0]
+        self.assertEqual(len(trigger_instances), 2)
+        self.assertEqual(trigger_instances[0].trigger, 'dummy_pack_1.trigger1')
+        self.assertEqual(trigger_instances[0].payload, {'k1': 'v1'})
+        self.assertEqual(trigger_instances[1].payload, {})
+
+        # All traces are added or updated at once
+        self.assertEqual(worker.add_or_update_given_trace_contexts.call_count, 1)
+        call_kwargs = worker.add_or_update_given_trace_contexts.call_args[1]
+        self.assertEqual(call_kwargs['trace_contexts'][0],
+                         {'trace_tag': 'trigger_instance-%s' % (trigger_instances[0].id)})
+        self.assertEqual(call_kwargs['trace_contexts'][1], {'trace_tag': 'user_tag'})
+        self.assertEqual(call_kwargs['trigger_instances'],
+                         [[str(trigger_instances[0].id)], [str(trigger_instances[1].id)]])
+
+        # Rules are enforced with a shared trace batch which is committed once
+        self.assertEqual(RulesEngine.handle_trigger_instance.call_count, 2)
+        trace_batches = set([id(call[1]['trace_batch']) for call in
+                             RulesEngine.handle_trigger_instance.call_args_list])
+        self.assertEqual(len(trace_batches), 1)
+        self.assertEqual(worker.TraceComponentsBatch.commit.call_count, 1)
+
+    def test_process_batch_trigger_not_found(self):
+        dispatcher = worker.get_worker()
+        instances = [
+            {'trigger': 'dummy_pack_1.trigger1', 'payload': {}},
+            {'trigger': 'dummy_pack_1.unknown', 'payload': {}}
+        ]
+
+        with mock.patch.object(worker.container_utils, 'get_trigger_db',
+                               mock.MagicMock(side_effect=[TRIGGER_1, None])):
+            dispatcher.process_batch(instances)
+
+        trigger_instances = TriggerInstance.insert_many.call_args[0][0]
+        self.assertEqual(len(trigger_instances), 1)
+        self.assertEqual(RulesEngine.handle_trigger_instance.call_count, 1)
+
+    def test_process_batch_trace_commit_failure_is_not_propagated(self):
+        dispatcher = worker.get_worker()
+        instances = [{'trigger': 'dummy_pack_1.trigger1', 'payload': {}}]
+
+        # Rules have already been enforced so the batch mustn't be processed again
+        with mock.patch.object(worker.TraceComponentsBatch, 'commit',
+                               mock.MagicMock(side_effect=Exception('failure'))):
+            dispatcher.process_batch(instances)
+
+        self.assertEqual(RulesEngine.handle_trigger_instance.call_count, 1)
+
+    def test_sharded_worker(self):
+        trigger_ref_hash = reactor.get_trigger_ref_hash('dummy_pack_1.trigger1')
+        cfg.CONF.set_override(name='partition_hash_ranges',
+                              override='%s..%s' % (trigger_ref_hash, trigger_ref_hash + 1),
+                              group='rulesengine')
+
+        dispatcher = worker.get_worker()
+
+        # Work queue is only bound to the partition of the owned trigger
+        queue = dispatcher._queue_consumer._queues[0]
+        partition = reactor.get_trigger_instance_partition('dummy_pack_1.trigger1')
+        self.assertEqual(queue.name, '%s.%s-%s' % (worker.RULESENGINE_WORK_Q.name,
+                                                   trigger_ref_hash, trigger_ref_hash + 1))
+        self.assertEqual([queue_binding.routing_key for queue_binding in queue.bindings],
+                         ['trigger_instance.%s.#' % (partition)])
+
+        # Trigger instances of the triggers owned by other rules engines are skipped
+        instances = [
+            {'trigger': 'dummy_pack_1.trigger1', 'payload': {}},
+            {'trigger': 'dummy_pack_1.trigger2', 'payload': {}}
+        ]
+        dispatcher.process_batch(instances)
+
+        trigger_instances = TriggerInstance.insert_many.call_args[0][0]
+        self.assertEqual(len(trigger_instances), 1)
@@ -0,0 +1,104 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bson
+import unittest2
+
+from st2common.constants.rules import RULE_TYPE_BACKSTOP, RULE_TYPE_STANDARD
+from st2common.models.db.rule import RuleDB, RuleTypeSpecDB
+from st2common.models.db.trigger import TriggerDB, TriggerInstanceDB
+from st2common.util import date as date_utils
+from st2reactor.rules.matcher import RulesMatcher
+from st2reactor.rules.network import RulesNetwork
+
+TRIGGER = TriggerDB(pack='dummy_pack_1', name='webhook', type='core.st2.webhook')
+
+
+def _get_rule(name, criteria, rule_type=RULE_TYPE_STANDARD, enabled=True):
+    return RuleDB(id=bson.ObjectId(), pack='wolfpack', name=name, trigger=TRIGGER.ref,
+                  criteria=criteria, type=RuleTypeSpecDB(ref=rule_type), enabled=enabled)
+
+
+def _get_trigger_instance(payload):
+    return TriggerInstanceDB(trigger=TRIGGER.ref, payload=payload,
+                             occurrence_time=date_utils.get_datetime_utc_now())
+
+
+RULES = [
+    _get_rule('repo1', {'trigger.body.repo': {'type': 'equals', 'pattern': 'st2'}}),
+    _get_rule('repo2', {'trigger.body.repo': {'type': 'eq', 'pattern': 'st2web'}}),
+    _get_rule('repo1_master', {
+        'trigger.body.repo': {'type': 'equals', 'pattern': 'st2'},
+        'trigger.body.branch': {'type': 'startswith', 'pattern': 'master'}
+    }),
+    _get_rule('count', {'trigger.body.count': {'type': 'equals', 'pattern': 10}}),
+    _get_rule('list', {'trigger.body.tags': {'type': 'equals', 'pattern': ['a', 'b']}}),
+    _get_rule('has_user', {'trigger.body.user': {'type': 'exists'}}),
+    _get_rule('no_user', {
+        'trigger.body.user': {'type': 'nexists'},
+        'trigger.body.repo': {'type': 'matchregex', 'pattern': '^st2.*'}
+    }),
+    _get_rule('no_type', {'trigger.body.repo': {'pattern': 'st2'}}),
+    _get_rule('disabled', {'trigger.body.repo': {'type': 'equals', 'pattern': 'st2'}},
+              enabled=False),
+    _get_rule('no_criteria', {}),
+    _get_rule('backstop', {'trigger.body.repo': {'type': 'exists'}},
+              rule_type=RULE_TYPE_BACKSTOP)
+]
+
+PAYLOADS = [
+    {'body': {'repo': 'st2', 'branch': 'master', 'user': 'stanley'}},
+    {'body': {'repo': 'st2', 'branch': 'feature'}},
+    {'body': {'repo': 'st2web', 'count': 10}},
+    {'body': {'repo': 'other', 'count': 10.0, 'tags': ['a', 'b']}},
+    {'body': {'repo': ['st2'], 'tags': ['b']}},
+    {'body': {}},
+    {},
+    None
+]
+
+
+class RulesNetworkTestCase(unittest2.TestCase):
+
+    def test_matches_same_rules_as_linear_matcher(self):
+        network = RulesNetwork(rules=RULES)
+
+        for payload in PAYLOADS:
+            trigger_instance = _get_trigger_instance(payload)
+
+            expected = RulesMatcher(trigger_instance=trigger_instance, trigger=TRIGGER,
+                                    rules=RULES).get_matching_rules()
+            actual = RulesMatcher(trigger_instance=trigger_instance, trigger=TRIGGER,
+                                  rules=RULES, network=network).get_matching_rules()
+
+            self.assertEqual([rule.name for rule in actual], [rule.name for rule in expected],
+                             'Mismatch for payload %s' % (payload))
+
+    def test_backstop_rule_only_matches_if_no_other_rule_matched(self):
+        rules = [
+            _get_rule('repo1', {'trigger.body.repo': {'type': 'equals', 'pattern': 'st2'}}),
+            _get_rule('backstop', {}, rule_type=RULE_TYPE_BACKSTOP)
+        ]
+        network = RulesNetwork(rules=rules)
+
+        trigger_instance = _get_trigger_instance({'body': {'repo': 'st2'}})
+        first_pass, second_pass = network.get_matching_rules(trigger_instance, TRIGGER)
+        self.assertEqual([rule.name for rule in first_pass], ['repo1'])
+        self.assertEqual(second_pass, [])
+
+        trigger_instance = _get_trigger_instance({'body': {'repo': 'other'}})
+        first_pass, second_pass = network.get_matching_rules(trigger_instance, TRIGGER)
+        self.assertEqual(first_pass, [])
+        self.assertEqual([rule.name for rule in second_pass], ['backstop'])
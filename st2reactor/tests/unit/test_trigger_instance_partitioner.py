@@ -0,0 +1,99 @@
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest2
+
+from st2common.transport import reactor
+from st2reactor.rules.partitioner import TriggerInstancePartitioner
+
+PARTITION_SIZE = reactor.TRIGGER_REF_HASH_MAX // reactor.TRIGGER_INSTANCE_PARTITIONS
+
+
+class TriggerInstanceRoutingTestCase(unittest2.TestCase):
+
+    def test_get_trigger_ref(self):
+        self.assertEqual(reactor.get_trigger_ref('pack1.trigger1'), 'pack1.trigger1')
+        self.assertEqual(reactor.get_trigger_ref({'ref': 'pack1.trigger1'}), 'pack1.trigger1')
+        self.assertEqual(reactor.get_trigger_ref({'pack': 'pack1', 'name': 'trigger1',
+                                                  'type': 'core.st2.webhook'}),
+                         'pack1.trigger1')
+        self.assertEqual(reactor.get_trigger_ref({'type': 'core.st2.webhook',
+                                                  'parameters': {}}), None)
+
+    def test_routing_key(self):
+        partition = reactor.get_trigger_instance_partition('pack1.trigger1')
+        self.assertTrue(0 <= partition < reactor.TRIGGER_INSTANCE_PARTITIONS)
+        self.assertEqual(reactor.get_trigger_instance_routing_key('pack1.trigger1'),
+                         'trigger_instance.%s.pack1.trigger1' % (partition))
+
+        # Trigger without a reference is routed by the trigger type
+        partition = reactor.get_trigger_instance_partition('core.st2.webhook')
+        self.assertEqual(reactor.get_trigger_instance_routing_key({'type': 'core.st2.webhook'}),
+                         'trigger_instance.%s.core.st2.webhook' % (partition))
+
+    def test_unicode_trigger_ref(self):
+        self.assertEqual(reactor.get_trigger_ref_hash(u'pack1.trigger1'),
+                         reactor.get_trigger_ref_hash('pack1.trigger1'))
+        reactor.get_trigger_instance_routing_key(u'pack1.trigger\xe9')
+
+    def test_trigger_ref_hash_is_distributed_over_partitions(self):
+        partitions = set([reactor.get_trigger_instance_partition('pack1.trigger%s' % (index))
+                          for index in range(1000)])
+        self.assertEqual(len(partitions), reactor.TRIGGER_INSTANCE_PARTITIONS)
+
+
+class TriggerInstancePartitionerTestCase(unittest2.TestCase):
+
+    def test_full_range(self):
+        partitioner = TriggerInstancePartitioner('MIN..MAX')
+        self.assertEqual(partitioner.get_partitions(),
+                         range(reactor.TRIGGER_INSTANCE_PARTITIONS))
+        self.assertTrue(partitioner.is_trigger_owner('pack1.trigger1'))
+        self.assertEqual(partitioner.get_queue_name_suffix(), '0-%s' % (2 ** 32))
+
+    def test_aligned_ranges_split_partitions(self):
+        middle = reactor.TRIGGER_REF_HASH_MAX // 2
+        partitioner_1 = TriggerInstancePartitioner('MIN..%s' % (middle))
+        partitioner_2 = TriggerInstancePartitioner('%s..MAX' % (middle))
+
+        partitions_1 = partitioner_1.get_partitions()
+        partitions_2 = partitioner_2.get_partitions()
+        self.assertEqual(len(partitions_1), reactor.TRIGGER_INSTANCE_PARTITIONS // 2)
+        self.assertEqual(set(partitions_1) & set(partitions_2), set())
+
+        for index in range(100):
+            instance = {'trigger': 'pack1.trigger%s' % (index)}
+            partition = reactor.get_trigger_instance_partition(instance['trigger'])
+
+            # Exactly one of the rules engines owns the trigger and it consumes its partition
+            self.assertNotEqual(partitioner_1.is_trigger_instance_owner(instance),
+                                partitioner_2.is_trigger_instance_owner(instance))
+            if partitioner_1.is_trigger_instance_owner(instance):
+                self.assertIn(partition, partitions_1)
+            else:
+                self.assertIn(partition, partitions_2)
+
+    def test_unaligned_ranges_overlap_in_a_partition(self):
+        boundary = PARTITION_SIZE * 3 + 10
+        partitioner_1 = TriggerInstancePartitioner('MIN..%s' % (boundary))
+        partitioner_2 = TriggerInstancePartitioner('%s..MAX' % (boundary))
+
+        self.assertEqual(partitioner_1.get_partitions(), [0, 1, 2, 3])
+        self.assertEqual(partitioner_2.get_partitions()[0], 3)
+
+    def test_multiple_ranges(self):
+        partitioner = TriggerInstancePartitioner(
+            'MIN..%s|%s..%s' % (PARTITION_SIZE, PARTITION_SIZE * 10, PARTITION_SIZE * 12))
+        self.assertEqual(partitioner.get_partitions(), [0, 10, 11])
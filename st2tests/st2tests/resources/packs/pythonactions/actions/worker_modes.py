@@ -0,0 +1,25 @@
+import os
+import sys
+import time
+
+from st2actions.runners.pythonrunner import Action
+
+
+class WorkerModesAction(Action):
+    def run(self, mode='ok', value=None):
+        if mode == 'sleep':
+            time.sleep(value)
+        elif mode == 'crash':
+            os._exit(3)
+        elif mode == 'exit':
+            sys.exit(value)
+        elif mode == 'raise':
+            raise ValueError('action failed')
+        elif mode == 'output':
+            print('to stdout')
+            self.logger.info('to logger')
+            os.system('echo from subprocess')
+        elif mode == 'large_output':
+            sys.stdout.write('x' * value)
+
+        return {'pid': os.getpid(), 'value': value, 'env': os.environ.get('WORKER_TEST_VAR')}
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Tags: Benchmark.
+
+A utility script which measures how long it takes to escape and unescape (the work done when an
+execution is saved and loaded) the keys of typical action execution results.
+
+"""
+
+import json
+import time
+import argparse
+
+from st2common.util import mongoescape
+
+
+def _get_local_runner_result(size):
+    # Large output, no keys which need escaping
+    return {
+        'failed': False,
+        'succeeded': True,
+        'return_code': 0,
+        'stdout': 'line of output\n' * (size * 100),
+        'stderr': ''
+    }
+
+
+def _get_remote_runner_result(size):
+    # Result is keyed by the host names which need escaping
+    result = {}
+    for index in range(size):
+        result['web%s.example.com' % (index)] = {
+            'failed': False,
+            'succeeded': True,
+            'return_code': 0,
+            'stdout': 'line of output\n' * 10,
+            'stderr': ''
+        }
+
+    return result
+
+
+def _get_python_runner_result(size):
+    # Wide and nested API response style result (no keys which need escaping)
+    items = []
+    for index in range(size * 10):
+        items.append({
+            'id': index,
+            'name': 'item-%s' % (index),
+            'tags': ['a', 'b', 'c'],
+            'metadata': {'created_by': 'user', 'labels': {'env': 'prod', 'tier': 'web'}}
+        })
+
+    return {
+        'exit_code': 0,
+        'stdout': '',
+        'stderr': '',
+        'result': {'items': items, 'count': len(items)}
+    }
+
+
+def _get_workflow_result(size):
+    # Workflow style result with a mix of the keys which need escaping and which don't
+    tasks = []
+    for index in range(size):
+        tasks.append({
+            'name': 'task%s' % (index),
+            'state': 'SUCCESS',
+            'input': {'host.name': 'web%s.example.com' % (index), '$ref': 'core.local'},
+            'result': _get_local_runner_result(size=1)
+        })
+
+    return {'tasks': tasks, 'extra': {'state': 'SUCCESS'}}
+
+
+RESULTS = [
+    ('local runner', _get_local_runner_result),
+    ('remote runner', _get_remote_runner_result),
+    ('python runner', _get_python_runner_result),
+    ('workflow', _get_workflow_result)
+]
+
+
+def _measure(func, value, iterations):
+    start = time.time()
+    for _ in range(iterations):
+        func(value)
+    duration = time.time() - start
+
+    return (duration / iterations) * 1000
+
+
+def main(size, iterations):
+    print('%-15s %10s %12s %14s' % ('result', 'size (KB)', 'escape (ms)', 'unescape (ms)'))
+
+    for name, func in RESULTS:
+        value = func(size=size)
+        escaped = mongoescape.escape_chars(value)
+
+        assert mongoescape.unescape_chars(escaped) == value
+
+        value_size = len(json.dumps(value)) / 1024
+        escape_duration = _measure(func=mongoescape.escape_chars, value=value,
+                                   iterations=iterations)
+        unescape_duration = _measure(func=mongoescape.unescape_chars, value=escaped,
+                                     iterations=iterations)
+        print('%-15s %10s %12.3f %14.3f' % (name, value_size, escape_duration,
+                                            unescape_duration))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Execution result escaping benchmark')
+    parser.add_argument('--size', type=int, default=100,
+                        help='Number of hosts / tasks (and items per 10) in the results')
+    parser.add_argument('--iterations', type=int, default=20,
+                        help='Number of times each result is escaped and unescaped')
+    args = parser.parse_args()
+
+    main(size=args.size, iterations=args.iterations)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Tags: Benchmark.
+
+A utility script which measures message handler throughput for different prefetch counts.
+
+Handlers mimic the scheduler and the rules engine - processing a message performs a fixed
+number of simulated database round-trips. By default the in-memory broker is used and
+--broker-rtt simulates the network round-trip which is needed for an acknowledgement to reach
+the broker before it delivers the next message.
+
+"""
+
+import eventlet
+
+eventlet.monkey_patch(
+    os=True,
+    select=True,
+    socket=True,
+    thread=False,
+    time=True)
+
+import argparse
+import time
+
+import mock
+from kombu import Connection, Exchange, Queue
+from kombu.message import Message
+from oslo_config import cfg
+
+from st2common import config
+from st2common.transport import consumers
+
+# Number of database round-trips performed when processing a single message
+SERVICE_DB_ROUND_TRIPS = {
+    # liveaction lookup, policy query, status update
+    'scheduler': 3,
+
+    # trigger instance insert, trace lookup and upsert, trace update per matched rule
+    'rulesengine': 4
+}
+
+BENCHMARK_XCHG = Exchange('st2.benchmark', type='topic')
+
+
+class BenchmarkHandler(consumers.MessageHandler):
+    message_type = dict
+
+    def __init__(self, connection, queues, db_latency, messages_count):
+        super(BenchmarkHandler, self).__init__(connection, queues)
+        self._db_latency = db_latency
+        self._messages_count = messages_count
+        self.processed = 0
+        self.done = eventlet.event.Event()
+
+    def process(self, message):
+        for _ in range(SERVICE_DB_ROUND_TRIPS[self.service_name]):
+            eventlet.sleep(self._db_latency)
+
+        self.processed += 1
+        if self.processed == self._messages_count:
+            self.done.send()
+
+
+def _get_handler_cls(service_name):
+    return type('BenchmarkHandler_%s' % (service_name), (BenchmarkHandler,),
+                {'service_name': service_name})
+
+
+def _run(broker_url, service_name, prefetch_count, messages_count, db_latency, broker_rtt):
+    queue = Queue('st2.benchmark.%s.%s' % (service_name, prefetch_count), BENCHMARK_XCHG,
+                  routing_key='#')
+    cfg.CONF.set_override(name='prefetch_count', override=prefetch_count, group='messaging')
+
+    ack = Message.ack
+
+    def delayed_ack(message, *args, **kwargs):
+        # Acknowledgement (and as such a free prefetch slot) reaches the broker after a round-trip
+        eventlet.spawn_after(broker_rtt, ack, message, *args, **kwargs)
+
+    with Connection(broker_url, transport_options={'polling_interval': 0.001}) as connection:
+        with connection.Producer(exchange=BENCHMARK_XCHG, serializer='pickle') as producer:
+            producer.declare()
+            queue(connection.default_channel).declare()
+
+            for index in range(messages_count):
+                producer.publish({'index': index}, routing_key=service_name)
+
+        handler = _get_handler_cls(service_name)(connection, [queue], db_latency=db_latency,
+                                                 messages_count=messages_count)
+
+        with mock.patch.object(Message, 'ack', delayed_ack):
+            start = time.time()
+            handler.start()
+            handler.done.wait()
+            duration = time.time() - start
+
+        handler.shutdown()
+        handler._consumer_thread.kill()
+
+    return duration
+
+
+def main(broker_url, services, prefetch_counts, messages_count, db_latency, broker_rtt):
+    config.parse_args(args=[])
+
+    print('%-12s %10s %10s %14s' % ('service', 'prefetch', 'time (s)', 'messages / s'))
+    for service_name in services:
+        for prefetch_count in prefetch_counts:
+            duration = _run(broker_url=broker_url, service_name=service_name,
+                            prefetch_count=prefetch_count, messages_count=messages_count,
+                            db_latency=db_latency, broker_rtt=broker_rtt)
+            print('%-12s %10s %10.2f %14.1f' % (service_name, prefetch_count, duration,
+                                                messages_count / duration))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Queue consumer benchmark')
+    parser.add_argument('--broker-url', default='memory://',
+                        help='URL of the broker to use')
+    parser.add_argument('--services', default='scheduler,rulesengine',
+                        help='Comma separated list of services to simulate')
+    parser.add_argument('--prefetch-counts', default='1,10,100',
+                        help='Comma separated list of prefetch counts to benchmark')
+    parser.add_argument('--messages', type=int, default=2000,
+                        help='Number of messages to process')
+    parser.add_argument('--db-latency', type=float, default=1.0,
+                        help='Duration of a simulated database round-trip (in ms)')
+    parser.add_argument('--broker-rtt', type=float, default=1.0,
+                        help='Simulated broker network round-trip (in ms)')
+    args = parser.parse_args()
+
+    main(broker_url=args.broker_url, services=args.services.split(','),
+         prefetch_counts=[int(count) for count in args.prefetch_counts.split(',')],
+         messages_count=args.messages, db_latency=args.db_latency / 1000.0,
+         broker_rtt=args.broker_rtt / 1000.0)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Tags: Benchmark.
+
+A utility script which compares the linear rules matcher with the matching network.
+
+Rules are created in memory (no database is needed). All the rules hang off a single trigger
+and differ by an "equals" criterion on "trigger.body.repo". Some of the rules also have an
+additional non-indexable criterion.
+
+"""
+
+import argparse
+import logging
+import random
+import time
+
+import bson
+
+from st2common.models.db.rule import RuleDB
+from st2common.models.db.trigger import TriggerDB, TriggerInstanceDB
+from st2common.util import date as date_utils
+from st2reactor.rules.matcher import RulesMatcher
+from st2reactor.rules.network import RulesNetwork
+
+
+def _get_rules(trigger, count):
+    rules = []
+    for index in range(count):
+        criteria = {
+            'trigger.body.repo': {'type': 'equals', 'pattern': 'repo-%s' % (index)}
+        }
+
+        if index % 5 == 0:
+            criteria['trigger.body.branch'] = {'type': 'startswith', 'pattern': 'master'}
+
+        rule = RuleDB(id=bson.ObjectId(), pack='benchmark', name='rule-%s' % (index),
+                      trigger=trigger.ref, criteria=criteria)
+        rules.append(rule)
+
+    return rules
+
+
+def _get_trigger_instances(trigger, rules_count, count):
+    trigger_instances = []
+    for _ in range(count):
+        payload = {
+            'body': {
+                'repo': 'repo-%s' % (random.randint(0, rules_count * 2)),
+                'branch': random.choice(['master', 'feature'])
+            }
+        }
+        trigger_instance = TriggerInstanceDB(trigger=trigger.ref, payload=payload,
+                                             occurrence_time=date_utils.get_datetime_utc_now())
+        trigger_instances.append(trigger_instance)
+
+    return trigger_instances
+
+
+def _run(trigger, rules, trigger_instances, network=None):
+    matched = 0
+    start = time.time()
+
+    for trigger_instance in trigger_instances:
+        matcher = RulesMatcher(trigger_instance=trigger_instance, trigger=trigger, rules=rules,
+                               network=network)
+        matched += len(matcher.get_matching_rules())
+
+    return time.time() - start, matched
+
+
+def main(rules_count, trigger_instances_count):
+    # Matchers log each evaluated rule which would dominate the results
+    logging.disable(logging.CRITICAL)
+
+    trigger = TriggerDB(pack='benchmark', name='webhook', type='core.st2.webhook')
+    rules = _get_rules(trigger=trigger, count=rules_count)
+    trigger_instances = _get_trigger_instances(trigger=trigger, rules_count=rules_count,
+                                               count=trigger_instances_count)
+
+    linear_duration, linear_matched = _run(trigger=trigger, rules=rules,
+                                           trigger_instances=trigger_instances)
+
+    start = time.time()
+    network = RulesNetwork(rules=rules)
+    build_duration = time.time() - start
+
+    network_duration, network_matched = _run(trigger=trigger, rules=rules,
+                                             trigger_instances=trigger_instances,
+                                             network=network)
+
+    assert linear_matched == network_matched
+
+    print('Rules: %s, trigger instances: %s, matched rules: %s' %
+          (rules_count, trigger_instances_count, linear_matched))
+    print('Linear matcher:   %.4fs (%.1f trigger instances / s)' %
+          (linear_duration, trigger_instances_count / linear_duration))
+    print('Matching network: %.4fs (%.1f trigger instances / s, build time %.4fs)' %
+          (network_duration, trigger_instances_count / network_duration, build_duration))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rules matcher benchmark')
+    parser.add_argument('--rules', type=int, default=500,
+                        help='Number of rules for a single trigger')
+    parser.add_argument('--trigger-instances', type=int, default=1000,
+                        help='Number of trigger instances to match')
+    args = parser.parse_args()
+
+    main(rules_count=args.rules, trigger_instances_count=args.trigger_instances)
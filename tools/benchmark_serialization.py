@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Tags: Benchmark.
+
+A utility script which compares the message bus serializers.
+
+For each of the available serializers it reports encode and decode time and message size for
+typical execution payloads (live action and action execution objects with a result of the
+provided size).
+
+"""
+
+import argparse
+import datetime
+import time
+
+import bson
+
+from st2common import config
+from st2common.models.db.execution import ActionExecutionDB
+from st2common.models.db.liveaction import LiveActionDB
+from st2common.transport import serialization
+from st2common.util import date as date_utils
+
+
+def _get_liveaction_db(result_size):
+    return LiveActionDB(
+        id=bson.ObjectId(),
+        status='succeeded',
+        start_timestamp=date_utils.get_datetime_utc_now(),
+        end_timestamp=date_utils.get_datetime_utc_now() + datetime.timedelta(seconds=3),
+        action='core.remote',
+        parameters={'cmd': 'uname -a', 'hosts': 'host1,host2', 'timeout': 60},
+        context={'user': 'stanley', 'parent': {'execution_id': str(bson.ObjectId())}},
+        callback={},
+        result={
+            'host1': {'failed': False, 'succeeded': True, 'return_code': 0,
+                      'stdout': 'x' * result_size, 'stderr': ''},
+            'host2': {'failed': False, 'succeeded': True, 'return_code': 0,
+                      'stdout': 'x' * result_size, 'stderr': ''}
+        })
+
+
+def _get_execution_db(liveaction_db):
+    return ActionExecutionDB(
+        id=bson.ObjectId(),
+        action={'name': 'remote', 'pack': 'core', 'ref': 'core.remote',
+                'runner_type': 'remote-shell-cmd', 'enabled': True,
+                'parameters': {'cmd': {'type': 'string', 'required': True}}},
+        runner={'name': 'remote-shell-cmd',
+                'runner_module': 'st2actions.runners.remote_command_runner',
+                'runner_parameters': {'hosts': {'type': 'string'},
+                                      'timeout': {'type': 'integer', 'default': 60}}},
+        liveaction=liveaction_db.to_mongo().to_dict(),
+        status=liveaction_db.status,
+        start_timestamp=liveaction_db.start_timestamp,
+        end_timestamp=liveaction_db.end_timestamp,
+        parameters=liveaction_db.parameters,
+        result=liveaction_db.result,
+        context=liveaction_db.context,
+        children=[str(bson.ObjectId()) for _ in range(5)])
+
+
+def _measure(payload, serializer, iterations):
+    start = time.time()
+    for _ in range(iterations):
+        content_type, content_encoding, body = serialization.dumps(payload,
+                                                                   serializer=serializer)
+    encode_duration = time.time() - start
+
+    start = time.time()
+    for _ in range(iterations):
+        serialization.loads(body, content_type=content_type, content_encoding=content_encoding)
+    decode_duration = time.time() - start
+
+    return content_type, len(body), encode_duration, decode_duration
+
+
+def main(result_sizes, iterations):
+    config.parse_args(args=[])
+
+    serializers = [serialization.SERIALIZER_PICKLE, serialization.SERIALIZER_JSON]
+    if serialization.SERIALIZER_MSGPACK in serialization.ACCEPT_CONTENT:
+        serializers.append(serialization.SERIALIZER_MSGPACK)
+
+    print('%-15s %12s %-12s %10s %16s %16s' % ('payload', 'result size', 'serializer',
+                                              'size (B)', 'encode (us/msg)', 'decode (us/msg)'))
+    for result_size in result_sizes:
+        liveaction_db = _get_liveaction_db(result_size=result_size)
+        payloads = [
+            ('liveaction', liveaction_db),
+            ('execution', _get_execution_db(liveaction_db=liveaction_db))
+        ]
+
+        for payload_name, payload in payloads:
+            for serializer in serializers:
+                content_type, size, encode_duration, decode_duration = _measure(
+                    payload=payload, serializer=serializer, iterations=iterations)
+
+                if serializer != serialization.SERIALIZER_PICKLE and 'st2' not in content_type:
+                    # Serializer fell back to pickle
+                    serializer = '%s (pickle)' % (serializer)
+
+                print('%-15s %12s %-12s %10s %16.1f %16.1f' % (
+                    payload_name, result_size, serializer, size,
+                    encode_duration / iterations * 1000000,
+                    decode_duration / iterations * 1000000))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Message bus serialization benchmark')
+    parser.add_argument('--result-sizes', default='100,10000',
+                        help='Comma separated list of result stdout sizes (in bytes)')
+    parser.add_argument('--iterations', type=int, default=2000,
+                        help='Number of times each payload is encoded and decoded')
+    args = parser.parse_args()
+
+    main(result_sizes=[int(size) for size in args.result_sizes.split(',')],
+         iterations=args.iterations)
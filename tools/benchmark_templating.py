@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+
+Tags: Benchmark.
+
+A utility script which measures how many templates per second can be rendered.
+
+It renders a mapping which looks like typical rule action parameters or action chain node
+params using a new environment and template for each render (the old behavior) and using the
+shared environment and the compiled template cache.
+
+"""
+
+import argparse
+import time
+
+from st2common.util import jinja as jinja_utils
+
+MAPPING = {
+    'cmd': 'echo {{trigger.host}} {{trigger.message}}',
+    'hosts': '{{trigger.host}}',
+    'message': 'Alert "{{trigger.message | regex_replace("\\\\s+", " ")}}" on {{trigger.host}}',
+    'count': '{{trigger.count}}',
+    'static': 'no template here'
+}
+
+CONTEXT = {
+    'trigger': {
+        'host': 'web01.example.com',
+        'message': 'disk   usage  above 90%',
+        'count': 3
+    }
+}
+
+
+def _render_uncached(mapping, context):
+    env = jinja_utils.get_jinja_environment()
+    return {k: env.from_string(v).render(context) for k, v in mapping.items()}
+
+
+def _render_cached(mapping, context):
+    return {k: jinja_utils.get_template(v).render(context) for k, v in mapping.items()}
+
+
+def _measure(func, iterations):
+    start = time.time()
+    for _ in range(iterations):
+        func(MAPPING, CONTEXT)
+    duration = time.time() - start
+
+    return (iterations * len(MAPPING)) / duration
+
+
+def main(iterations):
+    variants = [
+        ('new environment', _render_uncached),
+        ('shared cache', _render_cached),
+        ('render_values', jinja_utils.render_values)
+    ]
+
+    print('%-20s %18s' % ('variant', 'renders / second'))
+    for name, func in variants:
+        print('%-20s %18.0f' % (name, _measure(func=func, iterations=iterations)))
+
+    print('')
+    print('Template cache stats: %s' % (jinja_utils.get_template_cache_stats()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Template rendering benchmark')
+    parser.add_argument('--iterations', type=int, default=2000,
+                        help='Number of times the mapping is rendered')
+    args = parser.parse_args()
+
+    main(iterations=args.iterations)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# Licensed to the StackStorm, Inc ('StackStorm') under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+A utility script which converts existing executions to store references to the shared resource
+snapshots (see execution.store_snapshots_by_reference config option) instead of full copies of
+the action, runner, rule, trigger and trigger type.
+
+Executions are converted in batches ordered by id so the migration can be interrupted and
+started again.
+"""
+
+from oslo_config import cfg
+
+from st2common import config
+from st2common.models.db import db_setup
+from st2common.models.db import db_teardown
+from st2common.models.db.execution import ActionExecutionDB
+from st2common.services import snapshots as snapshot_service
+
+
+def do_register_cli_opts(opts, ignore_errors=False):
+    for opt in opts:
+        try:
+            cfg.CONF.register_cli_opt(opt)
+        except:
+            if not ignore_errors:
+                raise
+
+
+def migrate_executions(batch_size=1000):
+    attributes = snapshot_service.SNAPSHOT_ATTRIBUTES
+    last_id = None
+    migrated_count = 0
+
+    while True:
+        queryset = ActionExecutionDB.objects.order_by('id').only(*attributes)
+
+        if last_id:
+            queryset = queryset.filter(id__gt=last_id)
+
+        execution_dbs = list(queryset.limit(batch_size))
+
+        if not execution_dbs:
+            break
+
+        for execution_db in execution_dbs:
+            values = dict([(attribute, getattr(execution_db, attribute, None))
+                           for attribute in attributes])
+            references = snapshot_service.get_snapshot_references(values)
+            changes = dict([('set__%s' % (attribute), references[attribute])
+                            for attribute in attributes
+                            if references[attribute] is not values[attribute]])
+
+            if changes:
+                ActionExecutionDB.objects(id=execution_db.id).update_one(**changes)
+                migrated_count += 1
+
+        last_id = execution_dbs[-1].id
+        print('Migrated %s executions (last id: %s).' % (migrated_count, last_id))
+
+    print('#### Total executions migrated: %d' % migrated_count)
+
+
+def main():
+    cli_opts = [
+        cfg.IntOpt('batch-size', default=1000,
+                   help='Number of executions retrieved with a single query.')
+    ]
+    do_register_cli_opts(cli_opts)
+    config.parse_args()
+
+    # Connect to db.
+    username = cfg.CONF.database.username if hasattr(cfg.CONF.database, 'username') else None
+    password = cfg.CONF.database.password if hasattr(cfg.CONF.database, 'password') else None
+    db_setup(cfg.CONF.database.db_name, cfg.CONF.database.host, cfg.CONF.database.port,
+             username=username, password=password)
+
+    # Migrate executions.
+    migrate_executions(batch_size=cfg.CONF.batch_size)
+
+    # Disconnect from db.
+    db_teardown()
+
+
+if __name__ == '__main__':
+    main()
@@ -22,22 +22,22 @@ timestamp.
 *** RISK RISK RISK. You will lose data. Run at your own risk. ***
 """
 
-from datetime import datetime, timedelta
+from datetime import timedelta
 import sys
 
 import eventlet
 from oslo_config import cfg
 
 from st2common import config
+from st2common.garbage_collection.purge import purge_executions
+from st2common.garbage_collection.purge import RateLimiter
 from st2common.models.db import db_setup
 from st2common.models.db import db_teardown
-from st2common.persistence.liveaction import LiveAction
-from st2common.persistence.execution import ActionExecution
+from st2common.util import date as date_utils
 from st2common.util import isotime
 
 
 DEFAULT_TIMEDELTA_DAYS = 2  # in days
-DELETED_COUNT = 0
 
 
 def _monkey_patch():
@@ -58,64 +58,23 @@ def do_register_cli_opts(opts, ignore_errors=False):
                 raise
 
 
-def _purge_action_models(execution_db):
-    liveaction_id = execution_db.liveaction['id']
-
-    if not liveaction_id:
-        print('Invalid LiveAction id. Skipping delete: %s', execution_db)
-
-    liveaction_db = None
-    try:
-        liveaction_db = LiveAction.get_by_id(liveaction_id)
-    except:
-        print('LiveAction with id: %s not found. Skipping delete.', liveaction_id)
-    else:
-        global DELETED_COUNT
-        DELETED_COUNT += 1
-
-    try:
-        ActionExecution.delete(execution_db)
-    except Exception as e:
-        print('Exception deleting Execution model: %s, exception: %s',
-              execution_db, str(e))
-    else:
-        try:
-            LiveAction.delete(liveaction_db)
-        except Exception as e:
-            print('Zombie LiveAction left in db: %s. Exception: %s',
-                  liveaction_db, str(e))
-
-
-def _purge_executions(timestamp=None, action_ref=None):
+def _purge_executions(timestamp=None, action_ref=None, purge_incomplete=False,
+                      batch_size=None, rate_limit=0):
     if not timestamp:
         print('Specify a valid timestamp to purge.')
         return
 
-    if not action_ref:
-        action_ref = ''
-
     print('Purging executions older than timestamp: %s' %
           timestamp.strftime('%Y-%m-%dT%H:%M:%S.%fZ'))
 
-    def should_delete(execution_db):
-        if action_ref != '':
-            return (execution_db.liveaction['action'] == action_ref
-                    and execution_db.start_timestamp < timestamp)
-        else:
-            return execution_db.start_timestamp < timestamp
-
-    # XXX: Think about paginating this call.
-    filters = {'start_timestamp__lt': isotime.parse(timestamp)}
-    executions = ActionExecution.query(**filters)
-    executions_to_delete = filter(should_delete, executions)
-    print('#### Total number of executions to delete: %d' % len(executions_to_delete))
-
-    # Purge execution and liveaction models now
-    for execution_db in executions_to_delete:
-        _purge_action_models(execution_db)
+    # Executions (and the corresponding live actions) are deleted in batches so the memory
+    # usage doesn't depend on the number of executions
+    count = purge_executions(timestamp=timestamp, action_ref=action_ref or None,
+                             purge_incomplete=purge_incomplete, batch_size=batch_size,
+                             rate_limiter=RateLimiter(max_per_second=rate_limit))
 
     # Print stats
-    print('#### Total execution models deleted: %d' % DELETED_COUNT)
+    print('#### Total execution models deleted: %d' % count)
 
 
 def main():
@@ -127,7 +86,13 @@ def main():
                    'this timestamp. (default 48 hours). ' +
                    'Example value: 2015-03-13T19:01:27.255542Z'),
         cfg.StrOpt('action-ref', default='',
-                   help='action-ref to delete executions for.')
+                   help='action-ref to delete executions for.'),
+        cfg.BoolOpt('purge-incomplete', default=False,
+                    help='Also delete executions which haven\'t completed yet.'),
+        cfg.IntOpt('batch-size', default=1000,
+                   help='Number of executions deleted with a single query.'),
+        cfg.IntOpt('rate-limit', default=0,
+                   help='Maximum number of executions deleted per second. 0 to disable.')
     ]
     do_register_cli_opts(cli_opts)
     config.parse_args()
@@ -135,6 +100,9 @@ def main():
     # Get config values
     timestamp = cfg.CONF.timestamp
     action_ref = cfg.CONF.action_ref
+    purge_incomplete = cfg.CONF.purge_incomplete
+    batch_size = cfg.CONF.batch_size
+    rate_limit = cfg.CONF.rate_limit
     username = cfg.CONF.database.username if hasattr(cfg.CONF.database, 'username') else None
     password = cfg.CONF.database.password if hasattr(cfg.CONF.database, 'password') else None
 
@@ -143,13 +111,15 @@ def main():
              username=username, password=password)
 
     if not timestamp:
-        now = datetime.now()
+        now = date_utils.get_datetime_utc_now()
         timestamp = now - timedelta(days=DEFAULT_TIMEDELTA_DAYS)
     else:
-        timestamp = datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S.%fZ')
+        timestamp = isotime.parse(timestamp)
 
     # Purge models.
-    _purge_executions(timestamp=timestamp, action_ref=action_ref)
+    _purge_executions(timestamp=timestamp, action_ref=action_ref,
+                      purge_incomplete=purge_incomplete, batch_size=batch_size,
+                      rate_limit=rate_limit)
 
     # Disconnect from db.
     db_teardown()
@@ -61,11 +61,12 @@ def main(metadata_path, output_path, print_source=False):
                   node_attr=node_attr, graph_attr=graph_attr, format='png')
     #  dot.body.extend(['rankdir=TD', 'size="10,5"'])
 
-    # Add all nodes
-    node = chain_holder.get_next_node()
-    while node:
-        dot.node(node.name, node.name)
-        node = chain_holder.get_next_node(curr_node_name=node.name)
+    # Add all nodes, parallel (fan-out) nodes are rendered as diamonds
+    for node in chain_holder.actionchain.chain:
+        if node.parallel is not None:
+            dot.node(node.name, node.name, shape='diamond')
+        else:
+            dot.node(node.name, node.name)
 
     # Add connections
     node = chain_holder.get_next_node()
@@ -78,10 +79,21 @@ def main(metadata_path, output_path, print_source=False):
         failure_node = chain_holder.get_next_node(curr_node_name=previous_node.name,
                                                   condition='on-failure')
 
-        # Add success node (if any)
+        # Add parallel branches (if any)
+        for branch_node_name in previous_node.parallel or []:
+            branch_node = chain_holder.get_node(branch_node_name)
+            dot.edge(previous_node.name, branch_node.name, constraint='true',
+                     color='blue', label='parallel')
+            if branch_node.name not in processed_nodes:
+                nodes.append(branch_node)
+                processed_nodes.add(branch_node.name)
+
+        # Add success node (if any). For parallel nodes this is the node which is executed once
+        # all the branches complete
         if success_node:
+            label = 'join' if previous_node.parallel is not None else 'on success'
             dot.edge(previous_node.name, success_node.name, constraint='true',
-                     color='green', label='on success')
+                     color='green', label=label)
             if success_node.name not in processed_nodes:
                 nodes.append(success_node)
                 processed_nodes.add(success_node.name)